@@ -3,7 +3,18 @@
 """
 from django.contrib import admin
 from django.utils.html import format_html
-from .models import Genre, Artist, Track
+from .models import Genre, Artist, Track, TrackTag, EnrichmentJob, ListeningEvent, PendingScrobble
+
+
+class ForListChangelistMixin:
+    """Список объектов в админке читается без тяжелых колонок (QuerySet.for_list)."""
+
+    def get_queryset(self, request):
+        queryset = super().get_queryset(request)
+        match = request.resolver_match
+        if match and match.url_name and match.url_name.endswith('_changelist'):
+            return queryset.for_list()
+        return queryset
 
 
 @admin.register(Genre)
@@ -15,7 +26,7 @@ class GenreAdmin(admin.ModelAdmin):
 
 
 @admin.register(Artist)
-class ArtistAdmin(admin.ModelAdmin):
+class ArtistAdmin(ForListChangelistMixin, admin.ModelAdmin):
     list_display = ('name', 'lastfm_listeners', 'lastfm_playcount',
                     'is_popular', 'created_at')
     list_filter = ('is_popular', 'genres', 'created_at')
@@ -34,14 +45,22 @@ class ArtistAdmin(admin.ModelAdmin):
     image_preview.short_description = "Превью"
 
 
+class TrackTagInline(admin.TabularInline):
+    model = TrackTag
+    extra = 0
+    ordering = ('rank',)
+    raw_id_fields = ('genre',)
+
+
 @admin.register(Track)
-class TrackAdmin(admin.ModelAdmin):
+class TrackAdmin(ForListChangelistMixin, admin.ModelAdmin):
     list_display = ('title', 'artist', 'lastfm_playcount',
                     'lastfm_listeners', 'is_reference', 'created_at')
     list_filter = ('is_reference', 'artist', 'created_at')
     search_fields = ('title', 'artist__name', 'album')
     readonly_fields = ('created_at', 'updated_at', 'image_preview')
     raw_id_fields = ('artist',)
+    inlines = (TrackTagInline,)
 
     def image_preview(self, obj):
         if obj.image_url:
@@ -52,3 +71,30 @@ class TrackAdmin(admin.ModelAdmin):
         return "Нет изображения"
 
     image_preview.short_description = "Превью"
+
+
+@admin.register(EnrichmentJob)
+class EnrichmentJobAdmin(admin.ModelAdmin):
+    list_display = ('key', 'kind', 'status', 'priority', 'attempts',
+                    'run_after', 'updated_at')
+    list_filter = ('status', 'kind')
+    search_fields = ('key', 'last_error')
+    readonly_fields = ('created_at', 'updated_at', 'locked_at', 'locked_by')
+
+
+@admin.register(ListeningEvent)
+class ListeningEventAdmin(admin.ModelAdmin):
+    list_display = ('user', 'track', 'listened_at')
+    search_fields = ('user__username', 'track__title', 'track__artist__name')
+    raw_id_fields = ('user', 'track')
+    list_select_related = ('user', 'track')
+    date_hierarchy = 'listened_at'
+
+
+@admin.register(PendingScrobble)
+class PendingScrobbleAdmin(admin.ModelAdmin):
+    list_display = ('user', 'artist_name', 'track_title', 'listened_at')
+    search_fields = ('user__username', 'artist_name', 'track_title')
+    raw_id_fields = ('user',)
+    list_select_related = ('user',)
+    date_hierarchy = 'listened_at'
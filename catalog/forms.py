@@ -66,7 +66,7 @@ class AddTrackFromLastFMForm(forms.Form):
         artist_name = cleaned_data.get('artist_name')
 
         if track_name and artist_name:
-            if Track.objects.filter(title__iexact=track_name, artist__name__iexact=artist_name).exists():
+            if Track.objects.by_name(track_name, artist_name).exists():
                 raise forms.ValidationError(
                     f'Трек "{track_name}" исполнителя "{artist_name}" уже существует в базе.'
                 )
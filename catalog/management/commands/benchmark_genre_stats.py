@@ -0,0 +1,137 @@
+"""
+Команда для сравнения источников статистики жанров на синтетическом каталоге.
+"""
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from catalog.models import Artist, Genre, Track, canonical_key
+from catalog.services import GenreStatsService
+
+BENCH_PREFIX = 'bench:'
+
+
+class Command(BaseCommand):
+    """Замер запроса страницы жанров для источников live, table и matview."""
+
+    help = ('Сравнивает время чтения рейтинга жанров из агрегирующего запроса, таблицы '
+            'GenreStats и материализованного представления (PostgreSQL); с --generate '
+            'замеряет на синтетическом каталоге, созданном на время замера')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--generate',
+            action='store_true',
+            help='Замерить на синтетическом каталоге, который удаляется по окончании'
+        )
+        parser.add_argument('--tracks', type=int, default=1_000_000, help='Треков (по умолчанию: 1 000 000)')
+        parser.add_argument('--artists', type=int, default=None, help='Исполнителей (по умолчанию: треков / 20)')
+        parser.add_argument('--genres', type=int, default=500, help='Жанров (по умолчанию: 500)')
+        parser.add_argument('--genres-per-artist', type=int, default=3, help='Жанров у исполнителя (по умолчанию: 3)')
+        parser.add_argument('--limit', type=int, default=100, help='Жанров в выборке (по умолчанию: 100)')
+        parser.add_argument('--repeat', type=int, default=5, help='Повторов каждого запроса (по умолчанию: 5)')
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        if not options['generate']:
+            self._measure(options)
+            return
+
+        # Синтетический каталог живет только до конца замера: откат транзакции
+        # убирает его вместе с пересчитанной статистикой, без DELETE и сигналов
+        with transaction.atomic():
+            self._generate(options)
+            self._measure(options)
+            transaction.set_rollback(True)
+            started = time.perf_counter()
+        self.stdout.write(self.style.SUCCESS(
+            f"Синтетический каталог удален откатом транзакции за {time.perf_counter() - started:.1f} с"
+        ))
+
+    def _measure(self, options):
+        self._timed("Пересчет GenreStats (rebuild)", GenreStatsService.rebuild)
+        backends = ['live', 'table']
+        if connection.vendor == 'postgresql':
+            # REFRESH CONCURRENTLY нельзя выполнить внутри транзакции
+            self._timed(
+                "Обновление представления (REFRESH)",
+                lambda: GenreStatsService.refresh_leaderboard(concurrently=not connection.in_atomic_block)
+            )
+            backends.append('matview')
+        else:
+            self.stdout.write("matview пропущен: база не PostgreSQL")
+
+        limit = options['limit']
+        self.stdout.write(f"Первые {limit} жанров по прослушиваниям, повторов: {options['repeat']}")
+        for backend in backends:
+            timings = []
+            for _ in range(options['repeat']):
+                started = time.perf_counter()
+                list(GenreStatsService.annotate_genres(backend=backend).order_by('-total_playcount')[:limit])
+                timings.append((time.perf_counter() - started) * 1000)
+            self.stdout.write(
+                f"  {backend:<8} медиана {statistics.median(timings):9.1f} мс | "
+                f"мин. {min(timings):9.1f} мс | макс. {max(timings):9.1f} мс"
+            )
+
+    def _timed(self, title, func):
+        started = time.perf_counter()
+        func()
+        self.stdout.write(f"{title}: {time.perf_counter() - started:.1f} с")
+
+    def _generate(self, options):
+        """Синтетический каталог пишется пакетно, в обход сигналов статистики."""
+        if Genre.objects.filter(name__startswith=BENCH_PREFIX).exists():
+            raise CommandError(f"В базе уже есть синтетический каталог ({BENCH_PREFIX}*)")
+
+        rng = random.Random(options['seed'])
+        total_tracks = options['tracks']
+        total_artists = options['artists'] or max(1, total_tracks // 20)
+        batch_size = 5000
+        started = time.perf_counter()
+
+        with transaction.atomic():
+            Genre.objects.bulk_create(
+                [Genre(name=f'{BENCH_PREFIX}genre-{i}') for i in range(options['genres'])],
+                batch_size=batch_size
+            )
+            genre_ids = list(Genre.objects.filter(name__startswith=BENCH_PREFIX).values_list('pk', flat=True))
+
+            Artist.objects.bulk_create(
+                [
+                    Artist(name=f'{BENCH_PREFIX}artist-{i}', name_key=canonical_key(f'{BENCH_PREFIX}artist-{i}'))
+                    for i in range(total_artists)
+                ],
+                batch_size=batch_size
+            )
+            artist_ids = list(Artist.objects.filter(name__startswith=BENCH_PREFIX).values_list('pk', flat=True))
+
+            per_artist = min(options['genres_per_artist'], len(genre_ids))
+            Link = Artist.genres.through
+            Link.objects.bulk_create(
+                [
+                    Link(artist_id=artist_id, genre_id=genre_id)
+                    for artist_id in artist_ids
+                    for genre_id in rng.sample(genre_ids, per_artist)
+                ],
+                batch_size=batch_size
+            )
+
+            for start in range(0, total_tracks, batch_size):
+                Track.objects.bulk_create([
+                    Track(
+                        title=f'track-{i}',
+                        title_key=canonical_key(f'track-{i}'),
+                        artist_id=artist_ids[i % len(artist_ids)],
+                        lastfm_playcount=int(rng.paretovariate(1.2) * 100)
+                    )
+                    for i in range(start, min(start + batch_size, total_tracks))
+                ])
+
+        self.stdout.write(
+            f"Создано: {len(genre_ids):,} жанров, {len(artist_ids):,} исполнителей, "
+            f"{total_tracks:,} треков за {time.perf_counter() - started:.1f} с"
+        )
@@ -0,0 +1,101 @@
+"""
+Команда для выполнения задач обогащения из очереди.
+"""
+import os
+import signal
+import socket
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections
+
+from catalog.services import JobQueueService, get_lastfm_service
+
+
+class Command(BaseCommand):
+    """Команда воркера очереди EnrichmentJob."""
+
+    help = 'Выполняет задачи обогащения данными Last.fm из очереди EnrichmentJob'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--threads',
+            type=int,
+            default=None,
+            help='Количество потоков (по умолчанию: JOB_WORKER_THREADS)'
+        )
+        parser.add_argument(
+            '--batch',
+            type=int,
+            default=None,
+            help='Сколько задач захватывать за раз (по умолчанию: число потоков)'
+        )
+        parser.add_argument(
+            '--poll-interval',
+            type=float,
+            default=None,
+            help='Пауза при пустой очереди в секундах (по умолчанию: JOB_POLL_INTERVAL)'
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Выполнить готовые задачи и завершиться'
+        )
+
+    def handle(self, *args, **options):
+        threads = options['threads'] or getattr(settings, 'JOB_WORKER_THREADS', 4)
+        batch = options['batch'] or threads
+        poll_interval = options['poll_interval']
+        if poll_interval is None:
+            poll_interval = getattr(settings, 'JOB_POLL_INTERVAL', 2.0)
+        if threads < 1 or batch < 1:
+            raise CommandError("--threads и --batch должны быть больше 0")
+
+        try:
+            lastfm = get_lastfm_service()
+        except ValueError as e:
+            raise CommandError(str(e))
+        # Ошибки Last.fm должны доходить до очереди, чтобы задача повторилась позже
+        lastfm.raise_unavailable = True
+        lastfm.rate_limit_wait = lastfm.batch_rate_limit_wait
+
+        worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        stop = threading.Event()
+        signal.signal(signal.SIGTERM, lambda signum, frame: stop.set())
+
+        self.stdout.write(self.style.SUCCESS(f"Воркер {worker_id}: {threads} потоков"))
+        done = failed = 0
+
+        with ThreadPoolExecutor(max_workers=threads, thread_name_prefix='enrichment') as pool:
+            try:
+                while not stop.is_set():
+                    reclaimed = JobQueueService.reclaim_stale()
+                    if reclaimed:
+                        self.stdout.write(f"  Возвращено в очередь зависших задач: {reclaimed}")
+
+                    jobs = JobQueueService.claim(worker_id, limit=batch)
+                    if not jobs:
+                        if options['once']:
+                            break
+                        stop.wait(poll_interval)
+                        continue
+
+                    for ok in pool.map(lambda job: self._run(job, lastfm), jobs):
+                        if ok:
+                            done += 1
+                        else:
+                            failed += 1
+            except KeyboardInterrupt:
+                pass
+
+        self.stdout.write(f"Выполнено: {done}, с ошибкой: {failed}")
+
+    @staticmethod
+    def _run(job, lastfm) -> bool:
+        close_old_connections()
+        try:
+            return JobQueueService.run(job, lastfm)
+        finally:
+            close_old_connections()
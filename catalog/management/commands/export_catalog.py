@@ -0,0 +1,79 @@
+"""
+Команда для потоковой выгрузки каталога.
+"""
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from catalog.services import ExportService
+
+
+class Command(BaseCommand):
+    """Выгрузка жанров, исполнителей, треков и связей в JSONL или CSV."""
+
+    help = ('Выгружает каталог в JSONL (все сущности в одном потоке) или CSV '
+            '(по файлу на сущность), не загружая его в память')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--format',
+            choices=ExportService.FORMATS,
+            default='jsonl',
+            help='Формат выгрузки (по умолчанию: jsonl)'
+        )
+        parser.add_argument(
+            '--entity',
+            action='append',
+            choices=list(ExportService.ENTITIES),
+            default=None,
+            help='Сущность для выгрузки, можно указать несколько раз (по умолчанию: все)'
+        )
+        parser.add_argument(
+            '--since',
+            default=None,
+            help='Только строки, изменённые с этого времени (ISO 8601)'
+        )
+        parser.add_argument(
+            '--output',
+            default=None,
+            help='JSONL: файл (по умолчанию: stdout). CSV: директория для <entity>.csv '
+                 '(stdout - только для одной сущности)'
+        )
+
+    def handle(self, *args, **options):
+        entities = options['entity'] or list(ExportService.ENTITIES)
+
+        since = None
+        if options['since']:
+            try:
+                since = ExportService.parse_since(options['since'])
+            except ValueError as e:
+                raise CommandError(str(e))
+
+        output = options['output']
+        if options['format'] == 'csv' and not output and len(entities) != 1:
+            raise CommandError("Для CSV нескольких сущностей укажите --output <директория>")
+
+        started_at = timezone.now()
+        if options['format'] == 'jsonl':
+            self._write(output, ExportService.iter_jsonl(entities, since))
+        elif not output:
+            self._write(None, ExportService.iter_csv(entities[0], since))
+        else:
+            os.makedirs(output, exist_ok=True)
+            for entity in entities:
+                self._write(os.path.join(output, f"{entity}.csv"), ExportService.iter_csv(entity, since))
+
+        # Сообщение идёт в stderr, чтобы не смешиваться с выгрузкой в stdout
+        self.stderr.write(f"Готово. Для следующей инкрементальной выгрузки: --since {started_at.isoformat()}")
+
+    def _write(self, path, lines):
+        if path is None:
+            for line in lines:
+                self.stdout.write(line, ending='')
+            self.stdout.flush()
+            return
+
+        with open(path, 'w', encoding='utf-8', newline='') as f:
+            f.writelines(lines)
@@ -0,0 +1,76 @@
+"""
+Команда для импорта истории прослушиваний из Last.fm.
+"""
+from django.core.management.base import BaseCommand, CommandError
+
+from catalog.models import UserProfile
+from catalog.services import ListeningHistoryService, get_lastfm_service
+from catalog.services.lastfm_service import LastFMUnavailable
+
+
+class Command(BaseCommand):
+    """Импорт скробблов пользователей с указанным lastfm_username."""
+
+    help = ('Загружает прослушивания пользователей из Last.fm (user.getRecentTracks). '
+            'По умолчанию - только новее последнего импортированного')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user',
+            default=None,
+            help='Имя пользователя сайта (по умолчанию: все с заполненным lastfm_username)'
+        )
+        parser.add_argument(
+            '--full',
+            action='store_true',
+            help='Загрузить всю историю заново (уже импортированное не дублируется)'
+        )
+
+    def handle(self, *args, **options):
+        try:
+            lastfm = get_lastfm_service()
+        except ValueError as e:
+            raise CommandError(str(e))
+        # Пропущенная страница сдвинула бы отметку последнего импорта
+        lastfm.raise_unavailable = True
+
+        profiles = (
+            UserProfile.objects
+            .exclude(lastfm_username__isnull=True)
+            .exclude(lastfm_username='')
+            .select_related('user')
+            .order_by('user_id')
+        )
+        if options['user']:
+            profiles = profiles.filter(user__username=options['user'])
+            if not profiles.exists():
+                raise CommandError(f"У пользователя {options['user']} не указан lastfm_username или он не найден")
+
+        failed = 0
+        for profile in profiles:
+            self.stdout.write(f"{profile.user.username} (Last.fm: {profile.lastfm_username})")
+
+            def progress(stats):
+                self.stdout.write(
+                    f"  страниц: {stats['pages']:,} | прослушиваний: {stats['scrobbles']:,} | "
+                    f"ждут проверки трека: {stats['pending']:,}"
+                )
+
+            try:
+                stats = ListeningHistoryService.sync_user(
+                    profile.user_id, profile.lastfm_username, lastfm,
+                    full=options['full'], progress=progress
+                )
+            except LastFMUnavailable as e:
+                failed += 1
+                self.stderr.write(f"  Импорт прерван, повторный запуск продолжит его: {e}")
+                continue
+
+            self.stdout.write(self.style.SUCCESS(f"  Импортировано прослушиваний: {stats['scrobbles']:,}"))
+            if stats['pending']:
+                self.stdout.write(
+                    f"  Ждут проверки трека в Last.fm (enrichment_worker): {stats['pending']:,}"
+                )
+
+        if failed:
+            raise CommandError(f"Не удалось импортировать историю {failed} пользователей")
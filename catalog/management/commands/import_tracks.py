@@ -0,0 +1,121 @@
+"""
+Команда для массового импорта треков из CSV или JSONL.
+"""
+import os
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from catalog.services import GenreStatsService, IngestionService, LastFMService
+from catalog.services.lastfm_service import LastFMUnavailable
+
+
+class Command(BaseCommand):
+    """Команда для импорта больших списков треков с обогащением из Last.fm."""
+
+    help = 'Импортирует пары (артист, трек) из CSV или JSONL, обогащая их данными Last.fm'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Файл CSV (artist,track) или JSONL ({"artist": ..., "track": ...})')
+        parser.add_argument(
+            '--format',
+            choices=['csv', 'jsonl'],
+            default=None,
+            help='Формат файла (по умолчанию: по расширению)'
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=500,
+            help='Размер порции и транзакции (по умолчанию: 500)'
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=None,
+            help='Потоков для запросов к Last.fm (по умолчанию: LASTFM_BATCH_WORKERS)'
+        )
+        parser.add_argument(
+            '--checkpoint',
+            default=None,
+            help='Файл прогресса (по умолчанию: <path>.checkpoint.json)'
+        )
+        parser.add_argument(
+            '--restart',
+            action='store_true',
+            help='Начать сначала, игнорируя сохранённый прогресс'
+        )
+        parser.add_argument(
+            '--no-enrich',
+            action='store_true',
+            help='Не обращаться к Last.fm, импортировать только имена'
+        )
+
+    def handle(self, *args, **options):
+        path = options['path']
+        if not os.path.exists(path):
+            raise CommandError(f"Файл не найден: {path}")
+        if options['chunk_size'] < 1:
+            raise CommandError("--chunk-size должен быть больше 0")
+
+        checkpoint_path = options['checkpoint'] or f"{path}.checkpoint.json"
+        if options['restart'] and os.path.exists(checkpoint_path):
+            os.remove(checkpoint_path)
+
+        lastfm = None
+        if not options['no_enrich']:
+            # Отдельный клиент: настройки ниже не меняют общий клиент процесса,
+            # а HTTP-сессия, кэш и лимит запросов у них общие
+            try:
+                lastfm = LastFMService()
+            except ValueError as e:
+                raise CommandError(str(e))
+            # Ошибка Last.fm останавливает импорт до сохранения прогресса,
+            # а не засчитывает порцию как не найденную
+            lastfm.raise_unavailable = True
+            if options['workers']:
+                lastfm.batch_workers = options['workers']
+
+        checkpoint = IngestionService.load_checkpoint(checkpoint_path, path)
+        if checkpoint['rows_done']:
+            self.stdout.write(f"Продолжение с строки {checkpoint['rows_done'] + 1}")
+
+        def progress(stats):
+            self.stdout.write(
+                f"  строк: {stats['rows_done']:,} | "
+                f"треков +{stats.get('tracks_created', 0):,} ~{stats.get('tracks_updated', 0):,} | "
+                f"не найдено: {stats.get('not_found', 0):,} | "
+                f"порция: {stats['chunk_seconds']:.1f} с | "
+                f"{stats['rows_per_second']:.1f} строк/с"
+            )
+
+        try:
+            stats = IngestionService.import_file(
+                path,
+                lastfm=lastfm,
+                chunk_size=options['chunk_size'],
+                checkpoint_path=checkpoint_path,
+                file_format=options['format'],
+                progress=progress,
+            )
+        except LastFMUnavailable as e:
+            rows_done = IngestionService.load_checkpoint(checkpoint_path, path)['rows_done']
+            raise CommandError(
+                f"Last.fm недоступен ({e}). Обработано строк: {rows_done:,}; "
+                f"повторный запуск продолжит с этого места"
+            )
+
+        self.stdout.write(self.style.SUCCESS("Импорт завершён"))
+        self.stdout.write(f"  Строк обработано: {stats['rows_done']:,}")
+        self.stdout.write(f"  Пропущено (пустые строки): {stats.get('skipped', 0):,}")
+        self.stdout.write(f"  Не найдено в Last.fm: {stats.get('not_found', 0):,}")
+        self.stdout.write(f"  Артистов создано: {stats.get('artists_created', 0):,}")
+        self.stdout.write(f"  Треков создано: {stats.get('tracks_created', 0):,}")
+        self.stdout.write(f"  Треков обновлено: {stats.get('tracks_updated', 0):,}")
+        self.stdout.write(f"  Жанров создано: {stats.get('genres_created', 0):,}")
+        self.stdout.write(f"  Время: {stats['elapsed']:.1f} с ({stats['rows_per_second']:.1f} строк/с)")
+
+        if GenreStatsService.backend() == 'matview':
+            started = time.monotonic()
+            GenreStatsService.refresh_leaderboard()
+            self.stdout.write(f"  Рейтинг жанров обновлен за {time.monotonic() - started:.1f} с")
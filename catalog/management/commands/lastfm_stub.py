@@ -0,0 +1,96 @@
+"""
+Команда для запуска локальной замены Last.fm API.
+"""
+from django.core.management.base import BaseCommand, CommandError
+
+from catalog.services.lastfm_stub import LastFMStubServer, StubConfig
+
+
+class Command(BaseCommand):
+    """Команда для запуска сервера, изображающего Last.fm API."""
+
+    help = ('Запускает локальный сервер Last.fm API для бенчмарков и нагрузочных тестов. '
+            'Укажите его адрес в LASTFM_API_URL')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='127.0.0.1', help='Адрес (по умолчанию: 127.0.0.1)')
+        parser.add_argument('--port', type=int, default=8765, help='Порт (по умолчанию: 8765)')
+        parser.add_argument(
+            '--latency-ms',
+            type=float,
+            default=0,
+            help='Медиана задержки ответа в миллисекундах (по умолчанию: 0)'
+        )
+        parser.add_argument(
+            '--latency-sigma',
+            type=float,
+            default=0,
+            help='Разброс задержки: сигма логнормального распределения (по умолчанию: 0 - постоянная)'
+        )
+        parser.add_argument('--rate-429', type=float, default=0, help='Доля ответов 429 (0..1)')
+        parser.add_argument('--rate-5xx', type=float, default=0, help='Доля ответов 503 (0..1)')
+        parser.add_argument(
+            '--total-items',
+            type=int,
+            default=10000,
+            help='Количество элементов в синтетических списках (по умолчанию: 10000)'
+        )
+        parser.add_argument(
+            '--max-page-size',
+            type=int,
+            default=1000,
+            help='Максимальный размер страницы (по умолчанию: 1000)'
+        )
+        parser.add_argument(
+            '--bio-bytes',
+            type=int,
+            default=2000,
+            help='Размер биографий и описаний в байтах (по умолчанию: 2000)'
+        )
+        parser.add_argument('--replay-dir', help='Директория записанных ответов')
+        parser.add_argument(
+            '--record',
+            metavar='UPSTREAM_URL',
+            help='Записывать в --replay-dir ответы настоящего API, например https://ws.audioscrobbler.com/2.0/'
+        )
+        parser.add_argument(
+            '--no-synthetic',
+            action='store_true',
+            help='Не генерировать ответы: без записи отвечать "не найдено"'
+        )
+        parser.add_argument('--seed', type=int, default=None, help='Начальное значение генератора задержек и ошибок')
+
+    def handle(self, *args, **options):
+        if options['record'] and not options['replay_dir']:
+            raise CommandError("--record требует --replay-dir")
+
+        for name in ('rate_429', 'rate_5xx'):
+            if not 0 <= options[name] <= 1:
+                raise CommandError(f"--{name.replace('_', '-')} должно быть от 0 до 1")
+
+        config = StubConfig(
+            latency_ms=options['latency_ms'],
+            latency_sigma=options['latency_sigma'],
+            rate_429=options['rate_429'],
+            rate_5xx=options['rate_5xx'],
+            max_page_size=options['max_page_size'],
+            total_items=options['total_items'],
+            bio_bytes=options['bio_bytes'],
+            replay_dir=options['replay_dir'],
+            record_upstream=options['record'],
+            synthetic=not options['no_synthetic'],
+            seed=options['seed'],
+        )
+
+        server = LastFMStubServer(options['host'], options['port'], config)
+
+        self.stdout.write(self.style.SUCCESS(f"Last.fm stub: {server.url}"))
+        self.stdout.write(f"Для подключения: LASTFM_API_URL={server.url}")
+
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+            self.stdout.write(f"Статистика: {server.stats}")
@@ -1,10 +1,11 @@
 """
 Команда для загрузки демо-данных.
 """
-import json
 from django.core.management.base import BaseCommand
-from catalog.models import Genre, Artist, Track
-from catalog.services import LastFMService
+from django.db.models import OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+from catalog.models import Genre, GenreStats, Artist, Track, canonical_key
+from catalog.services import GenreService, UpsertService, get_lastfm_service
 
 
 class Command(BaseCommand):
@@ -49,15 +50,14 @@ class Command(BaseCommand):
             {'name': 'Indie', 'lastfm_tag': 'indie', 'description': 'Инди-музыка'},
         ]
 
-        genres = {}
+        existing_genres = set(
+            Genre.objects.filter(name__in=[genre_data['name'] for genre_data in genres_data])
+            .values_list('name', flat=True)
+        )
+        UpsertService.upsert_genres(genres_data)
         for genre_data in genres_data:
-            genre, created = Genre.objects.get_or_create(
-                name=genre_data['name'],
-                defaults=genre_data
-            )
-            genres[genre.name.lower()] = genre
-            if created:
-                self.stdout.write(f"Создан жанр: {genre.name}")
+            if genre_data['name'] not in existing_genres:
+                self.stdout.write(f"Создан жанр: {genre_data['name']}")
 
         popular_tracks = [
             {'artist': 'Queen', 'track': 'Bohemian Rhapsody'},
@@ -80,84 +80,81 @@ class Command(BaseCommand):
 
         tracks_to_load = popular_tracks[:track_count]
 
-        lastfm_service = LastFMService()
+        lastfm_service = get_lastfm_service()
 
-        for i, demo_track in enumerate(tracks_to_load, 1):
-            try:
-                self.stdout.write(
-                    f"[{i}/{len(tracks_to_load)}] Поиск: {demo_track['artist']} - {demo_track['track']}")
+        self.stdout.write(f"Запрос {len(tracks_to_load)} треков в Last.fm...")
+        track_keys = [(demo_track['artist'], demo_track['track']) for demo_track in tracks_to_load]
 
-                track_info = lastfm_service.get_track_info(
-                    artist=demo_track['artist'],
-                    track=demo_track['track']
-                )
+        found = []
+        for i, ((artist_name, track_name), track_info) in enumerate(
+                lastfm_service.get_track_info_many(track_keys), 1):
+            self.stdout.write(f"[{i}/{len(tracks_to_load)}] {artist_name} - {track_name}")
 
-                if not track_info:
-                    self.stdout.write(self.style.WARNING(f"Не найден: {demo_track['track']}"))
-                    continue
+            if not track_info:
+                self.stdout.write(self.style.WARNING(f"Не найден: {track_name}"))
+                continue
 
-                artist_obj, artist_created = Artist.objects.get_or_create(
-                    name=track_info['artist'],
-                    defaults={
-                        'lastfm_url': track_info.get('url', ''),
-                        'lastfm_listeners': track_info.get('listeners', 0),
-                        'lastfm_playcount': track_info.get('playcount', 0),
-                        'image_url': track_info.get('image', ''),
-                        'description': f'Демо-артист: {track_info["artist"]}'
-                    }
-                )
+            found.append(track_info)
 
-                if not artist_created:
-                    artist_obj.lastfm_listeners = track_info.get('listeners', 0)
-                    artist_obj.lastfm_playcount = track_info.get('playcount', 0)
-                    if track_info.get('image'):
-                        artist_obj.image_url = track_info['image']
-                    artist_obj.save()
-
-                track_obj, track_created = Track.objects.get_or_create(
-                    title=track_info['name'],
-                    artist=artist_obj,
-                    defaults={
+        if found:
+            artist_ids = UpsertService.upsert_artists(
+                [
+                    {
+                        'name': track_info['artist'],
                         'lastfm_url': track_info.get('url', ''),
                         'lastfm_listeners': track_info.get('listeners', 0),
                         'lastfm_playcount': track_info.get('playcount', 0),
-                        'duration': track_info.get('duration'),
-                        'album': track_info.get('album', ''),
-                        'tags': track_info.get('tags', []),
                         'image_url': track_info.get('image', ''),
-                        'is_reference': True,
+                        'description': f'Демо-артист: {track_info["artist"]}',
                     }
-                )
-
-                track_obj.set_lastfm_data(track_info)
+                    for track_info in found
+                ],
+                update_fields=['lastfm_listeners', 'lastfm_playcount']
+            )
 
-                if track_created and track_info.get('tags'):
-                    track_obj.link_genres_from_tags()
+            existing = set(
+                Track.objects.filter(
+                    artist_id__in=artist_ids.values(),
+                    title_key__in=[canonical_key(t['name'][:200]) for t in found]
+                ).values_list('artist_id', 'title_key')
+            )
 
-                if track_created:
-                    self.stdout.write(self.style.SUCCESS(
-                        f"Добавлен: {track_obj.title} - {artist_obj.name}"
-                    ))
-                else:
-                    self.stdout.write(self.style.NOTICE(
-                        f"Уже существует: {track_obj.title}"
-                    ))
+            UpsertService.upsert_tracks(
+                [
+                    {
+                        'artist_id': artist_ids[track_info['artist'][:200]],
+                        'title': track_info['name'],
+                        'is_reference': True,
+                        **UpsertService.track_stats(track_info),
+                    }
+                    for track_info in found
+                ],
+                update_fields=UpsertService.TRACK_STATS_FIELDS
+            )
 
-                import time
-                time.sleep(0.3)
+            new_artist_tags = {}
+            for track_info in found:
+                artist_id = artist_ids[track_info['artist'][:200]]
+                if (artist_id, canonical_key(track_info['name'][:200])) in existing:
+                    self.stdout.write(self.style.NOTICE(f"Уже существует: {track_info['name']}"))
+                    continue
 
-            except Exception as e:
-                self.stdout.write(self.style.ERROR(
-                    f"Ошибка при добавлении {demo_track['track']}: {str(e)}"
+                new_artist_tags.setdefault(artist_id, []).extend(
+                    track_info.get('tags', [])[:GenreService.GENRES_PER_ENTITY]
+                )
+                self.stdout.write(self.style.SUCCESS(
+                    f"Добавлен: {track_info['name']} - {track_info['artist']}"
                 ))
 
+            GenreService.link_artist_genres(new_artist_tags)
+
         self.stdout.write("Обновление статистики жанров...")
-        for genre in Genre.objects.all():
-            genre.track_count = Track.objects.filter(
-                tags_json__icontains=genre.name.lower()
-            ).count()
-            genre.is_popular = genre.track_count > 5
-            genre.save()
+        # GenreStats уже актуальна после записи; Genre.track_count
+        # копируется из неё двумя UPDATE вместо подсчета по каждому жанру
+        Genre.objects.update(track_count=Coalesce(
+            Subquery(GenreStats.objects.filter(genre=OuterRef('pk')).values('track_count')[:1]), 0
+        ))
+        Genre.objects.update(is_popular=Q(track_count__gt=5))
 
         self.stdout.write(self.style.SUCCESS("Демо-данные успешно загружены!"))
 
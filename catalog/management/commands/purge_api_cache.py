@@ -0,0 +1,38 @@
+"""
+Команда для очистки истёкших записей кэша Last.fm.
+"""
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from catalog.services.cache import get_cache_storage
+
+
+class Command(BaseCommand):
+    """Команда для массового удаления истёкших записей кэша."""
+
+    help = 'Удаляет истёкшие записи из кэша ответов Last.fm'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--cache-dir',
+            default='.cache/lastfm',
+            help='Директория кэша (по умолчанию: .cache/lastfm)'
+        )
+        parser.add_argument(
+            '--grace-hours',
+            type=float,
+            default=None,
+            help='Сколько часов хранить запись после истечения TTL '
+                 '(по умолчанию: LASTFM_STALE_IF_ERROR, чтобы не удалять записи для отдачи при сбоях)'
+        )
+
+    def handle(self, *args, **options):
+        if options['grace_hours'] is None:
+            grace_seconds = getattr(settings, 'LASTFM_STALE_IF_ERROR', 0)
+        else:
+            grace_seconds = options['grace_hours'] * 60 * 60
+
+        storage = get_cache_storage(options['cache_dir'])
+        removed = storage.purge_expired(grace_seconds=grace_seconds)
+
+        self.stdout.write(self.style.SUCCESS(f"Удалено записей: {removed}"))
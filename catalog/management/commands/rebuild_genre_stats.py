@@ -0,0 +1,22 @@
+"""
+Команда для полного пересчета статистики жанров.
+"""
+import time
+
+from django.core.management.base import BaseCommand
+
+from catalog.services import GenreStatsService
+
+
+class Command(BaseCommand):
+    """Пересчет таблицы GenreStats по текущим трекам и связям."""
+
+    help = ('Пересчитывает статистику всех жанров (треки, исполнители, прослушивания) '
+            'агрегирующими запросами; нужна после прямых изменений базы в обход сервисов')
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        genres = GenreStatsService.rebuild()
+        self.stdout.write(self.style.SUCCESS(
+            f"Статистика пересчитана: {genres} жанров за {time.monotonic() - started:.1f} с"
+        ))
@@ -0,0 +1,89 @@
+"""
+Команда для планового обновления данных Last.fm.
+"""
+import signal
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections
+
+from catalog.services import RefreshService, get_lastfm_service
+from catalog.services.lastfm_service import LastFMUnavailable
+
+
+class Command(BaseCommand):
+    """Планировщик обновления устаревших треков и исполнителей."""
+
+    help = ('Постоянно обновляет статистику Last.fm у треков и исполнителей: '
+            'сначала популярные и давно не обновлявшиеся, в пределах бюджета запросов в час')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--budget',
+            type=int,
+            default=None,
+            help='Запросов к Last.fm в час (по умолчанию: LASTFM_REFRESH_BUDGET)'
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=None,
+            help='Шаг планировщика в секундах (по умолчанию: REFRESH_INTERVAL)'
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Выполнить один шаг и завершиться'
+        )
+
+    def handle(self, *args, **options):
+        budget = options['budget'] or getattr(settings, 'LASTFM_REFRESH_BUDGET', 600)
+        interval = options['interval'] or getattr(settings, 'REFRESH_INTERVAL', 60)
+        if budget < 1 or interval <= 0:
+            raise CommandError("--budget и --interval должны быть больше 0")
+
+        try:
+            lastfm = get_lastfm_service()
+        except ValueError as e:
+            raise CommandError(str(e))
+        # При ошибке Last.fm шаг прерывается, а не помечает сущности обновлёнными
+        lastfm.raise_unavailable = True
+
+        stop = threading.Event()
+        signal.signal(signal.SIGTERM, lambda signum, frame: stop.set())
+
+        per_tick = budget * interval / 3600
+        self.stdout.write(self.style.SUCCESS(
+            f"Планировщик: {budget} запросов в час, шаг {interval:g} с (~{per_tick:.1f} за шаг)"
+        ))
+
+        # Дробный остаток бюджета переносится на следующий шаг, неизрасходованный - нет
+        allowance = 0.0
+        try:
+            while not stop.is_set():
+                started = time.monotonic()
+                allowance = min(allowance + per_tick, max(per_tick, 1.0))
+                limit = max(int(allowance), 1) if options['once'] else int(allowance)
+                allowance -= limit
+
+                if limit:
+                    close_old_connections()
+                    try:
+                        stats = RefreshService.refresh_batch(limit, lastfm)
+                    except LastFMUnavailable as e:
+                        self.stderr.write(f"  Last.fm недоступен, шаг прерван: {e}")
+                    else:
+                        if stats['selected']:
+                            self.stdout.write(
+                                f"  выбрано: {stats['selected']} | треков: {stats['tracks']} | "
+                                f"исполнителей: {stats['artists']} | не найдено: {stats['not_found']} | "
+                                f"{time.monotonic() - started:.1f} с"
+                            )
+
+                if options['once']:
+                    break
+                stop.wait(max(0.0, interval - (time.monotonic() - started)))
+        except KeyboardInterrupt:
+            pass
@@ -0,0 +1,136 @@
+# Generated by Django 5.2.9 on 2026-10-17 00:00
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("catalog", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="EnrichmentJob",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "kind",
+                    models.CharField(
+                        choices=[("track", "Трек"), ("artist", "Исполнитель")],
+                        max_length=20,
+                        verbose_name="Тип задачи",
+                    ),
+                ),
+                (
+                    "key",
+                    models.CharField(
+                        help_text="Ключ сущности для исключения дублей, например track:42",
+                        max_length=255,
+                        verbose_name="Ключ",
+                    ),
+                ),
+                (
+                    "payload",
+                    models.JSONField(
+                        blank=True, default=dict, verbose_name="Параметры"
+                    ),
+                ),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("pending", "Ожидает"),
+                            ("running", "Выполняется"),
+                            ("done", "Выполнена"),
+                            ("failed", "Ошибка"),
+                        ],
+                        default="pending",
+                        max_length=20,
+                        verbose_name="Статус",
+                    ),
+                ),
+                (
+                    "priority",
+                    models.IntegerField(
+                        default=0,
+                        help_text="Задачи с большим приоритетом выполняются раньше",
+                        verbose_name="Приоритет",
+                    ),
+                ),
+                (
+                    "attempts",
+                    models.PositiveIntegerField(default=0, verbose_name="Попыток"),
+                ),
+                (
+                    "max_attempts",
+                    models.PositiveIntegerField(
+                        default=5, verbose_name="Максимум попыток"
+                    ),
+                ),
+                (
+                    "run_after",
+                    models.DateTimeField(
+                        default=django.utils.timezone.now, verbose_name="Не раньше"
+                    ),
+                ),
+                (
+                    "locked_at",
+                    models.DateTimeField(
+                        blank=True, null=True, verbose_name="Взята в работу"
+                    ),
+                ),
+                (
+                    "locked_by",
+                    models.CharField(
+                        blank=True, default="", max_length=100, verbose_name="Воркер"
+                    ),
+                ),
+                (
+                    "last_error",
+                    models.TextField(
+                        blank=True, default="", verbose_name="Последняя ошибка"
+                    ),
+                ),
+                (
+                    "created_at",
+                    models.DateTimeField(
+                        auto_now_add=True, verbose_name="Дата создания"
+                    ),
+                ),
+                (
+                    "updated_at",
+                    models.DateTimeField(
+                        auto_now=True, verbose_name="Дата обновления"
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Задача обогащения",
+                "verbose_name_plural": "Задачи обогащения",
+                "ordering": ["-priority", "run_after", "id"],
+                "indexes": [
+                    models.Index(
+                        fields=["status", "run_after", "priority"],
+                        name="job_queue_idx",
+                    )
+                ],
+                "constraints": [
+                    models.UniqueConstraint(
+                        condition=models.Q(("status__in", ["pending", "running"])),
+                        fields=("key",),
+                        name="unique_active_job_per_key",
+                    )
+                ],
+            },
+        ),
+    ]
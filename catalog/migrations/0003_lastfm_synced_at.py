@@ -0,0 +1,45 @@
+# Generated by Django 5.2.9 on 2026-10-17 00:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("catalog", "0002_enrichmentjob"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="artist",
+            name="lastfm_synced_at",
+            field=models.DateTimeField(
+                blank=True,
+                help_text="Когда данные Last.fm последний раз обновлялись",
+                null=True,
+                verbose_name="Синхронизировано с Last.fm",
+            ),
+        ),
+        migrations.AddField(
+            model_name="track",
+            name="lastfm_synced_at",
+            field=models.DateTimeField(
+                blank=True,
+                help_text="Когда данные Last.fm последний раз обновлялись",
+                null=True,
+                verbose_name="Синхронизировано с Last.fm",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="artist",
+            index=models.Index(
+                fields=["lastfm_synced_at"], name="catalog_art_lastfm__828f19_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="track",
+            index=models.Index(
+                fields=["lastfm_synced_at"], name="catalog_tra_lastfm__a38af7_idx"
+            ),
+        ),
+    ]
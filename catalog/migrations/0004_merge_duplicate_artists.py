@@ -0,0 +1,82 @@
+# Generated by Django 5.2.9 on 2026-10-17 00:10
+
+from django.db import migrations
+from django.db.models import Count
+
+
+def repoint_favorites(Favorite, item_type, old_ids, new_id):
+    """Перенос избранного со старых id на новый без нарушения уникальности."""
+    for favorite in Favorite.objects.filter(item_type=item_type, item_id__in=[str(pk) for pk in old_ids]):
+        duplicate = Favorite.objects.filter(
+            user_id=favorite.user_id, item_type=item_type, item_id=str(new_id)
+        ).exists()
+        if duplicate:
+            favorite.delete()
+        else:
+            favorite.item_id = str(new_id)
+            favorite.save(update_fields=["item_id"])
+
+
+def merge_duplicate_artists(apps, schema_editor):
+    """
+    Слияние исполнителей с одинаковым именем перед уникальным индексом.
+
+    Остаётся исполнитель с наименьшим id: к нему переходят треки,
+    жанры и избранное дублей; треки с уже существующим у него
+    названием сливаются в один.
+    """
+    Artist = apps.get_model("catalog", "Artist")
+    Track = apps.get_model("catalog", "Track")
+    Favorite = apps.get_model("catalog", "Favorite")
+    ArtistGenres = Artist.genres.through
+
+    duplicate_names = (
+        Artist.objects.values("name")
+        .annotate(copies=Count("id"))
+        .filter(copies__gt=1)
+        .values_list("name", flat=True)
+    )
+
+    for name in list(duplicate_names):
+        artists = list(Artist.objects.filter(name=name).order_by("id"))
+        keep, duplicates = artists[0], artists[1:]
+        duplicate_ids = [artist.id for artist in duplicates]
+
+        keep.lastfm_listeners = max(artist.lastfm_listeners for artist in artists)
+        keep.lastfm_playcount = max(artist.lastfm_playcount for artist in artists)
+        for field in ("lastfm_url", "description", "image_url"):
+            if not getattr(keep, field):
+                setattr(keep, field, next((getattr(a, field) for a in duplicates if getattr(a, field)), None))
+        keep.save()
+
+        kept_genres = set(ArtistGenres.objects.filter(artist_id=keep.id).values_list("genre_id", flat=True))
+        new_genres = set(
+            ArtistGenres.objects.filter(artist_id__in=duplicate_ids).values_list("genre_id", flat=True)
+        ) - kept_genres
+        ArtistGenres.objects.bulk_create(
+            [ArtistGenres(artist_id=keep.id, genre_id=genre_id) for genre_id in new_genres]
+        )
+
+        kept_tracks = dict(Track.objects.filter(artist_id=keep.id).values_list("title", "id"))
+        for track in Track.objects.filter(artist_id__in=duplicate_ids).order_by("id"):
+            if track.title in kept_tracks:
+                repoint_favorites(Favorite, "track", [track.id], kept_tracks[track.title])
+                track.delete()
+            else:
+                track.artist_id = keep.id
+                track.save(update_fields=["artist"])
+                kept_tracks[track.title] = track.id
+
+        repoint_favorites(Favorite, "artist", duplicate_ids, keep.id)
+        Artist.objects.filter(id__in=duplicate_ids).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("catalog", "0003_lastfm_synced_at"),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_artists, migrations.RunPython.noop),
+    ]
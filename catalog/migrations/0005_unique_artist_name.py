@@ -0,0 +1,20 @@
+# Generated by Django 5.2.9 on 2026-10-17 00:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("catalog", "0004_merge_duplicate_artists"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="artist",
+            name="name",
+            field=models.CharField(
+                max_length=200, unique=True, verbose_name="Имя исполнителя"
+            ),
+        ),
+    ]
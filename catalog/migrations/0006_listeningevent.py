@@ -0,0 +1,70 @@
+# Generated by Django 5.2.9 on 2026-10-17 00:14
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("catalog", "0005_unique_artist_name"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ListeningEvent",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "listened_at",
+                    models.DateTimeField(verbose_name="Время прослушивания"),
+                ),
+                (
+                    "track",
+                    models.ForeignKey(
+                        db_index=False,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="listening_events",
+                        to="catalog.track",
+                        verbose_name="Трек",
+                    ),
+                ),
+                (
+                    "user",
+                    models.ForeignKey(
+                        db_index=False,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="listening_events",
+                        to=settings.AUTH_USER_MODEL,
+                        verbose_name="Пользователь",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Прослушивание",
+                "verbose_name_plural": "Прослушивания",
+                "ordering": ["-listened_at"],
+                "indexes": [
+                    models.Index(
+                        fields=["track", "listened_at"], name="listening_track_idx"
+                    )
+                ],
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("user", "listened_at", "track"),
+                        name="unique_listening_event",
+                    )
+                ],
+            },
+        ),
+    ]
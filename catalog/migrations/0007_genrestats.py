@@ -0,0 +1,82 @@
+# Generated by Django 5.2.9 on 2026-10-17 00:20
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Sum
+from django.db.models.functions import Coalesce
+
+
+def fill_genre_stats(apps, schema_editor):
+    """Начальное заполнение статистики по существующим трекам и связям."""
+    Genre = apps.get_model("catalog", "Genre")
+    GenreStats = apps.get_model("catalog", "GenreStats")
+
+    rows = Genre.objects.annotate(
+        track_total=Count("artists__tracks", distinct=True),
+        artist_total=Count("artists", distinct=True),
+        playcount_total=Coalesce(Sum("artists__tracks__lastfm_playcount"), 0),
+    ).values_list("pk", "track_total", "artist_total", "playcount_total")
+
+    GenreStats.objects.bulk_create(
+        [
+            GenreStats(
+                genre_id=genre_id,
+                track_count=tracks,
+                artist_count=artists,
+                total_playcount=playcount,
+            )
+            for genre_id, tracks, artists, playcount in rows.iterator(chunk_size=1000)
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("catalog", "0006_listeningevent"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="GenreStats",
+            fields=[
+                (
+                    "genre",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="stats",
+                        serialize=False,
+                        to="catalog.genre",
+                        verbose_name="Жанр",
+                    ),
+                ),
+                (
+                    "track_count",
+                    models.IntegerField(default=0, verbose_name="Количество треков"),
+                ),
+                (
+                    "artist_count",
+                    models.IntegerField(
+                        default=0, verbose_name="Количество исполнителей"
+                    ),
+                ),
+                (
+                    "total_playcount",
+                    models.BigIntegerField(
+                        default=0, verbose_name="Прослушиваний треков"
+                    ),
+                ),
+                (
+                    "updated_at",
+                    models.DateTimeField(auto_now=True, verbose_name="Дата обновления"),
+                ),
+            ],
+            options={
+                "verbose_name": "Статистика жанра",
+                "verbose_name_plural": "Статистика жанров",
+            },
+        ),
+        migrations.RunPython(fill_genre_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,86 @@
+# Generated by Django 5.2.9 on 2026-10-17 00:23
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+CREATE_LEADERBOARD = """
+CREATE MATERIALIZED VIEW catalog_genre_leaderboard AS
+SELECT
+    g.id AS genre_id,
+    COUNT(DISTINCT t.id)::integer AS track_count,
+    COUNT(DISTINCT ag.artist_id)::integer AS artist_count,
+    COALESCE(SUM(t.lastfm_playcount), 0)::bigint AS total_playcount
+FROM catalog_genre g
+LEFT JOIN catalog_artist_genres ag ON ag.genre_id = g.id
+LEFT JOIN catalog_track t ON t.artist_id = ag.artist_id
+GROUP BY g.id
+"""
+
+# Уникальный индекс обязателен для REFRESH MATERIALIZED VIEW CONCURRENTLY
+CREATE_LEADERBOARD_INDEXES = [
+    "CREATE UNIQUE INDEX genre_leaderboard_genre_uniq ON catalog_genre_leaderboard (genre_id)",
+    "CREATE INDEX genre_leaderboard_playcount_idx ON catalog_genre_leaderboard (total_playcount DESC)",
+]
+
+DROP_LEADERBOARD = "DROP MATERIALIZED VIEW IF EXISTS catalog_genre_leaderboard"
+
+
+def create_leaderboard(apps, schema_editor):
+    """Материализованное представление создается только на PostgreSQL."""
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute(CREATE_LEADERBOARD)
+    for statement in CREATE_LEADERBOARD_INDEXES:
+        schema_editor.execute(statement)
+
+
+def drop_leaderboard(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute(DROP_LEADERBOARD)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("catalog", "0007_genrestats"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="GenreLeaderboard",
+            fields=[
+                (
+                    "genre",
+                    models.OneToOneField(
+                        db_constraint=False,
+                        on_delete=django.db.models.deletion.DO_NOTHING,
+                        primary_key=True,
+                        related_name="leaderboard",
+                        serialize=False,
+                        to="catalog.genre",
+                        verbose_name="Жанр",
+                    ),
+                ),
+                (
+                    "track_count",
+                    models.IntegerField(verbose_name="Количество треков"),
+                ),
+                (
+                    "artist_count",
+                    models.IntegerField(verbose_name="Количество исполнителей"),
+                ),
+                (
+                    "total_playcount",
+                    models.BigIntegerField(verbose_name="Прослушиваний треков"),
+                ),
+            ],
+            options={
+                "verbose_name": "Рейтинг жанра",
+                "verbose_name_plural": "Рейтинг жанров",
+                "db_table": "catalog_genre_leaderboard",
+                "managed": False,
+            },
+        ),
+        migrations.RunPython(create_leaderboard, drop_leaderboard),
+    ]
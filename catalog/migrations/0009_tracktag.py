@@ -0,0 +1,181 @@
+# Generated by Django 5.2.9 on 2026-10-17 00:27
+
+import json
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+# Сколько первых тегов трека переносится (GenreService.GENRES_PER_ENTITY)
+TAGS_PER_TRACK = 5
+CHUNK_SIZE = 2000
+
+
+def tag_weight(rank, total):
+    """Вес по позиции: теги Last.fm отсортированы по убыванию веса."""
+    return round(100 * (total - rank + 1) / total)
+
+
+def backfill_track_tags(apps, schema_editor):
+    """Перенос первых тегов из tags_json в TrackTag; недостающие жанры создаются."""
+    Genre = apps.get_model("catalog", "Genre")
+    Track = apps.get_model("catalog", "Track")
+    TrackTag = apps.get_model("catalog", "TrackTag")
+
+    tracks = (
+        Track.objects.exclude(tags_json__isnull=True)
+        .exclude(tags_json__in=["", "[]"])
+        .order_by("pk")
+        .values_list("pk", "tags_json")
+    )
+
+    chunk = []
+    for row in tracks.iterator(chunk_size=CHUNK_SIZE):
+        chunk.append(row)
+        if len(chunk) >= CHUNK_SIZE:
+            _backfill_chunk(Genre, TrackTag, chunk)
+            chunk = []
+    if chunk:
+        _backfill_chunk(Genre, TrackTag, chunk)
+
+
+def _backfill_chunk(Genre, TrackTag, chunk):
+    track_names = {}
+    tags_by_name = {}
+    for track_id, tags_json in chunk:
+        try:
+            tags = json.loads(tags_json)
+        except (json.JSONDecodeError, TypeError):
+            continue
+        if not isinstance(tags, list):
+            continue
+
+        names = []
+        for tag in tags:
+            if isinstance(tag, str) and tag.strip():
+                name = tag.strip().title()[:100]
+                if name not in names:
+                    tags_by_name.setdefault(name, tag.strip())
+                    names.append(name)
+                if len(names) == TAGS_PER_TRACK:
+                    break
+        if names:
+            track_names[track_id] = names
+
+    if not track_names:
+        return
+
+    genre_ids = dict(Genre.objects.filter(name__in=tags_by_name).values_list("name", "id"))
+    missing = [name for name in tags_by_name if name not in genre_ids]
+    if missing:
+        Genre.objects.bulk_create(
+            [
+                Genre(
+                    name=name,
+                    lastfm_tag=tags_by_name[name].lower()[:100],
+                    description=f"Жанр на основе тега Last.fm: {tags_by_name[name]}",
+                )
+                for name in missing
+            ],
+            ignore_conflicts=True,
+        )
+        genre_ids.update(Genre.objects.filter(name__in=missing).values_list("name", "id"))
+
+    TrackTag.objects.bulk_create(
+        [
+            TrackTag(
+                track_id=track_id,
+                genre_id=genre_ids[name],
+                rank=rank,
+                weight=tag_weight(rank, len(names)),
+            )
+            for track_id, names in track_names.items()
+            for rank, name in enumerate(names, 1)
+        ],
+        batch_size=1000,
+        ignore_conflicts=True,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("catalog", "0008_genreleaderboard"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="TrackTag",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "rank",
+                    models.PositiveSmallIntegerField(
+                        help_text="Порядковый номер тега у трека, начиная с 1",
+                        verbose_name="Позиция тега",
+                    ),
+                ),
+                (
+                    "weight",
+                    models.PositiveSmallIntegerField(
+                        help_text="Вес тега Last.fm (0-100)", verbose_name="Вес тега"
+                    ),
+                ),
+                (
+                    "genre",
+                    models.ForeignKey(
+                        db_index=False,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="track_tags",
+                        to="catalog.genre",
+                        verbose_name="Жанр",
+                    ),
+                ),
+                (
+                    "track",
+                    models.ForeignKey(
+                        db_index=False,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="track_tags",
+                        to="catalog.track",
+                        verbose_name="Трек",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Тег трека",
+                "verbose_name_plural": "Теги треков",
+            },
+        ),
+        migrations.AddField(
+            model_name="track",
+            name="tag_genres",
+            field=models.ManyToManyField(
+                blank=True,
+                related_name="tagged_tracks",
+                through="catalog.TrackTag",
+                to="catalog.genre",
+                verbose_name="Жанры по тегам",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="tracktag",
+            index=models.Index(
+                fields=["genre", "-weight", "track"], name="track_tag_genre_idx"
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="tracktag",
+            constraint=models.UniqueConstraint(
+                fields=("track", "genre"), name="unique_track_tag"
+            ),
+        ),
+        migrations.RunPython(backfill_track_tags, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,70 @@
+# Generated by Django 5.2.9 on 2026-10-17 00:40
+
+import json
+
+from django.db import migrations, models
+
+CHUNK_SIZE = 2000
+
+CREATE_GIN_INDEX = (
+    "CREATE INDEX track_lastfm_data_gin ON catalog_track "
+    "USING gin (lastfm_data jsonb_path_ops)"
+)
+DROP_GIN_INDEX = "DROP INDEX IF EXISTS track_lastfm_data_gin"
+
+
+def clear_invalid_lastfm_data(apps, schema_editor):
+    """Пустые и нечитаемые значения обнуляются: jsonb не примет их при смене типа."""
+    Track = apps.get_model("catalog", "Track")
+
+    invalid = []
+    rows = (
+        Track.objects.exclude(lastfm_data__isnull=True)
+        .order_by("pk")
+        .values_list("pk", "lastfm_data")
+    )
+    for pk, value in rows.iterator(chunk_size=CHUNK_SIZE):
+        try:
+            json.loads(value)
+        except (json.JSONDecodeError, TypeError):
+            invalid.append(pk)
+
+    for start in range(0, len(invalid), CHUNK_SIZE):
+        Track.objects.filter(pk__in=invalid[start:start + CHUNK_SIZE]).update(
+            lastfm_data=None
+        )
+
+
+def create_gin_index(apps, schema_editor):
+    """GIN-индекс по jsonb создается только на PostgreSQL."""
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute(CREATE_GIN_INDEX)
+
+
+def drop_gin_index(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute(DROP_GIN_INDEX)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("catalog", "0009_tracktag"),
+    ]
+
+    operations = [
+        migrations.RunPython(clear_invalid_lastfm_data, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name="track",
+            name="lastfm_data",
+            field=models.JSONField(
+                blank=True,
+                help_text="Полные данные из Last.fm API",
+                null=True,
+                verbose_name="Данные Last.fm (JSON)",
+            ),
+        ),
+        migrations.RunPython(create_gin_index, drop_gin_index),
+    ]
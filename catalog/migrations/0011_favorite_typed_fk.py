@@ -0,0 +1,184 @@
+# Generated by Django 5.2.9 on 2026-10-17 00:52
+
+from collections import defaultdict
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import CharField, F
+from django.db.models.functions import Cast
+
+ITEM_MODELS = {"genre": "Genre", "track": "Track", "artist": "Artist"}
+CHUNK_SIZE = 500
+
+
+def fill_item_fks(apps, schema_editor):
+    """
+    Перенос строкового item_id в типизированные FK.
+
+    Записи с нечисловым ID, неизвестным типом или удаленным элементом
+    удаляются; из дублей ('5' и '05') остается самая ранняя.
+    """
+    Favorite = apps.get_model("catalog", "Favorite")
+
+    seen = set()
+    invalid = []
+    wanted = defaultdict(lambda: defaultdict(list))
+    rows = Favorite.objects.order_by("pk").values_list("pk", "user_id", "item_type", "item_id")
+    for pk, user_id, item_type, item_id in rows.iterator(chunk_size=CHUNK_SIZE):
+        try:
+            target = int(item_id)
+        except (TypeError, ValueError):
+            invalid.append(pk)
+            continue
+        if item_type not in ITEM_MODELS or (user_id, item_type, target) in seen:
+            invalid.append(pk)
+            continue
+        seen.add((user_id, item_type, target))
+        wanted[item_type][target].append(pk)
+
+    for item_type, targets in wanted.items():
+        Model = apps.get_model("catalog", ITEM_MODELS[item_type])
+        target_ids = list(targets)
+        existing = set()
+        for start in range(0, len(target_ids), CHUNK_SIZE):
+            existing.update(
+                Model.objects.filter(pk__in=target_ids[start:start + CHUNK_SIZE])
+                .values_list("pk", flat=True)
+            )
+
+        for target, pks in targets.items():
+            if target in existing:
+                Favorite.objects.filter(pk__in=pks).update(**{f"{item_type}_id": target})
+            else:
+                invalid.extend(pks)
+
+    for start in range(0, len(invalid), CHUNK_SIZE):
+        Favorite.objects.filter(pk__in=invalid[start:start + CHUNK_SIZE]).delete()
+
+    # FK в PostgreSQL отложенные (DEFERRABLE INITIALLY DEFERRED): без
+    # немедленной проверки следующий ALTER TABLE catalog_favorite в этой
+    # же транзакции упадет с "pending trigger events"
+    if schema_editor.connection.vendor == "postgresql":
+        schema_editor.execute("SET CONSTRAINTS ALL IMMEDIATE")
+
+
+def restore_item_id(apps, schema_editor):
+    Favorite = apps.get_model("catalog", "Favorite")
+    for item_type in ITEM_MODELS:
+        Favorite.objects.filter(item_type=item_type).update(
+            item_id=Cast(F(f"{item_type}_id"), CharField())
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("catalog", "0010_track_lastfm_data_json"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="favorite",
+            name="artist",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="favorites",
+                to="catalog.artist",
+                verbose_name="Исполнитель",
+            ),
+        ),
+        migrations.AddField(
+            model_name="favorite",
+            name="genre",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="favorites",
+                to="catalog.genre",
+                verbose_name="Жанр",
+            ),
+        ),
+        migrations.AddField(
+            model_name="favorite",
+            name="track",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="favorites",
+                to="catalog.track",
+                verbose_name="Трек",
+            ),
+        ),
+        migrations.AlterUniqueTogether(
+            name="favorite",
+            unique_together=set(),
+        ),
+        migrations.RunPython(fill_item_fks, restore_item_id),
+        # Значение по умолчанию нужно только обратной миграции,
+        # чтобы вернуть колонку в непустую таблицу
+        migrations.AlterField(
+            model_name="favorite",
+            name="item_id",
+            field=models.CharField(
+                default="",
+                help_text="ID жанра, трека или исполнителя",
+                max_length=255,
+                verbose_name="ID элемента",
+            ),
+        ),
+        migrations.RemoveField(
+            model_name="favorite",
+            name="item_id",
+        ),
+        migrations.AddConstraint(
+            model_name="favorite",
+            constraint=models.UniqueConstraint(
+                fields=("user", "item_type", "genre"), name="unique_favorite_genre"
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="favorite",
+            constraint=models.UniqueConstraint(
+                fields=("user", "item_type", "track"), name="unique_favorite_track"
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="favorite",
+            constraint=models.UniqueConstraint(
+                fields=("user", "item_type", "artist"), name="unique_favorite_artist"
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="favorite",
+            constraint=models.CheckConstraint(
+                condition=models.Q(
+                    models.Q(
+                        ("artist__isnull", True),
+                        ("genre__isnull", False),
+                        ("item_type", "genre"),
+                        ("track__isnull", True),
+                    ),
+                    models.Q(
+                        ("artist__isnull", True),
+                        ("genre__isnull", True),
+                        ("item_type", "track"),
+                        ("track__isnull", False),
+                    ),
+                    models.Q(
+                        ("artist__isnull", False),
+                        ("genre__isnull", True),
+                        ("item_type", "artist"),
+                        ("track__isnull", True),
+                    ),
+                    _connector="OR",
+                ),
+                name="favorite_item_matches_type",
+            ),
+        ),
+    ]
@@ -0,0 +1,206 @@
+# Generated by Django 5.2.9 on 2026-10-17 01:05
+
+import unicodedata
+from collections import defaultdict
+
+from django.db import migrations, models
+from django.db.models import Count, Sum
+from django.db.models.functions import Coalesce
+
+KEY_MAX_LENGTH = 255
+CHUNK_SIZE = 2000
+
+
+def canonical_key(value):
+    """Копия catalog.models.canonical_key на момент миграции."""
+    text = " ".join(unicodedata.normalize("NFKC", value or "").casefold().split())
+    words = "".join(" " if unicodedata.category(char)[0] in "PS" else char for char in text).split()
+    return (" ".join(words) or text)[:KEY_MAX_LENGTH]
+
+
+def fill_keys(Model, source, target):
+    """Заполнение колонки ключа порциями; возвращает {id: ключ}."""
+    keys = {}
+    batch = []
+    rows = Model.objects.order_by("pk").values_list("pk", source)
+    for pk, value in rows.iterator(chunk_size=CHUNK_SIZE):
+        keys[pk] = canonical_key(value)
+        batch.append(Model(pk=pk, **{target: keys[pk]}))
+        if len(batch) >= CHUNK_SIZE:
+            Model.objects.bulk_update(batch, [target])
+            batch = []
+    if batch:
+        Model.objects.bulk_update(batch, [target])
+    return keys
+
+
+def repoint_favorites(Favorite, field, old_ids, new_id):
+    """Перенос избранного на оставшуюся запись без нарушения уникальности."""
+    kept_users = set(Favorite.objects.filter(**{field: new_id}).values_list("user_id", flat=True))
+    for favorite in Favorite.objects.filter(**{f"{field}__in": old_ids}).order_by("pk"):
+        if favorite.user_id in kept_users:
+            favorite.delete()
+        else:
+            setattr(favorite, f"{field}_id", new_id)
+            favorite.save(update_fields=[field])
+            kept_users.add(favorite.user_id)
+
+
+def merge_tracks(apps, keep_id, duplicate_ids):
+    """Слияние треков-дублей в keep: прослушивания, теги, избранное, статистика."""
+    Track = apps.get_model("catalog", "Track")
+    TrackTag = apps.get_model("catalog", "TrackTag")
+    ListeningEvent = apps.get_model("catalog", "ListeningEvent")
+    Favorite = apps.get_model("catalog", "Favorite")
+
+    keep = Track.objects.get(pk=keep_id)
+    duplicates = list(Track.objects.filter(pk__in=duplicate_ids).order_by("pk"))
+
+    keep.lastfm_listeners = max([keep.lastfm_listeners] + [t.lastfm_listeners for t in duplicates])
+    keep.lastfm_playcount = max([keep.lastfm_playcount] + [t.lastfm_playcount for t in duplicates])
+    for field in ("lastfm_url", "duration", "album", "tags_json", "lastfm_data", "image_url", "lastfm_synced_at"):
+        if not getattr(keep, field):
+            setattr(keep, field, next((getattr(t, field) for t in duplicates if getattr(t, field)), None))
+    keep.is_reference = keep.is_reference or any(t.is_reference for t in duplicates)
+    keep.save()
+
+    for duplicate in duplicates:
+        kept_events = set(
+            ListeningEvent.objects.filter(track_id=keep_id).values_list("user_id", "listened_at")
+        )
+        for event in ListeningEvent.objects.filter(track_id=duplicate.pk):
+            if (event.user_id, event.listened_at) in kept_events:
+                event.delete()
+            else:
+                event.track_id = keep_id
+                event.save(update_fields=["track"])
+                kept_events.add((event.user_id, event.listened_at))
+
+        kept_genres = set(TrackTag.objects.filter(track_id=keep_id).values_list("genre_id", flat=True))
+        TrackTag.objects.filter(track_id=duplicate.pk, genre_id__in=kept_genres).delete()
+        TrackTag.objects.filter(track_id=duplicate.pk).update(track_id=keep_id)
+
+    repoint_favorites(Favorite, "track", duplicate_ids, keep_id)
+    Track.objects.filter(pk__in=duplicate_ids).delete()
+
+
+def merge_artists(apps, keep_id, duplicate_ids):
+    """Слияние исполнителей-дублей: треки, жанры и избранное переходят к keep."""
+    Artist = apps.get_model("catalog", "Artist")
+    Track = apps.get_model("catalog", "Track")
+    Favorite = apps.get_model("catalog", "Favorite")
+    ArtistGenres = Artist.genres.through
+
+    keep = Artist.objects.get(pk=keep_id)
+    duplicates = list(Artist.objects.filter(pk__in=duplicate_ids).order_by("pk"))
+
+    keep.lastfm_listeners = max([keep.lastfm_listeners] + [a.lastfm_listeners for a in duplicates])
+    keep.lastfm_playcount = max([keep.lastfm_playcount] + [a.lastfm_playcount for a in duplicates])
+    for field in ("lastfm_url", "description", "image_url", "lastfm_synced_at"):
+        if not getattr(keep, field):
+            setattr(keep, field, next((getattr(a, field) for a in duplicates if getattr(a, field)), None))
+    keep.save()
+
+    kept_genres = set(ArtistGenres.objects.filter(artist_id=keep_id).values_list("genre_id", flat=True))
+    new_genres = set(
+        ArtistGenres.objects.filter(artist_id__in=duplicate_ids).values_list("genre_id", flat=True)
+    ) - kept_genres
+    ArtistGenres.objects.bulk_create(
+        [ArtistGenres(artist_id=keep_id, genre_id=genre_id) for genre_id in new_genres]
+    )
+
+    kept_tracks = dict(Track.objects.filter(artist_id=keep_id).values_list("title_key", "id"))
+    for track in Track.objects.filter(artist_id__in=duplicate_ids).order_by("pk"):
+        if track.title_key in kept_tracks:
+            merge_tracks(apps, kept_tracks[track.title_key], [track.pk])
+        else:
+            track.artist_id = keep_id
+            track.save(update_fields=["artist"])
+            kept_tracks[track.title_key] = track.pk
+
+    repoint_favorites(Favorite, "artist", duplicate_ids, keep_id)
+    Artist.objects.filter(pk__in=duplicate_ids).delete()
+
+
+def fill_and_merge(apps, schema_editor):
+    """
+    Заполнение ключей и слияние записей с одинаковым ключом.
+
+    Остается запись с наименьшим id; при слиянии исполнителей совпавший
+    трек остается у оставшегося исполнителя. Слияние обходит сигналы моделей,
+    поэтому после него статистика жанров пересчитывается целиком.
+    """
+    Artist = apps.get_model("catalog", "Artist")
+    Track = apps.get_model("catalog", "Track")
+    Genre = apps.get_model("catalog", "Genre")
+    GenreStats = apps.get_model("catalog", "GenreStats")
+
+    artist_keys = fill_keys(Artist, "name", "name_key")
+    fill_keys(Track, "title", "title_key")
+
+    merged = False
+    artists_by_key = defaultdict(list)
+    for pk, key in artist_keys.items():
+        artists_by_key[key].append(pk)
+    for ids in artists_by_key.values():
+        if len(ids) > 1:
+            ids.sort()
+            merge_artists(apps, ids[0], ids[1:])
+            merged = True
+
+    duplicate_tracks = (
+        Track.objects.values("artist_id", "title_key")
+        .annotate(copies=Count("id"))
+        .filter(copies__gt=1)
+        .values_list("artist_id", "title_key")
+    )
+    for artist_id, title_key in list(duplicate_tracks):
+        ids = list(
+            Track.objects.filter(artist_id=artist_id, title_key=title_key)
+            .order_by("pk")
+            .values_list("pk", flat=True)
+        )
+        merge_tracks(apps, ids[0], ids[1:])
+        merged = True
+
+    if not merged:
+        return
+
+    rows = Genre.objects.annotate(
+        track_total=Count("artists__tracks", distinct=True),
+        artist_total=Count("artists", distinct=True),
+        playcount_total=Coalesce(Sum("artists__tracks__lastfm_playcount"), 0),
+    ).values_list("pk", "track_total", "artist_total", "playcount_total")
+    GenreStats.objects.bulk_create(
+        [
+            GenreStats(genre_id=genre_id, track_count=tracks, artist_count=artists, total_playcount=playcount)
+            for genre_id, tracks, artists, playcount in rows.iterator(chunk_size=1000)
+        ],
+        batch_size=1000,
+        update_conflicts=True,
+        unique_fields=["genre"],
+        update_fields=["track_count", "artist_count", "total_playcount"],
+    )
+    if schema_editor.connection.vendor == "postgresql":
+        schema_editor.execute("REFRESH MATERIALIZED VIEW catalog_genre_leaderboard")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("catalog", "0011_favorite_typed_fk"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="artist",
+            name="name_key",
+            field=models.CharField(editable=False, max_length=255, null=True),
+        ),
+        migrations.AddField(
+            model_name="track",
+            name="title_key",
+            field=models.CharField(editable=False, max_length=255, null=True),
+        ),
+        migrations.RunPython(fill_and_merge, migrations.RunPython.noop),
+    ]
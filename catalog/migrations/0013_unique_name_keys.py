@@ -0,0 +1,42 @@
+# Generated by Django 5.2.9 on 2026-10-17 01:20
+
+from django.db import migrations, models
+
+
+# Отдельно от слияния в 0012: обновленные там FK оставляют в PostgreSQL
+# отложенные проверки, и ALTER TABLE в той же транзакции не выполнится
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("catalog", "0012_canonical_name_keys"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="artist",
+            name="name_key",
+            field=models.CharField(
+                editable=False,
+                help_text="Имя без регистра и пунктуации (canonical_key)",
+                max_length=255,
+                unique=True,
+                verbose_name="Ключ имени",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="track",
+            name="title_key",
+            field=models.CharField(
+                editable=False,
+                help_text="Название без регистра и пунктуации (canonical_key)",
+                max_length=255,
+                verbose_name="Ключ названия",
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="track",
+            constraint=models.UniqueConstraint(
+                fields=("artist", "title_key"), name="unique_track_key_per_artist"
+            ),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.9 on 2026-10-17 01:30
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("catalog", "0013_unique_name_keys"),
+    ]
+
+    operations = [
+        # unique=True на Artist.name уже создает индекс по имени
+        migrations.RemoveIndex(
+            model_name="artist",
+            name="catalog_art_name_36791d_idx",
+        ),
+    ]
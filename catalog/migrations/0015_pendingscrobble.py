@@ -0,0 +1,97 @@
+# Generated by Django 5.2.9 on 2026-10-17 01:45
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("catalog", "0014_drop_redundant_artist_name_index"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="enrichmentjob",
+            name="kind",
+            field=models.CharField(
+                choices=[
+                    ("track", "Трек"),
+                    ("artist", "Исполнитель"),
+                    ("scrobble", "Трек из прослушиваний"),
+                ],
+                max_length=20,
+                verbose_name="Тип задачи",
+            ),
+        ),
+        migrations.CreateModel(
+            name="PendingScrobble",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "artist_name",
+                    models.CharField(max_length=200, verbose_name="Исполнитель"),
+                ),
+                (
+                    "track_title",
+                    models.CharField(max_length=200, verbose_name="Название трека"),
+                ),
+                (
+                    "artist_key",
+                    models.CharField(
+                        help_text="canonical_key(artist_name)",
+                        max_length=255,
+                        verbose_name="Ключ исполнителя",
+                    ),
+                ),
+                (
+                    "title_key",
+                    models.CharField(
+                        help_text="canonical_key(track_title)",
+                        max_length=255,
+                        verbose_name="Ключ названия",
+                    ),
+                ),
+                (
+                    "listened_at",
+                    models.DateTimeField(verbose_name="Время прослушивания"),
+                ),
+                (
+                    "user",
+                    models.ForeignKey(
+                        db_index=False,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="pending_scrobbles",
+                        to=settings.AUTH_USER_MODEL,
+                        verbose_name="Пользователь",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Прослушивание вне каталога",
+                "verbose_name_plural": "Прослушивания вне каталога",
+                "indexes": [
+                    models.Index(
+                        fields=["artist_key", "title_key"],
+                        name="pending_scrobble_track_idx",
+                    )
+                ],
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("user", "listened_at", "artist_key", "title_key"),
+                        name="unique_pending_scrobble",
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.9 on 2026-10-17 01:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("catalog", "0015_pendingscrobble"),
+    ]
+
+    # Уникальность имен задают name_key и (artist, title_key) из 0013.
+    # Индекс по Artist.name не нужен: точный поиск идет через name_key,
+    # а поиск icontains индексом не пользуется
+    operations = [
+        migrations.RemoveConstraint(
+            model_name="track",
+            name="unique_track_per_artist",
+        ),
+        migrations.AlterField(
+            model_name="artist",
+            name="name",
+            field=models.CharField(max_length=200, verbose_name="Имя исполнителя"),
+        ),
+    ]
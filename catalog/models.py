@@ -2,10 +2,12 @@
 Модели данных для приложения catalog.
 """
 import json
+import unicodedata
 from django.db import models
-from django.db.models.signals import post_save
+from django.db.models.signals import m2m_changed, post_init, post_save, pre_delete
 from django.dispatch import receiver
 from django.urls import reverse
+from django.utils import timezone
 from django.contrib.auth.models import User
 from django.core.mail import send_mail
 from django.conf import settings
@@ -71,6 +73,38 @@ class Genre(models.Model):
         super().save(*args, **kwargs)
 
 
+# Длина колонок name_key и title_key
+KEY_MAX_LENGTH = 255
+
+
+def canonical_key(value: str) -> str:
+    """
+    Канонический ключ имени для поиска без учета регистра и пунктуации.
+
+    NFKC, casefold, пунктуация и символы заменяются пробелами, пробелы
+    схлопываются: 'AC/DC' -> 'ac dc', 'Guns N’ Roses' -> 'guns n roses'.
+    Имя только из пунктуации ('!!!') сохраняет ее, чтобы ключ не был пустым.
+    """
+    text = ' '.join(unicodedata.normalize('NFKC', value or '').casefold().split())
+    words = ''.join(' ' if unicodedata.category(char)[0] in 'PS' else char for char in text).split()
+    return (' '.join(words) or text)[:KEY_MAX_LENGTH]
+
+
+class ArtistQuerySet(models.QuerySet):
+    """QuerySet исполнителей."""
+
+    # Тяжелые колонки, не нужные в списках
+    LIST_DEFERRED_FIELDS = ('description',)
+
+    def for_list(self):
+        """Исполнители для списков: без описания."""
+        return self.defer(*self.LIST_DEFERRED_FIELDS)
+
+    def by_name(self, name: str):
+        """Поиск по имени через уникальный индекс name_key."""
+        return self.filter(name_key=canonical_key(name))
+
+
 class Artist(models.Model):
     """
     Модель музыкального исполнителя.
@@ -79,6 +113,13 @@ class Artist(models.Model):
         max_length=200,
         verbose_name="Имя исполнителя"
     )
+    name_key = models.CharField(
+        max_length=KEY_MAX_LENGTH,
+        verbose_name="Ключ имени",
+        unique=True,
+        editable=False,
+        help_text="Имя без регистра и пунктуации (canonical_key)"
+    )
     lastfm_url = models.URLField(
         verbose_name="Страница в Last.fm",
         blank=True,
@@ -113,6 +154,12 @@ class Artist(models.Model):
         verbose_name="Популярный исполнитель",
         default=False
     )
+    lastfm_synced_at = models.DateTimeField(
+        verbose_name="Синхронизировано с Last.fm",
+        blank=True,
+        null=True,
+        help_text="Когда данные Last.fm последний раз обновлялись"
+    )
     created_at = models.DateTimeField(
         verbose_name="Дата добавления",
         auto_now_add=True
@@ -122,13 +169,15 @@ class Artist(models.Model):
         auto_now=True
     )
 
+    objects = ArtistQuerySet.as_manager()
+
     class Meta:
         verbose_name = "Исполнитель"
         verbose_name_plural = "Исполнители"
         ordering = ['-lastfm_listeners', 'name']
         indexes = [
-            models.Index(fields=['name']),
             models.Index(fields=['lastfm_listeners']),
+            models.Index(fields=['lastfm_synced_at']),
         ]
 
     def __str__(self):
@@ -137,6 +186,13 @@ class Artist(models.Model):
     def get_absolute_url(self):
         return reverse('artist_detail', kwargs={'pk': self.pk})
 
+    def save(self, *args, **kwargs):
+        self.name_key = canonical_key(self.name)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'name' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'name_key'}
+        super().save(*args, **kwargs)
+
     def update_popularity(self):
         """Обновление статуса популярности исполнителя."""
         self.is_popular = self.lastfm_listeners > 100000
@@ -148,6 +204,37 @@ class Artist(models.Model):
         return self.genres.all()[:3]
 
 
+class TrackQuerySet(models.QuerySet):
+    """QuerySet треков."""
+
+    # Сырой ответ Last.fm и теги нужны только на странице трека
+    LIST_DEFERRED_FIELDS = ('lastfm_data', 'tags_json')
+
+    def for_list(self):
+        """
+        Треки для списков: с исполнителем, но без тяжелых колонок.
+
+        Отложенные поля загружаются отдельным запросом при первом
+        обращении, поэтому в шаблонах списков их использовать нельзя.
+        """
+        return self.select_related('artist').defer(
+            *self.LIST_DEFERRED_FIELDS,
+            *(f'artist__{field}' for field in ArtistQuerySet.LIST_DEFERRED_FIELDS)
+        )
+
+    def by_name(self, title: str, artist_name: str = None):
+        """
+        Поиск по названию (и имени исполнителя) через ключи.
+
+        Пара (artist, title_key) уникальна, а исполнитель находится по
+        name_key, поэтому поиск - два поиска по индексу.
+        """
+        queryset = self.filter(title_key=canonical_key(title))
+        if artist_name is not None:
+            queryset = queryset.filter(artist__name_key=canonical_key(artist_name))
+        return queryset
+
+
 class Track(models.Model):
     """
     Модель музыкального трека.
@@ -156,6 +243,12 @@ class Track(models.Model):
         max_length=200,
         verbose_name="Название трека"
     )
+    title_key = models.CharField(
+        max_length=KEY_MAX_LENGTH,
+        verbose_name="Ключ названия",
+        editable=False,
+        help_text="Название без регистра и пунктуации (canonical_key)"
+    )
     artist = models.ForeignKey(
         Artist,
         on_delete=models.CASCADE,
@@ -192,11 +285,11 @@ class Track(models.Model):
         null=True,
         help_text="Теги и жанры трека в формате JSON"
     )
-    lastfm_data = models.TextField(
+    lastfm_data = models.JSONField(
         verbose_name="Данные Last.fm (JSON)",
         blank=True,
         null=True,
-        help_text="Полные данные из Last.fm API в формате JSON"
+        help_text="Полные данные из Last.fm API"
     )
     image_url = models.URLField(
         verbose_name="URL изображения",
@@ -204,6 +297,19 @@ class Track(models.Model):
         null=True,
         max_length=500
     )
+    lastfm_synced_at = models.DateTimeField(
+        verbose_name="Синхронизировано с Last.fm",
+        blank=True,
+        null=True,
+        help_text="Когда данные Last.fm последний раз обновлялись"
+    )
+    tag_genres = models.ManyToManyField(
+        Genre,
+        through='TrackTag',
+        related_name='tagged_tracks',
+        blank=True,
+        verbose_name="Жанры по тегам"
+    )
     is_reference = models.BooleanField(
         verbose_name="Референс-трек",
         default=False,
@@ -218,6 +324,8 @@ class Track(models.Model):
         auto_now=True
     )
 
+    objects = TrackQuerySet.as_manager()
+
     class Meta:
         verbose_name = "Трек"
         verbose_name_plural = "Треки"
@@ -226,12 +334,13 @@ class Track(models.Model):
             models.Index(fields=['title']),
             models.Index(fields=['lastfm_playcount']),
             models.Index(fields=['is_reference']),
+            models.Index(fields=['lastfm_synced_at']),
         ]
         constraints = [
             models.UniqueConstraint(
-                fields=['title', 'artist'],
-                name='unique_track_per_artist'
-            )
+                fields=['artist', 'title_key'],
+                name='unique_track_key_per_artist'
+            ),
         ]
 
     def __str__(self):
@@ -240,6 +349,13 @@ class Track(models.Model):
     def get_absolute_url(self):
         return reverse('track_detail', kwargs={'pk': self.pk})
 
+    def save(self, *args, **kwargs):
+        self.title_key = canonical_key(self.title)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'title' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'title_key'}
+        super().save(*args, **kwargs)
+
     def get_lastfm_data(self):
         """Проверяет, есть ли данные из Last.fm."""
         return bool(self.lastfm_listeners or self.lastfm_playcount)
@@ -274,19 +390,20 @@ class Track(models.Model):
 
     def get_lastfm_data(self):
         """Получение данных Last.fm как словаря."""
-        if self.lastfm_data:
-            try:
-                return json.loads(self.lastfm_data)
-            except (json.JSONDecodeError, TypeError):
-                return {}
-        return {}
+        return self.lastfm_data if isinstance(self.lastfm_data, dict) else {}
+
+    def needs_enrichment(self):
+        """
+        Нужна ли задача обогащения.
+
+        Трек, которого нет в Last.fm, получает lastfm_synced_at без данных
+        и больше не ставится в очередь при каждом просмотре.
+        """
+        return not self.get_lastfm_data() and self.lastfm_synced_at is None
 
     def set_lastfm_data(self, value):
         """Сохранение данных Last.fm."""
-        if isinstance(value, dict):
-            self.lastfm_data = json.dumps(value, ensure_ascii=False)
-        else:
-            self.lastfm_data = json.dumps({}, ensure_ascii=False)
+        self.lastfm_data = value if isinstance(value, dict) else {}
 
     def calculate_popularity_score(self):
         """Расчет рейтинга популярности трека."""
@@ -297,24 +414,147 @@ class Track(models.Model):
         return 0.0
 
     def link_genres_from_tags(self):
-        """Связывание трека с жанрами на основе тегов."""
-        if not self.tags:
-            return
-
-        for tag_name in self.tags[:5]:
-            genre, created = Genre.objects.get_or_create(
-                name=tag_name.title(),
-                defaults={
-                    'lastfm_tag': tag_name.lower(),
-                    'description': f'Жанр на основе тега Last.fm: {tag_name}'
-                }
+        """Связывание трека с жанрами на основе тегов (TrackTag и жанры исполнителя)."""
+        from .services.genre_service import GenreService
+
+        tags = self.tags
+        GenreService.link_track_tags({self.pk: tags})
+        if tags:
+            GenreService.link_tags(self.artist_id, tags[:GenreService.GENRES_PER_ENTITY])
+
+
+class TrackTag(models.Model):
+    """
+    Тег трека, сопоставленный с жанром.
+
+    Нормализованная копия первых тегов из tags_json: выборка треков
+    жанра идет по индексу (genre, weight), а не по LIKE по JSON.
+    Индексы FK не создаются отдельно - их заменяют составные ниже.
+    """
+    track = models.ForeignKey(
+        Track,
+        on_delete=models.CASCADE,
+        related_name='track_tags',
+        db_index=False,
+        verbose_name="Трек"
+    )
+    genre = models.ForeignKey(
+        Genre,
+        on_delete=models.CASCADE,
+        related_name='track_tags',
+        db_index=False,
+        verbose_name="Жанр"
+    )
+    rank = models.PositiveSmallIntegerField(
+        verbose_name="Позиция тега",
+        help_text="Порядковый номер тега у трека, начиная с 1"
+    )
+    weight = models.PositiveSmallIntegerField(
+        verbose_name="Вес тега",
+        help_text="Вес тега Last.fm (0-100)"
+    )
+
+    class Meta:
+        verbose_name = "Тег трека"
+        verbose_name_plural = "Теги треков"
+        indexes = [
+            models.Index(fields=['genre', '-weight', 'track'], name='track_tag_genre_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['track', 'genre'],
+                name='unique_track_tag'
             )
-            if genre not in self.artist.genres.all():
-                self.artist.genres.add(genre)
+        ]
+
+    def __str__(self):
+        return f"{self.track_id}: {self.genre_id} (#{self.rank}, {self.weight})"
+
+
+class GenreStats(models.Model):
+    """
+    Предрассчитанная статистика жанра для страниц жанров и аналитики.
+
+    Одиночные сохранения треков, удаления и изменения связей
+    исполнитель-жанр применяются сигналами ниже как приращения;
+    пакетные записи пересчитывают затронутые жанры через
+    GenreStatsService. Полный пересчет - команда rebuild_genre_stats.
+    """
+    genre = models.OneToOneField(
+        Genre,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='stats',
+        verbose_name="Жанр"
+    )
+    track_count = models.IntegerField(
+        verbose_name="Количество треков",
+        default=0
+    )
+    artist_count = models.IntegerField(
+        verbose_name="Количество исполнителей",
+        default=0
+    )
+    total_playcount = models.BigIntegerField(
+        verbose_name="Прослушиваний треков",
+        default=0
+    )
+    updated_at = models.DateTimeField(
+        verbose_name="Дата обновления",
+        auto_now=True
+    )
+
+    class Meta:
+        verbose_name = "Статистика жанра"
+        verbose_name_plural = "Статистика жанров"
+
+    def __str__(self):
+        return f"{self.genre_id}: {self.track_count} треков, {self.artist_count} исполнителей"
+
+
+class GenreLeaderboard(models.Model):
+    """
+    Статистика жанров из материализованного представления PostgreSQL.
+
+    Представление создается миграцией только на PostgreSQL и
+    обновляется командой refresh_genre_leaderboard; модель только
+    для чтения и используется при GENRE_STATS_BACKEND = 'matview'.
+    """
+    genre = models.OneToOneField(
+        Genre,
+        on_delete=models.DO_NOTHING,
+        primary_key=True,
+        related_name='leaderboard',
+        db_constraint=False,
+        verbose_name="Жанр"
+    )
+    track_count = models.IntegerField(
+        verbose_name="Количество треков"
+    )
+    artist_count = models.IntegerField(
+        verbose_name="Количество исполнителей"
+    )
+    total_playcount = models.BigIntegerField(
+        verbose_name="Прослушиваний треков"
+    )
+
+    class Meta:
+        managed = False
+        db_table = 'catalog_genre_leaderboard'
+        verbose_name = "Рейтинг жанра"
+        verbose_name_plural = "Рейтинг жанров"
+
+    def __str__(self):
+        return f"{self.genre_id}: {self.track_count} треков, {self.artist_count} исполнителей"
 
 
 class Favorite(models.Model):
-    """Модель для хранения избранных элементов пользователя"""
+    """
+    Модель для хранения избранных элементов пользователя.
+
+    Элемент хранится в одном из типизированных FK (genre, track или
+    artist) - в том, что соответствует item_type; остальные пусты.
+    """
     ITEM_TYPES = [
         ('genre', 'Жанр'),
         ('track', 'Трек'),
@@ -334,10 +574,29 @@ class Favorite(models.Model):
         verbose_name="Тип элемента",
         default='genre'
     )
-    item_id = models.CharField(
-        max_length=255,
-        verbose_name="ID элемента",
-        help_text="ID жанра, трека или исполнителя"
+    genre = models.ForeignKey(
+        Genre,
+        on_delete=models.CASCADE,
+        related_name='favorites',
+        blank=True,
+        null=True,
+        verbose_name="Жанр"
+    )
+    track = models.ForeignKey(
+        Track,
+        on_delete=models.CASCADE,
+        related_name='favorites',
+        blank=True,
+        null=True,
+        verbose_name="Трек"
+    )
+    artist = models.ForeignKey(
+        Artist,
+        on_delete=models.CASCADE,
+        related_name='favorites',
+        blank=True,
+        null=True,
+        verbose_name="Исполнитель"
     )
 
     created_at = models.DateTimeField(
@@ -348,35 +607,267 @@ class Favorite(models.Model):
     class Meta:
         verbose_name = "Избранное"
         verbose_name_plural = "Избранное"
-        unique_together = ['user', 'item_type', 'item_id']
         ordering = ['-created_at']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'item_type', 'genre'],
+                name='unique_favorite_genre'
+            ),
+            models.UniqueConstraint(
+                fields=['user', 'item_type', 'track'],
+                name='unique_favorite_track'
+            ),
+            models.UniqueConstraint(
+                fields=['user', 'item_type', 'artist'],
+                name='unique_favorite_artist'
+            ),
+            models.CheckConstraint(
+                condition=(
+                    models.Q(item_type='genre', genre__isnull=False, track__isnull=True, artist__isnull=True)
+                    | models.Q(item_type='track', genre__isnull=True, track__isnull=False, artist__isnull=True)
+                    | models.Q(item_type='artist', genre__isnull=True, track__isnull=True, artist__isnull=False)
+                ),
+                name='favorite_item_matches_type'
+            ),
+        ]
 
     def __str__(self):
         item_name = self.get_item_name()
         return f"{self.user.username} → {self.get_item_type_display()}: {item_name}"
 
+    @classmethod
+    def item_model(cls, item_type: str):
+        """Модель элемента для типа избранного (None для неизвестного типа)."""
+        if item_type not in dict(cls.ITEM_TYPES):
+            return None
+        return cls._meta.get_field(item_type).related_model
+
+    @property
+    def item_id(self):
+        """ID связанного элемента."""
+        return getattr(self, f'{self.item_type}_id', None)
+
     def get_item_name(self):
-        """Получение названия связанного элемента."""
-        if self.item_type == 'genre':
-            genre = Genre.objects.filter(id=self.item_id).first()
-            return genre.name if genre else f"Жанр #{self.item_id}"
-        elif self.item_type == 'track':
-            track = Track.objects.filter(id=self.item_id).first()
-            return track.title if track else f"Трек #{self.item_id}"
-        elif self.item_type == 'artist':
-            artist = Artist.objects.filter(id=self.item_id).first()
-            return artist.name if artist else f"Исполнитель #{self.item_id}"
-        return f"Элемент #{self.item_id}"
+        """Получение названия связанного элемента (без запроса при select_related)."""
+        item = self.get_item()
+        if item is None:
+            return f"Элемент #{self.item_id}"
+        return item.title if self.item_type == 'track' else item.name
 
     def get_item(self):
         """Получение связанного объекта."""
-        if self.item_type == 'genre':
-            return Genre.objects.filter(id=self.item_id).first()
-        elif self.item_type == 'track':
-            return Track.objects.filter(id=self.item_id).first()
-        elif self.item_type == 'artist':
-            return Artist.objects.filter(id=self.item_id).first()
-        return None
+        if self.item_type not in dict(self.ITEM_TYPES):
+            return None
+        return getattr(self, self.item_type)
+
+
+class EnrichmentJob(models.Model):
+    """
+    Фоновая задача обогащения данными Last.fm.
+
+    Задачи выполняет команда enrichment_worker. Для одного ключа
+    (например, track:42) одновременно существует не больше одной
+    ожидающей или выполняемой задачи.
+    """
+    KIND_TRACK = 'track'
+    KIND_ARTIST = 'artist'
+    KIND_SCROBBLE = 'scrobble'
+    KINDS = [
+        (KIND_TRACK, 'Трек'),
+        (KIND_ARTIST, 'Исполнитель'),
+        (KIND_SCROBBLE, 'Трек из прослушиваний'),
+    ]
+
+    STATUS_PENDING = 'pending'
+    STATUS_RUNNING = 'running'
+    STATUS_DONE = 'done'
+    STATUS_FAILED = 'failed'
+    STATUSES = [
+        (STATUS_PENDING, 'Ожидает'),
+        (STATUS_RUNNING, 'Выполняется'),
+        (STATUS_DONE, 'Выполнена'),
+        (STATUS_FAILED, 'Ошибка'),
+    ]
+    ACTIVE_STATUSES = [STATUS_PENDING, STATUS_RUNNING]
+
+    kind = models.CharField(
+        max_length=20,
+        choices=KINDS,
+        verbose_name="Тип задачи"
+    )
+    key = models.CharField(
+        max_length=255,
+        verbose_name="Ключ",
+        help_text="Ключ сущности для исключения дублей, например track:42"
+    )
+    payload = models.JSONField(
+        verbose_name="Параметры",
+        default=dict,
+        blank=True
+    )
+    status = models.CharField(
+        max_length=20,
+        choices=STATUSES,
+        default=STATUS_PENDING,
+        verbose_name="Статус"
+    )
+    priority = models.IntegerField(
+        verbose_name="Приоритет",
+        default=0,
+        help_text="Задачи с большим приоритетом выполняются раньше"
+    )
+    attempts = models.PositiveIntegerField(
+        verbose_name="Попыток",
+        default=0
+    )
+    max_attempts = models.PositiveIntegerField(
+        verbose_name="Максимум попыток",
+        default=5
+    )
+    run_after = models.DateTimeField(
+        verbose_name="Не раньше",
+        default=timezone.now
+    )
+    locked_at = models.DateTimeField(
+        verbose_name="Взята в работу",
+        blank=True,
+        null=True
+    )
+    locked_by = models.CharField(
+        max_length=100,
+        verbose_name="Воркер",
+        blank=True,
+        default=''
+    )
+    last_error = models.TextField(
+        verbose_name="Последняя ошибка",
+        blank=True,
+        default=''
+    )
+    created_at = models.DateTimeField(
+        verbose_name="Дата создания",
+        auto_now_add=True
+    )
+    updated_at = models.DateTimeField(
+        verbose_name="Дата обновления",
+        auto_now=True
+    )
+
+    class Meta:
+        verbose_name = "Задача обогащения"
+        verbose_name_plural = "Задачи обогащения"
+        ordering = ['-priority', 'run_after', 'id']
+        indexes = [
+            models.Index(fields=['status', 'run_after', 'priority'], name='job_queue_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['key'],
+                condition=models.Q(status__in=['pending', 'running']),
+                name='unique_active_job_per_key'
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.key} ({self.get_status_display()})"
+
+
+class ListeningEvent(models.Model):
+    """
+    Прослушивание трека пользователем (скроббл Last.fm).
+
+    Узкая таблица без JSON: только ссылки и время. Индексы FK не
+    создаются отдельно - их заменяют составные индексы ниже.
+    """
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='listening_events',
+        db_index=False,
+        verbose_name="Пользователь"
+    )
+    track = models.ForeignKey(
+        Track,
+        on_delete=models.CASCADE,
+        related_name='listening_events',
+        db_index=False,
+        verbose_name="Трек"
+    )
+    listened_at = models.DateTimeField(
+        verbose_name="Время прослушивания"
+    )
+
+    class Meta:
+        verbose_name = "Прослушивание"
+        verbose_name_plural = "Прослушивания"
+        ordering = ['-listened_at']
+        indexes = [
+            models.Index(fields=['track', 'listened_at'], name='listening_track_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'listened_at', 'track'],
+                name='unique_listening_event'
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.user_id}: {self.track_id} @ {self.listened_at:%Y-%m-%d %H:%M}"
+
+
+class PendingScrobble(models.Model):
+    """
+    Прослушивание трека, которого ещё нет в каталоге.
+
+    Скробблы пользователей не создают исполнителей и треки сами: они
+    ждут здесь задачу очереди обогащения, которая проверяет трек в
+    Last.fm, добавляет его в каталог и переносит прослушивания в
+    ListeningEvent.
+    """
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='pending_scrobbles',
+        db_index=False,
+        verbose_name="Пользователь"
+    )
+    artist_name = models.CharField(
+        max_length=200,
+        verbose_name="Исполнитель"
+    )
+    track_title = models.CharField(
+        max_length=200,
+        verbose_name="Название трека"
+    )
+    artist_key = models.CharField(
+        max_length=KEY_MAX_LENGTH,
+        verbose_name="Ключ исполнителя",
+        help_text="canonical_key(artist_name)"
+    )
+    title_key = models.CharField(
+        max_length=KEY_MAX_LENGTH,
+        verbose_name="Ключ названия",
+        help_text="canonical_key(track_title)"
+    )
+    listened_at = models.DateTimeField(
+        verbose_name="Время прослушивания"
+    )
+
+    class Meta:
+        verbose_name = "Прослушивание вне каталога"
+        verbose_name_plural = "Прослушивания вне каталога"
+        indexes = [
+            models.Index(fields=['artist_key', 'title_key'], name='pending_scrobble_track_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'listened_at', 'artist_key', 'title_key'],
+                name='unique_pending_scrobble'
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.user_id}: {self.artist_name} - {self.track_title} @ {self.listened_at:%Y-%m-%d %H:%M}"
 
 
 class UserProfile(models.Model):
@@ -423,3 +914,75 @@ def send_welcome_email(sender, instance, created, **kwargs):
             )
         except:
             pass
+
+
+# Статистика жанров (GenreStats). bulk_create и bulk_update сигналов
+# не вызывают - пакетные записи обновляют её через GenreStatsService.
+
+@receiver(post_init, sender=Track)
+def remember_track_genre_stats_state(sender, instance, **kwargs):
+    """Запоминание исполнителя и прослушиваний трека для расчета приращения."""
+    instance._genre_stats_state = (instance.__dict__.get('artist_id'), instance.__dict__.get('lastfm_playcount'))
+
+
+@receiver(post_save, sender=Track)
+def update_genre_stats_on_track_save(sender, instance, created, raw=False, **kwargs):
+    """Приращение статистики жанров исполнителя после сохранения трека."""
+    if raw:
+        return
+
+    from .services.genre_stats_service import GenreStatsService
+
+    old_artist_id, old_playcount = instance._genre_stats_state
+    playcount = instance.lastfm_playcount or 0
+
+    if created:
+        GenreStatsService.track_changed(instance.artist_id, 1, playcount)
+    elif old_artist_id is None or old_playcount is None:
+        # Поле было отложено (defer/only) - прежнее значение неизвестно
+        GenreStatsService.refresh_for_artists({old_artist_id, instance.artist_id} - {None})
+    elif old_artist_id != instance.artist_id:
+        GenreStatsService.track_changed(old_artist_id, -1, -old_playcount)
+        GenreStatsService.track_changed(instance.artist_id, 1, playcount)
+    elif old_playcount != playcount:
+        GenreStatsService.track_changed(instance.artist_id, 0, playcount - old_playcount)
+
+    instance._genre_stats_state = (instance.artist_id, playcount)
+
+
+@receiver(pre_delete, sender=Track)
+def update_genre_stats_on_track_delete(sender, instance, **kwargs):
+    """Вычитание трека из статистики, пока связи исполнителя ещё существуют."""
+    from .services.genre_stats_service import GenreStatsService
+    GenreStatsService.track_changed(instance.artist_id, -1, -(instance.lastfm_playcount or 0))
+
+
+@receiver(pre_delete, sender=Artist)
+def update_genre_stats_on_artist_delete(sender, instance, **kwargs):
+    """Вычитание исполнителя; его треки вычитаются собственными сигналами."""
+    from .services.genre_stats_service import GenreStatsService
+    GenreStatsService.artist_removed(instance.pk)
+
+
+@receiver(m2m_changed, sender=Artist.genres.through)
+def update_genre_stats_on_artist_genres(sender, instance, action, reverse, pk_set, **kwargs):
+    """Приращение статистики при добавлении и удалении связей исполнитель-жанр."""
+    from .services.genre_stats_service import GenreStatsService
+
+    if reverse:
+        links = sender.objects.filter(genre_id=instance.pk)
+        if pk_set is not None:
+            links = links.filter(artist_id__in=pk_set)
+    else:
+        links = sender.objects.filter(artist_id=instance.pk)
+        if pk_set is not None:
+            links = links.filter(genre_id__in=pk_set)
+
+    if action in ('pre_remove', 'pre_clear'):
+        instance._removed_genre_links = list(links.values_list('artist_id', 'genre_id'))
+    elif action in ('post_remove', 'post_clear'):
+        GenreStatsService.links_changed(getattr(instance, '_removed_genre_links', []), -1)
+        instance._removed_genre_links = []
+    elif action == 'post_add' and pk_set:
+        # В post_add pk_set содержит только действительно добавленные связи
+        GenreStatsService.links_changed(links.values_list('artist_id', 'genre_id'), 1)
@@ -1,13 +1,32 @@
 from .base_service import BaseAPIService
-from .lastfm_service import LastFMService
+from .lastfm_service import LastFMService, get_lastfm_service
+from .resilience import with_deadline
 from .visualization import VisualizationService
 from .catalog_service import CatalogService
 from .analytics_service import AnalyticsService
+from .upsert_service import UpsertService
+from .genre_stats_service import GenreStatsService
+from .genre_service import GenreService
+from .ingestion_service import IngestionService
+from .job_queue import JobQueueService
+from .refresh_service import RefreshService
+from .listening_service import ListeningHistoryService
+from .export_service import ExportService
 
 __all__ = [
     'BaseAPIService',
     'LastFMService',
+    'get_lastfm_service',
+    'with_deadline',
     'VisualizationService',
     'CatalogService',
-    'AnalyticsService'
+    'AnalyticsService',
+    'UpsertService',
+    'GenreStatsService',
+    'GenreService',
+    'IngestionService',
+    'JobQueueService',
+    'RefreshService',
+    'ListeningHistoryService',
+    'ExportService'
 ]
@@ -1,9 +1,8 @@
 import plotly.graph_objects as go
 import plotly.offline as pyo
-from django.db.models import Count
 
-from catalog.models import Genre
-from .lastfm_service import LastFMService
+from .genre_stats_service import GenreStatsService
+from .lastfm_service import get_lastfm_service
 
 
 class AnalyticsService:
@@ -27,17 +26,14 @@ class AnalyticsService:
     @staticmethod
     def _get_local_genres():
         """Получение жанров из локальной базы с статистикой."""
-        genres = Genre.objects.annotate(
-            annotated_track_count=Count('artists__tracks', distinct=True),
-            annotated_artist_count=Count('artists', distinct=True)
-        ).order_by('-annotated_track_count')
+        genres = GenreStatsService.annotate_genres().order_by('-annotated_track_count')
 
         return genres
 
     @staticmethod
     def _get_lastfm_genres(limit):
         """Получение популярных жанров из Last.fm."""
-        client = LastFMService()
+        client = get_lastfm_service()
 
         try:
             tags = client.get_top_tags(limit=limit)
@@ -2,37 +2,60 @@ import hashlib
 import json
 import os
 import time
-from datetime import datetime, timedelta
-from pathlib import Path
-from typing import Dict, Optional
+from datetime import timedelta
+from typing import Dict, Optional, Tuple
+
+from .cache import FileCacheStorage, MemoryCache
 
 
 class BaseAPIService:
-    def __init__(self, cache_dir: str = ".cache"):
+    def __init__(self, cache_dir: str = ".cache", memory_cache: Optional[MemoryCache] = None,
+                 storage=None):
         self.cache_dir = cache_dir
+        self.memory_cache = memory_cache
         os.makedirs(cache_dir, exist_ok=True)
+        self.storage = storage if storage is not None else FileCacheStorage(cache_dir)
 
     def _get_cache_key(self, method: str, params: dict) -> str:
         key_str = f"{method}:{json.dumps(params, sort_keys=True)}"
         return hashlib.md5(key_str.encode()).hexdigest()
 
-    def _load_from_cache(self, key: str, ttl_days: int = 7) -> Optional[Dict]:
-        cache_file = Path(self.cache_dir) / f"{key}.json"
-
-        if cache_file.exists():
-            file_age = datetime.now() - datetime.fromtimestamp(cache_file.stat().st_mtime)
-            if file_age < timedelta(days=ttl_days):
-                try:
-                    with open(cache_file, 'r', encoding='utf-8') as f:
-                        return json.load(f)
-                except (json.JSONDecodeError, IOError):
-                    pass
-        return None
-
-    def _save_to_cache(self, key: str, data: Dict):
-        cache_file = Path(self.cache_dir) / f"{key}.json"
-        with open(cache_file, 'w', encoding='utf-8') as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
+    def _load_from_cache(self, key: str, ttl_days: float = 7) -> Optional[Dict]:
+        ttl_seconds = timedelta(days=ttl_days).total_seconds()
+
+        if self.memory_cache is not None:
+            data = self.memory_cache.get(key, ttl_seconds)
+            if data is not None:
+                return data
+
+        entry = self.storage.read(key, ttl_seconds)
+        if entry is None:
+            return None
+
+        data, stored_at, size = entry
+        if self.memory_cache is not None:
+            self.memory_cache.set(key, data, size=size, stored_at=stored_at)
+        return data
+
+    def _load_stale_from_cache(self, key: str, max_age_seconds: float) -> Optional[Tuple[Dict, float]]:
+        """
+        Загрузка записи из хранилища без учёта TTL.
+
+        Returns:
+            Кортеж (данные, возраст записи в секундах) или None
+        """
+        entry = self.storage.read(key, max_age_seconds)
+        if entry is None:
+            return None
+
+        data, stored_at, _ = entry
+        return data, time.time() - stored_at
+
+    def _save_to_cache(self, key: str, data: Dict, ttl_days: float = 7):
+        size = self.storage.write(key, data, timedelta(days=ttl_days).total_seconds())
+
+        if self.memory_cache is not None:
+            self.memory_cache.set(key, data, size=size)
 
     def _rate_limit(self, last_request_time: float, min_interval: float = 0.2) -> float:
         current_time = time.time()
@@ -0,0 +1,354 @@
+"""
+Кэширование ответов внешних API.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+from django.conf import settings
+
+
+class MemoryCache:
+    """
+    Потокобезопасный LRU-кэш в памяти процесса.
+
+    Ограничен как по количеству записей, так и по суммарному размеру
+    сериализованных данных. Записи хранят момент сохранения, поэтому
+    свежесть проверяется по тому же TTL, что и у дискового кэша.
+
+    Попадание не копирует и не разбирает данные: get возвращает тот же
+    объект, что был передан в set, общий для всех потоков. Вызывающий
+    код не должен изменять ни его, ни данные после set; если изменение
+    нужно, он работает с copy.deepcopy(...).
+    """
+
+    def __init__(self, max_entries: int = 1024, max_bytes: int = 32 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+
+        self._entries: "OrderedDict[str, Tuple[Dict, float, int]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key: str, ttl_seconds: float) -> Optional[Dict]:
+        """
+        Получение записи, если она моложе ttl_seconds.
+
+        Args:
+            key: Ключ кэша
+            ttl_seconds: Допустимый возраст записи в секундах
+
+        Returns:
+            Сохранённые данные (не изменять) или None
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+
+            if entry is None:
+                self.misses += 1
+                return None
+
+            data, stored_at, size = entry
+
+            if time.time() - stored_at >= ttl_seconds:
+                self._remove(key)
+                self.expirations += 1
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return data
+
+    def set(self, key: str, data: Dict, size: int, stored_at: Optional[float] = None):
+        """
+        Сохранение записи.
+
+        Args:
+            key: Ключ кэша
+            data: Данные ответа; после сохранения не изменяются
+            size: Размер сериализованных данных в байтах
+            stored_at: Момент сохранения (по умолчанию - текущее время)
+        """
+        if size > self.max_bytes:
+            return
+
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+
+            self._entries[key] = (data, stored_at if stored_at is not None else time.time(), size)
+            self._bytes += size
+
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                oldest_key = next(iter(self._entries))
+                self._remove(oldest_key)
+                self.evictions += 1
+
+    def delete(self, key: str):
+        """Удаление записи."""
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+
+    def clear(self):
+        """Очистка кэша и счётчиков."""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            self.hits = self.misses = self.evictions = self.expirations = 0
+
+    def stats(self) -> Dict:
+        """Счётчики попаданий, промахов и вытеснений."""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'hit_ratio': self.hits / total if total else 0.0,
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+            }
+
+    def _remove(self, key: str):
+        _, _, size = self._entries.pop(key)
+        self._bytes -= size
+
+
+_memory_caches: Dict[str, MemoryCache] = {}
+_memory_caches_lock = threading.Lock()
+
+
+def get_memory_cache(namespace: str) -> MemoryCache:
+    """
+    Общий для процесса LRU-кэш для указанного пространства имён.
+
+    Сервисы создаются на каждый запрос, поэтому кэш в памяти
+    хранится на уровне модуля, а не экземпляра.
+    """
+    with _memory_caches_lock:
+        cache = _memory_caches.get(namespace)
+        if cache is None:
+            cache = MemoryCache(
+                max_entries=getattr(settings, 'API_MEMORY_CACHE_MAX_ENTRIES', 1024),
+                max_bytes=getattr(settings, 'API_MEMORY_CACHE_MAX_BYTES', 32 * 1024 * 1024),
+            )
+            _memory_caches[namespace] = cache
+        return cache
+
+
+class FileCacheStorage:
+    """
+    Хранилище кэша в виде отдельного JSON-файла на каждый ключ.
+
+    Момент сохранения берётся из времени изменения файла, поэтому
+    для массовой очистки используется общий TTL ttl_seconds.
+    """
+
+    def __init__(self, cache_dir: str, ttl_seconds: float = 7 * 24 * 60 * 60):
+        self.cache_dir = cache_dir
+        self.ttl_seconds = ttl_seconds
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def read(self, key: str, max_age_seconds: float) -> Optional[Tuple[Dict, float, int]]:
+        """
+        Чтение записи не старше max_age_seconds.
+
+        Returns:
+            Кортеж (данные, момент сохранения, размер) или None
+        """
+        cache_file = Path(self.cache_dir) / f"{key}.json"
+
+        if not cache_file.exists():
+            return None
+
+        stored_at = cache_file.stat().st_mtime
+        if time.time() - stored_at >= max_age_seconds:
+            return None
+
+        try:
+            raw = cache_file.read_bytes()
+            return json.loads(raw), stored_at, len(raw)
+        except (json.JSONDecodeError, UnicodeDecodeError, IOError):
+            return None
+
+    def write(self, key: str, data: Dict, ttl_seconds: float) -> int:
+        """Сохранение записи. Возвращает размер сериализованных данных."""
+        cache_file = Path(self.cache_dir) / f"{key}.json"
+        raw = json.dumps(data, ensure_ascii=False, indent=2).encode('utf-8')
+        cache_file.write_bytes(raw)
+        return len(raw)
+
+    def delete(self, key: str):
+        """Удаление записи."""
+        cache_file = Path(self.cache_dir) / f"{key}.json"
+        cache_file.unlink(missing_ok=True)
+
+    def purge_expired(self, grace_seconds: float = 0) -> int:
+        """
+        Массовое удаление истёкших записей.
+
+        Args:
+            grace_seconds: Сколько хранить запись после истечения TTL
+
+        Returns:
+            Количество удалённых записей
+        """
+        threshold = time.time() - self.ttl_seconds - grace_seconds
+        removed = 0
+
+        for cache_file in Path(self.cache_dir).glob('*.json'):
+            try:
+                if cache_file.stat().st_mtime < threshold:
+                    cache_file.unlink()
+                    removed += 1
+            except FileNotFoundError:
+                continue
+
+        return removed
+
+
+class SQLiteCacheStorage:
+    """
+    Хранилище кэша в одном файле SQLite.
+
+    Данные сжимаются zlib, время сохранения и истечения хранятся в
+    отдельных индексированных колонках. Режим WAL позволяет нескольким
+    процессам gunicorn читать и писать кэш одновременно.
+    """
+
+    SCHEMA = (
+        """
+        CREATE TABLE IF NOT EXISTS api_cache (
+            key TEXT PRIMARY KEY,
+            payload BLOB NOT NULL,
+            size INTEGER NOT NULL,
+            stored_at REAL NOT NULL,
+            expires_at REAL NOT NULL
+        ) WITHOUT ROWID
+        """,
+        "CREATE INDEX IF NOT EXISTS api_cache_expires_at ON api_cache (expires_at)",
+    )
+
+    def __init__(self, path: str, compress_level: int = 6, busy_timeout: float = 30.0):
+        self.path = path
+        self.compress_level = compress_level
+        self.busy_timeout = busy_timeout
+        self._local = threading.local()
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+        conn = self._connection()
+        for statement in self.SCHEMA:
+            conn.execute(statement)
+
+    def _connection(self) -> sqlite3.Connection:
+        """Соединение текущего потока. После fork открывается заново."""
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None and self._local.pid == os.getpid():
+            return conn
+
+        conn = sqlite3.connect(self.path, timeout=self.busy_timeout, isolation_level=None)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+
+        self._local.conn = conn
+        self._local.pid = os.getpid()
+        return conn
+
+    def read(self, key: str, max_age_seconds: float) -> Optional[Tuple[Dict, float, int]]:
+        """
+        Чтение записи не старше max_age_seconds.
+
+        Returns:
+            Кортеж (данные, момент сохранения, размер) или None
+        """
+        row = self._connection().execute(
+            "SELECT payload, stored_at, size FROM api_cache WHERE key = ? AND stored_at > ?",
+            (key, time.time() - max_age_seconds)
+        ).fetchone()
+
+        if row is None:
+            return None
+
+        payload, stored_at, size = row
+        try:
+            return json.loads(zlib.decompress(payload)), stored_at, size
+        except (zlib.error, json.JSONDecodeError, UnicodeDecodeError):
+            self.delete(key)
+            return None
+
+    def write(self, key: str, data: Dict, ttl_seconds: float) -> int:
+        """Сохранение записи. Возвращает размер несжатых данных."""
+        raw = json.dumps(data, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+        now = time.time()
+
+        self._connection().execute(
+            "INSERT OR REPLACE INTO api_cache (key, payload, size, stored_at, expires_at) "
+            "VALUES (?, ?, ?, ?, ?)",
+            (key, zlib.compress(raw, self.compress_level), len(raw), now, now + ttl_seconds)
+        )
+        return len(raw)
+
+    def delete(self, key: str):
+        """Удаление записи."""
+        self._connection().execute("DELETE FROM api_cache WHERE key = ?", (key,))
+
+    def purge_expired(self, grace_seconds: float = 0) -> int:
+        """
+        Массовое удаление истёкших записей.
+
+        Args:
+            grace_seconds: Сколько хранить запись после истечения TTL
+
+        Returns:
+            Количество удалённых записей
+        """
+        cursor = self._connection().execute(
+            "DELETE FROM api_cache WHERE expires_at < ?",
+            (time.time() - grace_seconds,)
+        )
+        return cursor.rowcount
+
+
+_storages: Dict[Tuple[str, str], object] = {}
+_storages_lock = threading.Lock()
+
+
+def get_cache_storage(cache_dir: str, backend: Optional[str] = None):
+    """
+    Общее для процесса хранилище кэша.
+
+    Args:
+        cache_dir: Директория кэша
+        backend: 'sqlite' или 'file' (по умолчанию - настройка API_CACHE_BACKEND)
+    """
+    backend = backend or getattr(settings, 'API_CACHE_BACKEND', 'sqlite')
+
+    with _storages_lock:
+        storage = _storages.get((cache_dir, backend))
+        if storage is None:
+            if backend == 'sqlite':
+                storage = SQLiteCacheStorage(os.path.join(cache_dir, 'cache.sqlite3'))
+            elif backend == 'file':
+                storage = FileCacheStorage(
+                    cache_dir,
+                    ttl_seconds=getattr(settings, 'CACHE_TTL_DAYS', 7) * 24 * 60 * 60
+                )
+            else:
+                raise ValueError(f"Неизвестный тип хранилища кэша: {backend}")
+            _storages[(cache_dir, backend)] = storage
+        return storage
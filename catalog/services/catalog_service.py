@@ -3,11 +3,17 @@
 """
 from typing import Dict, List, Optional, Tuple
 
+from asgiref.sync import sync_to_async
 from django.contrib.auth.models import User
-from django.db.models import Count, Sum
 from django.shortcuts import get_object_or_404
-
-from .lastfm_service import LastFMService
+from django.utils import timezone
+
+from .genre_service import GenreService
+from .genre_stats_service import GenreStatsService
+from .job_queue import JobQueueService
+from .upsert_service import UpsertService
+from .lastfm_async import async_lastfm_service
+from .lastfm_service import LastFMUnavailable, get_lastfm_service
 from ..models import Genre, Artist, Track, Favorite
 
 
@@ -19,36 +25,37 @@ class CatalogService:
         """
         Получение статистики по жанрам с возможностью поиска.
         """
-        queryset = Genre.objects.annotate(
-            annotated_track_count=Count('artists__tracks', distinct=True),
-            annotated_artist_count=Count('artists', distinct=True),
-            total_playcount=Sum('artists__tracks__lastfm_playcount')
-        )
+        queryset = GenreStatsService.annotate_genres()
 
         if search_query:
             queryset = queryset.filter(name__icontains=search_query)
 
         return queryset.order_by('-total_playcount')[:limit]
 
+    @staticmethod
+    def _get_genre_local_details(pk: int):
+        """Жанр, его артисты и треки из локальной базы."""
+        genre = get_object_or_404(Genre.objects.select_related('stats'), pk=pk)
+        stats = getattr(genre, 'stats', None)
+
+        artists = list(Artist.objects.for_list().filter(genres=genre)[:10])
+        tracks = list(Track.objects.for_list().filter(artist__genres=genre)[:20])
+
+        genre.artist_count = stats.artist_count if stats else 0
+        genre.track_count = stats.track_count if stats else 0
+
+        return genre, artists, tracks
+
     @staticmethod
     def get_genre_with_details(pk: int):
         """
         Получение жанра с детальной информацией.
         """
-        genre = get_object_or_404(Genre, pk=pk)
-
-        artists_count = Artist.objects.filter(genres=genre).count()
-        tracks_count = Track.objects.filter(artist__genres=genre).count()
-
-        artists = Artist.objects.filter(genres=genre)[:10]
-        tracks = Track.objects.filter(artist__genres=genre).select_related('artist')[:20]
-
-        genre.artist_count = artists_count
-        genre.track_count = tracks_count
+        genre, artists, tracks = CatalogService._get_genre_local_details(pk)
 
         top_tracks = []
         try:
-            lastfm = LastFMService()
+            lastfm = get_lastfm_service()
             top_tracks = lastfm.get_top_tracks_by_tag(
                 tag=genre.lastfm_tag or genre.name.lower(),
                 limit=20
@@ -58,6 +65,27 @@ class CatalogService:
 
         return genre, artists, tracks, top_tracks
 
+    @staticmethod
+    async def aget_genre_with_details(pk: int):
+        """
+        Асинхронная версия get_genre_with_details.
+
+        Запрос к Last.fm не занимает поток из пула sync_to_async.
+        """
+        genre, artists, tracks = await sync_to_async(CatalogService._get_genre_local_details)(pk)
+
+        top_tracks = []
+        try:
+            async with async_lastfm_service() as lastfm:
+                top_tracks = await lastfm.get_top_tracks_by_tag(
+                    tag=genre.lastfm_tag or genre.name.lower(),
+                    limit=20
+                )
+        except ValueError:
+            pass
+
+        return genre, artists, tracks, top_tracks
+
     @staticmethod
     def search_in_lastfm(query: str, search_type: str = 'track', limit: int = 20) -> List[Dict]:
         """
@@ -72,7 +100,7 @@ class CatalogService:
             Список результатов
         """
         try:
-            lastfm = LastFMService()
+            lastfm = get_lastfm_service()
 
             if search_type == 'track':
                 return lastfm.search_track(query, limit=limit)
@@ -81,6 +109,18 @@ class CatalogService:
         except ValueError:
             return []
 
+    @staticmethod
+    async def asearch_in_lastfm(query: str, search_type: str = 'track', limit: int = 20) -> List[Dict]:
+        """Асинхронная версия search_in_lastfm."""
+        try:
+            async with async_lastfm_service() as lastfm:
+                if search_type == 'track':
+                    return await lastfm.search_track(query, limit=limit)
+                else:
+                    return await lastfm.search_artist(query, limit=limit)
+        except ValueError:
+            return []
+
     @staticmethod
     def get_or_create_track_from_lastfm(track_name: str, artist_name: str) -> Tuple[Optional[Track], bool]:
         """
@@ -94,45 +134,32 @@ class CatalogService:
             Кортеж (трек, создан_ли_новый)
         """
         try:
-            lastfm = LastFMService()
+            lastfm = get_lastfm_service()
             track_info = lastfm.get_track_info(artist=artist_name, track=track_name)
 
             if not track_info:
                 return None, False
 
-            artist, artist_created = Artist.objects.get_or_create(
-                name=artist_name,
-                defaults={'lastfm_listeners': track_info.get('listeners', 0)}
-            )
-
+            artist_row = {'name': artist_name, 'lastfm_listeners': track_info.get('listeners', 0)}
+            artist_fields = []
             artist_info = lastfm.get_artist_info(artist_name)
             if artist_info:
-                artist.lastfm_listeners = artist_info.get('listeners', 0)
-                artist.lastfm_playcount = artist_info.get('playcount', 0)
-                artist.save()
-
-            track, track_created = Track.objects.get_or_create(
-                title=track_name,
-                artist=artist,
-                defaults={
-                    'lastfm_listeners': track_info.get('listeners', 0),
-                    'lastfm_playcount': track_info.get('playcount', 0),
-                    'lastfm_url': track_info.get('url', ''),
-                    'duration': track_info.get('duration'),
-                    'album': track_info.get('album', ''),
-                    'tags': track_info.get('tags', []),
-                    'lastfm_data': track_info
-                }
-            )
-
-            for tag_name in track_info.get('tags', [])[:5]:
-                genre, created = Genre.objects.get_or_create(
-                    name=tag_name.title(),
-                    defaults={'lastfm_tag': tag_name.lower()}
+                artist_row.update(
+                    lastfm_listeners=artist_info.get('listeners', 0),
+                    lastfm_playcount=artist_info.get('playcount', 0),
+                    lastfm_synced_at=timezone.now()
                 )
-                artist.genres.add(genre)
+                artist_fields = ['lastfm_listeners', 'lastfm_playcount', 'lastfm_synced_at']
+            artist_id = next(iter(UpsertService.upsert_artists([artist_row], artist_fields).values()))
+
+            track_created = not Track.objects.by_name(track_name).filter(artist_id=artist_id).exists()
+            track_ids = UpsertService.upsert_tracks(
+                [{'artist_id': artist_id, 'title': track_name, **UpsertService.track_stats(track_info)}],
+                UpsertService.TRACK_STATS_FIELDS
+            )
+            track = Track.objects.select_related('artist').get(pk=next(iter(track_ids.values())))
 
-            track.link_genres_from_tags()
+            GenreService.link_tags(artist_id, track_info.get('tags', [])[:GenreService.GENRES_PER_ENTITY])
 
             return track, track_created
 
@@ -152,7 +179,7 @@ class CatalogService:
             True если обновлено успешно
         """
         try:
-            lastfm = LastFMService()
+            lastfm = get_lastfm_service()
             track_info = lastfm.get_track_info(
                 artist=track.artist.name,
                 track=track.title
@@ -163,64 +190,103 @@ class CatalogService:
                 track.lastfm_playcount = track_info.get('playcount', 0)
                 track.tags = track_info.get('tags', [])
                 track.set_lastfm_data(track_info)
+                track.lastfm_synced_at = timezone.now()
                 track.save()
+                GenreService.link_track_tags({track.pk: track.tags})
                 return True
         except Exception as e:
             print(f"Error updating track from Last.fm: {e}")
 
         return False
 
+    @staticmethod
+    def get_or_create_confirmed_track(track_name: str, artist_name: str) -> Tuple[Optional[Track], bool]:
+        """
+        Трек каталога или новый трек, подтверждённый Last.fm.
+
+        Существующий трек возвращается без обращения к Last.fm. Новый
+        создаётся, только если Last.fm знает трек, - с его названием и
+        данными; обогащение исполнителя ставится в очередь.
+
+        Args:
+            track_name: Название трека
+            artist_name: Имя исполнителя
+
+        Returns:
+            Кортеж (трек, создан_ли_новый); (None, False), если Last.fm
+            ответил, что такого трека нет
+
+        Raises:
+            LastFMUnavailable: Last.fm не ответил, трек не проверен
+            ValueError: Если API ключи не настроены
+        """
+        track = Track.objects.by_name(track_name, artist_name).select_related('artist').first()
+        if track is not None:
+            if track.needs_enrichment():
+                JobQueueService.enqueue_track(track.pk, priority=JobQueueService.PRIORITY_INTERACTIVE)
+            return track, False
+
+        lastfm = get_lastfm_service()
+        track_info = lastfm.get_track_info(artist=artist_name, track=track_name)
+        if not track_info:
+            if lastfm.is_track_not_found(artist_name, track_name):
+                return None, False
+            raise LastFMUnavailable(f"Last.fm не ответил о треке {artist_name} - {track_name}")
+
+        # Имена из ответа Last.fm (с автоисправлением), а не из формы
+        artist_name = (track_info.get('artist') or artist_name)[:200]
+        track_name = (track_info.get('name') or track_name)[:200]
+        track = Track.objects.by_name(track_name, artist_name).select_related('artist').first()
+        if track is not None:
+            return track, False
+
+        artist_id = next(iter(UpsertService.upsert_artists([{'name': artist_name}]).values()))
+        track_ids = UpsertService.upsert_tracks(
+            [{'artist_id': artist_id, 'title': track_name, **UpsertService.track_stats(track_info)}],
+            UpsertService.TRACK_STATS_FIELDS
+        )
+        GenreService.link_tags(artist_id, track_info.get('tags', [])[:GenreService.GENRES_PER_ENTITY])
+        track = Track.objects.select_related('artist').get(pk=next(iter(track_ids.values())))
+
+        if not track.artist.lastfm_url and track.artist.lastfm_synced_at is None:
+            JobQueueService.enqueue_artist(artist_id, priority=JobQueueService.PRIORITY_INTERACTIVE)
+
+        return track, True
+
     @staticmethod
     def add_to_favorites(user, track):
         """Добавление жанров трека в избранное пользователя."""
         if not user.is_authenticated:
             return 0, 0
 
-        genres = track.artist.genres.all()
-        added = 0
-        existing = 0
-
-        for genre in genres:
-            item_id_str = str(genre.id)
-
-            exists = Favorite.objects.filter(
+        genre_ids = set(track.artist.genres.values_list('pk', flat=True))
+        existing = set(
+            Favorite.objects.filter(
                 user=user,
                 item_type='genre',
-                item_id=item_id_str
-            ).exists()
-
-            if not exists:
-                Favorite.objects.create(
-                    user=user,
-                    item_type='genre',
-                    item_id=item_id_str
-                )
-                added += 1
-            else:
-                existing += 1
+                genre_id__in=genre_ids
+            ).values_list('genre_id', flat=True)
+        )
+
+        missing = genre_ids - existing
+        Favorite.objects.bulk_create(
+            [Favorite(user=user, item_type='genre', genre_id=genre_id) for genre_id in missing],
+            ignore_conflicts=True
+        )
 
-        return added, existing
+        return len(missing), len(existing)
 
     @staticmethod
     def get_user_favorites_with_recommendations(user):
         """Получение избранных жанров пользователя с рекомендациями."""
-        favorite_genres_ids_str = Favorite.objects.filter(
-            user=user,
-            item_type='genre'
-        ).values_list('item_id', flat=True)
-
-        favorite_genres_ids = []
-        for id_str in favorite_genres_ids_str:
-            try:
-                favorite_genres_ids.append(int(id_str))
-            except (ValueError, TypeError):
-                continue
-
-        favorite_genres = Genre.objects.filter(id__in=favorite_genres_ids)
+        favorite_genres = Genre.objects.filter(
+            favorites__user=user,
+            favorites__item_type='genre'
+        )
 
         recommendations = {
-            'artists': Artist.objects.filter(genres__in=favorite_genres).distinct()[:4],
-            'tracks': Track.objects.filter(artist__genres__in=favorite_genres).distinct()[:5]
+            'artists': Artist.objects.for_list().filter(genres__in=favorite_genres).distinct()[:4],
+            'tracks': Track.objects.for_list().filter(artist__genres__in=favorite_genres).distinct()[:5]
         }
 
         return {
@@ -240,27 +306,26 @@ class CatalogService:
             Кортеж (исполнитель, создан_ли_новый)
         """
         try:
-            lastfm = LastFMService()
+            lastfm = get_lastfm_service()
             artist_info = lastfm.get_artist_info(artist_name)
 
             if not artist_info:
                 return None, False
 
-            artist, created = Artist.objects.get_or_create(
-                name=artist_name,
-                defaults={
+            created = not Artist.objects.by_name(artist_name).exists()
+            artist_ids = UpsertService.upsert_artists(
+                [{
+                    'name': artist_name,
                     'lastfm_listeners': artist_info.get('listeners', 0),
                     'lastfm_playcount': artist_info.get('playcount', 0),
-                    'lastfm_url': artist_info.get('url', '')
-                }
+                    'lastfm_url': artist_info.get('url', ''),
+                    'lastfm_synced_at': timezone.now()
+                }],
+                UpsertService.ARTIST_STATS_FIELDS
             )
+            artist = Artist.objects.get(pk=next(iter(artist_ids.values())))
 
-            for tag_name in artist_info.get('tags', [])[:5]:
-                genre, _ = Genre.objects.get_or_create(
-                    name=tag_name.title(),
-                    defaults={'lastfm_tag': tag_name.lower()}
-                )
-                artist.genres.add(genre)
+            GenreService.link_tags(artist.id, artist_info.get('tags', [])[:GenreService.GENRES_PER_ENTITY])
 
             return artist, created
 
@@ -0,0 +1,178 @@
+"""
+Объединение одновременных одинаковых запросов к внешним API.
+"""
+import hashlib
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows: межпроцессная блокировка недоступна
+    fcntl = None
+
+
+class _Call:
+    def __init__(self):
+        self.event = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    """
+    Объединение одновременных вызовов с одинаковым ключом в пределах процесса.
+
+    Первый вызов выполняет функцию, остальные ждут его результата
+    (или получают то же исключение). Ожидающий, не дождавшийся
+    результата за timeout, выполняет функцию сам.
+    """
+
+    def __init__(self):
+        self._calls: Dict[str, _Call] = {}
+        self._lock = threading.Lock()
+
+        self.executed = 0
+        self.coalesced = 0
+        self.timed_out = 0
+
+    def do(self, key: str, fn: Callable[[], Any], timeout: Optional[float] = None) -> Any:
+        """
+        Выполнение fn один раз для всех одновременных вызовов с ключом key.
+
+        Args:
+            key: Ключ объединения (например, ключ кэша)
+            fn: Функция без аргументов
+            timeout: Сколько ждать результата первого вызова в секундах
+                     (None - без ограничения); затем fn выполняется
+                     без объединения
+
+        Returns:
+            Результат fn
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                self.coalesced += 1
+                leader = False
+            else:
+                call = _Call()
+                self._calls[key] = call
+                self.executed += 1
+                leader = True
+
+        if not leader:
+            if not call.event.wait(timeout):
+                with self._lock:
+                    self.timed_out += 1
+                return fn()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.event.set()
+
+    def stats(self) -> Dict:
+        """Количество выполненных, объединённых и не дождавшихся вызовов."""
+        with self._lock:
+            return {
+                'executed': self.executed,
+                'coalesced': self.coalesced,
+                'timed_out': self.timed_out,
+                'in_flight': len(self._calls),
+            }
+
+
+# Полосы, которые сейчас держат потоки этого процесса
+_held_stripes = set()
+_held_stripes_lock = threading.Lock()
+
+
+def _stripe_path(lock_dir: str, key: str, stripes: int) -> str:
+    """Файл блокировки полосы, в которую попадает ключ."""
+    stripe = int(hashlib.md5(key.encode()).hexdigest()[:8], 16) % stripes
+    return os.path.join(lock_dir, f"{stripe}.lock")
+
+
+@contextmanager
+def striped_file_lock(lock_dir: str, key: str, timeout: float, stripes: int = 4096):
+    """
+    Межпроцессная блокировка ключа через flock.
+
+    Ключи распределяются по фиксированному набору файлов, чтобы число
+    файлов блокировок не росло вместе с числом ключей. Блокировка
+    снимается ОС и при аварийном завершении процесса.
+
+    Блокировка только межпроцессная: одинаковые ключи внутри процесса
+    объединяет SingleFlight до нее. Если полосу уже держит другой поток
+    процесса, значит это другой ключ из той же полосы, и ждать его
+    незачем - блокировка пропускается. flock привязан к открытому
+    файлу, поэтому иначе потоки одного процесса ждали бы друг друга.
+
+    Args:
+        lock_dir: Директория файлов блокировок
+        key: Ключ
+        timeout: Максимальное время ожидания в секундах
+        stripes: Количество файлов блокировок
+
+    Yields:
+        True, если пришлось ждать другой процесс
+    """
+    if fcntl is None:
+        yield False
+        return
+
+    path = _stripe_path(lock_dir, key, stripes)
+    with _held_stripes_lock:
+        if path in _held_stripes:
+            held_here = True
+        else:
+            _held_stripes.add(path)
+            held_here = False
+
+    if held_here:
+        yield False
+        return
+
+    try:
+        os.makedirs(lock_dir, exist_ok=True)
+        fd = os.open(path, os.O_CREAT | os.O_RDWR, 0o644)
+    except BaseException:
+        with _held_stripes_lock:
+            _held_stripes.discard(path)
+        raise
+
+    acquired = False
+    waited = False
+    deadline = time.monotonic() + timeout
+
+    try:
+        while True:
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                acquired = True
+                break
+            except BlockingIOError:
+                waited = True
+                if time.monotonic() >= deadline:
+                    break
+                time.sleep(0.05)
+
+        yield waited
+    finally:
+        if acquired:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+        os.close(fd)
+        with _held_stripes_lock:
+            _held_stripes.discard(path)
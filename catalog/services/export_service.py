@@ -0,0 +1,139 @@
+"""
+Потоковая выгрузка каталога в JSONL и CSV.
+"""
+import csv
+import json
+from datetime import datetime
+from typing import Dict, Iterable, Iterator, Optional
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from ..models import Genre, Artist, Track
+
+
+class _Echo:
+    """Файлоподобный объект, который возвращает записанную строку вместо хранения."""
+
+    def write(self, value: str) -> str:
+        return value
+
+
+class ExportService:
+    """
+    Сервис выгрузки жанров, исполнителей, треков и связей исполнитель-жанр.
+
+    Строки читаются через values().iterator(chunk_size=...), поэтому
+    ни queryset, ни выгрузка целиком в памяти не держатся: расход
+    памяти не зависит от размера каталога.
+    """
+
+    FORMATS = ['jsonl', 'csv']
+    CONTENT_TYPES = {
+        'jsonl': 'application/x-ndjson; charset=utf-8',
+        'csv': 'text/csv; charset=utf-8',
+    }
+
+    CHUNK_SIZE = 2000
+
+    # Выгружаемые колонки; сырой ответ Last.fm (lastfm_data) не выгружается
+    ENTITIES = {
+        'genres': (Genre, [
+            'id', 'name', 'description', 'lastfm_tag', 'lastfm_url', 'track_count', 'is_popular',
+            'created_at', 'updated_at',
+        ]),
+        'artists': (Artist, [
+            'id', 'name', 'lastfm_url', 'lastfm_listeners', 'lastfm_playcount', 'description', 'image_url',
+            'is_popular', 'lastfm_synced_at', 'created_at', 'updated_at',
+        ]),
+        'tracks': (Track, [
+            'id', 'title', 'artist_id', 'lastfm_url', 'lastfm_listeners', 'lastfm_playcount', 'duration',
+            'album', 'tags_json', 'image_url', 'is_reference', 'lastfm_synced_at', 'created_at', 'updated_at',
+        ]),
+        'artist_genres': (Artist.genres.through, ['artist_id', 'genre_id']),
+    }
+
+    @staticmethod
+    def parse_since(value: str) -> datetime:
+        """
+        Разбор границы инкрементальной выгрузки.
+
+        Args:
+            value: Дата (2024-01-31) или дата и время в ISO 8601
+
+        Returns:
+            Время с часовым поясом
+
+        Raises:
+            ValueError: Строку не удалось разобрать
+        """
+        parsed = parse_datetime(value)
+        if parsed is None:
+            date = parse_date(value)
+            if date is None:
+                raise ValueError(f"Некорректная дата: {value}")
+            parsed = datetime(date.year, date.month, date.day)
+
+        if timezone.is_naive(parsed):
+            parsed = timezone.make_aware(parsed)
+        return parsed
+
+    @staticmethod
+    def rows(entity: str, since: Optional[datetime] = None) -> Iterator[Dict]:
+        """
+        Строки сущности по возрастанию id.
+
+        Args:
+            entity: Ключ ENTITIES
+            since: Только строки с updated_at не раньше этого времени.
+                   У связей исполнитель-жанр нет updated_at, они
+                   выгружаются всегда целиком
+
+        Yields:
+            Словари {колонка: значение}
+        """
+        model, fields = ExportService.ENTITIES[entity]
+        queryset = model.objects.order_by('pk')
+        if since is not None and 'updated_at' in fields:
+            queryset = queryset.filter(updated_at__gte=since)
+
+        return queryset.values(*fields).iterator(chunk_size=ExportService.CHUNK_SIZE)
+
+    @staticmethod
+    def iter_jsonl(entities: Iterable[str], since: Optional[datetime] = None) -> Iterator[str]:
+        """
+        Выгрузка в JSON Lines: по объекту на строку с ключом type.
+
+        Args:
+            entities: Ключи ENTITIES в порядке выгрузки
+            since: См. rows()
+
+        Yields:
+            Строки, оканчивающиеся переводом строки
+        """
+        for entity in entities:
+            for row in ExportService.rows(entity, since):
+                yield json.dumps({'type': entity, **row}, cls=DjangoJSONEncoder, ensure_ascii=False) + '\n'
+
+    @staticmethod
+    def iter_csv(entity: str, since: Optional[datetime] = None) -> Iterator[str]:
+        """
+        Выгрузка одной сущности в CSV с заголовком.
+
+        Args:
+            entity: Ключ ENTITIES
+            since: См. rows()
+
+        Yields:
+            Строки CSV
+        """
+        fields = ExportService.ENTITIES[entity][1]
+        writer = csv.writer(_Echo())
+
+        yield writer.writerow(fields)
+        for row in ExportService.rows(entity, since):
+            yield writer.writerow([
+                value.isoformat() if isinstance(value, datetime) else value
+                for value in (row[field] for field in fields)
+            ])
@@ -0,0 +1,197 @@
+"""
+Пакетное сопоставление тегов Last.fm с жанрами каталога.
+"""
+from typing import Dict, Iterable, List, Mapping, Tuple, Union
+
+from .genre_stats_service import GenreStatsService
+from ..models import Genre, Artist, TrackTag
+
+# Тег Last.fm: название или словарь {'name': ..., 'count': ...} (track.getTopTags)
+Tag = Union[str, Dict]
+
+
+class GenreService:
+    """
+    Сервис превращения тегов в жанры и связи артист-жанр.
+
+    Все теги разрешаются одним запросом, недостающие жанры создаются
+    одним bulk_create, а в промежуточную таблицу добавляются только
+    отсутствующие связи - независимо от количества тегов. Теги треков
+    с позицией и весом пишутся в TrackTag тем же способом.
+    """
+
+    # Сколько первых тегов трека или артиста становятся жанрами
+    GENRES_PER_ENTITY = 5
+
+    @staticmethod
+    def genre_name(tag: str) -> str:
+        """Название жанра для тега Last.fm."""
+        return tag.strip().title()[:100]
+
+    @staticmethod
+    def _tags_by_name(tags: Iterable[str]) -> Dict[str, str]:
+        """Теги, сгруппированные по названию жанра (первый тег побеждает)."""
+        tags_by_name = {}
+        for tag in tags:
+            if tag and tag.strip():
+                tags_by_name.setdefault(GenreService.genre_name(tag), tag.strip())
+        return tags_by_name
+
+    @staticmethod
+    def _resolve(tags: Iterable[str]) -> Tuple[Dict[str, int], int]:
+        """Разрешение тегов: ({название жанра: id}, сколько жанров создано)."""
+        tags_by_name = GenreService._tags_by_name(tags)
+        if not tags_by_name:
+            return {}, 0
+
+        genre_ids = dict(Genre.objects.filter(name__in=tags_by_name).values_list('name', 'id'))
+
+        missing = [name for name in tags_by_name if name not in genre_ids]
+        if not missing:
+            return genre_ids, 0
+
+        Genre.objects.bulk_create(
+            [
+                Genre(
+                    name=name,
+                    lastfm_tag=tags_by_name[name].lower()[:100],
+                    description=f'Жанр на основе тега Last.fm: {tags_by_name[name]}'
+                )
+                for name in missing
+            ],
+            ignore_conflicts=True
+        )
+        created = dict(Genre.objects.filter(name__in=missing).values_list('name', 'id'))
+        genre_ids.update(created)
+
+        return genre_ids, len(missing)
+
+    @staticmethod
+    def resolve(tags: Iterable[str]) -> Dict[str, int]:
+        """
+        Получение или создание жанров для тегов.
+
+        Args:
+            tags: Теги Last.fm
+
+        Returns:
+            Словарь {название жанра: id}
+        """
+        return GenreService._resolve(tags)[0]
+
+    @staticmethod
+    def link_artist_genres(artist_tags: Mapping[int, Iterable[str]]) -> Dict[str, int]:
+        """
+        Связывание артистов с жанрами их тегов.
+
+        Args:
+            artist_tags: Словарь {id артиста: теги}
+
+        Returns:
+            Счетчики: genres_created, links_created
+        """
+        artist_tags = {artist_id: list(tags) for artist_id, tags in artist_tags.items()}
+        genre_ids, genres_created = GenreService._resolve(
+            tag for tags in artist_tags.values() for tag in tags
+        )
+
+        wanted = {
+            (artist_id, genre_ids[GenreService.genre_name(tag)])
+            for artist_id, tags in artist_tags.items()
+            for tag in tags
+            if tag and tag.strip() and GenreService.genre_name(tag) in genre_ids
+        }
+        if not wanted:
+            return {'genres_created': genres_created, 'links_created': 0}
+
+        through = Artist.genres.through
+        existing = set(
+            through.objects.filter(
+                artist_id__in={artist_id for artist_id, _ in wanted},
+                genre_id__in={genre_id for _, genre_id in wanted}
+            ).values_list('artist_id', 'genre_id')
+        )
+        missing = wanted - existing
+        through.objects.bulk_create(
+            [through(artist_id=artist_id, genre_id=genre_id) for artist_id, genre_id in missing],
+            ignore_conflicts=True
+        )
+        # bulk_create не вызывает m2m_changed
+        GenreStatsService.links_changed(missing, 1)
+
+        return {'genres_created': genres_created, 'links_created': len(missing)}
+
+    @staticmethod
+    def link_tags(artist_id: int, tags: Iterable[str]) -> Dict[str, int]:
+        """Связывание одного артиста с жанрами тегов (см. link_artist_genres)."""
+        return GenreService.link_artist_genres({artist_id: tags})
+
+    @staticmethod
+    def _weighted_tags(tags: Iterable[Tag]) -> List[Tuple[str, int]]:
+        """
+        Первые GENRES_PER_ENTITY тегов с весом 0-100.
+
+        track.getInfo отдает теги по убыванию веса, но без самих весов -
+        тогда вес оценивается по позиции (100, 80, ... для пяти тегов).
+        """
+        named, seen = [], set()
+        for tag in tags:
+            name, count = (tag.get('name') or '', tag.get('count')) if isinstance(tag, dict) else (tag or '', None)
+            if name.strip() and GenreService.genre_name(name) not in seen:
+                seen.add(GenreService.genre_name(name))
+                named.append((name, count))
+        named = named[:GenreService.GENRES_PER_ENTITY]
+
+        total = len(named)
+        return [
+            (name, min(max(int(count), 0), 100) if count is not None else round(100 * (total - rank) / total))
+            for rank, (name, count) in enumerate(named)
+        ]
+
+    @staticmethod
+    def link_track_tags(track_tags: Mapping[int, Iterable[Tag]]) -> Dict[str, int]:
+        """
+        Запись тегов треков в TrackTag.
+
+        Набор тегов трека заменяется целиком: устаревшие строки удаляются,
+        новые вставляются, у оставшихся обновляются позиция и вес.
+
+        Args:
+            track_tags: Словарь {id трека: теги по убыванию веса}
+
+        Returns:
+            Счетчики: genres_created, tags_written, tags_deleted
+        """
+        weighted = {track_id: GenreService._weighted_tags(tags) for track_id, tags in track_tags.items()}
+        genre_ids, genres_created = GenreService._resolve(
+            name for tags in weighted.values() for name, _ in tags
+        )
+
+        rows = {}
+        for track_id, tags in weighted.items():
+            rank = 0
+            for name, weight in tags:
+                genre_id = genre_ids.get(GenreService.genre_name(name))
+                if genre_id is None or (track_id, genre_id) in rows:
+                    continue
+                rank += 1
+                rows[(track_id, genre_id)] = TrackTag(track_id=track_id, genre_id=genre_id, rank=rank, weight=weight)
+
+        stale = [
+            pk for pk, track_id, genre_id in TrackTag.objects.filter(
+                track_id__in=list(weighted)
+            ).values_list('pk', 'track_id', 'genre_id')
+            if (track_id, genre_id) not in rows
+        ]
+        if stale:
+            TrackTag.objects.filter(pk__in=stale).delete()
+
+        TrackTag.objects.bulk_create(
+            list(rows.values()),
+            batch_size=GenreStatsService.BATCH_SIZE,
+            update_conflicts=True,
+            unique_fields=['track', 'genre'],
+            update_fields=['rank', 'weight']
+        )
+
+        return {'genres_created': genres_created, 'tags_written': len(rows), 'tags_deleted': len(stale)}
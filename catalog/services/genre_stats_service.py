@@ -0,0 +1,233 @@
+"""
+Поддержка предрассчитанной статистики жанров.
+"""
+from collections import defaultdict
+from typing import Dict, Iterable, Tuple
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connection
+from django.db.models import Count, F, Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from ..models import Genre, GenreStats, GenreLeaderboard, Artist, Track
+
+# Приращение статистики жанра: (треков, исполнителей, прослушиваний)
+StatsDelta = Tuple[int, int, int]
+
+
+class GenreStatsService:
+    """
+    Сервис таблицы GenreStats.
+
+    Одиночные изменения применяются приращениями (UPDATE ... SET
+    track_count = track_count + n), пакетные - пересчетом затронутых
+    жанров одним агрегирующим запросом. Страницы жанров и аналитики
+    читают готовые строки вместо соединения трех таблиц.
+
+    Источник чтения задается настройкой GENRE_STATS_BACKEND: table -
+    GenreStats, matview - материализованное представление
+    GenreLeaderboard (только PostgreSQL), live - агрегирующий запрос.
+    """
+
+    BATCH_SIZE = 500
+    BACKENDS = ['table', 'matview', 'live']
+
+    @staticmethod
+    def _apply(deltas: Dict[int, StatsDelta]):
+        """Применение приращений; жанры с одинаковым приращением обновляются одним UPDATE."""
+        deltas = {genre_id: delta for genre_id, delta in deltas.items() if any(delta)}
+        if not deltas:
+            return
+
+        GenreStats.objects.bulk_create(
+            [GenreStats(genre_id=genre_id) for genre_id in deltas],
+            ignore_conflicts=True
+        )
+
+        by_delta = defaultdict(list)
+        for genre_id, delta in deltas.items():
+            by_delta[delta].append(genre_id)
+
+        now = timezone.now()
+        for (tracks, artists, playcount), genre_ids in by_delta.items():
+            GenreStats.objects.filter(genre_id__in=genre_ids).update(
+                track_count=F('track_count') + tracks,
+                artist_count=F('artist_count') + artists,
+                total_playcount=F('total_playcount') + playcount,
+                updated_at=now
+            )
+
+    @staticmethod
+    def _genre_ids(artist_ids: Iterable[int]) -> list:
+        return list(
+            Artist.genres.through.objects.filter(artist_id__in=list(artist_ids))
+            .values_list('genre_id', flat=True).distinct()
+        )
+
+    @staticmethod
+    def track_changed(artist_id: int, tracks: int, playcount: int):
+        """
+        Приращение для жанров исполнителя после изменения его трека.
+
+        Args:
+            artist_id: ID исполнителя трека
+            tracks: Изменение количества треков (1, 0 или -1)
+            playcount: Изменение суммы прослушиваний
+        """
+        genre_ids = GenreStatsService._genre_ids([artist_id])
+        GenreStatsService._apply({genre_id: (tracks, 0, playcount) for genre_id in genre_ids})
+
+    @staticmethod
+    def artist_removed(artist_id: int):
+        """Вычитание исполнителя из его жанров (треки вычитаются отдельно)."""
+        genre_ids = GenreStatsService._genre_ids([artist_id])
+        GenreStatsService._apply({genre_id: (0, -1, 0) for genre_id in genre_ids})
+
+    @staticmethod
+    def links_changed(links: Iterable[Tuple[int, int]], sign: int):
+        """
+        Приращение после добавления или удаления связей исполнитель-жанр.
+
+        Args:
+            links: Пары (artist_id, genre_id)
+            sign: 1 - связи добавлены, -1 - удалены
+        """
+        links = list(links)
+        if not links:
+            return
+
+        track_stats = {
+            artist_id: (tracks, playcount or 0)
+            for artist_id, tracks, playcount in Track.objects.filter(
+                artist_id__in={artist_id for artist_id, _ in links}
+            ).values('artist_id').annotate(
+                tracks=Count('id'), playcount=Sum('lastfm_playcount')
+            ).values_list('artist_id', 'tracks', 'playcount')
+        }
+
+        deltas = defaultdict(lambda: (0, 0, 0))
+        for artist_id, genre_id in links:
+            tracks, playcount = track_stats.get(artist_id, (0, 0))
+            total = deltas[genre_id]
+            deltas[genre_id] = (total[0] + sign * tracks, total[1] + sign, total[2] + sign * playcount)
+
+        GenreStatsService._apply(deltas)
+
+    @staticmethod
+    def refresh(genre_ids: Iterable[int]):
+        """
+        Пересчет статистики жанров одним агрегирующим запросом на порцию.
+
+        Args:
+            genre_ids: ID жанров
+        """
+        genre_ids = list(genre_ids)
+        for start in range(0, len(genre_ids), GenreStatsService.BATCH_SIZE):
+            chunk = genre_ids[start:start + GenreStatsService.BATCH_SIZE]
+            rows = Genre.objects.filter(pk__in=chunk).annotate(
+                track_total=Count('artists__tracks', distinct=True),
+                artist_total=Count('artists', distinct=True),
+                playcount_total=Coalesce(Sum('artists__tracks__lastfm_playcount'), 0)
+            ).values_list('pk', 'track_total', 'artist_total', 'playcount_total')
+
+            now = timezone.now()
+            GenreStats.objects.bulk_create(
+                [
+                    GenreStats(genre_id=genre_id, track_count=tracks, artist_count=artists,
+                               total_playcount=playcount, updated_at=now)
+                    for genre_id, tracks, artists, playcount in rows
+                ],
+                update_conflicts=True,
+                unique_fields=['genre'],
+                update_fields=['track_count', 'artist_count', 'total_playcount', 'updated_at']
+            )
+
+    @staticmethod
+    def refresh_for_artists(artist_ids: Iterable[int]):
+        """Пересчет статистики всех жанров исполнителей (после пакетной записи треков)."""
+        artist_ids = list(artist_ids)
+        if artist_ids:
+            GenreStatsService.refresh(GenreStatsService._genre_ids(artist_ids))
+
+    @staticmethod
+    def rebuild() -> int:
+        """
+        Полный пересчет статистики всех жанров.
+
+        Returns:
+            Количество жанров
+        """
+        genre_ids = list(Genre.objects.order_by('pk').values_list('pk', flat=True))
+        GenreStatsService.refresh(genre_ids)
+        return len(genre_ids)
+
+    @staticmethod
+    def backend() -> str:
+        """
+        Текущий источник статистики жанров.
+
+        Returns:
+            table, matview или live; matview вне PostgreSQL заменяется на table
+        """
+        backend = getattr(settings, 'GENRE_STATS_BACKEND', 'table')
+        if backend not in GenreStatsService.BACKENDS:
+            raise ImproperlyConfigured(
+                f"GENRE_STATS_BACKEND должен быть одним из {GenreStatsService.BACKENDS}, получено {backend!r}"
+            )
+        if backend == 'matview' and connection.vendor != 'postgresql':
+            return 'table'
+        return backend
+
+    @staticmethod
+    def annotate_genres(queryset=None, backend: str = None):
+        """
+        Жанры со статистикой из выбранного источника.
+
+        Args:
+            queryset: Исходный QuerySet жанров (по умолчанию все жанры)
+            backend: Источник (по умолчанию из настройки GENRE_STATS_BACKEND)
+
+        Returns:
+            QuerySet с annotated_track_count, annotated_artist_count и total_playcount
+        """
+        queryset = Genre.objects.all() if queryset is None else queryset
+        backend = backend or GenreStatsService.backend()
+
+        if backend == 'live':
+            return queryset.annotate(
+                annotated_track_count=Count('artists__tracks', distinct=True),
+                annotated_artist_count=Count('artists', distinct=True),
+                total_playcount=Coalesce(Sum('artists__tracks__lastfm_playcount'), 0)
+            )
+
+        relation = 'leaderboard' if backend == 'matview' else 'stats'
+        return queryset.annotate(
+            annotated_track_count=Coalesce(F(f'{relation}__track_count'), 0),
+            annotated_artist_count=Coalesce(F(f'{relation}__artist_count'), 0),
+            total_playcount=Coalesce(F(f'{relation}__total_playcount'), 0)
+        )
+
+    @staticmethod
+    def refresh_leaderboard(concurrently: bool = True) -> bool:
+        """
+        Обновление материализованного представления GenreLeaderboard.
+
+        CONCURRENTLY не блокирует чтение представления на время пересчета,
+        но требует уже заполненного представления с уникальным индексом.
+
+        Args:
+            concurrently: Обновлять без блокировки чтения
+
+        Returns:
+            False, если база не PostgreSQL и представления нет
+        """
+        if connection.vendor != 'postgresql':
+            return False
+
+        table = connection.ops.quote_name(GenreLeaderboard._meta.db_table)
+        mode = 'CONCURRENTLY ' if concurrently else ''
+        with connection.cursor() as cursor:
+            cursor.execute(f"REFRESH MATERIALIZED VIEW {mode}{table}")
+        return True
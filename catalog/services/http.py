@@ -0,0 +1,86 @@
+"""
+HTTP-сессии с пулом соединений для внешних API.
+"""
+from typing import Dict, Iterable
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+
+def build_session(pool_size: int = 20, retries: int = 2, backoff: float = 0.3,
+                  retry_statuses: Iterable[int] = (500, 502, 503, 504)) -> requests.Session:
+    """
+    Создание сессии с keep-alive и повтором неудачных запросов.
+
+    Повторы выполняются только для GET, с экспоненциальной задержкой
+    и случайным разбросом, чтобы процессы не повторяли запросы синхронно.
+    429 не повторяется: повтор должен снова пройти через ограничитель
+    частоты вызывающего кода, а не уйти к API в обход него.
+    Сессию можно использовать из нескольких потоков одновременно.
+
+    Args:
+        pool_size: Максимальное число соединений к одному хосту
+        retries: Количество повторов
+        backoff: Базовая задержка повтора в секундах
+        retry_statuses: HTTP-статусы, после которых запрос повторяется
+
+    Returns:
+        Настроенная сессия requests
+    """
+    retry = Retry(
+        total=retries,
+        connect=retries,
+        read=retries,
+        status=retries,
+        allowed_methods=frozenset(['GET']),
+        status_forcelist=frozenset(retry_statuses),
+        backoff_factor=backoff,
+        backoff_jitter=backoff,
+        backoff_max=5,
+        respect_retry_after_header=False,
+        raise_on_status=False,
+    )
+
+    adapter = HTTPAdapter(
+        pool_connections=4,
+        pool_maxsize=pool_size,
+        max_retries=retry,
+    )
+
+    session = requests.Session()
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+
+def connection_stats(session: requests.Session) -> Dict:
+    """
+    Статистика повторного использования соединений сессии.
+
+    Returns:
+        Словарь с числом запросов, открытых соединений и долей
+        запросов, выполненных по уже открытому соединению
+    """
+    requests_count = 0
+    connections_count = 0
+
+    for adapter in set(session.adapters.values()):
+        pools = getattr(adapter.poolmanager, 'pools', None)
+        if pools is None:
+            continue
+        for pool_key in pools.keys():
+            pool = pools.get(pool_key)
+            if pool is None:
+                continue
+            requests_count += pool.num_requests
+            connections_count += pool.num_connections
+
+    reused = max(requests_count - connections_count, 0)
+
+    return {
+        'requests': requests_count,
+        'connections': connections_count,
+        'reused': reused,
+        'reuse_ratio': reused / requests_count if requests_count else 0.0,
+    }
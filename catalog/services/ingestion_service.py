@@ -0,0 +1,296 @@
+"""
+Массовый импорт треков в каталог.
+"""
+import csv
+import json
+import os
+import time
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from django.db import transaction
+
+from .genre_service import GenreService
+from .lastfm_service import LastFMService, LastFMUnavailable
+from .upsert_service import UpsertService
+from ..models import Artist, Track, canonical_key
+
+TrackKey = Tuple[str, str]
+
+
+class IngestionService:
+    """Сервис импорта больших списков треков (артист, название)."""
+
+    @staticmethod
+    def read_chunks(path: str, chunk_size: int = 500, skip: int = 0,
+                    file_format: Optional[str] = None) -> Iterator[List[TrackKey]]:
+        """
+        Потоковое чтение файла порциями.
+
+        CSV: колонки artist и track (или title) с заголовком, либо
+        первые две колонки без заголовка. JSONL: объекты с ключами
+        artist и track (или title). Строка без артиста или названия
+        отдаётся как ('', ''), чтобы номера строк не сбивались, и
+        пропускается при импорте.
+
+        Args:
+            path: Путь к файлу
+            chunk_size: Размер порции
+            skip: Сколько строк данных пропустить (продолжение импорта)
+            file_format: 'csv' или 'jsonl' (None - по расширению)
+
+        Yields:
+            Списки пар (артист, название)
+        """
+        rows = IngestionService._read_rows(path, file_format)
+
+        chunk = []
+        for index, row in enumerate(rows):
+            if index < skip:
+                continue
+
+            chunk.append(row)
+            if len(chunk) >= chunk_size:
+                yield chunk
+                chunk = []
+
+        if chunk:
+            yield chunk
+
+    @staticmethod
+    def _read_rows(path: str, file_format: Optional[str] = None) -> Iterator[TrackKey]:
+        if file_format is None:
+            file_format = 'jsonl' if path.endswith(('.jsonl', '.ndjson')) else 'csv'
+
+        with open(path, 'r', encoding='utf-8-sig', newline='') as f:
+            if file_format == 'jsonl':
+                for line in f:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        item = json.loads(line)
+                    except json.JSONDecodeError:
+                        yield '', ''
+                        continue
+                    if not isinstance(item, dict):
+                        yield '', ''
+                        continue
+                    yield (str(item.get('artist') or '').strip(),
+                           str(item.get('track') or item.get('title') or '').strip())
+                return
+
+            reader = csv.reader(f)
+            header = next(reader, None)
+            if header is None:
+                return
+
+            columns = [column.strip().lower() for column in header]
+            if 'artist' in columns and ('track' in columns or 'title' in columns):
+                artist_index = columns.index('artist')
+                track_index = columns.index('track' if 'track' in columns else 'title')
+            else:
+                artist_index, track_index = 0, 1
+                yield IngestionService._csv_pair(header, artist_index, track_index)
+
+            for row in reader:
+                yield IngestionService._csv_pair(row, artist_index, track_index)
+
+    @staticmethod
+    def _csv_pair(row: List[str], artist_index: int, track_index: int) -> TrackKey:
+        if len(row) <= max(artist_index, track_index):
+            return '', ''
+        return row[artist_index].strip(), row[track_index].strip()
+
+    @staticmethod
+    def ingest_chunk(pairs: List[TrackKey], lastfm: Optional[LastFMService] = None) -> Dict[str, int]:
+        """
+        Обогащение порции через Last.fm и запись в базу одной транзакцией.
+
+        Args:
+            pairs: Пары (артист, название)
+            lastfm: Клиент Last.fm (None - импорт без обогащения); не
+                    найденными считаются только треки, о которых Last.fm
+                    ответил "не найдено", любой другой пустой ответ
+                    прерывает порцию
+
+        Returns:
+            Счетчики порции: rows, skipped, not_found, artists_created,
+            tracks_created, tracks_updated, genres_created
+
+        Raises:
+            LastFMUnavailable: Last.fm недоступен или ответил ошибкой;
+                               порция не записана
+        """
+        stats = dict.fromkeys(
+            ['rows', 'skipped', 'not_found', 'artists_created', 'tracks_created', 'tracks_updated', 'genres_created'],
+            0
+        )
+        stats['rows'] = len(pairs)
+
+        keys = list(dict.fromkeys(pair for pair in pairs if pair[0] and pair[1]))
+        stats['skipped'] = len(pairs) - sum(1 for pair in pairs if pair[0] and pair[1])
+
+        if lastfm is not None:
+            info_by_key = dict(lastfm.get_track_info_many(keys))
+        else:
+            info_by_key = {key: None for key in keys}
+
+        records = {}
+        for key in keys:
+            info = info_by_key.get(key)
+            if lastfm is not None and not info:
+                if not lastfm.is_track_not_found(*key):
+                    # Ошибка запроса или отрицательная запись об ошибке:
+                    # порция будет импортирована заново
+                    raise LastFMUnavailable(f"Нет ответа Last.fm для {key[0]} - {key[1]}")
+                stats['not_found'] += 1
+                continue
+
+            artist_name = (info or {}).get('artist') or key[0]
+            title = (info or {}).get('name') or key[1]
+            records[(artist_name[:200], title[:200])] = info
+
+        if not records:
+            return stats
+
+        with transaction.atomic():
+            artists = IngestionService._get_or_create_artists({artist for artist, _ in records}, stats)
+            IngestionService._upsert_tracks(records, artists, stats)
+            IngestionService._link_genres(records, artists, stats)
+
+        return stats
+
+    @staticmethod
+    def _get_or_create_artists(names, stats: Dict[str, int]) -> Dict[str, int]:
+        """Артисты по имени: недостающие вставляются одним INSERT ... ON CONFLICT. Возвращает {имя: id}."""
+        keys = {canonical_key(name) for name in names}
+        existing = set(Artist.objects.filter(name_key__in=keys).values_list('name_key', flat=True))
+        artists = UpsertService.upsert_artists([{'name': name} for name in names])
+        stats['artists_created'] += len(keys - existing)
+        return artists
+
+    @staticmethod
+    def _upsert_tracks(records: Dict[TrackKey, Optional[Dict]], artists: Dict[str, int], stats: Dict[str, int]):
+        """Создание новых треков и обновление данных Last.fm у существующих."""
+        # Названия, различающиеся регистром или пунктуацией, - один трек
+        wanted = {
+            (artists[artist], canonical_key(title)): (title, info)
+            for (artist, title), info in records.items()
+        }
+
+        existing = set(
+            Track.objects.filter(
+                artist_id__in={artist_id for artist_id, _ in wanted},
+                title_key__in={title_key for _, title_key in wanted}
+            ).values_list('artist_id', 'title_key')
+        )
+        existing &= set(wanted)
+
+        found, not_found = [], []
+        for (artist_id, _), (title, info) in wanted.items():
+            row = {'artist_id': artist_id, 'title': title, **UpsertService.track_stats(info)}
+            (found if info else not_found).append(row)
+
+        # Без данных Last.fm существующий трек не трогаем
+        UpsertService.upsert_tracks(found, UpsertService.TRACK_STATS_FIELDS)
+        UpsertService.upsert_tracks(not_found)
+
+        stats['tracks_created'] += len(wanted) - len(existing)
+        stats['tracks_updated'] += sum(1 for key, (_, info) in wanted.items() if info and key in existing)
+
+    @staticmethod
+    def _link_genres(records: Dict[TrackKey, Optional[Dict]], artists: Dict[str, int], stats: Dict[str, int]):
+        """Жанры из тегов треков и связи артист-жанр."""
+        artist_tags = {}
+        for (artist, _), info in records.items():
+            tags = (info or {}).get('tags', [])[:GenreService.GENRES_PER_ENTITY]
+            artist_tags.setdefault(artists[artist], []).extend(tags)
+
+        result = GenreService.link_artist_genres(artist_tags)
+        stats['genres_created'] += result['genres_created']
+
+    @staticmethod
+    def load_checkpoint(checkpoint_path: str, source: str) -> Dict:
+        """Состояние прерванного импорта того же файла или пустое состояние."""
+        if os.path.exists(checkpoint_path):
+            try:
+                with open(checkpoint_path, 'r', encoding='utf-8') as f:
+                    checkpoint = json.load(f)
+                if checkpoint.get('source') == os.path.abspath(source):
+                    return checkpoint
+            except (json.JSONDecodeError, OSError):
+                pass
+
+        return {'source': os.path.abspath(source), 'rows_done': 0, 'stats': {}}
+
+    @staticmethod
+    def save_checkpoint(checkpoint_path: str, checkpoint: Dict):
+        """Атомарная запись состояния импорта."""
+        temp_path = f"{checkpoint_path}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(checkpoint, f, ensure_ascii=False, indent=2)
+        os.replace(temp_path, checkpoint_path)
+
+    @staticmethod
+    def import_file(path: str, lastfm: Optional[LastFMService] = None, chunk_size: int = 500,
+                    checkpoint_path: Optional[str] = None, file_format: Optional[str] = None,
+                    progress: Optional[Callable[[Dict], None]] = None) -> Dict:
+        """
+        Импорт файла порциями с сохранением прогресса.
+
+        После каждой записанной порции номер обработанной строки
+        сохраняется в checkpoint_path; повторный запуск продолжает
+        с неё. Если Last.fm недоступен, прогресс не сдвигается за
+        порцию, и повторный запуск импортирует её заново.
+
+        Args:
+            path: Путь к CSV или JSONL
+            lastfm: Клиент Last.fm (None - импорт без обогащения)
+            chunk_size: Размер порции
+            checkpoint_path: Файл прогресса (None - без продолжения)
+            file_format: 'csv' или 'jsonl' (None - по расширению)
+            progress: Вызывается после каждой порции с текущей статистикой
+
+        Returns:
+            Итоговая статистика, включая rows_per_second
+
+        Raises:
+            LastFMUnavailable: Last.fm недоступен или ответил ошибкой
+        """
+        checkpoint = (
+            IngestionService.load_checkpoint(checkpoint_path, path)
+            if checkpoint_path else {'source': os.path.abspath(path), 'rows_done': 0, 'stats': {}}
+        )
+        totals = checkpoint['stats']
+        started = time.monotonic()
+        rows_this_run = 0
+
+        for chunk in IngestionService.read_chunks(path, chunk_size, skip=checkpoint['rows_done'],
+                                                  file_format=file_format):
+            chunk_started = time.monotonic()
+            stats = IngestionService.ingest_chunk(chunk, lastfm)
+
+            for name, value in stats.items():
+                totals[name] = totals.get(name, 0) + value
+            checkpoint['rows_done'] += len(chunk)
+            rows_this_run += len(chunk)
+
+            if checkpoint_path:
+                IngestionService.save_checkpoint(checkpoint_path, checkpoint)
+
+            if progress:
+                elapsed = time.monotonic() - started
+                progress({
+                    **totals,
+                    'rows_done': checkpoint['rows_done'],
+                    'chunk_seconds': time.monotonic() - chunk_started,
+                    'rows_per_second': rows_this_run / elapsed if elapsed else 0.0,
+                })
+
+        elapsed = time.monotonic() - started
+        return {
+            **totals,
+            'rows_done': checkpoint['rows_done'],
+            'elapsed': elapsed,
+            'rows_per_second': rows_this_run / elapsed if elapsed else 0.0,
+        }
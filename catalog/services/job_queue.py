@@ -0,0 +1,397 @@
+"""
+Очередь фоновых задач обогащения данными Last.fm.
+
+Задачи хранятся в таблице EnrichmentJob и выполняются командой
+enrichment_worker, поэтому отдельный брокер не нужен.
+"""
+import hashlib
+import logging
+import random
+from datetime import timedelta
+from typing import List, Optional, Tuple
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .genre_service import GenreService
+from .lastfm_service import LastFMService, LastFMUnavailable
+from .upsert_service import UpsertService
+from ..models import Artist, Track, EnrichmentJob, ListeningEvent, PendingScrobble
+
+logger = logging.getLogger(__name__)
+
+
+class JobQueueService:
+    """Сервис очереди задач обогащения."""
+
+    # Приоритеты: задачи, которых ждёт пользователь, идут раньше фоновых
+    PRIORITY_INTERACTIVE = 10
+    PRIORITY_DEFAULT = 0
+    PRIORITY_BACKGROUND = -10
+
+    @staticmethod
+    def track_key(track_id: int) -> str:
+        return f'{EnrichmentJob.KIND_TRACK}:{track_id}'
+
+    @staticmethod
+    def artist_key(artist_id: int) -> str:
+        return f'{EnrichmentJob.KIND_ARTIST}:{artist_id}'
+
+    @staticmethod
+    def scrobble_key(artist_key: str, title_key: str) -> str:
+        digest = hashlib.md5(f'{artist_key}\n{title_key}'.encode()).hexdigest()
+        return f'{EnrichmentJob.KIND_SCROBBLE}:{digest}'
+
+    @staticmethod
+    def enqueue(kind: str, key: str, payload: Optional[dict] = None,
+                priority: int = PRIORITY_DEFAULT) -> Tuple[EnrichmentJob, bool]:
+        """
+        Постановка задачи в очередь без дублей.
+
+        Если для ключа уже есть ожидающая или выполняемая задача, новая
+        не создаётся; приоритет существующей повышается до переданного.
+
+        Args:
+            kind: Тип задачи (EnrichmentJob.KIND_*)
+            key: Ключ сущности, например track:42
+            payload: Параметры задачи
+            priority: Приоритет (больше - раньше)
+
+        Returns:
+            Кортеж (задача, создана_ли_новая)
+        """
+        for _ in range(2):
+            job = EnrichmentJob.objects.filter(key=key, status__in=EnrichmentJob.ACTIVE_STATUSES).first()
+            if job is not None:
+                if priority > job.priority:
+                    EnrichmentJob.objects.filter(pk=job.pk, priority__lt=priority).update(priority=priority)
+                    job.priority = priority
+                return job, False
+
+            try:
+                with transaction.atomic():
+                    job = EnrichmentJob.objects.create(
+                        kind=kind,
+                        key=key,
+                        payload=payload or {},
+                        priority=priority,
+                        max_attempts=getattr(settings, 'JOB_MAX_ATTEMPTS', 5)
+                    )
+                return job, True
+            except IntegrityError:
+                # Ту же задачу одновременно поставил другой процесс
+                continue
+
+        raise IntegrityError(f"Не удалось поставить задачу {key} в очередь")
+
+    @staticmethod
+    def enqueue_track(track_id: int, priority: int = PRIORITY_DEFAULT) -> Tuple[EnrichmentJob, bool]:
+        """Постановка в очередь обогащения трека."""
+        return JobQueueService.enqueue(
+            EnrichmentJob.KIND_TRACK,
+            JobQueueService.track_key(track_id),
+            {'track_id': track_id},
+            priority
+        )
+
+    @staticmethod
+    def enqueue_artist(artist_id: int, priority: int = PRIORITY_DEFAULT) -> Tuple[EnrichmentJob, bool]:
+        """Постановка в очередь обогащения исполнителя."""
+        return JobQueueService.enqueue(
+            EnrichmentJob.KIND_ARTIST,
+            JobQueueService.artist_key(artist_id),
+            {'artist_id': artist_id},
+            priority
+        )
+
+    @staticmethod
+    def enqueue_scrobble(artist_key: str, title_key: str, artist: str, title: str,
+                         priority: int = PRIORITY_BACKGROUND) -> Tuple[EnrichmentJob, bool]:
+        """Постановка в очередь проверки трека из прослушиваний (PendingScrobble)."""
+        return JobQueueService.enqueue(
+            EnrichmentJob.KIND_SCROBBLE,
+            JobQueueService.scrobble_key(artist_key, title_key),
+            {'artist_key': artist_key, 'title_key': title_key, 'artist': artist, 'title': title},
+            priority
+        )
+
+    @staticmethod
+    def is_pending(key: str) -> bool:
+        """Есть ли по ключу ожидающая или выполняемая задача."""
+        return EnrichmentJob.objects.filter(key=key, status__in=EnrichmentJob.ACTIVE_STATUSES).exists()
+
+    @staticmethod
+    def claim(worker_id: str, limit: int = 1) -> List[EnrichmentJob]:
+        """
+        Захват готовых к выполнению задач.
+
+        Задача переводится в статус running условным UPDATE, поэтому
+        несколько воркеров не возьмут одну задачу дважды.
+
+        Args:
+            worker_id: Идентификатор воркера
+            limit: Максимальное количество задач
+
+        Returns:
+            Захваченные задачи в порядке приоритета
+        """
+        now = timezone.now()
+        candidates = EnrichmentJob.objects.filter(
+            status=EnrichmentJob.STATUS_PENDING,
+            run_after__lte=now
+        ).order_by('-priority', 'run_after', 'id').values_list('id', flat=True)[:limit * 2]
+
+        claimed = []
+        for job_id in candidates:
+            updated = EnrichmentJob.objects.filter(pk=job_id, status=EnrichmentJob.STATUS_PENDING).update(
+                status=EnrichmentJob.STATUS_RUNNING,
+                locked_by=worker_id[:100],
+                locked_at=now,
+                attempts=F('attempts') + 1,
+                updated_at=now
+            )
+            if updated:
+                claimed.append(job_id)
+                if len(claimed) >= limit:
+                    break
+
+        return list(EnrichmentJob.objects.filter(pk__in=claimed).order_by('-priority', 'run_after', 'id'))
+
+    @staticmethod
+    def complete(job: EnrichmentJob, note: str = ''):
+        """Отметка задачи как выполненной."""
+        EnrichmentJob.objects.filter(pk=job.pk).update(
+            status=EnrichmentJob.STATUS_DONE,
+            locked_by='',
+            locked_at=None,
+            last_error=note,
+            updated_at=timezone.now()
+        )
+        job.status = EnrichmentJob.STATUS_DONE
+
+    @staticmethod
+    def retry_delay(attempts: int) -> float:
+        """
+        Задержка перед повтором: экспоненциальная, со случайным разбросом.
+
+        Args:
+            attempts: Сколько попыток уже сделано
+
+        Returns:
+            Задержка в секундах
+        """
+        base = getattr(settings, 'JOB_RETRY_BACKOFF', 30)
+        cap = getattr(settings, 'JOB_RETRY_BACKOFF_MAX', 60 * 60)
+        delay = min(cap, base * 2 ** max(attempts - 1, 0))
+        return delay * random.uniform(0.5, 1.0)
+
+    @staticmethod
+    def fail(job: EnrichmentJob, error: str):
+        """
+        Обработка ошибки задачи.
+
+        Задача возвращается в очередь с задержкой или, если попытки
+        исчерпаны, получает статус failed.
+        """
+        now = timezone.now()
+        if job.attempts >= job.max_attempts:
+            status = EnrichmentJob.STATUS_FAILED
+            run_after = job.run_after
+        else:
+            status = EnrichmentJob.STATUS_PENDING
+            run_after = now + timedelta(seconds=JobQueueService.retry_delay(job.attempts))
+
+        EnrichmentJob.objects.filter(pk=job.pk).update(
+            status=status,
+            run_after=run_after,
+            locked_by='',
+            locked_at=None,
+            last_error=error[:2000],
+            updated_at=now
+        )
+        job.status = status
+        job.run_after = run_after
+
+    @staticmethod
+    def reclaim_stale(lease_seconds: Optional[float] = None) -> int:
+        """
+        Возврат в очередь задач, чей воркер завис или был остановлен.
+
+        Args:
+            lease_seconds: Через сколько секунд задача в работе считается
+                           брошенной (по умолчанию JOB_LEASE_SECONDS)
+
+        Returns:
+            Количество возвращённых задач
+        """
+        if lease_seconds is None:
+            lease_seconds = getattr(settings, 'JOB_LEASE_SECONDS', 600)
+
+        now = timezone.now()
+        stale = EnrichmentJob.objects.filter(
+            status=EnrichmentJob.STATUS_RUNNING,
+            locked_at__lt=now - timedelta(seconds=lease_seconds)
+        )
+        reset = dict(locked_by='', locked_at=None, last_error='Истекла аренда воркера', updated_at=now)
+
+        failed = stale.filter(attempts__gte=F('max_attempts')).update(status=EnrichmentJob.STATUS_FAILED, **reset)
+        requeued = stale.update(status=EnrichmentJob.STATUS_PENDING, run_after=now, **reset)
+        return failed + requeued
+
+    @staticmethod
+    def run(job: EnrichmentJob, lastfm: LastFMService) -> bool:
+        """
+        Выполнение захваченной задачи.
+
+        Args:
+            job: Задача в статусе running
+            lastfm: Клиент Last.fm
+
+        Returns:
+            True если задача выполнена
+        """
+        handler = getattr(JobQueueService, f'_run_{job.kind}', None)
+        if handler is None:
+            job.attempts = job.max_attempts
+            JobQueueService.fail(job, f"Неизвестный тип задачи: {job.kind}")
+            return False
+
+        try:
+            note = handler(job, lastfm)
+        except Exception as e:
+            logger.warning("Job %s failed (attempt %s): %s", job.key, job.attempts, e)
+            JobQueueService.fail(job, f"{type(e).__name__}: {e}")
+            return False
+
+        JobQueueService.complete(job, note or '')
+        return True
+
+    @staticmethod
+    def _run_track(job: EnrichmentJob, lastfm: LastFMService) -> str:
+        """Обогащение трека; исполнитель обогащается отдельной задачей."""
+        track = Track.objects.select_related('artist').filter(pk=job.payload.get('track_id')).first()
+        if track is None:
+            return 'Трек удалён'
+
+        track_info = lastfm.get_track_info(artist=track.artist.name, track=track.title)
+        if not track_info:
+            if not lastfm.is_track_not_found(track.artist.name, track.title):
+                # Ошибка запроса или отрицательная запись об ошибке: повторим позже
+                raise LastFMUnavailable("Нет ответа Last.fm")
+            # Отметка о проверке, чтобы просмотры не ставили задачу снова
+            track.lastfm_synced_at = timezone.now()
+            track.save(update_fields=['lastfm_synced_at'])
+            return 'Не найден в Last.fm'
+
+        track.lastfm_listeners = track_info.get('listeners', 0)
+        track.lastfm_playcount = track_info.get('playcount', 0)
+        track.lastfm_url = track_info.get('url', '') or track.lastfm_url
+        track.duration = track_info.get('duration') or track.duration
+        track.album = track_info.get('album', '') or track.album
+        track.image_url = track_info.get('image', '') or track.image_url
+        track.tags = track_info.get('tags', [])
+        track.set_lastfm_data(track_info)
+        track.lastfm_synced_at = timezone.now()
+        track.save()
+        track.link_genres_from_tags()
+
+        if not track.artist.lastfm_url and track.artist.lastfm_synced_at is None:
+            JobQueueService.enqueue_artist(track.artist_id, priority=job.priority)
+
+        return ''
+
+    @staticmethod
+    def _run_artist(job: EnrichmentJob, lastfm: LastFMService) -> str:
+        """Обогащение исполнителя и его жанров."""
+        artist = Artist.objects.filter(pk=job.payload.get('artist_id')).first()
+        if artist is None:
+            return 'Исполнитель удалён'
+
+        artist_info = lastfm.get_artist_info(artist.name)
+        if not artist_info:
+            if not lastfm.is_artist_not_found(artist.name):
+                raise LastFMUnavailable("Нет ответа Last.fm")
+            artist.lastfm_synced_at = timezone.now()
+            artist.save(update_fields=['lastfm_synced_at'])
+            return 'Не найден в Last.fm'
+
+        artist.lastfm_listeners = artist_info.get('listeners', 0)
+        artist.lastfm_playcount = artist_info.get('playcount', 0)
+        artist.lastfm_url = artist_info.get('url', '') or artist.lastfm_url
+        artist.image_url = artist.image_url or artist_info.get('image', '')
+        artist.description = artist.description or artist_info.get('bio', '')
+        artist.lastfm_synced_at = timezone.now()
+        artist.save()
+
+        GenreService.link_tags(artist.id, artist_info.get('tags', [])[:GenreService.GENRES_PER_ENTITY])
+
+        return ''
+
+    @staticmethod
+    def _run_scrobble(job: EnrichmentJob, lastfm: LastFMService) -> str:
+        """
+        Проверка трека из прослушиваний.
+
+        Подтверждённый Last.fm трек добавляется в каталог с его данными,
+        и ожидающие прослушивания переносятся в ListeningEvent. Трек,
+        которого нет в Last.fm, в каталог не попадает, а его
+        прослушивания удаляются.
+        """
+        payload = job.payload
+        pending = PendingScrobble.objects.filter(artist_key=payload['artist_key'], title_key=payload['title_key'])
+        if not pending.exists():
+            return 'Нет ожидающих прослушиваний'
+
+        track_info = lastfm.get_track_info(artist=payload['artist'], track=payload['title'])
+        if not track_info:
+            if not lastfm.is_track_not_found(payload['artist'], payload['title']):
+                raise LastFMUnavailable("Нет ответа Last.fm")
+            pending.delete()
+            return 'Не найден в Last.fm'
+
+        artist_name = (track_info.get('artist') or payload['artist'])[:200]
+        title = (track_info.get('name') or payload['title'])[:200]
+        with transaction.atomic():
+            artist_id = UpsertService.upsert_artists([{'name': artist_name}])[artist_name]
+            track_id = UpsertService.upsert_tracks(
+                [{'artist_id': artist_id, 'title': title, **UpsertService.track_stats(track_info)}],
+                UpsertService.TRACK_STATS_FIELDS
+            )[(artist_id, title)]
+            GenreService.link_artist_genres(
+                {artist_id: track_info.get('tags', [])[:GenreService.GENRES_PER_ENTITY]}
+            )
+
+        JobQueueService._move_pending(pending, track_id)
+
+        artist = Artist.objects.only('lastfm_url', 'lastfm_synced_at').get(pk=artist_id)
+        if not artist.lastfm_url and artist.lastfm_synced_at is None:
+            JobQueueService.enqueue_artist(artist_id, priority=job.priority)
+
+        return ''
+
+    @staticmethod
+    def _move_pending(pending, track_id: int) -> int:
+        """
+        Перенос ожидающих прослушиваний в ListeningEvent порциями.
+
+        Прослушивания, записанные во время переноса, тоже переносятся:
+        задача по их ключу уже выполняется, и новой не будет.
+        """
+        moved = 0
+        while True:
+            rows = list(pending.values_list('pk', 'user_id', 'listened_at')[:1000])
+            if not rows:
+                return moved
+
+            with transaction.atomic():
+                ListeningEvent.objects.bulk_create(
+                    [
+                        ListeningEvent(user_id=user_id, track_id=track_id, listened_at=listened_at)
+                        for _, user_id, listened_at in rows
+                    ],
+                    ignore_conflicts=True
+                )
+                PendingScrobble.objects.filter(pk__in=[pk for pk, _, _ in rows]).delete()
+            moved += len(rows)
@@ -0,0 +1,309 @@
+"""
+Асинхронный клиент Last.fm API.
+"""
+import asyncio
+import random
+import time
+import weakref
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, List, Optional
+
+import httpx
+from django.conf import settings
+
+from .lastfm_service import (
+    LastFMCircuitOpen, LastFMDeadlineExceeded, LastFMRateLimited, LastFMService, LastFMUnavailable,
+    get_lastfm_service
+)
+from .resilience import cap_timeout
+
+_async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, AsyncLastFMService]]" = \
+    weakref.WeakKeyDictionary()
+_managed_loops: "weakref.WeakSet[asyncio.AbstractEventLoop]" = weakref.WeakSet()
+
+
+class AsyncLastFMService:
+    """
+    Асинхронный клиент Last.fm для async-представлений.
+
+    Кэш, TTL, отрицательные записи, лимит запросов и разбор ответов
+    берутся у синхронного LastFMService. HTTP-запросы выполняются
+    через httpx.AsyncClient, число одновременных запросов ограничено
+    семафором, одинаковые одновременные запросы объединяются.
+    Экземпляр привязан к циклу событий, в котором создан.
+    """
+
+    def __init__(self, client: LastFMService, max_concurrency: int = 10):
+        self.client = client
+        self.max_concurrency = max_concurrency
+        self.retries = getattr(settings, 'LASTFM_HTTP_RETRIES', 2)
+        self.backoff = getattr(settings, 'LASTFM_HTTP_BACKOFF', 0.3)
+
+        self.http = httpx.AsyncClient(
+            timeout=client.request_timeout,
+            limits=httpx.Limits(
+                max_connections=max_concurrency,
+                max_keepalive_connections=max_concurrency
+            )
+        )
+        self.semaphore = asyncio.Semaphore(max_concurrency)
+        self._in_flight: Dict[str, asyncio.Task] = {}
+
+    async def aclose(self):
+        """Закрытие HTTP-соединений."""
+        await self.http.aclose()
+
+    async def _make_request(self, method: str, params: Dict, requires_auth: bool = False) -> Optional[Dict]:
+        """
+        Асинхронное выполнение запроса к Last.fm API.
+
+        Семантика кэша та же, что у LastFMService._make_request.
+
+        Returns:
+            Ответ API в виде словаря или None в случае ошибки
+        """
+        client = self.client
+        cache_key = client._get_cache_key(method, params)
+        ttl_seconds = client._cache_ttl(method, cache_key)
+
+        found, cached_data, stale = await asyncio.to_thread(client._lookup_cache, cache_key, ttl_seconds)
+        if found:
+            return cached_data
+
+        if client._should_revalidate(stale, ttl_seconds):
+            client._schedule_refresh(cache_key, method, params, requires_auth)
+            return stale[0]
+
+        try:
+            return await self._fetch_coalesced(cache_key, method, params, requires_auth)
+        except LastFMUnavailable as e:
+            return await asyncio.to_thread(client._handle_unavailable, cache_key, e, stale)
+
+    async def _fetch_coalesced(self, cache_key: str, method: str, params: Dict,
+                               requires_auth: bool = False) -> Optional[Dict]:
+        """
+        Один запрос к Last.fm на все одновременные вызовы с тем же ключом.
+
+        Чужой запрос ждется не дольше lease_timeout и оставшегося бюджета
+        времени, затем вызов запрашивает сам.
+        """
+        task = self._in_flight.get(cache_key)
+
+        if task is not None:
+            try:
+                return await asyncio.wait_for(asyncio.shield(task), cap_timeout(self.client.lease_timeout))
+            except TimeoutError:
+                return await self._fetch(cache_key, method, params, requires_auth)
+
+        task = asyncio.ensure_future(self._fetch(cache_key, method, params, requires_auth))
+        self._in_flight[cache_key] = task
+
+        def done(finished_task):
+            self._in_flight.pop(cache_key, None)
+            if not finished_task.cancelled():
+                finished_task.exception()
+
+        task.add_done_callback(done)
+
+        return await asyncio.shield(task)
+
+    async def _fetch(self, cache_key: str, method: str, params: Dict, requires_auth: bool = False) -> Optional[Dict]:
+        """
+        HTTP-запрос с повтором после 5xx и сохранением ответа в кэш.
+
+        429 не повторяется в обход ограничителя частоты, а передается
+        вызывающему коду как недоступность Last.fm.
+
+        Повторы, ожидание токена и таймауты не выходят за бюджет
+        времени запроса; результат учитывается выключателем, кроме
+        таймаута из-за бюджета и локальных ошибок.
+
+        Raises:
+            LastFMUnavailable: Last.fm недоступен после всех повторов
+            LastFMRateLimited: Токен лимита не получен за rate_limit_wait секунд
+            LastFMCircuitOpen: Выключатель разомкнут
+            LastFMDeadlineExceeded: Бюджет времени исчерпан
+        """
+        client = self.client
+        breaker = client.circuit_breaker
+
+        client._check_budget(method)
+
+        if not await client.rate_limiter.acquire_async(timeout=cap_timeout(client.rate_limit_wait)):
+            raise LastFMRateLimited(f"Rate limit exceeded for {method}")
+
+        client._check_budget(method)
+        if not breaker.allow_request():
+            raise LastFMCircuitOpen(f"Circuit open for {method}")
+
+        request_params = client._build_request_params(method, params, requires_auth)
+        started = time.monotonic()
+
+        try:
+            async with self.semaphore:
+                for attempt in range(self.retries + 1):
+                    timeout = cap_timeout(client.request_timeout)
+                    try:
+                        response = await self.http.get(
+                            client.base_url,
+                            params=request_params,
+                            timeout=timeout
+                        )
+                    except httpx.TimeoutException as e:
+                        if client._timeout_cut_by_budget(timeout):
+                            raise LastFMDeadlineExceeded(f"Deadline exceeded during {method}") from e
+                        error = LastFMUnavailable(f"Request error: {e}")
+                    except httpx.HTTPError as e:
+                        error = LastFMUnavailable(f"Request error: {e}")
+                    else:
+                        if response.status_code < 500:
+                            break
+                        error = LastFMUnavailable(f"HTTP error {response.status_code}")
+
+                    delay = self.backoff * (2 ** attempt) + random.uniform(0, self.backoff)
+                    if attempt == self.retries or cap_timeout(delay) < delay:
+                        raise error
+
+                    await asyncio.sleep(delay)
+
+            result = await asyncio.to_thread(client._process_response, cache_key, method, response)
+        except LastFMDeadlineExceeded:
+            breaker.release()
+            raise
+        except LastFMUnavailable:
+            breaker.record_failure()
+            raise
+        except BaseException:
+            # Локальная ошибка или отмена задачи не говорит о Last.fm
+            breaker.release()
+            raise
+
+        breaker.record_success(time.monotonic() - started)
+        return result
+
+    async def search_track(self, query: str, artist: str = None, limit: int = 30, page: int = 1) -> List[Dict]:
+        """Поиск треков по названию и артисту."""
+        params = self.client._track_search_params(query, artist, limit, page)
+
+        result = await self._make_request('track.search', params)
+        return self.client._parse_track_search_response(result)
+
+    async def search_artist(self, query: str, limit: int = 20, page: int = 1) -> List[Dict]:
+        """Поиск артистов по имени."""
+        params = self.client._with_page({
+            'artist': query,
+            'limit': limit
+        }, page)
+
+        result = await self._make_request('artist.search', params)
+        return self.client._parse_artist_search_response(result)
+
+    async def get_track_info(self, artist: str, track: str) -> Optional[Dict]:
+        """Получение полной информации о треке."""
+        params = {
+            'artist': artist,
+            'track': track,
+            'autocorrect': 1
+        }
+
+        result = await self._make_request('track.getInfo', params)
+        return self.client._parse_track_info_response(result)
+
+    async def get_artist_info(self, artist: str) -> Optional[Dict]:
+        """Получение полной информации об артисте."""
+        params = {
+            'artist': artist,
+            'autocorrect': 1
+        }
+
+        result = await self._make_request('artist.getInfo', params)
+        return self.client._parse_artist_info_response(result)
+
+    async def get_top_tracks_by_tag(self, tag: str, limit: int = 50, page: int = 1) -> List[Dict]:
+        """Получение топовых треков по тегу (жанру)."""
+        params = self.client._with_page({
+            'tag': tag,
+            'limit': limit
+        }, page)
+
+        result = await self._make_request('tag.getTopTracks', params)
+        return self.client._parse_top_tracks_response(result)
+
+    async def get_top_tags(self, limit: int = 100, page: int = 1) -> List[Dict]:
+        """Получение топовых тегов (жанров)."""
+        params = self.client._with_page({
+            'limit': limit
+        }, page)
+
+        result = await self._make_request('chart.getTopTags', params)
+        return self.client._parse_top_tags_response(result)
+
+
+def manage_event_loop():
+    """
+    Объявление текущего цикла событий долгоживущим (ASGI lifespan startup).
+
+    В таком цикле async_lastfm_service отдаёт общий клиент, который
+    закрывается вызовом aclose_async_lastfm_services при остановке.
+    """
+    _managed_loops.add(asyncio.get_running_loop())
+
+
+async def aclose_async_lastfm_services():
+    """Закрытие клиентов текущего цикла событий (ASGI lifespan shutdown)."""
+    loop = asyncio.get_running_loop()
+    _managed_loops.discard(loop)
+    clients = _async_clients.pop(loop, {})
+    for client in clients.values():
+        await client.aclose()
+
+
+def get_async_lastfm_service(cache_dir: str = ".cache/lastfm") -> AsyncLastFMService:
+    """
+    Общий асинхронный клиент Last.fm для текущего цикла событий.
+
+    Под ASGI в воркере один цикл событий, и клиент с его пулом
+    соединений создаётся один раз. Закрывает клиентов цикла
+    aclose_async_lastfm_services; представления получают клиент
+    через async_lastfm_service.
+
+    Raises:
+        ValueError: Если API ключи не настроены
+    """
+    clients = _async_clients.setdefault(asyncio.get_running_loop(), {})
+
+    client = clients.get(cache_dir)
+    if client is None:
+        client = AsyncLastFMService(
+            get_lastfm_service(cache_dir),
+            max_concurrency=getattr(settings, 'LASTFM_ASYNC_MAX_CONCURRENCY', 10)
+        )
+        clients[cache_dir] = client
+    return client
+
+
+@asynccontextmanager
+async def async_lastfm_service(cache_dir: str = ".cache/lastfm") -> AsyncIterator[AsyncLastFMService]:
+    """
+    Асинхронный клиент Last.fm на время вызова.
+
+    В цикле, объявленном manage_event_loop (воркер uvicorn), это общий
+    клиент цикла. В остальных циклах (async_to_sync под WSGI,
+    asyncio.run) цикл живёт один вызов, поэтому клиент создаётся
+    отдельно и закрывается на выходе.
+
+    Raises:
+        ValueError: Если API ключи не настроены
+    """
+    if asyncio.get_running_loop() in _managed_loops:
+        yield get_async_lastfm_service(cache_dir)
+        return
+
+    client = AsyncLastFMService(
+        get_lastfm_service(cache_dir),
+        max_concurrency=getattr(settings, 'LASTFM_ASYNC_MAX_CONCURRENCY', 10)
+    )
+    try:
+        yield client
+    finally:
+        await client.aclose()
@@ -1,18 +1,90 @@
+import contextvars
 import hashlib
 import json
-from typing import Dict, List, Optional
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Callable, Dict, Hashable, Iterable, Iterator, List, Optional, Tuple
 
 import requests
 from django.conf import settings
 
 from .base_service import BaseAPIService
+from .cache import get_cache_storage, get_memory_cache
+from .coalescing import SingleFlight, striped_file_lock
+from .http import build_session, connection_stats
+from .rate_limit import get_rate_limiter
+from .resilience import CircuitBreaker, cap_timeout, get_circuit_breaker, remaining_time
+
+_single_flight = SingleFlight()
+
+_sessions: Dict[bool, requests.Session] = {}
+_clients: Dict[str, 'LastFMService'] = {}
+_clients_lock = threading.Lock()
+
+_refresh_executor: Optional[ThreadPoolExecutor] = None
+_refresh_in_flight = set()
+_refresh_lock = threading.Lock()
+
+
+class LastFMUnavailable(Exception):
+    """Last.fm временно недоступен: сетевая ошибка, 429/5xx или временная ошибка API."""
+
+
+class LastFMRateLimited(LastFMUnavailable):
+    """Лимит запросов к Last.fm исчерпан, а ждать токен дольше нельзя."""
+
+
+class LastFMCircuitOpen(LastFMUnavailable):
+    """Выключатель разомкнут: Last.fm недавно часто ошибался или отвечал медленно."""
+
+
+class LastFMDeadlineExceeded(LastFMUnavailable):
+    """Бюджет времени запроса на обращения к Last.fm исчерпан."""
+
+
+# Запрос не отправлялся, поэтому ответ нельзя кэшировать как ошибку
+_NOT_SENT_ERRORS = (LastFMRateLimited, LastFMCircuitOpen, LastFMDeadlineExceeded)
 
 
 class LastFMService(BaseAPIService):
     """Сервис для работы с Last.fm API."""
 
-    def __init__(self, cache_dir: str = ".cache/lastfm"):
-        super().__init__(cache_dir)
+    # Коды ошибок Last.fm, после которых запрос имеет смысл повторить:
+    # 8 - operation failed, 11 - service offline, 16 - temporary error, 29 - rate limit exceeded
+    TRANSIENT_ERRORS = {8, 11, 16, 29}
+
+    # Код ошибки Last.fm для ненайденных треков и артистов
+    NOT_FOUND_ERROR = 6
+
+    # Время жизни ответов в кэше по методам API, в секундах.
+    # Переопределяется настройкой LASTFM_CACHE_TTL.
+    CACHE_TTL = {
+        'chart.getTopTags': 6 * 60 * 60,
+        'tag.getTopTracks': 12 * 60 * 60,
+        'track.search': 24 * 60 * 60,
+        'artist.search': 24 * 60 * 60,
+        'track.getInfo': 7 * 24 * 60 * 60,
+        'artist.getInfo': 7 * 24 * 60 * 60,
+        'user.getRecentTracks': 5 * 60,
+    }
+
+    # Время жизни отрицательных записей: "не найдено" и прочие ошибки
+    NOT_FOUND_TTL = 60 * 60
+    ERROR_TTL = 60
+
+    # Разброс TTL (доля), чтобы ключи одной страницы не истекали одновременно
+    CACHE_TTL_JITTER = 0.1
+
+    NEGATIVE_MARKER = '_negative'
+
+    def __init__(self, cache_dir: str = ".cache/lastfm", session: Optional[requests.Session] = None):
+        super().__init__(
+            cache_dir,
+            memory_cache=get_memory_cache(cache_dir),
+            storage=get_cache_storage(cache_dir)
+        )
 
         self.api_key = getattr(settings, 'LASTFM_API_KEY', '')
         self.shared_secret = getattr(settings, 'LASTFM_SHARED_SECRET', '')
@@ -20,9 +92,33 @@ class LastFMService(BaseAPIService):
         if not self.api_key or not self.shared_secret:
             raise ValueError("Last.fm API ключи не настроены. Проверьте настройки в .env")
 
-        self.base_url = "https://ws.audioscrobbler.com/2.0/"
-        self.last_request_time = 0
-        self.min_request_interval = 0.2
+        self.base_url = getattr(settings, 'LASTFM_API_URL', "https://ws.audioscrobbler.com/2.0/")
+        self.session = session if session is not None else get_http_session()
+        self.budget_session = session if session is not None else get_http_session(retries=False)
+        self.request_timeout = getattr(settings, 'LASTFM_REQUEST_TIMEOUT', 10)
+        self.rate_limiter = get_rate_limiter(
+            'lastfm',
+            rate=getattr(settings, 'LASTFM_RATE_LIMIT', 5.0),
+            capacity=getattr(settings, 'LASTFM_RATE_BURST', 10),
+            path=os.path.join(cache_dir, 'ratelimit.sqlite3')
+        )
+        self.rate_limit_wait = getattr(settings, 'LASTFM_RATE_LIMIT_WAIT', 1.0)
+        self.circuit_breaker = get_circuit_breaker('lastfm')
+
+        self.cache_ttl_days = getattr(settings, 'CACHE_TTL_DAYS', 7)
+        self.cache_ttl = {**self.CACHE_TTL, **getattr(settings, 'LASTFM_CACHE_TTL', {})}
+        self.stale_while_revalidate = getattr(settings, 'LASTFM_STALE_WHILE_REVALIDATE', 24 * 60 * 60)
+        self.stale_if_error = getattr(settings, 'LASTFM_STALE_IF_ERROR', 30 * 24 * 60 * 60)
+        self.lease_timeout = getattr(settings, 'LASTFM_LEASE_TIMEOUT', 5)
+        self.batch_workers = getattr(settings, 'LASTFM_BATCH_WORKERS', 4)
+        self.batch_rate_limit_wait = getattr(settings, 'LASTFM_BATCH_RATE_LIMIT_WAIT', 30.0)
+        # Пробрасывать LastFMUnavailable вместо None, если нет устаревших
+        # данных (фоновые задачи сами повторяют запрос позже)
+        self.raise_unavailable = False
+
+    def connection_stats(self) -> Dict:
+        """Статистика повторного использования HTTP-соединений."""
+        return connection_stats(self.session)
 
     def _sign_request(self, params: Dict) -> str:
         """Создание подписи для запросов, требующих аутентификации."""
@@ -37,22 +133,220 @@ class LastFMService(BaseAPIService):
         """
         Выполнение запроса к Last.fm API.
 
+        Свежий ответ отдаётся из кэша. Устаревший, но не старше
+        stale_while_revalidate, отдаётся сразу, а обновление выполняется
+        в фоне. Более старый ответ (до stale_if_error) используется,
+        если Last.fm недоступен.
+
         Args:
             method: Метод API (например, 'track.search')
             params: Параметры запроса
             requires_auth: Требуется ли аутентификация
 
         Returns:
-            Ответ API в виде словаря или None в случае ошибки
+            Ответ API в виде словаря или None в случае ошибки. Словарь
+            общий с кэшем в памяти: разбор должен строить новые объекты,
+            а не менять его
         """
         cache_key = self._get_cache_key(method, params)
+        ttl_seconds = self._cache_ttl(method, cache_key)
 
-        cached_data = self._load_from_cache(cache_key)
-        if cached_data:
+        found, cached_data, stale = self._lookup_cache(cache_key, ttl_seconds)
+        if found:
             return cached_data
 
-        self.last_request_time = self._rate_limit(self.last_request_time, self.min_request_interval)
+        if self._should_revalidate(stale, ttl_seconds):
+            self._schedule_refresh(cache_key, method, params, requires_auth)
+            return stale[0]
+
+        try:
+            return self._fetch_coalesced(cache_key, method, params, requires_auth)
+        except LastFMUnavailable as e:
+            return self._handle_unavailable(cache_key, e, stale)
+
+    def _lookup_cache(self, cache_key: str, ttl_seconds: float) -> Tuple[bool, Optional[Dict], Optional[Tuple[Dict, float]]]:
+        """
+        Поиск ответа в кэше.
+
+        Returns:
+            Кортеж (найдена ли свежая запись, её данные,
+            устаревшая запись в виде (данные, возраст) или None)
+        """
+        found, cached_data = self._load_fresh(cache_key, ttl_seconds)
+        if found:
+            return True, cached_data, None
+
+        stale = self._load_stale_from_cache(cache_key, ttl_seconds + self.stale_if_error)
+        if stale is not None and self.NEGATIVE_MARKER in stale[0]:
+            stale = None
+
+        return False, None, stale
+
+    def _should_revalidate(self, stale: Optional[Tuple[Dict, float]], ttl_seconds: float) -> bool:
+        """Можно ли отдать устаревшую запись сразу, обновив её в фоне."""
+        return stale is not None and stale[1] < ttl_seconds + self.stale_while_revalidate
+
+    def _handle_unavailable(self, cache_key: str, error: LastFMUnavailable,
+                            stale: Optional[Tuple[Dict, float]]) -> Optional[Dict]:
+        """Ответ при недоступности Last.fm: устаревшие данные или отрицательная запись."""
+        print(f"Last.fm unavailable: {error}")
+        if stale is not None:
+            return stale[0]
+        if self.raise_unavailable:
+            raise error
+        if not isinstance(error, _NOT_SENT_ERRORS):
+            self._save_negative(cache_key, {'error': str(error)}, self.ERROR_TTL)
+        return None
+
+    def _load_fresh(self, cache_key: str, ttl_seconds: float) -> Tuple[bool, Optional[Dict]]:
+        """
+        Загрузка свежей записи кэша с учётом отрицательных записей.
+
+        Returns:
+            Кортеж (найдена ли запись, данные или None для отрицательной записи)
+        """
+        cached_data = self._load_from_cache(cache_key, ttl_days=ttl_seconds / (24 * 60 * 60))
+        if not cached_data:
+            return False, None
+
+        if self.NEGATIVE_MARKER not in cached_data:
+            return True, cached_data
+
+        if cached_data[self.NEGATIVE_MARKER]['expires_at'] > time.time():
+            return True, None
+
+        return False, None
+
+    def _cache_ttl(self, method: str, cache_key: str) -> float:
+        """
+        TTL ответа метода в секундах с разбросом CACHE_TTL_JITTER.
+
+        Разброс вычисляется из ключа кэша, поэтому одинаков во всех
+        процессах и не меняется при повторном сохранении ключа.
+        """
+        ttl = self.cache_ttl.get(method, self.cache_ttl_days * 24 * 60 * 60)
+        spread = int(cache_key[:8], 16) / 0xFFFFFFFF * 2 - 1
+        return ttl * (1 + self.CACHE_TTL_JITTER * spread)
+
+    def _save_negative(self, cache_key: str, details: Dict, ttl_seconds: float):
+        """Сохранение отрицательной записи, которая действует ttl_seconds."""
+        negative = {self.NEGATIVE_MARKER: {**details, 'expires_at': time.time() + ttl_seconds}}
+        self._save_to_cache(cache_key, negative, ttl_days=ttl_seconds / (24 * 60 * 60))
+
+    def _fetch_coalesced(self, cache_key: str, method: str, params: Dict,
+                         requires_auth: bool = False, rate_limit_wait: Optional[float] = None) -> Optional[Dict]:
+        """
+        Запрос к Last.fm, общий для всех одновременных вызовов с тем же ключом.
+
+        Внутри процесса потоки ждут один запрос, но не дольше lease_timeout
+        и оставшегося бюджета времени: затем поток запрашивает сам (и при
+        исчерпанном бюджете получает LastFMDeadlineExceeded). Между
+        процессами gunicorn ключ защищён файловой блокировкой: процесс,
+        дождавшийся блокировки, сначала проверяет кэш, заполненный
+        другим процессом.
+        """
+        def fetch():
+            lock_dir = os.path.join(self.cache_dir, 'locks')
+            with striped_file_lock(lock_dir, cache_key, cap_timeout(self.lease_timeout)) as waited:
+                if waited:
+                    found, cached_data = self._load_fresh(cache_key, self._cache_ttl(method, cache_key))
+                    if found:
+                        return cached_data
+
+                return self._fetch(cache_key, method, params, requires_auth, rate_limit_wait)
+
+        return _single_flight.do(cache_key, fetch, timeout=cap_timeout(self.lease_timeout))
+
+    def _fetch(self, cache_key: str, method: str, params: Dict, requires_auth: bool = False,
+               rate_limit_wait: Optional[float] = None) -> Optional[Dict]:
+        """
+        Запрос к Last.fm API с сохранением ответа в кэш.
+
+        Ожидание токена и таймаут запроса урезаются до оставшегося
+        бюджета времени (см. resilience.deadline). При заданном бюджете
+        запрос выполняется без повторов сессии, чтобы не выйти за него.
+        Результат учитывается выключателем circuit_breaker; таймаут из-за
+        бюджета и локальные ошибки ошибками Last.fm не считаются.
+
+        Args:
+            rate_limit_wait: Сколько ждать токен лимита
+                             (None - значение rate_limit_wait сервиса)
+
+        Returns:
+            Ответ API или None, если Last.fm вернул ошибку запроса
+
+        Raises:
+            LastFMUnavailable: Сетевая ошибка, ошибка сервера или временная ошибка API
+            LastFMRateLimited: Токен лимита не получен за rate_limit_wait секунд
+            LastFMCircuitOpen: Выключатель разомкнут
+            LastFMDeadlineExceeded: Бюджет времени исчерпан
+        """
+        self._check_budget(method)
+
+        if rate_limit_wait is None:
+            rate_limit_wait = self.rate_limit_wait
 
+        if not self.rate_limiter.acquire(timeout=cap_timeout(rate_limit_wait)):
+            raise LastFMRateLimited(f"Rate limit exceeded for {method}")
+
+        self._check_budget(method)
+        if not self.circuit_breaker.allow_request():
+            raise LastFMCircuitOpen(f"Circuit open for {method}")
+
+        session = self.session if remaining_time() is None else self.budget_session
+        timeout = cap_timeout(self.request_timeout)
+        started = time.monotonic()
+
+        try:
+            try:
+                response = session.get(
+                    self.base_url,
+                    params=self._build_request_params(method, params, requires_auth),
+                    timeout=timeout
+                )
+            except requests.exceptions.Timeout as e:
+                if self._timeout_cut_by_budget(timeout):
+                    raise LastFMDeadlineExceeded(f"Deadline exceeded during {method}") from e
+                raise LastFMUnavailable(f"Request error: {e}") from e
+            except requests.exceptions.RequestException as e:
+                raise LastFMUnavailable(f"Request error: {e}") from e
+
+            result = self._process_response(cache_key, method, response)
+        except LastFMDeadlineExceeded:
+            self.circuit_breaker.release()
+            raise
+        except LastFMUnavailable:
+            self.circuit_breaker.record_failure()
+            raise
+        except BaseException:
+            # Локальная ошибка (кэш, разбор ответа) не говорит о Last.fm
+            self.circuit_breaker.release()
+            raise
+
+        self.circuit_breaker.record_success(time.monotonic() - started)
+        return result
+
+    def _timeout_cut_by_budget(self, timeout: Optional[float]) -> bool:
+        """Был ли таймаут запроса урезан бюджетом времени вызывающего кода."""
+        return timeout is not None and (self.request_timeout is None or timeout < self.request_timeout)
+
+    def _check_budget(self, method: str):
+        """
+        Проверка перед запросом: остался ли бюджет времени и не разомкнут ли выключатель.
+
+        Raises:
+            LastFMDeadlineExceeded: Бюджет времени исчерпан
+            LastFMCircuitOpen: Выключатель разомкнут
+        """
+        remaining = remaining_time()
+        if remaining is not None and remaining <= 0:
+            raise LastFMDeadlineExceeded(f"Deadline exceeded before {method}")
+
+        if self.circuit_breaker.state == CircuitBreaker.OPEN:
+            raise LastFMCircuitOpen(f"Circuit open for {method}")
+
+    def _build_request_params(self, method: str, params: Dict, requires_auth: bool = False) -> Dict:
+        """Параметры HTTP-запроса к Last.fm с ключом API и подписью."""
         request_params = {
             'method': method,
             'api_key': self.api_key,
@@ -63,35 +357,211 @@ class LastFMService(BaseAPIService):
         if requires_auth:
             request_params['api_sig'] = self._sign_request(request_params)
 
-        try:
-            response = requests.get(
-                self.base_url,
-                params=request_params,
-                timeout=10
-            )
+        return request_params
 
-            if response.status_code == 200:
-                data = response.json()
+    def _process_response(self, cache_key: str, method: str, response) -> Optional[Dict]:
+        """
+        Разбор HTTP-ответа Last.fm и сохранение результата в кэш.
 
-                if 'error' in data:
-                    print(f"Last.fm API error {data['error']}: {data.get('message', 'Unknown error')}")
-                    return None
+        Args:
+            cache_key: Ключ кэша
+            method: Метод API
+            response: Ответ requests или httpx
 
-                self._save_to_cache(cache_key, data)
-                return data
+        Returns:
+            Ответ API или None, если Last.fm вернул ошибку запроса
 
-            else:
-                print(f"HTTP error {response.status_code}: {response.text}")
-                return None
+        Raises:
+            LastFMUnavailable: Ошибка сервера, 429 или временная ошибка API
+        """
+        if response.status_code == 429 or response.status_code >= 500:
+            raise LastFMUnavailable(f"HTTP error {response.status_code}")
 
-        except requests.exceptions.RequestException as e:
-            print(f"Request error: {e}")
+        if response.status_code != 200:
+            print(f"HTTP error {response.status_code}: {response.text}")
+            self._save_negative(cache_key, {'status': response.status_code}, self.ERROR_TTL)
             return None
-        except json.JSONDecodeError as e:
-            print(f"JSON decode error: {e}")
+
+        try:
+            data = response.json()
+        except ValueError as e:
+            raise LastFMUnavailable(f"JSON decode error: {e}") from e
+
+        if 'error' in data:
+            if data['error'] in self.TRANSIENT_ERRORS:
+                raise LastFMUnavailable(f"Last.fm API error {data['error']}: {data.get('message', '')}")
+            print(f"Last.fm API error {data['error']}: {data.get('message', 'Unknown error')}")
+            negative_ttl = self.NOT_FOUND_TTL if data['error'] == self.NOT_FOUND_ERROR else self.ERROR_TTL
+            self._save_negative(cache_key, {'error': data['error']}, negative_ttl)
             return None
 
-    def search_track(self, query: str, artist: str = None, limit: int = 30) -> List[Dict]:
+        self._save_to_cache(cache_key, data, ttl_days=self._cache_ttl(method, cache_key) / (24 * 60 * 60))
+        return data
+
+    def _schedule_refresh(self, cache_key: str, method: str, params: Dict, requires_auth: bool = False):
+        """Фоновое обновление устаревшей записи кэша (не более одного на ключ)."""
+        global _refresh_executor
+
+        with _refresh_lock:
+            if cache_key in _refresh_in_flight:
+                return
+            _refresh_in_flight.add(cache_key)
+
+            if _refresh_executor is None:
+                _refresh_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='lastfm-refresh')
+
+        def refresh():
+            try:
+                self._fetch_coalesced(cache_key, method, params, requires_auth)
+            except LastFMUnavailable as e:
+                print(f"Background refresh failed: {e}")
+            finally:
+                with _refresh_lock:
+                    _refresh_in_flight.discard(cache_key)
+
+        _refresh_executor.submit(refresh)
+
+    def _request_many(self, requests_by_key: Dict[Hashable, Tuple[str, Dict]],
+                      parse: Callable[[Optional[Dict]], Any],
+                      max_age: Optional[float] = None) -> Iterator[Tuple[Hashable, Any]]:
+        """
+        Пакетное выполнение запросов к Last.fm.
+
+        Ответы из кэша отдаются сразу, промахи запрашиваются пулом из
+        batch_workers потоков под общим лимитом запросов. Поток ждёт
+        токен до batch_rate_limit_wait секунд, поэтому пакет упирается
+        в лимит, а не получает отказы.
+
+        Args:
+            requests_by_key: Словарь {ключ: (метод API, параметры)}
+            parse: Функция разбора ответа
+            max_age: Максимальный возраст ответа из кэша в секундах;
+                     более старые ответы запрашиваются заново
+
+        Yields:
+            Кортежи (ключ, разобранный ответ) по мере готовности
+        """
+        misses = []
+
+        for key, (method, params) in requests_by_key.items():
+            cache_key = self._get_cache_key(method, params)
+            ttl_seconds = self._cache_ttl(method, cache_key)
+            if max_age is not None:
+                ttl_seconds = min(ttl_seconds, max_age)
+
+            found, cached_data, stale = self._lookup_cache(cache_key, ttl_seconds)
+            if found:
+                yield key, parse(cached_data)
+            elif max_age is None and self._should_revalidate(stale, ttl_seconds):
+                self._schedule_refresh(cache_key, method, params)
+                yield key, parse(stale[0])
+            else:
+                misses.append((key, cache_key, method, params, stale))
+
+        if not misses:
+            return
+
+        def fetch(cache_key, method, params, stale):
+            try:
+                return self._fetch_coalesced(cache_key, method, params, rate_limit_wait=self.batch_rate_limit_wait)
+            except LastFMUnavailable as e:
+                if max_age is not None and self.raise_unavailable:
+                    # Данные старше max_age вызывающему не подходят даже при ошибке
+                    raise
+                return self._handle_unavailable(cache_key, e, stale)
+
+        executor = ThreadPoolExecutor(
+            max_workers=min(self.batch_workers, len(misses)),
+            thread_name_prefix='lastfm-batch'
+        )
+        try:
+            # Каждый запрос выполняется с бюджетом времени вызывающего кода
+            futures = {
+                executor.submit(contextvars.copy_context().run, fetch, cache_key, method, params, stale): key
+                for key, cache_key, method, params, stale in misses
+            }
+            for future in as_completed(futures):
+                yield futures[future], parse(future.result())
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+    def _iter_pages(self, fetch_page: Callable[[int], Tuple[List[Dict], int]],
+                    max_items: Optional[int] = None) -> Iterator[Dict]:
+        """
+        Постраничный обход списка Last.fm.
+
+        Следующая страница запрашивается в фоновом потоке, пока
+        вызывающий код обрабатывает текущую, поэтому в памяти не больше
+        двух страниц. Если вызывающий код прекращает обход, ещё не
+        начатый запрос следующей страницы отменяется.
+
+        Args:
+            fetch_page: Функция (номер страницы) -> (элементы, всего страниц)
+            max_items: Максимальное количество элементов (None - все)
+
+        Yields:
+            Элементы списка по порядку
+        """
+        executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='lastfm-prefetch')
+
+        def submit(page):
+            # Предзагрузка выполняется с тем же бюджетом времени, что и вызывающий код
+            return executor.submit(contextvars.copy_context().run, fetch_page, page)
+
+        page = 1
+        future = submit(page)
+        yielded = 0
+
+        try:
+            while future is not None:
+                items, total_pages = future.result()
+
+                page += 1
+                future = submit(page) if items and page <= total_pages else None
+
+                for item in items:
+                    yield item
+                    yielded += 1
+                    if max_items is not None and yielded >= max_items:
+                        return
+        finally:
+            if future is not None:
+                future.cancel()
+            executor.shutdown(wait=False)
+
+    @staticmethod
+    def _with_page(params: Dict, page: int) -> Dict:
+        """Параметры запроса со страницей; первая страница не меняет ключ кэша."""
+        if page > 1:
+            return {**params, 'page': page}
+        return params
+
+    @staticmethod
+    def _total_pages(result: Optional[Dict], container: str) -> int:
+        """
+        Количество страниц в ответе списочного метода.
+
+        Args:
+            result: Ответ API
+            container: Ключ списка в ответе ('results', 'tracks', 'tags')
+        """
+        if not result or container not in result:
+            return 0
+
+        data = result[container]
+        attrs = data.get('@attr', {})
+        try:
+            if 'totalPages' in attrs:
+                return int(attrs['totalPages'])
+
+            total = int(data.get('opensearch:totalResults', 0))
+            per_page = int(data.get('opensearch:itemsPerPage', 0))
+        except (TypeError, ValueError):
+            return 0
+
+        return -(-total // per_page) if per_page else 0
+
+    def search_track(self, query: str, artist: str = None, limit: int = 30, page: int = 1) -> List[Dict]:
         """
         Поиск треков по названию и артисту.
 
@@ -99,10 +569,36 @@ class LastFMService(BaseAPIService):
             query: Название трека
             artist: Имя артиста (опционально)
             limit: Максимальное количество результатов
+            page: Номер страницы
 
         Returns:
             Список найденных треков
         """
+        result = self._make_request('track.search', self._track_search_params(query, artist, limit, page))
+        return self._parse_track_search_response(result)
+
+    def iter_search_track(self, query: str, artist: str = None, page_size: int = 50,
+                          max_items: Optional[int] = None) -> Iterator[Dict]:
+        """
+        Постраничный поиск треков с предзагрузкой следующей страницы.
+
+        Args:
+            query: Название трека
+            artist: Имя артиста (опционально)
+            page_size: Размер страницы
+            max_items: Максимальное количество результатов (None - все)
+
+        Yields:
+            Найденные треки
+        """
+        def fetch_page(page):
+            result = self._make_request('track.search', self._track_search_params(query, artist, page_size, page))
+            return self._parse_track_search_response(result), self._total_pages(result, 'results')
+
+        return self._iter_pages(fetch_page, max_items)
+
+    def _track_search_params(self, query: str, artist: Optional[str], limit: int, page: int) -> Dict:
+        """Параметры запроса track.search."""
         params = {
             'track': query,
             'limit': limit
@@ -111,8 +607,10 @@ class LastFMService(BaseAPIService):
         if artist:
             params['artist'] = artist
 
-        result = self._make_request('track.search', params)
+        return self._with_page(params, page)
 
+    def _parse_track_search_response(self, result: Optional[Dict]) -> List[Dict]:
+        """Парсинг ответа track.search."""
         if not result or 'results' not in result:
             return []
 
@@ -126,24 +624,50 @@ class LastFMService(BaseAPIService):
 
         return tracks
 
-    def search_artist(self, query: str, limit: int = 20) -> List[Dict]:
+    def search_artist(self, query: str, limit: int = 20, page: int = 1) -> List[Dict]:
         """
         Поиск артистов по имени.
 
         Args:
             query: Имя артиста
             limit: Максимальное количество результатов
+            page: Номер страницы
 
         Returns:
             Список найденных артистов
         """
-        params = {
+        params = self._with_page({
             'artist': query,
             'limit': limit
-        }
+        }, page)
 
         result = self._make_request('artist.search', params)
+        return self._parse_artist_search_response(result)
+
+    def iter_search_artist(self, query: str, page_size: int = 50,
+                           max_items: Optional[int] = None) -> Iterator[Dict]:
+        """
+        Постраничный поиск артистов с предзагрузкой следующей страницы.
+
+        Args:
+            query: Имя артиста
+            page_size: Размер страницы
+            max_items: Максимальное количество результатов (None - все)
+
+        Yields:
+            Найденные артисты
+        """
+        def fetch_page(page):
+            result = self._make_request('artist.search', self._with_page({
+                'artist': query,
+                'limit': page_size
+            }, page))
+            return self._parse_artist_search_response(result), self._total_pages(result, 'results')
+
+        return self._iter_pages(fetch_page, max_items)
 
+    def _parse_artist_search_response(self, result: Optional[Dict]) -> List[Dict]:
+        """Парсинг ответа artist.search."""
         if not result or 'results' not in result:
             return []
 
@@ -166,16 +690,33 @@ class LastFMService(BaseAPIService):
             track: Название трека
 
         Returns:
-            Информация о треке или None
+            Информация о треке или None (не найден или ошибка -
+            различает is_track_not_found)
         """
-        params = {
+        result = self._make_request('track.getInfo', self._track_info_params(artist, track))
+        return self._parse_track_info_response(result)
+
+    @staticmethod
+    def _track_info_params(artist: str, track: str) -> Dict:
+        """Параметры запроса track.getInfo."""
+        return {
             'artist': artist,
             'track': track,
             'autocorrect': 1
         }
 
-        result = self._make_request('track.getInfo', params)
+    def is_track_not_found(self, artist: str, track: str) -> bool:
+        """
+        Ответил ли Last.fm на track.getInfo ошибкой "не найдено".
+
+        Отличает трек, которого нет в Last.fm, от None из-за ошибки
+        запроса или недоступности Last.fm. Проверяется отрицательная
+        запись кэша, оставленная последним запросом get_track_info.
+        """
+        return self._is_not_found('track.getInfo', self._track_info_params(artist, track))
 
+    def _parse_track_info_response(self, result: Optional[Dict]) -> Optional[Dict]:
+        """Парсинг ответа track.getInfo."""
         if not result or 'track' not in result:
             return None
 
@@ -189,38 +730,126 @@ class LastFMService(BaseAPIService):
             artist: Имя артиста
 
         Returns:
-            Информация об артисте или None
+            Информация об артисте или None (не найден или ошибка -
+            различает is_artist_not_found)
         """
-        params = {
+        result = self._make_request('artist.getInfo', self._artist_info_params(artist))
+        return self._parse_artist_info_response(result)
+
+    @staticmethod
+    def _artist_info_params(artist: str) -> Dict:
+        """Параметры запроса artist.getInfo."""
+        return {
             'artist': artist,
             'autocorrect': 1
         }
 
-        result = self._make_request('artist.getInfo', params)
+    def is_artist_not_found(self, artist: str) -> bool:
+        """Ответил ли Last.fm на artist.getInfo ошибкой "не найдено" (см. is_track_not_found)."""
+        return self._is_not_found('artist.getInfo', self._artist_info_params(artist))
 
+    def _is_not_found(self, method: str, params: Dict) -> bool:
+        """Действующая отрицательная запись кэша с кодом NOT_FOUND_ERROR."""
+        cache_key = self._get_cache_key(method, params)
+        cached_data = self._load_from_cache(cache_key, ttl_days=self._cache_ttl(method, cache_key) / (24 * 60 * 60))
+        negative = (cached_data or {}).get(self.NEGATIVE_MARKER)
+        return (
+            negative is not None
+            and negative.get('error') == self.NOT_FOUND_ERROR
+            and negative['expires_at'] > time.time()
+        )
+
+    def _parse_artist_info_response(self, result: Optional[Dict]) -> Optional[Dict]:
+        """Парсинг ответа artist.getInfo."""
         if not result or 'artist' not in result:
             return None
 
         return self._parse_artist_info(result['artist'])
 
-    def get_top_tracks_by_tag(self, tag: str, limit: int = 50) -> List[Dict]:
+    def get_track_info_many(self, tracks: Iterable[Tuple[str, str]],
+                            max_age: Optional[float] = None) -> Iterator[Tuple[Tuple[str, str], Optional[Dict]]]:
+        """
+        Получение информации о нескольких треках.
+
+        Args:
+            tracks: Пары (артист, название трека)
+            max_age: Максимальный возраст ответа из кэша в секундах
+
+        Yields:
+            Кортежи ((артист, название), информация о треке или None)
+            в порядке готовности: сначала найденные в кэше
+        """
+        requests_by_key = {
+            (artist, track): ('track.getInfo', self._track_info_params(artist, track))
+            for artist, track in tracks
+        }
+
+        return self._request_many(requests_by_key, self._parse_track_info_response, max_age)
+
+    def get_artist_info_many(self, artists: Iterable[str],
+                             max_age: Optional[float] = None) -> Iterator[Tuple[str, Optional[Dict]]]:
+        """
+        Получение информации о нескольких артистах.
+
+        Args:
+            artists: Имена артистов
+            max_age: Максимальный возраст ответа из кэша в секундах
+
+        Yields:
+            Кортежи (имя, информация об артисте или None)
+            в порядке готовности: сначала найденные в кэше
+        """
+        requests_by_key = {
+            artist: ('artist.getInfo', self._artist_info_params(artist))
+            for artist in artists
+        }
+
+        return self._request_many(requests_by_key, self._parse_artist_info_response, max_age)
+
+    def get_top_tracks_by_tag(self, tag: str, limit: int = 50, page: int = 1) -> List[Dict]:
         """
         Получение топовых треков по тегу (жанру).
 
         Args:
             tag: Тег/жанр
             limit: Количество треков
+            page: Номер страницы
 
         Returns:
             Список треков
         """
-        params = {
+        params = self._with_page({
             'tag': tag,
             'limit': limit
-        }
+        }, page)
 
         result = self._make_request('tag.getTopTracks', params)
+        return self._parse_top_tracks_response(result)
+
+    def iter_top_tracks_by_tag(self, tag: str, page_size: int = 100,
+                               max_items: Optional[int] = None) -> Iterator[Dict]:
+        """
+        Постраничный обход топовых треков тега с предзагрузкой следующей страницы.
+
+        Args:
+            tag: Тег/жанр
+            page_size: Размер страницы
+            max_items: Максимальное количество треков (None - все)
+
+        Yields:
+            Треки по убыванию популярности
+        """
+        def fetch_page(page):
+            result = self._make_request('tag.getTopTracks', self._with_page({
+                'tag': tag,
+                'limit': page_size
+            }, page))
+            return self._parse_top_tracks_response(result), self._total_pages(result, 'tracks')
+
+        return self._iter_pages(fetch_page, max_items)
 
+    def _parse_top_tracks_response(self, result: Optional[Dict]) -> List[Dict]:
+        """Парсинг ответа tag.getTopTracks."""
         if not result or 'tracks' not in result:
             return []
 
@@ -232,23 +861,44 @@ class LastFMService(BaseAPIService):
 
         return tracks
 
-    def get_top_tags(self, limit: int = 100) -> List[Dict]:
+    def get_top_tags(self, limit: int = 100, page: int = 1) -> List[Dict]:
         """
         Получение топовых тегов (жанров).
 
         Args:
             limit: Количество тегов
+            page: Номер страницы
 
         Returns:
             Список тегов
         """
 
-        params = {
+        params = self._with_page({
             'limit': limit
-        }
+        }, page)
 
         result = self._make_request('chart.getTopTags', params)
+        return self._parse_top_tags_response(result)
+
+    def iter_top_tags(self, page_size: int = 100, max_items: Optional[int] = None) -> Iterator[Dict]:
+        """
+        Постраничный обход топовых тегов с предзагрузкой следующей страницы.
+
+        Args:
+            page_size: Размер страницы
+            max_items: Максимальное количество тегов (None - все)
 
+        Yields:
+            Теги по убыванию популярности
+        """
+        def fetch_page(page):
+            result = self._make_request('chart.getTopTags', self._with_page({'limit': page_size}, page))
+            return self._parse_top_tags_response(result), self._total_pages(result, 'tags')
+
+        return self._iter_pages(fetch_page, max_items)
+
+    def _parse_top_tags_response(self, result: Optional[Dict]) -> List[Dict]:
+        """Парсинг ответа chart.getTopTags."""
         if not result or 'tags' not in result:
             return []
 
@@ -264,6 +914,63 @@ class LastFMService(BaseAPIService):
 
         return tags
 
+    def get_recent_tracks(self, username: str, page: int = 1, limit: int = 200,
+                          since: Optional[int] = None,
+                          until: Optional[int] = None) -> Optional[Tuple[List[Dict], int]]:
+        """
+        Получение страницы прослушиваний пользователя.
+
+        Args:
+            username: Имя пользователя Last.fm
+            page: Номер страницы (первая - самые новые прослушивания)
+            limit: Размер страницы (не больше 200)
+            since: Unix-время начала диапазона (None - с начала истории)
+            until: Unix-время конца диапазона (None - до текущего момента)
+
+        Returns:
+            Кортеж (прослушивания от новых к старым, всего страниц)
+            или None, если страницу получить не удалось
+        """
+        params = {
+            'user': username,
+            'limit': limit
+        }
+        if since is not None:
+            params['from'] = since
+        if until is not None:
+            params['to'] = until
+
+        result = self._make_request('user.getRecentTracks', self._with_page(params, page))
+        if not result or 'recenttracks' not in result:
+            return None
+
+        return self._parse_recent_tracks_response(result), self._total_pages(result, 'recenttracks')
+
+    def _parse_recent_tracks_response(self, result: Dict) -> List[Dict]:
+        """Парсинг ответа user.getRecentTracks."""
+        tracks_data = result['recenttracks'].get('track', [])
+        # Единственный элемент Last.fm отдаёт объектом, а не списком
+        if isinstance(tracks_data, dict):
+            tracks_data = [tracks_data]
+
+        tracks = []
+        for track_data in tracks_data:
+            # Играющий сейчас трек ещё не скробблирован и не имеет даты
+            if track_data.get('@attr', {}).get('nowplaying') or 'date' not in track_data:
+                continue
+            try:
+                artist = track_data.get('artist', {})
+                tracks.append({
+                    'name': track_data.get('name', ''),
+                    'artist': artist.get('#text') or artist.get('name', ''),
+                    'album': track_data.get('album', {}).get('#text', ''),
+                    'timestamp': int(track_data['date']['uts']),
+                })
+            except (KeyError, TypeError, ValueError, AttributeError):
+                continue
+
+        return tracks
+
     def _parse_track_search_result(self, track_data: Dict) -> Optional[Dict]:
         """Парсинг результата поиска трека."""
         try:
@@ -370,3 +1077,44 @@ class LastFMService(BaseAPIService):
                 return img['#text']
 
         return ''
+
+
+def get_http_session(retries: bool = True) -> requests.Session:
+    """
+    Общая для процесса HTTP-сессия Last.fm с пулом соединений.
+
+    Args:
+        retries: Повторять ли неудачные запросы (без повторов - для
+                 запросов с бюджетом времени)
+    """
+    with _clients_lock:
+        session = _sessions.get(retries)
+        if session is None:
+            session = build_session(
+                pool_size=getattr(settings, 'LASTFM_HTTP_POOL_SIZE', 20),
+                retries=getattr(settings, 'LASTFM_HTTP_RETRIES', 2) if retries else 0,
+                backoff=getattr(settings, 'LASTFM_HTTP_BACKOFF', 0.3),
+            )
+            _sessions[retries] = session
+        return session
+
+
+def get_lastfm_service(cache_dir: str = ".cache/lastfm") -> LastFMService:
+    """
+    Общий для процесса клиент Last.fm.
+
+    Клиент создаётся один раз на директорию кэша и использует общую
+    HTTP-сессию, поэтому соединения с Last.fm переиспользуются
+    между запросами и потоками.
+
+    Raises:
+        ValueError: Если API ключи не настроены
+    """
+    client = _clients.get(cache_dir)
+    if client is not None:
+        return client
+
+    client = LastFMService(cache_dir)
+
+    with _clients_lock:
+        return _clients.setdefault(cache_dir, client)
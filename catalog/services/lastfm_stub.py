@@ -0,0 +1,442 @@
+"""
+Локальная замена Last.fm API для нагрузочных тестов и бенчмарков.
+
+Сервер отвечает на методы, которые использует LastFMService:
+track.search, artist.search, track.getInfo, artist.getInfo,
+tag.getTopTracks, chart.getTopTags и user.getRecentTracks. Ответы берутся из записанных
+файлов или генерируются детерминированно по параметрам запроса.
+Задержка, доля ответов 429/5xx и размер ответов настраиваются.
+"""
+import hashlib
+import json
+import logging
+import math
+import os
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional, Tuple
+from urllib.parse import parse_qsl, urlsplit
+
+import requests
+
+logger = logging.getLogger(__name__)
+
+# Параметры, которые не влияют на ответ и не входят в ключ записи
+IGNORED_PARAMS = {'api_key', 'api_sig', 'format', 'sk'}
+
+TAGS = [
+    'rock', 'pop', 'electronic', 'hip hop', 'jazz', 'classical', 'indie', 'alternative',
+    'metal', 'punk', 'folk', 'soul', 'blues', 'ambient', 'techno', 'house',
+]
+
+# Синтетическая история прослушиваний: total_items скробблов каждые
+# SCROBBLE_INTERVAL секунд начиная с SCROBBLE_EPOCH
+SCROBBLE_EPOCH = 1600000000
+SCROBBLE_INTERVAL = 30 * 60
+
+
+class StubConfig:
+    """
+    Настройки поведения сервера.
+
+    Args:
+        latency_ms: Медиана задержки ответа в миллисекундах
+        latency_sigma: Разброс задержки (сигма логнормального
+                       распределения; 0 - задержка постоянна)
+        rate_429: Доля ответов 429
+        rate_5xx: Доля ответов 503
+        max_page_size: Максимальный размер страницы списочных методов
+        total_items: Общее количество элементов в синтетических списках
+        bio_bytes: Размер текста биографии и описания в байтах
+        replay_dir: Директория записанных ответов
+        record_upstream: URL настоящего API; ответы с него сохраняются
+                         в replay_dir
+        synthetic: Генерировать ответ, если записи нет
+        seed: Начальное значение генератора случайных чисел
+    """
+
+    def __init__(self, latency_ms: float = 0, latency_sigma: float = 0, rate_429: float = 0,
+                 rate_5xx: float = 0, max_page_size: int = 1000, total_items: int = 10000,
+                 bio_bytes: int = 2000, replay_dir: Optional[str] = None,
+                 record_upstream: Optional[str] = None, synthetic: bool = True, seed: Optional[int] = None):
+        self.latency_ms = latency_ms
+        self.latency_sigma = latency_sigma
+        self.rate_429 = rate_429
+        self.rate_5xx = rate_5xx
+        self.max_page_size = max_page_size
+        self.total_items = total_items
+        self.bio_bytes = bio_bytes
+        self.replay_dir = replay_dir
+        self.record_upstream = record_upstream
+        self.synthetic = synthetic
+        self.seed = seed
+
+
+def recording_key(params: Dict) -> str:
+    """Имя файла записи для параметров запроса."""
+    significant = sorted((k, str(v)) for k, v in params.items() if k not in IGNORED_PARAMS)
+    digest = hashlib.sha1(json.dumps(significant, ensure_ascii=False).encode()).hexdigest()
+    return f"{params.get('method', 'unknown')}-{digest[:16]}.json"
+
+
+class SyntheticLastFM:
+    """Детерминированные ответы в формате Last.fm 2.0."""
+
+    def __init__(self, config: StubConfig):
+        self.config = config
+
+    def respond(self, params: Dict) -> Tuple[int, Dict]:
+        """
+        Ответ на запрос.
+
+        Returns:
+            Кортеж (HTTP-статус, тело ответа)
+        """
+        method = params.get('method', '')
+        handler = {
+            'track.search': self._track_search,
+            'artist.search': self._artist_search,
+            'track.getInfo': self._track_info,
+            'artist.getInfo': self._artist_info,
+            'tag.getTopTracks': self._tag_top_tracks,
+            'chart.getTopTags': self._top_tags,
+            'user.getRecentTracks': self._recent_tracks,
+        }.get(method)
+
+        if handler is None:
+            return 400, {'error': 3, 'message': 'Invalid Method - No method with that name in this package'}
+
+        rng = random.Random(recording_key(params))
+        return 200, handler(params, rng)
+
+    def _page(self, params: Dict, default_limit: int) -> Tuple[int, int, int]:
+        """Номер страницы, размер страницы и количество элементов на ней."""
+        try:
+            limit = min(max(int(params.get('limit', default_limit)), 1), self.config.max_page_size)
+            page = max(int(params.get('page', 1)), 1)
+        except ValueError:
+            limit, page = default_limit, 1
+
+        count = max(min(limit, self.config.total_items - (page - 1) * limit), 0)
+        return page, limit, count
+
+    def _text(self, rng: random.Random, seed: str) -> str:
+        words = ['music', 'band', 'album', 'tour', 'sound', 'record', 'song', 'stage', seed]
+        text = []
+        size = 0
+        while size < self.config.bio_bytes:
+            word = rng.choice(words)
+            text.append(word)
+            size += len(word.encode()) + 1
+        return ' '.join(text)
+
+    @staticmethod
+    def _images(url: str):
+        return [{'#text': f"{url}/{size}.png", 'size': size} for size in ('small', 'medium', 'large', 'extralarge')]
+
+    @staticmethod
+    def _url(*parts: str) -> str:
+        return 'https://www.last.fm/music/' + '/_/'.join(part.replace(' ', '+') for part in parts)
+
+    def _tags(self, rng: random.Random, count: int = 5):
+        return [{'name': tag, 'url': f'https://www.last.fm/tag/{tag}'} for tag in rng.sample(TAGS, count)]
+
+    def _search_results(self, query: str, page: int, limit: int, items_key: str, items):
+        return {
+            'results': {
+                'opensearch:Query': {'searchTerms': query, 'startPage': str(page)},
+                'opensearch:totalResults': str(self.config.total_items),
+                'opensearch:startIndex': str((page - 1) * limit),
+                'opensearch:itemsPerPage': str(limit),
+                items_key: items,
+                '@attr': {'for': query},
+            }
+        }
+
+    def _track_search(self, params: Dict, rng: random.Random) -> Dict:
+        query = params.get('track', '')
+        page, limit, count = self._page(params, 30)
+        offset = (page - 1) * limit
+
+        tracks = []
+        for i in range(count):
+            artist = params.get('artist') or f"Artist {offset + i + 1}"
+            name = f"{query} {offset + i + 1}" if offset + i else query
+            tracks.append({
+                'name': name,
+                'artist': artist,
+                'url': self._url(artist, name),
+                'listeners': str(rng.randint(100, 5000000)),
+                'image': self._images(self._url(artist, name)),
+            })
+
+        return self._search_results(query, page, limit, 'trackmatches', {'track': tracks})
+
+    def _artist_search(self, params: Dict, rng: random.Random) -> Dict:
+        query = params.get('artist', '')
+        page, limit, count = self._page(params, 30)
+        offset = (page - 1) * limit
+
+        artists = []
+        for i in range(count):
+            name = f"{query} {offset + i + 1}" if offset + i else query
+            artists.append({
+                'name': name,
+                'url': self._url(name),
+                'listeners': str(rng.randint(100, 5000000)),
+                'image': self._images(self._url(name)),
+            })
+
+        return self._search_results(query, page, limit, 'artistmatches', {'artist': artists})
+
+    def _track_info(self, params: Dict, rng: random.Random) -> Dict:
+        artist = params.get('artist', '')
+        name = params.get('track', '')
+        listeners = rng.randint(100, 5000000)
+
+        return {
+            'track': {
+                'name': name,
+                'url': self._url(artist, name),
+                'duration': str(rng.randint(90, 600) * 1000),
+                'listeners': str(listeners),
+                'playcount': str(listeners * rng.randint(2, 20)),
+                'artist': {'name': artist, 'url': self._url(artist)},
+                'album': {
+                    'artist': artist,
+                    'title': f"{name} (Single)",
+                    'image': self._images(self._url(artist, name)),
+                },
+                'toptags': {'tag': self._tags(rng)},
+                'wiki': {'summary': self._text(rng, name)[:300], 'content': self._text(rng, name)},
+            }
+        }
+
+    def _artist_info(self, params: Dict, rng: random.Random) -> Dict:
+        name = params.get('artist', '')
+        listeners = rng.randint(100, 5000000)
+
+        return {
+            'artist': {
+                'name': name,
+                'url': self._url(name),
+                'image': self._images(self._url(name)),
+                'stats': {'listeners': str(listeners), 'playcount': str(listeners * rng.randint(5, 50))},
+                'tags': {'tag': self._tags(rng)},
+                'bio': {'summary': self._text(rng, name)[:300], 'content': self._text(rng, name)},
+            }
+        }
+
+    def _tag_top_tracks(self, params: Dict, rng: random.Random) -> Dict:
+        tag = params.get('tag', '')
+        page, limit, count = self._page(params, 50)
+        offset = (page - 1) * limit
+
+        tracks = []
+        for i in range(count):
+            rank = offset + i + 1
+            artist = f"{tag.title()} Artist {rank % 97 + 1}"
+            name = f"{tag.title()} Song {rank}"
+            tracks.append({
+                'name': name,
+                'duration': str(rng.randint(90, 600)),
+                'url': self._url(artist, name),
+                'artist': {'name': artist, 'url': self._url(artist)},
+                'image': self._images(self._url(artist, name)),
+                '@attr': {'rank': str(rank)},
+            })
+
+        return {'tracks': {'track': tracks, '@attr': self._list_attrs(page, limit, tag=tag)}}
+
+    def _top_tags(self, params: Dict, rng: random.Random) -> Dict:
+        page, limit, count = self._page(params, 50)
+        offset = (page - 1) * limit
+
+        tags = []
+        for i in range(count):
+            rank = offset + i + 1
+            name = TAGS[rank - 1] if rank <= len(TAGS) else f"tag {rank}"
+            reach = max(5000000 // rank, 1)
+            tags.append({
+                'name': name,
+                'url': f'https://www.last.fm/tag/{name}',
+                'reach': str(reach),
+                'taggings': str(reach * 3),
+                'count': str(reach * 3),
+            })
+
+        return {'tags': {'tag': tags, '@attr': self._list_attrs(page, limit)}}
+
+    def _recent_tracks(self, params: Dict, rng: random.Random) -> Dict:
+        user = params.get('user', '')
+        try:
+            since = int(params.get('from', SCROBBLE_EPOCH))
+            until = int(params.get('to', SCROBBLE_EPOCH + self.config.total_items * SCROBBLE_INTERVAL))
+            limit = min(max(int(params.get('limit', 50)), 1), self.config.max_page_size, 200)
+            page = max(int(params.get('page', 1)), 1)
+        except ValueError:
+            return {'error': 6, 'message': 'Invalid parameters'}
+
+        first = max(-(-(since - SCROBBLE_EPOCH) // SCROBBLE_INTERVAL), 0)
+        last = min((until - SCROBBLE_EPOCH) // SCROBBLE_INTERVAL, self.config.total_items - 1)
+        total = max(last - first + 1, 0)
+
+        tracks = []
+        for i in range((page - 1) * limit, min(page * limit, total)):
+            number = last - i
+            artist = f"Listener Artist {number % 37 + 1}"
+            name = f"Listener Song {number % 211 + 1}"
+            uts = SCROBBLE_EPOCH + number * SCROBBLE_INTERVAL
+            tracks.append({
+                'name': name,
+                'url': self._url(artist, name),
+                'artist': {'#text': artist, 'mbid': ''},
+                'album': {'#text': f"Listener Album {number % 23 + 1}", 'mbid': ''},
+                'image': self._images(self._url(artist, name)),
+                'date': {'uts': str(uts), '#text': time.strftime('%d %b %Y, %H:%M', time.gmtime(uts))},
+            })
+
+        return {'recenttracks': {'track': tracks, '@attr': {
+            'user': user,
+            'page': str(page),
+            'perPage': str(limit),
+            'totalPages': str(math.ceil(total / limit)),
+            'total': str(total),
+        }}}
+
+    def _list_attrs(self, page: int, limit: int, **extra) -> Dict:
+        return {
+            **extra,
+            'page': str(page),
+            'perPage': str(limit),
+            'totalPages': str(math.ceil(self.config.total_items / limit)),
+            'total': str(self.config.total_items),
+        }
+
+
+class LastFMStubServer(ThreadingHTTPServer):
+    """
+    HTTP-сервер, изображающий Last.fm API.
+
+    Запуск в фоне: server.start(); адрес для LASTFM_API_URL - server.url.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 0, config: Optional[StubConfig] = None):
+        super().__init__((host, port), _StubRequestHandler)
+        self.config = config or StubConfig()
+        self.synthetic = SyntheticLastFM(self.config)
+
+        self._rng = random.Random(self.config.seed)
+        self._rng_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+        self.stats = {'requests': 0, 'replayed': 0, 'recorded': 0, 'synthetic': 0, 'injected_errors': 0}
+
+        if self.config.replay_dir:
+            os.makedirs(self.config.replay_dir, exist_ok=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/2.0/"
+
+    def start(self) -> 'LastFMStubServer':
+        """Запуск сервера в фоновом потоке."""
+        self._thread = threading.Thread(target=self.serve_forever, name='lastfm-stub', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Остановка фонового сервера."""
+        self.shutdown()
+        self.server_close()
+        if self._thread is not None:
+            self._thread.join()
+
+    def count(self, name: str):
+        with self._stats_lock:
+            self.stats[name] += 1
+
+    def latency(self) -> float:
+        """Задержка очередного ответа в секундах."""
+        if self.config.latency_ms <= 0:
+            return 0.0
+        if self.config.latency_sigma <= 0:
+            return self.config.latency_ms / 1000
+        with self._rng_lock:
+            return self._rng.lognormvariate(math.log(self.config.latency_ms), self.config.latency_sigma) / 1000
+
+    def injected_error(self) -> Optional[int]:
+        """HTTP-статус внедрённой ошибки или None."""
+        with self._rng_lock:
+            roll = self._rng.random()
+        if roll < self.config.rate_429:
+            return 429
+        if roll < self.config.rate_429 + self.config.rate_5xx:
+            return 503
+        return None
+
+    def respond(self, params: Dict) -> Tuple[int, Dict]:
+        """Ответ из записи, с настоящего API (запись) или синтетический."""
+        path = os.path.join(self.config.replay_dir, recording_key(params)) if self.config.replay_dir else None
+
+        if path and os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                recording = json.load(f)
+            self.count('replayed')
+            return recording['status'], recording['body']
+
+        if path and self.config.record_upstream:
+            response = requests.get(self.config.record_upstream, params=params, timeout=30)
+            status, body = response.status_code, response.json()
+            if status == 200:
+                with open(path, 'w', encoding='utf-8') as f:
+                    json.dump({'status': status, 'body': body}, f, ensure_ascii=False)
+                self.count('recorded')
+            return status, body
+
+        if self.config.synthetic:
+            self.count('synthetic')
+            return self.synthetic.respond(params)
+
+        return 200, {'error': 6, 'message': 'The resource you requested could not be found'}
+
+
+class _StubRequestHandler(BaseHTTPRequestHandler):
+    server: LastFMStubServer
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        self.server.count('requests')
+        time.sleep(self.server.latency())
+
+        error = self.server.injected_error()
+        if error is not None:
+            self.server.count('injected_errors')
+            self._send(error, {'error': 29 if error == 429 else 16, 'message': 'Injected error'})
+            return
+
+        params = dict(parse_qsl(urlsplit(self.path).query))
+        try:
+            status, body = self.server.respond(params)
+        except (requests.RequestException, ValueError, OSError) as e:
+            logger.warning("Stub response failed: %s", e)
+            status, body = 502, {'error': 16, 'message': str(e)}
+
+        self._send(status, body)
+
+    def _send(self, status: int, body: Dict):
+        payload = json.dumps(body, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        logger.debug("%s - %s", self.address_string(), format % args)
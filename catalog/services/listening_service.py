@@ -0,0 +1,163 @@
+"""
+Импорт истории прослушиваний пользователей из Last.fm.
+"""
+import time
+from datetime import datetime, timezone as dt_timezone
+from typing import Callable, Dict, Iterable, Optional, Set, Tuple
+
+from django.db import transaction
+from django.db.models import Max
+
+from .job_queue import JobQueueService
+from .lastfm_service import LastFMService, LastFMUnavailable
+from ..models import ListeningEvent, PendingScrobble, Track, canonical_key
+
+
+class ListeningHistoryService:
+    """
+    Сервис импорта скробблов user.getRecentTracks в ListeningEvent.
+
+    Каталог пополняется не скробблами, а очередью обогащения: треки,
+    которых нет в каталоге, ждут проверки в PendingScrobble.
+
+    Страницы обходятся от старых прослушиваний к новым в окне
+    [последнее импортированное прослушивание, начало синхронизации],
+    и каждая страница сразу записывается одной транзакцией. Поэтому
+    прерванный импорт продолжается обычным повторным запуском: всё,
+    что старше последней записанной отметки времени, уже в базе, а
+    дубли на границе окна отбрасывает уникальный индекс.
+    """
+
+    # Максимальный размер страницы user.getRecentTracks
+    PAGE_SIZE = 200
+
+    @staticmethod
+    def last_listened_at(user_id: int) -> Optional[datetime]:
+        """Время последнего импортированного прослушивания пользователя (в каталоге или ожидающего)."""
+        last = [
+            model.objects.filter(user_id=user_id).aggregate(last=Max('listened_at'))['last']
+            for model in (ListeningEvent, PendingScrobble)
+        ]
+        return max((value for value in last if value is not None), default=None)
+
+    @staticmethod
+    def store_scrobbles(user_id: int, scrobbles: Iterable[Dict]) -> Dict[str, int]:
+        """
+        Запись страницы прослушиваний.
+
+        Пары (исполнитель, трек) пакетно сопоставляются с каталогом по
+        canonical_key. Прослушивания найденных треков пишутся в
+        ListeningEvent. Остальные сохраняются в PendingScrobble, а трек
+        ставится в очередь обогащения: в каталог он попадёт, только если
+        его подтвердит Last.fm.
+
+        Args:
+            user_id: ID пользователя
+            scrobbles: Прослушивания из LastFMService.get_recent_tracks
+
+        Returns:
+            Счетчики: scrobbles (записано в ListeningEvent), pending
+            (ожидают проверки трека), с учётом уже имевшихся
+        """
+        stats = {'scrobbles': 0, 'pending': 0}
+        rows = [
+            (scrobble['artist'][:200], scrobble['name'][:200],
+             datetime.fromtimestamp(scrobble['timestamp'], tz=dt_timezone.utc))
+            for scrobble in scrobbles if scrobble['artist'] and scrobble['name']
+        ]
+        if not rows:
+            return stats
+
+        keyed = [(canonical_key(artist), canonical_key(title), artist, title, listened_at)
+                 for artist, title, listened_at in rows]
+        track_ids = ListeningHistoryService._catalog_track_ids({(a, t) for a, t, _, _, _ in keyed})
+
+        events, pending, new_tracks = [], [], {}
+        for artist_key, title_key, artist, title, listened_at in keyed:
+            track_id = track_ids.get((artist_key, title_key))
+            if track_id is not None:
+                events.append(ListeningEvent(user_id=user_id, track_id=track_id, listened_at=listened_at))
+            else:
+                pending.append(PendingScrobble(
+                    user_id=user_id, artist_name=artist, track_title=title,
+                    artist_key=artist_key, title_key=title_key, listened_at=listened_at
+                ))
+                new_tracks.setdefault((artist_key, title_key), (artist, title))
+
+        with transaction.atomic():
+            ListeningEvent.objects.bulk_create(events, ignore_conflicts=True)
+            PendingScrobble.objects.bulk_create(pending, ignore_conflicts=True)
+            for (artist_key, title_key), (artist, title) in new_tracks.items():
+                JobQueueService.enqueue_scrobble(artist_key, title_key, artist, title)
+
+        stats['scrobbles'] = len(events)
+        stats['pending'] = len(pending)
+        return stats
+
+    @staticmethod
+    def _catalog_track_ids(keys: Set[Tuple[str, str]]) -> Dict[Tuple[str, str], int]:
+        """id треков каталога по ключам (artist.name_key, title_key)."""
+        ids = {}
+        key_list = list(keys)
+        for start in range(0, len(key_list), ListeningHistoryService.PAGE_SIZE):
+            chunk = key_list[start:start + ListeningHistoryService.PAGE_SIZE]
+            tracks = Track.objects.filter(
+                artist__name_key__in={artist_key for artist_key, _ in chunk},
+                title_key__in={title_key for _, title_key in chunk}
+            ).values_list('artist__name_key', 'title_key', 'id')
+            ids.update(((artist_key, title_key), pk) for artist_key, title_key, pk in tracks
+                       if (artist_key, title_key) in keys)
+        return ids
+
+    @staticmethod
+    def _fetch_page(lastfm: LastFMService, username: str, page: int, since: Optional[int], until: int):
+        result = lastfm.get_recent_tracks(username, page, ListeningHistoryService.PAGE_SIZE, since, until)
+        if result is None:
+            raise LastFMUnavailable(f"user.getRecentTracks: страница {page} пользователя {username} недоступна")
+        return result
+
+    @staticmethod
+    def sync_user(user_id: int, username: str, lastfm: LastFMService, full: bool = False,
+                  progress: Optional[Callable[[Dict], None]] = None) -> Dict[str, int]:
+        """
+        Импорт новых прослушиваний пользователя.
+
+        Args:
+            user_id: ID пользователя
+            username: Имя пользователя Last.fm
+            lastfm: Клиент Last.fm
+            full: Загрузить всю историю, а не только новее последнего импорта
+            progress: Функция, вызываемая после каждой страницы со счетчиками
+
+        Returns:
+            Счетчики: pages, scrobbles, pending
+
+        Raises:
+            LastFMUnavailable: Страницу получить не удалось; записанные
+                               страницы остаются, повторный запуск продолжит импорт
+        """
+        since = None
+        if not full:
+            last = ListeningHistoryService.last_listened_at(user_id)
+            since = int(last.timestamp()) if last else None
+        # Конец окна фиксирован, чтобы новые скробблы не сдвигали страницы
+        until = int(time.time())
+
+        first_page, total_pages = ListeningHistoryService._fetch_page(lastfm, username, 1, since, until)
+        if first_page:
+            total_pages = max(total_pages, 1)
+
+        stats = {'pages': 0, 'scrobbles': 0, 'pending': 0}
+        for page in range(total_pages, 0, -1):
+            if page > 1:
+                scrobbles, _ = ListeningHistoryService._fetch_page(lastfm, username, page, since, until)
+            else:
+                scrobbles = first_page
+
+            for name, value in ListeningHistoryService.store_scrobbles(user_id, reversed(scrobbles)).items():
+                stats[name] += value
+            stats['pages'] += 1
+            if progress:
+                progress(stats)
+
+        return stats
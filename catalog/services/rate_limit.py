@@ -0,0 +1,193 @@
+"""
+Ограничение частоты запросов к внешним API.
+"""
+import asyncio
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+
+class TokenBucket:
+    """
+    Token bucket, общий для всех потоков процесса.
+
+    Токены пополняются со скоростью rate в секунду, но не больше
+    capacity - это допустимый всплеск запросов.
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+
+        self._lock = threading.Lock()
+        self._tokens = capacity
+        self._updated_at = time.time()
+
+        self.acquired = 0
+        self.rejected = 0
+
+    def _refill(self, tokens: float, updated_at: float, now: float) -> float:
+        elapsed = max(now - updated_at, 0)
+        return min(self.capacity, tokens + elapsed * self.rate)
+
+    def _take(self, tokens: float, now: float) -> Tuple[float, float]:
+        """
+        Попытка взять токен.
+
+        Returns:
+            Кортеж (оставшиеся токены, сколько ждать до следующего токена;
+            0 - токен взят)
+        """
+        if tokens >= 1:
+            return tokens - 1, 0.0
+        return tokens, (1 - tokens) / self.rate
+
+    def _reserve(self) -> float:
+        with self._lock:
+            now = time.time()
+            tokens = self._refill(self._tokens, self._updated_at, now)
+            self._tokens, wait = self._take(tokens, now)
+            self._updated_at = now
+            return wait
+
+    def try_acquire(self) -> bool:
+        """Взять токен без ожидания."""
+        return self.acquire(timeout=0)
+
+    def acquire(self, timeout: Optional[float] = None) -> bool:
+        """
+        Взять токен, ожидая не дольше timeout секунд.
+
+        Args:
+            timeout: Максимальное ожидание (None - ждать сколько нужно)
+
+        Returns:
+            True, если токен получен
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+
+        while True:
+            wait = self._reserve()
+            if wait == 0:
+                self.acquired += 1
+                return True
+
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or wait > remaining:
+                    self.rejected += 1
+                    return False
+
+            time.sleep(wait)
+
+    async def acquire_async(self, timeout: Optional[float] = None) -> bool:
+        """То же, что acquire, но ожидание не блокирует цикл событий."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+
+        while True:
+            wait = self._reserve()
+            if wait == 0:
+                self.acquired += 1
+                return True
+
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or wait > remaining:
+                    self.rejected += 1
+                    return False
+
+            await asyncio.sleep(wait)
+
+    def stats(self) -> Dict:
+        """Счётчики выданных и отклонённых токенов."""
+        return {
+            'acquired': self.acquired,
+            'rejected': self.rejected,
+            'rate': self.rate,
+            'capacity': self.capacity,
+        }
+
+
+class SharedTokenBucket(TokenBucket):
+    """
+    Token bucket, общий для нескольких процессов.
+
+    Состояние хранится в файле SQLite и изменяется в транзакции
+    BEGIN IMMEDIATE, поэтому воркеры gunicorn на одной машине
+    делят один лимит.
+    """
+
+    def __init__(self, path: str, name: str, rate: float, capacity: float):
+        super().__init__(rate, capacity)
+        self.path = path
+        self.name = name
+        self._local = threading.local()
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._connection().execute(
+            "CREATE TABLE IF NOT EXISTS token_buckets ("
+            "name TEXT PRIMARY KEY, tokens REAL NOT NULL, updated_at REAL NOT NULL)"
+        )
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None and self._local.pid == os.getpid():
+            return conn
+
+        conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+        conn.execute('PRAGMA journal_mode=WAL')
+
+        self._local.conn = conn
+        self._local.pid = os.getpid()
+        return conn
+
+    def _reserve(self) -> float:
+        with self._lock:
+            conn = self._connection()
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                now = time.time()
+                row = conn.execute(
+                    "SELECT tokens, updated_at FROM token_buckets WHERE name = ?", (self.name,)
+                ).fetchone()
+
+                tokens = self._refill(*row, now) if row else self.capacity
+                tokens, wait = self._take(tokens, now)
+
+                conn.execute(
+                    "INSERT OR REPLACE INTO token_buckets (name, tokens, updated_at) VALUES (?, ?, ?)",
+                    (self.name, tokens, now)
+                )
+                conn.execute('COMMIT')
+            except BaseException:
+                conn.execute('ROLLBACK')
+                raise
+            return wait
+
+
+_buckets: Dict[Tuple[str, str], TokenBucket] = {}
+_buckets_lock = threading.Lock()
+
+
+def get_rate_limiter(name: str, rate: float, capacity: float, path: Optional[str] = None) -> TokenBucket:
+    """
+    Общий для процесса ограничитель частоты запросов.
+
+    Args:
+        name: Имя лимита (например, 'lastfm')
+        rate: Запросов в секунду
+        capacity: Допустимый всплеск
+        path: Файл SQLite для общего между процессами лимита
+              (None - лимит только в пределах процесса)
+    """
+    with _buckets_lock:
+        bucket = _buckets.get((name, path or ''))
+        if bucket is None:
+            if path:
+                bucket = SharedTokenBucket(path, name, rate, capacity)
+            else:
+                bucket = TokenBucket(rate, capacity)
+            _buckets[(name, path or '')] = bucket
+        return bucket
@@ -0,0 +1,248 @@
+"""
+Плановое обновление данных Last.fm у треков и исполнителей.
+"""
+import heapq
+import math
+from datetime import timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from django.conf import settings
+from django.db.models import ExpressionWrapper, F, FloatField, Func, Q, Value
+from django.db.models.functions import Coalesce, Greatest, Log
+from django.utils import timezone
+
+from .genre_service import GenreService
+from .genre_stats_service import GenreStatsService
+from .lastfm_service import LastFMService
+from ..models import Artist, Track
+
+StaleEntity = Tuple[float, str, int]
+
+
+class _EpochSeconds(Func):
+    """Дата и время в секундах Unix (PostgreSQL, SQLite)."""
+
+    template = 'CAST(EXTRACT(EPOCH FROM %(expressions)s) AS double precision)'
+    output_field = FloatField()
+
+    def as_sqlite(self, compiler, connection, **extra_context):
+        # SQLite хранит дату текстом в UTC; 2440587.5 - юлианский день 1970-01-01
+        return self.as_sql(
+            compiler, connection,
+            template='((julianday(%(expressions)s) - 2440587.5) * 86400.0)',
+            **extra_context
+        )
+
+
+class RefreshService:
+    """
+    Сервис выбора и обновления устаревших треков и исполнителей.
+
+    Сущность считается тем более устаревшей, чем дольше она не
+    синхронизировалась относительно желаемого интервала, а желаемый
+    интервал сокращается с ростом популярности. Поэтому популярные
+    треки обновляются часто, а длинный хвост - редко.
+    """
+
+    KIND_TRACK = 'track'
+    KIND_ARTIST = 'artist'
+
+    TRACK_REFRESH_FIELDS = [
+        'lastfm_listeners', 'lastfm_playcount', 'tags_json', 'lastfm_data',
+        'lastfm_synced_at', 'updated_at',
+    ]
+    ARTIST_REFRESH_FIELDS = ['lastfm_listeners', 'lastfm_playcount', 'lastfm_synced_at', 'updated_at']
+
+    @staticmethod
+    def min_age() -> float:
+        """Минимальный возраст данных для обновления, в секундах."""
+        return getattr(settings, 'REFRESH_MIN_AGE', 24 * 60 * 60)
+
+    @staticmethod
+    def target_age(listeners: int) -> float:
+        """
+        Желаемый интервал обновления сущности.
+
+        Args:
+            listeners: Количество слушателей в Last.fm
+
+        Returns:
+            Интервал в секундах: REFRESH_MAX_AGE для сущностей без
+            слушателей, короче для популярных, но не меньше REFRESH_MIN_AGE
+        """
+        max_age = getattr(settings, 'REFRESH_MAX_AGE', 30 * 24 * 60 * 60)
+        return max(RefreshService.min_age(), max_age / (1 + math.log10(1 + max(listeners or 0, 0))))
+
+    @staticmethod
+    def staleness(age_seconds: float, listeners: int) -> float:
+        """Устарелость: возраст данных в долях желаемого интервала (1.0 - пора обновлять)."""
+        return age_seconds / RefreshService.target_age(listeners)
+
+    @staticmethod
+    def staleness_expression(now):
+        """
+        Устарелость staleness() как SQL-выражение для order_by.
+
+        Возраст отсчитывается от lastfm_synced_at, а у никогда не
+        синхронизированных - от created_at.
+        """
+        max_age = getattr(settings, 'REFRESH_MAX_AGE', 30 * 24 * 60 * 60)
+        synced_at = _EpochSeconds(Coalesce('lastfm_synced_at', 'created_at'))
+        popularity = Value(1.0) + Log(Value(10.0), Value(1.0) + Greatest(F('lastfm_listeners'), Value(0)))
+        target_age = Greatest(Value(RefreshService.min_age()), Value(float(max_age)) / popularity)
+        return ExpressionWrapper((Value(now.timestamp()) - synced_at) / target_age, output_field=FloatField())
+
+    @staticmethod
+    def pick_stale(limit: int, now=None) -> List[StaleEntity]:
+        """
+        Выбор самых устаревших треков и исполнителей.
+
+        Рассматриваются сущности, данные которых старше REFRESH_MIN_AGE
+        (фильтр по индексу lastfm_synced_at); ранжирование и LIMIT
+        выполняются в базе, в Python приходит не больше limit строк
+        каждого типа.
+
+        Args:
+            limit: Максимальное количество сущностей
+            now: Текущее время (для тестов)
+
+        Returns:
+            Кортежи (устарелость, тип, id) по убыванию устарелости
+        """
+        now = now or timezone.now()
+        cutoff = now - timedelta(seconds=RefreshService.min_age())
+
+        picked = []
+        for kind, model in ((RefreshService.KIND_TRACK, Track), (RefreshService.KIND_ARTIST, Artist)):
+            rows = (
+                model.objects.filter(
+                    Q(lastfm_synced_at__lt=cutoff) | Q(lastfm_synced_at__isnull=True, created_at__lt=cutoff)
+                )
+                .annotate(staleness=RefreshService.staleness_expression(now))
+                .order_by('-staleness', 'pk')
+                .values_list('staleness', 'pk')[:limit]
+            )
+            picked.extend((staleness, kind, pk) for staleness, pk in rows)
+
+        return heapq.nlargest(limit, picked)
+
+    @staticmethod
+    def refresh_tracks(track_ids: Iterable[int], lastfm: LastFMService,
+                       max_age: Optional[float] = None) -> Dict[str, int]:
+        """
+        Обновление статистики треков одним пакетом запросов.
+
+        Уже полученные результаты сохраняются, даже если пакет
+        прервался ошибкой Last.fm; ошибка пробрасывается дальше.
+
+        Args:
+            track_ids: id треков
+            lastfm: Клиент Last.fm
+            max_age: Максимальный возраст ответа из кэша в секундах
+
+        Returns:
+            Счетчики: refreshed, not_found
+        """
+        tracks_by_key = {}
+        for track in Track.objects.filter(pk__in=track_ids).select_related('artist'):
+            tracks_by_key.setdefault((track.artist.name, track.title), []).append(track)
+
+        stats = {'refreshed': 0, 'not_found': 0}
+        now = timezone.now()
+        updated = []
+        track_tags = {}
+        try:
+            for key, info in lastfm.get_track_info_many(tracks_by_key, max_age=max_age):
+                for track in tracks_by_key[key]:
+                    if info:
+                        track.lastfm_listeners = info.get('listeners', 0)
+                        track.lastfm_playcount = info.get('playcount', 0)
+                        track.tags = info.get('tags', [])
+                        track_tags[track.pk] = track.tags
+                        track.set_lastfm_data(info)
+                        stats['refreshed'] += 1
+                    else:
+                        stats['not_found'] += 1
+                    track.lastfm_synced_at = now
+                    track.updated_at = now
+                    updated.append(track)
+        finally:
+            if updated:
+                Track.objects.bulk_update(updated, RefreshService.TRACK_REFRESH_FIELDS)
+                GenreStatsService.refresh_for_artists({track.artist_id for track in updated})
+                GenreService.link_track_tags(track_tags)
+
+        return stats
+
+    @staticmethod
+    def refresh_artists(artist_ids: Iterable[int], lastfm: LastFMService,
+                        max_age: Optional[float] = None) -> Dict[str, int]:
+        """
+        Обновление статистики исполнителей одним пакетом запросов.
+
+        Args:
+            artist_ids: id исполнителей
+            lastfm: Клиент Last.fm
+            max_age: Максимальный возраст ответа из кэша в секундах
+
+        Returns:
+            Счетчики: refreshed, not_found
+        """
+        artists_by_name = {}
+        for artist in Artist.objects.filter(pk__in=artist_ids):
+            artists_by_name.setdefault(artist.name, []).append(artist)
+
+        stats = {'refreshed': 0, 'not_found': 0}
+        now = timezone.now()
+        updated = []
+        try:
+            for name, info in lastfm.get_artist_info_many(artists_by_name, max_age=max_age):
+                for artist in artists_by_name[name]:
+                    if info:
+                        artist.lastfm_listeners = info.get('listeners', 0)
+                        artist.lastfm_playcount = info.get('playcount', 0)
+                        stats['refreshed'] += 1
+                    else:
+                        stats['not_found'] += 1
+                    artist.lastfm_synced_at = now
+                    artist.updated_at = now
+                    updated.append(artist)
+        finally:
+            if updated:
+                Artist.objects.bulk_update(updated, RefreshService.ARTIST_REFRESH_FIELDS)
+
+        return stats
+
+    @staticmethod
+    def refresh_batch(limit: int, lastfm: LastFMService) -> Dict[str, int]:
+        """
+        Обновление самых устаревших сущностей.
+
+        Ответы кэша моложе REFRESH_MIN_AGE используются без запроса
+        к Last.fm.
+
+        Args:
+            limit: Сколько сущностей обновить (не больше запросов к Last.fm)
+            lastfm: Клиент Last.fm с raise_unavailable=True
+
+        Returns:
+            Счетчики: selected, tracks, artists, not_found
+        """
+        picked = RefreshService.pick_stale(limit)
+        track_ids = [pk for _, kind, pk in picked if kind == RefreshService.KIND_TRACK]
+        artist_ids = [pk for _, kind, pk in picked if kind == RefreshService.KIND_ARTIST]
+
+        stats = {'selected': len(picked), 'tracks': 0, 'artists': 0, 'not_found': 0}
+        max_age = RefreshService.min_age()
+
+        if track_ids:
+            result = RefreshService.refresh_tracks(track_ids, lastfm, max_age)
+            stats['tracks'] = result['refreshed']
+            stats['not_found'] += result['not_found']
+
+        if artist_ids:
+            result = RefreshService.refresh_artists(artist_ids, lastfm, max_age)
+            stats['artists'] = result['refreshed']
+            stats['not_found'] += result['not_found']
+
+        return stats
@@ -0,0 +1,245 @@
+"""
+Защита представлений от медленных и недоступных внешних API.
+"""
+import asyncio
+import contextvars
+import functools
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+from django.conf import settings
+
+_deadline: contextvars.ContextVar[Optional[float]] = contextvars.ContextVar('upstream_deadline', default=None)
+
+
+class CircuitBreaker:
+    """
+    Автоматический выключатель для внешнего API.
+
+    closed - запросы выполняются, результаты последних window вызовов
+    запоминаются. Если вызовов не меньше min_calls, а доля ошибок
+    (медленные вызовы тоже считаются ошибками) не меньше failure_rate,
+    выключатель переходит в open.
+
+    open - запросы не выполняются open_seconds секунд, затем half_open.
+
+    half_open - пропускается не больше half_open_calls пробных вызовов.
+    Если все они успешны - closed, при первой ошибке снова open.
+    Пробный вызов без результата (release) освобождает место для
+    следующего.
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, failure_rate: float = 0.5, window: int = 20, min_calls: int = 10,
+                 slow_call_seconds: float = 5.0, open_seconds: float = 30.0, half_open_calls: int = 1):
+        self.failure_rate = failure_rate
+        self.window = window
+        self.min_calls = min_calls
+        self.slow_call_seconds = slow_call_seconds
+        self.open_seconds = open_seconds
+        self.half_open_calls = half_open_calls
+
+        self._lock = threading.Lock()
+        self._state = self.CLOSED
+        self._outcomes = deque(maxlen=window)
+        self._opened_at = 0.0
+        self._probes = 0
+        self._probe_successes = 0
+
+        self.rejected = 0
+        self.opened = 0
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            self._update_state(time.monotonic())
+            return self._state
+
+    def _update_state(self, now: float):
+        if self._state == self.OPEN and now - self._opened_at >= self.open_seconds:
+            self._state = self.HALF_OPEN
+            self._probes = 0
+            self._probe_successes = 0
+
+    def _open(self, now: float):
+        self._state = self.OPEN
+        self._opened_at = now
+        self._outcomes.clear()
+        self.opened += 1
+
+    def allow_request(self) -> bool:
+        """Можно ли выполнить запрос сейчас."""
+        with self._lock:
+            self._update_state(time.monotonic())
+
+            if self._state == self.CLOSED:
+                return True
+
+            if self._state == self.HALF_OPEN and self._probes < self.half_open_calls:
+                self._probes += 1
+                return True
+
+            self.rejected += 1
+            return False
+
+    def record_success(self, duration: float):
+        """
+        Учет успешного вызова.
+
+        Args:
+            duration: Длительность вызова в секундах; вызов дольше
+                      slow_call_seconds считается ошибкой
+        """
+        if duration >= self.slow_call_seconds:
+            self.record_failure()
+            return
+
+        with self._lock:
+            if self._state == self.HALF_OPEN:
+                self._probe_successes += 1
+                if self._probe_successes >= self.half_open_calls:
+                    self._state = self.CLOSED
+                    self._outcomes.clear()
+                return
+
+            self._outcomes.append(True)
+
+    def record_failure(self):
+        """Учет неудачного вызова."""
+        with self._lock:
+            now = time.monotonic()
+
+            if self._state == self.HALF_OPEN:
+                self._open(now)
+                return
+
+            if self._state == self.OPEN:
+                return
+
+            self._outcomes.append(False)
+            if len(self._outcomes) >= self.min_calls:
+                failures = self._outcomes.count(False)
+                if failures / len(self._outcomes) >= self.failure_rate:
+                    self._open(now)
+
+    def release(self):
+        """
+        Вызов завершился, ничего не сказав о внешнем API.
+
+        Например, запрос прерван бюджетом времени вызывающего кода или
+        локальной ошибкой. Исход не учитывается, а место пробного
+        вызова в half_open освобождается.
+        """
+        with self._lock:
+            if self._state == self.HALF_OPEN and self._probes > self._probe_successes:
+                self._probes -= 1
+
+    def stats(self) -> Dict:
+        """Состояние и счетчики выключателя."""
+        with self._lock:
+            self._update_state(time.monotonic())
+            return {
+                'state': self._state,
+                'calls': len(self._outcomes),
+                'failures': self._outcomes.count(False),
+                'opened': self.opened,
+                'rejected': self.rejected,
+            }
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+
+def get_circuit_breaker(name: str) -> CircuitBreaker:
+    """
+    Общий для процесса выключатель внешнего API.
+
+    Параметры берутся из настроек CIRCUIT_BREAKER_*.
+    """
+    with _breakers_lock:
+        breaker = _breakers.get(name)
+        if breaker is None:
+            breaker = CircuitBreaker(
+                failure_rate=getattr(settings, 'CIRCUIT_BREAKER_FAILURE_RATE', 0.5),
+                window=getattr(settings, 'CIRCUIT_BREAKER_WINDOW', 20),
+                min_calls=getattr(settings, 'CIRCUIT_BREAKER_MIN_CALLS', 10),
+                slow_call_seconds=getattr(settings, 'CIRCUIT_BREAKER_SLOW_CALL', 5.0),
+                open_seconds=getattr(settings, 'CIRCUIT_BREAKER_OPEN_SECONDS', 30.0),
+            )
+            _breakers[name] = breaker
+        return breaker
+
+
+@contextmanager
+def deadline(seconds: float):
+    """
+    Ограничение общего времени обращений к внешним API.
+
+    Вложенный дедлайн не может быть позже внешнего.
+
+    Args:
+        seconds: Бюджет времени в секундах
+    """
+    expires_at = time.monotonic() + seconds
+    current = _deadline.get()
+    if current is not None:
+        expires_at = min(expires_at, current)
+
+    token = _deadline.set(expires_at)
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def remaining_time() -> Optional[float]:
+    """Оставшийся бюджет времени в секундах (None - дедлайн не задан)."""
+    expires_at = _deadline.get()
+    if expires_at is None:
+        return None
+    return expires_at - time.monotonic()
+
+
+def cap_timeout(timeout: Optional[float]) -> Optional[float]:
+    """Таймаут, урезанный до оставшегося бюджета времени."""
+    remaining = remaining_time()
+    if remaining is None:
+        return timeout
+    remaining = max(remaining, 0)
+    return remaining if timeout is None else min(timeout, remaining)
+
+
+def with_deadline(seconds: Optional[float] = None):
+    """
+    Декоратор представления: бюджет времени на внешние API за запрос.
+
+    Работает с обычными и async-представлениями.
+
+    Args:
+        seconds: Бюджет в секундах (None - настройка UPSTREAM_DEADLINE)
+    """
+    def decorator(view):
+        def budget():
+            return seconds if seconds is not None else getattr(settings, 'UPSTREAM_DEADLINE', 3.0)
+
+        if asyncio.iscoroutinefunction(view):
+            @functools.wraps(view)
+            async def async_wrapper(request, *args, **kwargs):
+                with deadline(budget()):
+                    return await view(request, *args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(view)
+        def wrapper(request, *args, **kwargs):
+            with deadline(budget()):
+                return view(request, *args, **kwargs)
+        return wrapper
+
+    return decorator
@@ -0,0 +1,235 @@
+"""
+Пакетная запись артистов, треков и жанров через INSERT ... ON CONFLICT.
+"""
+import json
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from django.db import connection
+from django.utils import timezone
+
+from .genre_service import GenreService
+from .genre_stats_service import GenreStatsService
+from ..models import Genre, Artist, Track, canonical_key
+
+TrackKey = Tuple[int, str]
+
+
+class UpsertService:
+    """
+    Сервис идемпотентной записи сущностей каталога.
+
+    Исполнители и треки сопоставляются по ключам name_key и title_key,
+    поэтому 'AC/DC' и 'ac-dc' пишутся в одну строку.
+
+    Каждая порция записывается одним INSERT ... ON CONFLICT DO UPDATE
+    (PostgreSQL, SQLite 3.35+), который обновляет только переданные
+    колонки статистики. Параллельные воркеры, пишущие одну сущность,
+    не получают IntegrityError, а повторная запись ничего не ломает.
+
+    Запись треков минует сигналы моделей, поэтому статистика жанров
+    затронутых исполнителей пересчитывается здесь же, а записанные
+    tags_json переносятся в TrackTag.
+    """
+
+    ARTIST_STATS_FIELDS = ['lastfm_url', 'lastfm_listeners', 'lastfm_playcount', 'lastfm_synced_at']
+    TRACK_STATS_FIELDS = [
+        'lastfm_url', 'lastfm_listeners', 'lastfm_playcount', 'duration', 'album',
+        'tags_json', 'lastfm_data', 'image_url', 'lastfm_synced_at',
+    ]
+    GENRE_FIELDS = ['lastfm_tag', 'description']
+
+    BATCH_SIZE = 500
+
+    @staticmethod
+    def track_stats(info: Optional[Dict]) -> Dict:
+        """Колонки TRACK_STATS_FIELDS из ответа track.getInfo (пустой словарь для None)."""
+        if not info:
+            return {}
+
+        return {
+            'lastfm_url': info.get('url', ''),
+            'lastfm_listeners': info.get('listeners', 0),
+            'lastfm_playcount': info.get('playcount', 0),
+            'duration': info.get('duration'),
+            'album': info.get('album', ''),
+            'tags_json': json.dumps(info.get('tags', []), ensure_ascii=False),
+            'lastfm_data': info,
+            'image_url': info.get('image', ''),
+            'lastfm_synced_at': timezone.now(),
+        }
+
+    @staticmethod
+    def _write(model, objs: List, unique_fields: Sequence[str], update_fields: Sequence[str]) -> List:
+        """
+        Запись объектов одной командой на порцию.
+
+        Без update_fields существующие строки не меняются.
+        Возвращает объекты; id заполнены там, где СУБД их вернула.
+        """
+        if not objs:
+            return []
+
+        if update_fields:
+            return model.objects.bulk_create(
+                objs,
+                update_conflicts=True,
+                unique_fields=list(unique_fields),
+                update_fields=[*update_fields, 'updated_at'],
+                batch_size=UpsertService.BATCH_SIZE
+            )
+
+        model.objects.bulk_create(objs, ignore_conflicts=True, batch_size=UpsertService.BATCH_SIZE)
+        return objs
+
+    @staticmethod
+    def _needs_lookup(objs: List, update_fields: Sequence[str]) -> bool:
+        """Нужен ли отдельный SELECT, чтобы узнать id."""
+        return not update_fields or not connection.features.can_return_rows_from_bulk_insert \
+            or any(obj.pk is None for obj in objs)
+
+    @staticmethod
+    def upsert_artists(rows: Iterable[Dict], update_fields: Optional[Sequence[str]] = None) -> Dict[str, int]:
+        """
+        Запись исполнителей по имени.
+
+        Args:
+            rows: Словари с ключом name и полями модели Artist; имена с
+                  одинаковым canonical_key - один исполнитель, побеждает
+                  последняя строка
+            update_fields: Колонки, обновляемые у существующих исполнителей
+                           (None - существующие не меняются)
+
+        Returns:
+            Словарь {имя: id} для каждого переданного имени
+        """
+        by_key = {}
+        name_keys = {}
+        for row in rows:
+            if row.get('name'):
+                name = row['name'][:200]
+                name_keys[name] = canonical_key(name)
+                by_key[name_keys[name]] = {**row, 'name': name}
+        # bulk_create не вызывает Artist.save(), который заполняет ключ
+        objs = [Artist(**row, name_key=key) for key, row in by_key.items()]
+        update_fields = list(update_fields or [])
+
+        written = UpsertService._write(Artist, objs, ['name_key'], update_fields)
+        if not UpsertService._needs_lookup(written, update_fields):
+            ids = {obj.name_key: obj.pk for obj in written}
+        else:
+            ids = {}
+            keys = list(by_key)
+            for start in range(0, len(keys), UpsertService.BATCH_SIZE):
+                chunk = keys[start:start + UpsertService.BATCH_SIZE]
+                ids.update(Artist.objects.filter(name_key__in=chunk).values_list('name_key', 'id'))
+        return {name: ids[key] for name, key in name_keys.items() if key in ids}
+
+    @staticmethod
+    def upsert_tracks(rows: Iterable[Dict], update_fields: Optional[Sequence[str]] = None) -> Dict[TrackKey, int]:
+        """
+        Запись треков по паре (исполнитель, название).
+
+        Args:
+            rows: Словари с ключами artist_id, title и полями модели Track;
+                  названия с одинаковым canonical_key у исполнителя - один
+                  трек, побеждает последняя строка
+            update_fields: Колонки, обновляемые у существующих треков
+                           (None - существующие не меняются)
+
+        Returns:
+            Словарь {(artist_id, название): id} для каждого переданного названия
+        """
+        by_key = {}
+        title_keys = {}
+        for row in rows:
+            if row.get('title'):
+                title = row['title'][:200]
+                key = (row['artist_id'], canonical_key(title))
+                title_keys[(row['artist_id'], title)] = key
+                by_key[key] = {**row, 'title': title}
+        update_fields = list(update_fields or [])
+
+        if update_fields:
+            written = UpsertService._write(Track, UpsertService._track_objs(by_key), ['artist', 'title_key'],
+                                           update_fields)
+            GenreStatsService.refresh_for_artists({artist_id for artist_id, _ in by_key})
+            if not UpsertService._needs_lookup(written, update_fields):
+                ids = {(obj.artist_id, obj.title_key): obj.pk for obj in written}
+            else:
+                ids = UpsertService._track_ids(by_key)
+            if 'tags_json' in update_fields:
+                UpsertService._link_tags(by_key, ids)
+            return {pair: ids[key] for pair, key in title_keys.items() if key in ids}
+
+        # Без обновления вставляются только отсутствующие треки, и
+        # статистика жанров пересчитывается только для их исполнителей
+        ids = UpsertService._track_ids(by_key)
+        missing = {key: row for key, row in by_key.items() if key not in ids}
+        if missing:
+            UpsertService._write(Track, UpsertService._track_objs(missing), ['artist', 'title_key'], update_fields)
+            ids.update(UpsertService._track_ids(missing))
+            GenreStatsService.refresh_for_artists({artist_id for artist_id, _ in missing})
+            UpsertService._link_tags(missing, ids)
+        return {pair: ids[key] for pair, key in title_keys.items() if key in ids}
+
+    @staticmethod
+    def _track_objs(rows: Dict[TrackKey, Dict]) -> List[Track]:
+        """Объекты Track с ключом названия: bulk_create не вызывает Track.save()."""
+        return [Track(**row, title_key=title_key) for (_, title_key), row in rows.items()]
+
+    @staticmethod
+    def _link_tags(rows: Dict[TrackKey, Dict], ids: Dict[TrackKey, int]):
+        """Перенос tags_json записанных треков в TrackTag."""
+        track_tags = {}
+        for key, row in rows.items():
+            if key in ids and row.get('tags_json') is not None:
+                try:
+                    track_tags[ids[key]] = json.loads(row['tags_json'])
+                except (json.JSONDecodeError, TypeError):
+                    track_tags[ids[key]] = []
+        if track_tags:
+            GenreService.link_track_tags(track_tags)
+
+    @staticmethod
+    def _track_ids(keys: Iterable[TrackKey]) -> Dict[TrackKey, int]:
+        """id существующих треков по ключам (artist_id, title_key)."""
+        keys = set(keys)
+        ids = {}
+        key_list = list(keys)
+        for start in range(0, len(key_list), UpsertService.BATCH_SIZE):
+            chunk = key_list[start:start + UpsertService.BATCH_SIZE]
+            tracks = Track.objects.filter(
+                artist_id__in={artist_id for artist_id, _ in chunk},
+                title_key__in={title_key for _, title_key in chunk}
+            ).values_list('artist_id', 'title_key', 'id')
+            ids.update(((artist_id, key), pk) for artist_id, key, pk in tracks if (artist_id, key) in keys)
+        return ids
+
+    @staticmethod
+    def upsert_genres(rows: Iterable[Dict], update_fields: Optional[Sequence[str]] = None) -> Dict[str, int]:
+        """
+        Запись жанров по названию.
+
+        Args:
+            rows: Словари с ключом name и полями модели Genre
+            update_fields: Колонки, обновляемые у существующих жанров
+                           (None - существующие не меняются)
+
+        Returns:
+            Словарь {название: id}
+        """
+        by_name = {}
+        for row in rows:
+            if row.get('name'):
+                row = {**row, 'name': row['name'][:100]}
+                # bulk_create не вызывает Genre.save(), который заполняет тег
+                row.setdefault('lastfm_tag', row['name'].lower())
+                by_name[row['name']] = row
+        objs = [Genre(**row) for row in by_name.values()]
+        update_fields = list(update_fields or [])
+
+        written = UpsertService._write(Genre, objs, ['name'], update_fields)
+        if not UpsertService._needs_lookup(written, update_fields):
+            return {obj.name: obj.pk for obj in written}
+
+        return dict(Genre.objects.filter(name__in=list(by_name)).values_list('name', 'id'))
@@ -13,6 +13,7 @@ from pathlib import Path
 from unittest.mock import patch
 
 from catalog.services.base_service import BaseAPIService
+from catalog.services.cache import MemoryCache
 
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
 
@@ -120,6 +121,30 @@ class TestBaseAPIService(unittest.TestCase):
 
         self.assertIsNone(loaded_data)
 
+    def test_memory_cache_serves_without_disk(self):
+        """Тест: горячий ключ отдаётся из памяти без обращения к файлу."""
+        service = BaseAPIService(cache_dir=self.temp_dir, memory_cache=MemoryCache())
+        test_data = {'test': 'data'}
+
+        service._save_to_cache('test_key', test_data)
+
+        with patch.object(service.storage, 'read') as mock_read:
+            loaded_data = service._load_from_cache('test_key', ttl_days=7)
+
+        mock_read.assert_not_called()
+        self.assertEqual(loaded_data, test_data)
+
+    def test_memory_cache_filled_from_disk(self):
+        """Тест: промах в памяти заполняется из дискового кэша."""
+        BaseAPIService(cache_dir=self.temp_dir)._save_to_cache('test_key', {'test': 'data'})
+
+        memory_cache = MemoryCache()
+        service = BaseAPIService(cache_dir=self.temp_dir, memory_cache=memory_cache)
+
+        self.assertEqual(service._load_from_cache('test_key'), {'test': 'data'})
+        self.assertEqual(service._load_from_cache('test_key'), {'test': 'data'})
+        self.assertEqual(memory_cache.stats()['hits'], 1)
+
     @patch('time.sleep')
     @patch('time.time')
     def test_rate_limit(self, mock_time, mock_sleep):
@@ -0,0 +1,214 @@
+"""
+Тесты для кэша в памяти и хранилищ кэша.
+"""
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+import threading
+import unittest
+import django
+from django.conf import settings
+from unittest.mock import patch
+
+from catalog.services.cache import FileCacheStorage, MemoryCache, SQLiteCacheStorage
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+if not settings.configured:
+    settings.configure(
+        SECRET_KEY='test-secret-key',
+        INSTALLED_APPS=[
+            'django.contrib.contenttypes',
+            'django.contrib.auth',
+            'catalog',
+        ],
+        USE_TZ=True,
+    )
+    django.setup()
+
+
+class TestMemoryCache(unittest.TestCase):
+    """Тесты для MemoryCache."""
+
+    def setUp(self):
+        self.cache = MemoryCache(max_entries=3, max_bytes=100)
+
+    def test_get_miss(self):
+        """Тест: промах для отсутствующего ключа."""
+        self.assertIsNone(self.cache.get('missing', ttl_seconds=60))
+        self.assertEqual(self.cache.stats()['misses'], 1)
+
+    def test_set_and_get(self):
+        """Тест: сохранение и получение данных."""
+        data = {'test': 'data'}
+        self.cache.set('key', data, size=10)
+
+        self.assertEqual(self.cache.get('key', ttl_seconds=60), data)
+        self.assertEqual(self.cache.stats()['hits'], 1)
+
+    def test_hit_does_not_copy_or_decode(self):
+        """Тест: попадание отдаёт сохранённый объект без разбора JSON."""
+        data = {'tags': ['rock']}
+        self.cache.set('key', data, size=10)
+
+        with patch('catalog.services.cache.json.loads') as mock_loads, \
+                patch('catalog.services.cache.json.dumps') as mock_dumps:
+            result = self.cache.get('key', ttl_seconds=60)
+
+        self.assertIs(result, data)
+        mock_loads.assert_not_called()
+        mock_dumps.assert_not_called()
+
+    def test_expired_entry_is_miss(self):
+        """Тест: устаревшая запись удаляется и считается промахом."""
+        with patch('catalog.services.cache.time.time', return_value=1000.0):
+            self.cache.set('key', {'test': 'data'}, size=10)
+
+        with patch('catalog.services.cache.time.time', return_value=1100.0):
+            self.assertIsNone(self.cache.get('key', ttl_seconds=60))
+
+        stats = self.cache.stats()
+        self.assertEqual(stats['expirations'], 1)
+        self.assertEqual(stats['entries'], 0)
+
+    def test_evicts_least_recently_used_by_entries(self):
+        """Тест: вытеснение давно неиспользуемой записи по числу записей."""
+        for key in ('a', 'b', 'c'):
+            self.cache.set(key, {'key': key}, size=10)
+
+        self.cache.get('a', ttl_seconds=60)
+        self.cache.set('d', {'key': 'd'}, size=10)
+
+        self.assertIsNone(self.cache.get('b', ttl_seconds=60))
+        self.assertIsNotNone(self.cache.get('a', ttl_seconds=60))
+        self.assertEqual(self.cache.stats()['evictions'], 1)
+
+    def test_evicts_by_size(self):
+        """Тест: вытеснение по суммарному размеру."""
+        self.cache.set('a', {'key': 'a'}, size=60)
+        self.cache.set('b', {'key': 'b'}, size=60)
+
+        stats = self.cache.stats()
+        self.assertEqual(stats['entries'], 1)
+        self.assertEqual(stats['bytes'], 60)
+        self.assertIsNone(self.cache.get('a', ttl_seconds=60))
+
+    def test_oversized_entry_not_stored(self):
+        """Тест: запись больше лимита не сохраняется."""
+        self.cache.set('big', {'key': 'big'}, size=1000)
+        self.assertEqual(self.cache.stats()['entries'], 0)
+
+    def test_replace_entry_updates_size(self):
+        """Тест: перезапись ключа не удваивает учтённый размер."""
+        self.cache.set('a', {'v': 1}, size=40)
+        self.cache.set('a', {'v': 2}, size=30)
+
+        self.assertEqual(self.cache.stats()['bytes'], 30)
+        self.assertEqual(self.cache.get('a', ttl_seconds=60), {'v': 2})
+
+
+class TestSQLiteCacheStorage(unittest.TestCase):
+    """Тесты для SQLiteCacheStorage."""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.temp_dir, 'cache.sqlite3')
+        self.storage = SQLiteCacheStorage(self.path)
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_write_and_read(self):
+        """Тест: запись читается обратно вместе с размером."""
+        data = {'track': {'name': 'Тест', 'listeners': '100'}}
+
+        size = self.storage.write('key', data, ttl_seconds=60)
+        entry = self.storage.read('key', max_age_seconds=60)
+
+        self.assertIsNotNone(entry)
+        self.assertEqual(entry[0], data)
+        self.assertEqual(entry[2], size)
+
+    def test_payload_is_compressed(self):
+        """Тест: данные хранятся в сжатом виде."""
+        data = {'wiki': 'повтор ' * 1000}
+        size = self.storage.write('key', data, ttl_seconds=60)
+
+        with sqlite3.connect(self.path) as conn:
+            (payload_length,) = conn.execute("SELECT length(payload) FROM api_cache").fetchone()
+
+        self.assertLess(payload_length, size / 10)
+
+    def test_read_too_old(self):
+        """Тест: запись старше max_age не возвращается."""
+        with patch('catalog.services.cache.time.time', return_value=1000.0):
+            self.storage.write('key', {'test': 'data'}, ttl_seconds=60)
+
+        with patch('catalog.services.cache.time.time', return_value=1100.0):
+            self.assertIsNone(self.storage.read('key', max_age_seconds=60))
+            self.assertIsNotNone(self.storage.read('key', max_age_seconds=200))
+
+    def test_purge_expired(self):
+        """Тест: массовое удаление истёкших записей."""
+        with patch('catalog.services.cache.time.time', return_value=1000.0):
+            self.storage.write('short', {'v': 1}, ttl_seconds=10)
+            self.storage.write('long', {'v': 2}, ttl_seconds=1000)
+
+        with patch('catalog.services.cache.time.time', return_value=1100.0):
+            removed = self.storage.purge_expired()
+
+        self.assertEqual(removed, 1)
+        self.assertIsNone(self.storage.read('short', max_age_seconds=10 ** 10))
+        self.assertIsNotNone(self.storage.read('long', max_age_seconds=10 ** 10))
+
+    def test_shared_between_instances(self):
+        """Тест: второй экземпляр (как в другом процессе) видит записи первого."""
+        self.storage.write('key', {'test': 'data'}, ttl_seconds=60)
+        other = SQLiteCacheStorage(self.path)
+
+        self.assertEqual(other.read('key', max_age_seconds=60)[0], {'test': 'data'})
+
+    def test_concurrent_writers(self):
+        """Тест: параллельная запись из нескольких потоков."""
+        def writer(prefix):
+            for i in range(20):
+                self.storage.write(f'{prefix}-{i}', {'i': i}, ttl_seconds=60)
+
+        threads = [threading.Thread(target=writer, args=(n,)) for n in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        with sqlite3.connect(self.path) as conn:
+            (count,) = conn.execute("SELECT count(*) FROM api_cache").fetchone()
+
+        self.assertEqual(count, 80)
+
+
+class TestFileCacheStorage(unittest.TestCase):
+    """Тесты для FileCacheStorage."""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.storage = FileCacheStorage(self.temp_dir, ttl_seconds=60)
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_purge_expired(self):
+        """Тест: удаляются только файлы старше TTL."""
+        self.storage.write('old', {'v': 1}, ttl_seconds=60)
+        self.storage.write('new', {'v': 2}, ttl_seconds=60)
+
+        old_file = os.path.join(self.temp_dir, 'old.json')
+        os.utime(old_file, (0, 0))
+
+        self.assertEqual(self.storage.purge_expired(), 1)
+        self.assertFalse(os.path.exists(old_file))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,164 @@
+"""
+Тесты для избранного в CatalogService.
+"""
+import os
+import sys
+import unittest
+from unittest.mock import MagicMock, patch
+import django
+from django.conf import settings
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+if not settings.configured:
+    settings.configure(
+        SECRET_KEY='test-secret-key',
+        INSTALLED_APPS=[
+            'django.contrib.contenttypes',
+            'django.contrib.auth',
+            'catalog',
+        ],
+        DATABASES={
+            'default': {
+                'ENGINE': 'django.db.backends.sqlite3',
+                'NAME': ':memory:',
+            }
+        },
+        LASTFM_API_KEY='test_api_key',
+        LASTFM_SHARED_SECRET='test_shared_secret',
+        USE_TZ=True,
+    )
+    django.setup()
+
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db import IntegrityError, transaction
+
+from catalog.models import Artist, Favorite, Genre, Track
+from catalog.services.catalog_service import CatalogService
+from catalog.services.lastfm_service import LastFMUnavailable
+
+
+class TestCatalogFavorites(unittest.TestCase):
+    """Тесты для избранного с типизированными ссылками."""
+
+    @classmethod
+    def setUpClass(cls):
+        call_command('migrate', verbosity=0)
+
+    def setUp(self):
+        """Настройка тестового окружения."""
+        Favorite.objects.all().delete()
+        Track.objects.all().delete()
+        Artist.objects.all().delete()
+        Genre.objects.all().delete()
+        User.objects.filter(username='listener').delete()
+        self.user = User.objects.create_user('listener')
+        self.rock = Genre.objects.create(name='Rock')
+        self.jazz = Genre.objects.create(name='Jazz')
+        self.artist = Artist.objects.create(name='Radiohead')
+        self.artist.genres.add(self.rock, self.jazz)
+        self.track = Track.objects.create(title='Creep', artist=self.artist)
+
+    def test_add_to_favorites_inserts_missing_genres(self):
+        """Тест: жанры трека добавляются один раз, повтор считается существующим."""
+        Favorite.objects.create(user=self.user, item_type='genre', genre=self.rock)
+
+        self.assertEqual(CatalogService.add_to_favorites(self.user, self.track), (1, 1))
+        self.assertEqual(CatalogService.add_to_favorites(self.user, self.track), (0, 2))
+        self.assertEqual(
+            set(self.user.favorites.values_list('genre_id', flat=True)),
+            {self.rock.id, self.jazz.id}
+        )
+
+    def test_recommendations_join_favorite_genres(self):
+        """Тест: рекомендации строятся по избранным жанрам одним SQL-соединением."""
+        other = Artist.objects.create(name='Miles Davis')
+        other.genres.add(self.jazz)
+        Favorite.objects.create(user=self.user, item_type='genre', genre=self.jazz)
+        Favorite.objects.create(user=self.user, item_type='track', track=self.track)
+
+        data = CatalogService.get_user_favorites_with_recommendations(self.user)
+
+        self.assertEqual(list(data['favorite_genres']), [self.jazz])
+        self.assertEqual(
+            {artist.name for artist in data['recommendations']['artists']},
+            {'Radiohead', 'Miles Davis'}
+        )
+
+    def test_item_helpers_and_constraints(self):
+        """Тест: item_id и название берутся из FK, FK должен совпадать с типом."""
+        favorite = Favorite.objects.create(user=self.user, item_type='track', track=self.track)
+
+        self.assertEqual(favorite.item_id, self.track.id)
+        self.assertEqual(favorite.get_item_name(), 'Creep')
+        self.assertIs(Favorite.item_model('artist'), Artist)
+        self.assertIsNone(Favorite.item_model('album'))
+
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Favorite.objects.create(user=self.user, item_type='genre', track=self.track)
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Favorite.objects.create(user=self.user, item_type='track', track=self.track)
+
+        self.track.delete()
+        self.assertFalse(Favorite.objects.filter(user=self.user).exists())
+
+
+class TestConfirmedTrack(unittest.TestCase):
+    """Тесты для сохранения трека, подтверждённого Last.fm."""
+
+    @classmethod
+    def setUpClass(cls):
+        call_command('migrate', verbosity=0)
+
+    def setUp(self):
+        """Настройка тестового окружения."""
+        Track.objects.all().delete()
+        Artist.objects.all().delete()
+        Genre.objects.all().delete()
+        self.lastfm = MagicMock()
+        patcher = patch('catalog.services.catalog_service.get_lastfm_service', return_value=self.lastfm)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_not_found_track_is_not_saved(self):
+        """Тест: трек, которого нет в Last.fm, не попадает в каталог."""
+        self.lastfm.get_track_info.return_value = None
+        self.lastfm.is_track_not_found.return_value = True
+
+        self.assertEqual(CatalogService.get_or_create_confirmed_track('Nope', 'Nobody'), (None, False))
+        self.assertFalse(Track.objects.exists())
+        self.assertFalse(Artist.objects.exists())
+
+    def test_unavailable_lastfm_is_not_treated_as_not_found(self):
+        """Тест: без ответа Last.fm трек не сохраняется, а ошибка передаётся вызывающему."""
+        self.lastfm.get_track_info.return_value = None
+        self.lastfm.is_track_not_found.return_value = False
+
+        with self.assertRaises(LastFMUnavailable):
+            CatalogService.get_or_create_confirmed_track('Creep', 'Radiohead')
+        self.assertFalse(Track.objects.exists())
+
+    def test_confirmed_track_saved_with_lastfm_names(self):
+        """Тест: подтверждённый трек сохраняется под именами и с данными Last.fm."""
+        self.lastfm.get_track_info.return_value = {
+            'name': 'Creep', 'artist': 'Radiohead', 'listeners': 100, 'playcount': 1000,
+            'url': 'https://www.last.fm/music/Radiohead/_/Creep', 'tags': ['rock'],
+        }
+
+        track, created = CatalogService.get_or_create_confirmed_track('creep', 'radiohead')
+
+        self.assertTrue(created)
+        self.assertEqual((track.title, track.artist.name), ('Creep', 'Radiohead'))
+        self.assertEqual(track.lastfm_listeners, 100)
+        self.assertEqual(list(track.artist.genres.values_list('name', flat=True)), ['Rock'])
+
+        self.lastfm.reset_mock()
+        again, created = CatalogService.get_or_create_confirmed_track('CREEP', 'RADIOHEAD')
+        self.assertEqual((again.pk, created), (track.pk, False))
+        self.lastfm.get_track_info.assert_not_called()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,193 @@
+"""
+Тесты для объединения одновременных запросов.
+"""
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import unittest
+import django
+from django.conf import settings
+
+from catalog.services.coalescing import SingleFlight, _stripe_path, striped_file_lock, fcntl
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+if not settings.configured:
+    settings.configure(
+        SECRET_KEY='test-secret-key',
+        INSTALLED_APPS=[
+            'django.contrib.contenttypes',
+            'django.contrib.auth',
+            'catalog',
+        ],
+        USE_TZ=True,
+    )
+    django.setup()
+
+
+class TestSingleFlight(unittest.TestCase):
+    """Тесты для SingleFlight."""
+
+    def setUp(self):
+        self.single_flight = SingleFlight()
+
+    def test_concurrent_calls_share_one_execution(self):
+        """Тест: одновременные вызовы с одним ключом выполняются один раз."""
+        calls = []
+        started = threading.Event()
+
+        def fetch():
+            calls.append(1)
+            started.set()
+            time.sleep(0.1)
+            return {'data': 1}
+
+        results = []
+
+        def worker():
+            results.append(self.single_flight.do('key', fetch))
+
+        leader = threading.Thread(target=worker)
+        leader.start()
+        started.wait()
+
+        followers = [threading.Thread(target=worker) for _ in range(5)]
+        for thread in followers:
+            thread.start()
+        for thread in [leader] + followers:
+            thread.join()
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, [{'data': 1}] * 6)
+        self.assertEqual(self.single_flight.stats()['coalesced'], 5)
+
+    def test_error_propagates_to_waiters(self):
+        """Тест: исключение первого вызова получают и ожидающие."""
+        started = threading.Event()
+
+        def fetch():
+            started.set()
+            time.sleep(0.1)
+            raise RuntimeError('upstream down')
+
+        errors = []
+
+        def worker():
+            try:
+                self.single_flight.do('key', fetch)
+            except RuntimeError as e:
+                errors.append(str(e))
+
+        leader = threading.Thread(target=worker)
+        leader.start()
+        started.wait()
+        follower = threading.Thread(target=worker)
+        follower.start()
+        leader.join()
+        follower.join()
+
+        self.assertEqual(errors, ['upstream down', 'upstream down'])
+
+    def test_waiter_runs_fn_after_timeout(self):
+        """Тест: ожидающий не ждет зависший первый вызов дольше timeout."""
+        started = threading.Event()
+        release = threading.Event()
+
+        def stuck():
+            started.set()
+            release.wait(5)
+            return 'leader'
+
+        leader = threading.Thread(target=self.single_flight.do, args=('key', stuck))
+        leader.start()
+        started.wait()
+
+        began = time.monotonic()
+        try:
+            result = self.single_flight.do('key', lambda: 'own', timeout=0.1)
+            elapsed = time.monotonic() - began
+        finally:
+            release.set()
+            leader.join()
+
+        self.assertEqual(result, 'own')
+        self.assertLess(elapsed, 1)
+        self.assertEqual(self.single_flight.stats()['timed_out'], 1)
+
+    def test_sequential_calls_execute_again(self):
+        """Тест: после завершения вызова ключ освобождается."""
+        self.single_flight.do('key', lambda: 1)
+        self.single_flight.do('key', lambda: 2)
+
+        self.assertEqual(
+            self.single_flight.stats(),
+            {'executed': 2, 'coalesced': 0, 'timed_out': 0, 'in_flight': 0}
+        )
+
+
+@unittest.skipIf(fcntl is None, 'fcntl недоступен')
+class TestStripedFileLock(unittest.TestCase):
+    """Тесты для striped_file_lock."""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_uncontended_lock_does_not_wait(self):
+        """Тест: свободная блокировка берётся без ожидания."""
+        with striped_file_lock(self.temp_dir, 'key', timeout=1) as waited:
+            self.assertFalse(waited)
+
+    def test_contended_lock_waits(self):
+        """Тест: второй владелец ждёт, пока полосу держит другой процесс."""
+        # Отдельное открытие файла с flock ведёт себя как другой процесс
+        path = _stripe_path(self.temp_dir, 'key', 4096)
+        fd = os.open(path, os.O_CREAT | os.O_RDWR, 0o644)
+        fcntl.flock(fd, fcntl.LOCK_EX)
+
+        def release():
+            fcntl.flock(fd, fcntl.LOCK_UN)
+            os.close(fd)
+
+        threading.Timer(0.1, release).start()
+        with striped_file_lock(self.temp_dir, 'key', timeout=2) as waited:
+            self.assertTrue(waited)
+
+    def test_threads_of_one_process_do_not_wait(self):
+        """Тест: разные ключи одной полосы в потоках процесса не ждут друг друга."""
+        holding = threading.Event()
+        release = threading.Event()
+
+        def holder():
+            with striped_file_lock(self.temp_dir, 'key-1', timeout=1, stripes=1):
+                holding.set()
+                release.wait()
+
+        thread = threading.Thread(target=holder)
+        thread.start()
+        holding.wait()
+
+        started = time.monotonic()
+        with striped_file_lock(self.temp_dir, 'key-2', timeout=2, stripes=1) as waited:
+            self.assertFalse(waited)
+        self.assertLess(time.monotonic() - started, 0.5)
+
+        release.set()
+        thread.join()
+
+    def test_lock_files_are_bounded(self):
+        """Тест: число файлов блокировок не превышает число полос."""
+        for i in range(50):
+            with striped_file_lock(self.temp_dir, f'key-{i}', timeout=1, stripes=4):
+                pass
+
+        self.assertLessEqual(len(os.listdir(self.temp_dir)), 4)
+
+
+if __name__ == '__main__':
+    unittest.main()
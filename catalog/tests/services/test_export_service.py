@@ -0,0 +1,121 @@
+"""
+Тесты для потоковой выгрузки каталога.
+"""
+import csv
+import io
+import json
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from datetime import timedelta
+import django
+from django.conf import settings
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+if not settings.configured:
+    settings.configure(
+        SECRET_KEY='test-secret-key',
+        INSTALLED_APPS=[
+            'django.contrib.contenttypes',
+            'django.contrib.auth',
+            'catalog',
+        ],
+        DATABASES={
+            'default': {
+                'ENGINE': 'django.db.backends.sqlite3',
+                'NAME': ':memory:',
+            }
+        },
+        LASTFM_API_KEY='test_api_key',
+        LASTFM_SHARED_SECRET='test_shared_secret',
+        USE_TZ=True,
+    )
+    django.setup()
+
+from django.core.management import call_command
+from django.utils import timezone
+
+from catalog.models import Artist, Genre, Track
+from catalog.services.export_service import ExportService
+
+
+class TestExportService(unittest.TestCase):
+    """Тесты для ExportService."""
+
+    @classmethod
+    def setUpClass(cls):
+        call_command('migrate', verbosity=0)
+
+    def setUp(self):
+        """Настройка тестового окружения."""
+        Track.objects.all().delete()
+        Artist.objects.all().delete()
+        Genre.objects.all().delete()
+        self.genre = Genre.objects.create(name='Trip-Hop')
+        self.artist = Artist.objects.create(name='Portishead', lastfm_listeners=100)
+        self.artist.genres.add(self.genre)
+        self.track = Track.objects.create(title='Glory Box', artist=self.artist, lastfm_data={'big': 'blob'})
+
+    def test_jsonl_contains_all_entities(self):
+        """Тест: JSONL содержит все сущности с типом и без сырого ответа Last.fm."""
+        lines = [json.loads(line) for line in ExportService.iter_jsonl(ExportService.ENTITIES)]
+
+        self.assertEqual([line['type'] for line in lines], ['genres', 'artists', 'tracks', 'artist_genres'])
+        track = lines[2]
+        self.assertEqual(track['artist_id'], self.artist.id)
+        self.assertNotIn('lastfm_data', track)
+        self.assertEqual(lines[3], {'type': 'artist_genres', 'artist_id': self.artist.id, 'genre_id': self.genre.id})
+
+    def test_export_is_lazy(self):
+        """Тест: выгрузка - генератор, запросы выполняются только при чтении."""
+        lines = ExportService.iter_jsonl(['tracks'])
+
+        Track.objects.create(title='Roads', artist=self.artist)
+
+        self.assertEqual(len(list(lines)), 2)
+
+    def test_csv_has_header_and_iso_dates(self):
+        """Тест: CSV начинается с заголовка, даты в ISO 8601."""
+        rows = list(csv.DictReader(io.StringIO(''.join(ExportService.iter_csv('artists')))))
+
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(rows[0]['name'], 'Portishead')
+        self.assertEqual(rows[0]['lastfm_listeners'], '100')
+        self.assertIn('T', rows[0]['created_at'])
+
+    def test_since_filters_by_updated_at(self):
+        """Тест: инкрементальная выгрузка берёт только изменённые строки, связи - все."""
+        old = timezone.now() - timedelta(days=2)
+        Track.objects.filter(pk=self.track.pk).update(updated_at=old)
+        Artist.objects.filter(pk=self.artist.pk).update(updated_at=old)
+        Track.objects.create(title='Roads', artist=self.artist)
+
+        since = ExportService.parse_since((timezone.now() - timedelta(days=1)).date().isoformat())
+        lines = [json.loads(line) for line in ExportService.iter_jsonl(['artists', 'tracks', 'artist_genres'], since)]
+
+        self.assertEqual([(line['type'], line.get('title')) for line in lines],
+                         [('tracks', 'Roads'), ('artist_genres', None)])
+
+    def test_parse_since_rejects_garbage(self):
+        """Тест: некорректная дата вызывает ValueError."""
+        with self.assertRaises(ValueError):
+            ExportService.parse_since('yesterday')
+
+    def test_command_writes_csv_per_entity(self):
+        """Тест: команда пишет по CSV-файлу на сущность."""
+        output = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, output)
+
+        call_command('export_catalog', format='csv', entity=['genres', 'tracks'], output=output,
+                     stderr=io.StringIO())
+
+        self.assertEqual(sorted(os.listdir(output)), ['genres.csv', 'tracks.csv'])
+        with open(os.path.join(output, 'tracks.csv'), encoding='utf-8') as f:
+            self.assertEqual(len(f.readlines()), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,146 @@
+"""
+Тесты для пакетного сопоставления тегов с жанрами.
+"""
+import os
+import sys
+import unittest
+import django
+from django.conf import settings
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+if not settings.configured:
+    settings.configure(
+        SECRET_KEY='test-secret-key',
+        INSTALLED_APPS=[
+            'django.contrib.contenttypes',
+            'django.contrib.auth',
+            'catalog',
+        ],
+        DATABASES={
+            'default': {
+                'ENGINE': 'django.db.backends.sqlite3',
+                'NAME': ':memory:',
+            }
+        },
+        LASTFM_API_KEY='test_api_key',
+        LASTFM_SHARED_SECRET='test_shared_secret',
+        USE_TZ=True,
+    )
+    django.setup()
+
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from catalog.models import Artist, Genre, Track, TrackTag
+from catalog.services.genre_service import GenreService
+from catalog.services.upsert_service import UpsertService
+
+
+class TestGenreService(unittest.TestCase):
+    """Тесты для GenreService."""
+
+    @classmethod
+    def setUpClass(cls):
+        call_command('migrate', verbosity=0)
+
+    def setUp(self):
+        """Настройка тестового окружения."""
+        Track.objects.all().delete()
+        Artist.objects.all().delete()
+        Genre.objects.all().delete()
+        self.artist = Artist.objects.create(name='Radiohead')
+
+    def test_resolve_reuses_and_creates(self):
+        """Тест: существующие жанры переиспользуются, недостающие создаются."""
+        rock = Genre.objects.create(name='Rock')
+
+        genre_ids = GenreService.resolve(['rock', 'Alternative', 'alternative', '', '  '])
+
+        self.assertEqual(set(genre_ids), {'Rock', 'Alternative'})
+        self.assertEqual(genre_ids['Rock'], rock.id)
+        alternative = Genre.objects.get(name='Alternative')
+        self.assertEqual(alternative.lastfm_tag, 'alternative')
+        self.assertEqual(Genre.objects.count(), 2)
+
+    def test_link_inserts_only_missing_rows(self):
+        """Тест: связи добавляются только недостающие, счетчики верны."""
+        rock = Genre.objects.create(name='Rock')
+        self.artist.genres.add(rock)
+
+        result = GenreService.link_tags(self.artist.id, ['rock', 'electronic', 'experimental'])
+
+        self.assertEqual(result, {'genres_created': 2, 'links_created': 2})
+        self.assertEqual(
+            set(self.artist.genres.values_list('name', flat=True)),
+            {'Rock', 'Electronic', 'Experimental'}
+        )
+        self.assertEqual(GenreService.link_tags(self.artist.id, ['rock', 'electronic']),
+                         {'genres_created': 0, 'links_created': 0})
+
+    def test_query_count_does_not_grow_with_tags(self):
+        """Тест: число запросов не зависит от количества тегов."""
+        other = Artist.objects.create(name='Portishead')
+        tags = [f'tag {i}' for i in range(20)]
+
+        with CaptureQueriesContext(connection) as queries:
+            GenreService.link_artist_genres({self.artist.id: tags, other.id: tags[:10]})
+
+        # 5 запросов на связи и 4 на статистику жанров (два разных приращения)
+        self.assertEqual(len(self._statements(queries)), 9)
+        self.assertEqual(other.genres.count(), 10)
+
+        with CaptureQueriesContext(connection) as queries:
+            GenreService.link_artist_genres({self.artist.id: tags, other.id: tags})
+
+        self.assertEqual(len(self._statements(queries)), 6)
+        self.assertEqual(other.genres.count(), 20)
+
+    @staticmethod
+    def _statements(queries):
+        return [query for query in queries.captured_queries if query['sql'] not in ('BEGIN', 'COMMIT')]
+
+    def test_track_link_genres_from_tags(self):
+        """Тест: Track.link_genres_from_tags берёт первые пять тегов."""
+        track = Track.objects.create(title='Creep', artist=self.artist)
+        track.tags = ['alternative', 'rock', 'grunge', '90s', 'britpop', 'indie']
+
+        track.link_genres_from_tags()
+
+        self.assertEqual(self.artist.genres.count(), GenreService.GENRES_PER_ENTITY)
+        self.assertFalse(self.artist.genres.filter(name='Indie').exists())
+        self.assertEqual(track.tag_genres.count(), GenreService.GENRES_PER_ENTITY)
+
+    def _track_tags(self, track):
+        return list(TrackTag.objects.filter(track=track).order_by('rank').values_list('genre__name', 'rank', 'weight'))
+
+    def test_link_track_tags_replaces_set(self):
+        """Тест: набор тегов трека заменяется, позиция и вес пересчитываются."""
+        track = Track.objects.create(title='Creep', artist=self.artist)
+
+        GenreService.link_track_tags({track.id: ['rock', 'alternative', 'Rock']})
+        self.assertEqual(self._track_tags(track), [('Rock', 1, 100), ('Alternative', 2, 50)])
+
+        result = GenreService.link_track_tags({track.id: [{'name': 'grunge', 'count': 40}, {'name': 'rock', 'count': 100}]})
+        self.assertEqual(self._track_tags(track), [('Grunge', 1, 40), ('Rock', 2, 100)])
+        self.assertEqual(result, {'genres_created': 1, 'tags_written': 2, 'tags_deleted': 1})
+
+        GenreService.link_track_tags({track.id: []})
+        self.assertEqual(self._track_tags(track), [])
+
+    def test_upsert_tracks_writes_track_tags(self):
+        """Тест: пакетная запись треков заполняет TrackTag, запрос по жанру идет по связи."""
+        rows = [
+            {'artist_id': self.artist.id, 'title': 'Creep', **UpsertService.track_stats({'tags': ['rock', 'indie rock']})},
+            {'artist_id': self.artist.id, 'title': 'Airbag', **UpsertService.track_stats({'tags': ['indie rock']})},
+        ]
+        UpsertService.upsert_tracks(rows, UpsertService.TRACK_STATS_FIELDS)
+
+        rock = Genre.objects.get(name='Rock')
+        self.assertEqual(list(rock.tagged_tracks.values_list('title', flat=True)), ['Creep'])
+        self.assertEqual(Genre.objects.get(name='Indie Rock').tagged_tracks.count(), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
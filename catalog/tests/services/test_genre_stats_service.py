@@ -0,0 +1,189 @@
+"""
+Тесты для предрассчитанной статистики жанров.
+"""
+import os
+import sys
+import unittest
+import django
+from django.conf import settings
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+if not settings.configured:
+    settings.configure(
+        SECRET_KEY='test-secret-key',
+        INSTALLED_APPS=[
+            'django.contrib.contenttypes',
+            'django.contrib.auth',
+            'catalog',
+        ],
+        DATABASES={
+            'default': {
+                'ENGINE': 'django.db.backends.sqlite3',
+                'NAME': ':memory:',
+            }
+        },
+        LASTFM_API_KEY='test_api_key',
+        LASTFM_SHARED_SECRET='test_shared_secret',
+        USE_TZ=True,
+    )
+    django.setup()
+
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import call_command
+from django.db.models import Count, Sum
+from django.db.models.functions import Coalesce
+from django.test.utils import override_settings
+
+from catalog.models import Artist, Genre, GenreStats, Track
+from catalog.services.catalog_service import CatalogService
+from catalog.services.genre_service import GenreService
+from catalog.services.genre_stats_service import GenreStatsService
+from catalog.services.upsert_service import UpsertService
+
+
+class TestGenreStatsService(unittest.TestCase):
+    """Тесты для GenreStatsService и сигналов статистики."""
+
+    @classmethod
+    def setUpClass(cls):
+        call_command('migrate', verbosity=0)
+
+    def setUp(self):
+        """Настройка тестового окружения."""
+        Track.objects.all().delete()
+        Artist.objects.all().delete()
+        Genre.objects.all().delete()
+        self.rock = Genre.objects.create(name='Rock')
+        self.jazz = Genre.objects.create(name='Jazz')
+        self.artist = Artist.objects.create(name='Radiohead')
+        self.other = Artist.objects.create(name='Miles Davis')
+
+    def _stats(self):
+        return {
+            genre_id: (tracks, artists, playcount)
+            for genre_id, tracks, artists, playcount in GenreStats.objects.values_list(
+                'genre_id', 'track_count', 'artist_count', 'total_playcount'
+            )
+            if tracks or artists or playcount
+        }
+
+    def _expected(self):
+        rows = Genre.objects.annotate(
+            track_total=Count('artists__tracks', distinct=True),
+            artist_total=Count('artists', distinct=True),
+            playcount_total=Coalesce(Sum('artists__tracks__lastfm_playcount'), 0)
+        ).values_list('pk', 'track_total', 'artist_total', 'playcount_total')
+        return {row[0]: tuple(row[1:]) for row in rows if any(row[1:])}
+
+    def test_track_signals_apply_deltas(self):
+        """Тест: создание, изменение, перенос и удаление трека меняют статистику."""
+        self.artist.genres.add(self.rock)
+        self.other.genres.add(self.jazz)
+
+        track = Track.objects.create(title='Creep', artist=self.artist, lastfm_playcount=100)
+        self.assertEqual(self._stats(), {self.rock.id: (1, 1, 100), self.jazz.id: (0, 1, 0)})
+
+        track.lastfm_playcount = 150
+        track.save()
+        self.assertEqual(self._stats(), self._expected())
+
+        track = Track.objects.get(pk=track.pk)
+        track.artist = self.other
+        track.save()
+        self.assertEqual(self._stats(), {self.rock.id: (0, 1, 0), self.jazz.id: (1, 1, 150)})
+
+        track.delete()
+        self.assertEqual(self._stats(), self._expected())
+
+    def test_deferred_playcount_falls_back_to_refresh(self):
+        """Тест: сохранение трека с отложенным полем пересчитывает жанры."""
+        self.artist.genres.add(self.rock)
+        Track.objects.create(title='Creep', artist=self.artist, lastfm_playcount=100)
+
+        track = Track.objects.only('id', 'artist_id', 'title').get(title='Creep')
+        track.lastfm_playcount = 300
+        track.save()
+
+        self.assertEqual(self._stats(), {self.rock.id: (1, 1, 300)})
+
+    def test_m2m_signals_forward_and_reverse(self):
+        """Тест: add, remove и clear с обеих сторон связи."""
+        Track.objects.create(title='Creep', artist=self.artist, lastfm_playcount=10)
+        Track.objects.create(title='So What', artist=self.other, lastfm_playcount=20)
+
+        self.artist.genres.add(self.rock, self.jazz)
+        self.jazz.artists.add(self.other)
+        self.assertEqual(self._stats(), {self.rock.id: (1, 1, 10), self.jazz.id: (2, 2, 30)})
+
+        self.artist.genres.remove(self.jazz, self.jazz)
+        self.jazz.artists.remove(self.artist)
+        self.assertEqual(self._stats(), self._expected())
+
+        self.jazz.artists.clear()
+        self.artist.genres.clear()
+        self.assertEqual(self._stats(), {})
+
+    def test_artist_delete_cascades(self):
+        """Тест: удаление исполнителя вычитает его и его треки ровно один раз."""
+        self.artist.genres.add(self.rock)
+        self.other.genres.add(self.rock)
+        Track.objects.create(title='Creep', artist=self.artist, lastfm_playcount=10)
+        Track.objects.create(title='So What', artist=self.other, lastfm_playcount=20)
+
+        self.artist.delete()
+
+        self.assertEqual(self._stats(), {self.rock.id: (1, 1, 20)})
+
+    def test_bulk_paths_keep_stats_current(self):
+        """Тест: пакетная запись треков и связей обновляет статистику."""
+        GenreService.link_tags(self.artist.id, ['rock', 'indie'])
+        UpsertService.upsert_tracks(
+            [{'artist_id': self.artist.id, 'title': title, 'lastfm_playcount': 5} for title in ('A', 'B')],
+            ['lastfm_playcount']
+        )
+        UpsertService.upsert_tracks([{'artist_id': self.artist.id, 'title': 'C'}])
+        GenreService.link_tags(self.other.id, ['rock'])
+
+        self.assertEqual(self._stats(), self._expected())
+        self.assertEqual(self._stats()[self.rock.id], (3, 2, 10))
+
+    def test_rebuild_and_reads(self):
+        """Тест: полный пересчет исправляет расхождение, страница жанров читает таблицу."""
+        self.artist.genres.add(self.rock)
+        Track.objects.create(title='Creep', artist=self.artist, lastfm_playcount=100)
+        GenreStats.objects.update(track_count=999)
+
+        self.assertEqual(GenreStatsService.rebuild(), 2)
+
+        self.assertEqual(self._stats(), self._expected())
+        top = CatalogService.get_genre_statistics(limit=1)[0]
+        self.assertEqual((top.name, top.annotated_track_count, top.total_playcount), ('Rock', 1, 100))
+
+    def test_backends_return_same_rows(self):
+        """Тест: live и table дают одинаковую статистику, matview вне PostgreSQL читает таблицу."""
+        self.artist.genres.add(self.rock, self.jazz)
+        Track.objects.create(title='Creep', artist=self.artist, lastfm_playcount=100)
+        Track.objects.create(title='Karma Police', artist=self.artist, lastfm_playcount=50)
+
+        def rows(backend):
+            return list(GenreStatsService.annotate_genres(backend=backend).order_by('name').values_list(
+                'name', 'annotated_track_count', 'annotated_artist_count', 'total_playcount'
+            ))
+
+        self.assertEqual(rows('live'), rows('table'))
+        self.assertEqual(rows('table'), [('Jazz', 2, 1, 150), ('Rock', 2, 1, 150)])
+
+        with override_settings(GENRE_STATS_BACKEND='matview'):
+            self.assertEqual(GenreStatsService.backend(), 'table')
+        self.assertFalse(GenreStatsService.refresh_leaderboard())
+
+    def test_unknown_backend_is_rejected(self):
+        """Тест: неизвестное значение GENRE_STATS_BACKEND - ошибка конфигурации."""
+        with override_settings(GENRE_STATS_BACKEND='redis'):
+            with self.assertRaises(ImproperlyConfigured):
+                CatalogService.get_genre_statistics()
+
+
+if __name__ == '__main__':
+    unittest.main()
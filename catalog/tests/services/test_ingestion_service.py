@@ -0,0 +1,235 @@
+"""
+Тесты для сервиса массового импорта.
+"""
+import json
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+import django
+from django.conf import settings
+from unittest.mock import Mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+if not settings.configured:
+    settings.configure(
+        SECRET_KEY='test-secret-key',
+        INSTALLED_APPS=[
+            'django.contrib.contenttypes',
+            'django.contrib.auth',
+            'catalog',
+        ],
+        DATABASES={
+            'default': {
+                'ENGINE': 'django.db.backends.sqlite3',
+                'NAME': ':memory:',
+            }
+        },
+        LASTFM_API_KEY='test_api_key',
+        LASTFM_SHARED_SECRET='test_shared_secret',
+        USE_TZ=True,
+    )
+    django.setup()
+
+from django.core.management import call_command
+
+from catalog.models import Artist, Genre, Track
+from catalog.services.ingestion_service import IngestionService
+from catalog.services.lastfm_service import LastFMUnavailable
+
+
+def fake_lastfm(missing=(), errors=()):
+    """Клиент Last.fm, отвечающий без сети: missing - не найдены, errors - ошибка запроса."""
+    def get_track_info_many(keys):
+        for artist, track in keys:
+            if track in missing or track in errors:
+                yield (artist, track), None
+            else:
+                yield (artist, track), {
+                    'name': track,
+                    'artist': artist,
+                    'url': f'https://www.last.fm/music/{artist}',
+                    'listeners': 10,
+                    'playcount': 100,
+                    'duration': 200,
+                    'album': '',
+                    'tags': ['rock', 'indie'],
+                    'image': '',
+                }
+
+    lastfm = Mock()
+    lastfm.get_track_info_many.side_effect = get_track_info_many
+    lastfm.is_track_not_found.side_effect = lambda artist, track: track in missing
+    return lastfm
+
+
+class TestReadChunks(unittest.TestCase):
+    """Тесты для чтения входных файлов."""
+
+    def setUp(self):
+        """Настройка тестового окружения."""
+        self.temp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        """Очистка после тестов."""
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def _write(self, name, content):
+        path = os.path.join(self.temp_dir, name)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(content)
+        return path
+
+    def test_csv_with_header(self):
+        """Тест: CSV с заголовком в любом порядке колонок."""
+        path = self._write('tracks.csv', 'track,artist\nYellow,Coldplay\nCreep,Radiohead\nHello,Adele\n')
+
+        chunks = list(IngestionService.read_chunks(path, chunk_size=2))
+
+        self.assertEqual(chunks, [[('Coldplay', 'Yellow'), ('Radiohead', 'Creep')], [('Adele', 'Hello')]])
+
+    def test_csv_without_header_and_skip(self):
+        """Тест: CSV без заголовка и пропуск уже обработанных строк."""
+        path = self._write('tracks.csv', 'Coldplay,Yellow\nRadiohead,Creep\nAdele,Hello\n')
+
+        chunks = list(IngestionService.read_chunks(path, chunk_size=10, skip=2))
+
+        self.assertEqual(chunks, [[('Adele', 'Hello')]])
+
+    def test_jsonl_with_bad_lines(self):
+        """Тест: JSONL с битой строкой сохраняет нумерацию строк."""
+        path = self._write('tracks.jsonl', '{"artist": "Coldplay", "track": "Yellow"}\nnot json\n'
+                                           '{"artist": "Adele", "title": "Hello"}\n')
+
+        rows = [row for chunk in IngestionService.read_chunks(path) for row in chunk]
+
+        self.assertEqual(rows, [('Coldplay', 'Yellow'), ('', ''), ('Adele', 'Hello')])
+
+
+class TestIngestion(unittest.TestCase):
+    """Тесты для записи порций в базу."""
+
+    @classmethod
+    def setUpClass(cls):
+        call_command('migrate', verbosity=0)
+
+    def setUp(self):
+        """Настройка тестового окружения."""
+        Track.objects.all().delete()
+        Artist.objects.all().delete()
+        Genre.objects.all().delete()
+        self.temp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        """Очистка после тестов."""
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_ingest_chunk_creates_catalog(self):
+        """Тест: артисты, треки, жанры и связи создаются пакетно."""
+        stats = IngestionService.ingest_chunk(
+            [('Coldplay', 'Yellow'), ('Coldplay', 'Clocks'), ('Nobody', 'Missing'), ('', '')],
+            fake_lastfm(missing={'Missing'})
+        )
+
+        self.assertEqual(stats['skipped'], 1)
+        self.assertEqual(stats['not_found'], 1)
+        self.assertEqual(stats['artists_created'], 1)
+        self.assertEqual(stats['tracks_created'], 2)
+        self.assertEqual(Track.objects.count(), 2)
+        self.assertEqual(Track.objects.get(title='Yellow').tags, ['rock', 'indie'])
+        self.assertEqual(
+            set(Artist.objects.get(name='Coldplay').genres.values_list('name', flat=True)),
+            {'Rock', 'Indie'}
+        )
+
+    def test_ingest_chunk_is_idempotent(self):
+        """Тест: повторный импорт обновляет треки, а не создаёт дубли."""
+        Artist.objects.create(name='Coldplay')
+
+        IngestionService.ingest_chunk([('Coldplay', 'Yellow')], fake_lastfm())
+        stats = IngestionService.ingest_chunk([('Coldplay', 'Yellow')], fake_lastfm())
+
+        self.assertEqual(stats['artists_created'], 0)
+        self.assertEqual(stats['tracks_created'], 0)
+        self.assertEqual(stats['tracks_updated'], 1)
+        self.assertEqual(Artist.objects.count(), 1)
+        self.assertEqual(Track.objects.count(), 1)
+        self.assertEqual(Genre.objects.count(), 2)
+
+    def test_import_file_resumes_from_checkpoint(self):
+        """Тест: импорт продолжается с сохранённой строки."""
+        path = os.path.join(self.temp_dir, 'tracks.csv')
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write('artist,track\n' + ''.join(f'Artist {i},Song {i}\n' for i in range(5)))
+        checkpoint_path = os.path.join(self.temp_dir, 'checkpoint.json')
+        IngestionService.save_checkpoint(
+            checkpoint_path, {'source': os.path.abspath(path), 'rows_done': 3, 'stats': {'rows': 3}}
+        )
+
+        progress = Mock()
+        stats = IngestionService.import_file(path, fake_lastfm(), chunk_size=1,
+                                             checkpoint_path=checkpoint_path, progress=progress)
+
+        self.assertEqual(stats['rows_done'], 5)
+        self.assertEqual(stats['rows'], 5)
+        self.assertEqual(stats['tracks_created'], 2)
+        self.assertEqual(progress.call_count, 2)
+        self.assertEqual(set(Track.objects.values_list('title', flat=True)), {'Song 3', 'Song 4'})
+        with open(checkpoint_path, encoding='utf-8') as f:
+            self.assertEqual(json.load(f)['rows_done'], 5)
+
+    def test_import_stops_before_checkpoint_when_lastfm_unavailable(self):
+        """Тест: при недоступном Last.fm прогресс не сдвигается за порцию."""
+        path = os.path.join(self.temp_dir, 'tracks.csv')
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write('artist,track\n' + ''.join(f'Artist {i},Song {i}\n' for i in range(4)))
+        checkpoint_path = os.path.join(self.temp_dir, 'checkpoint.json')
+        lastfm = fake_lastfm()
+        available = lastfm.get_track_info_many.side_effect
+
+        def get_track_info_many(keys):
+            if ('Artist 2', 'Song 2') in keys:
+                raise LastFMUnavailable('HTTP error 503')
+            return available(keys)
+
+        lastfm.get_track_info_many.side_effect = get_track_info_many
+
+        with self.assertRaises(LastFMUnavailable):
+            IngestionService.import_file(path, lastfm, chunk_size=2, checkpoint_path=checkpoint_path)
+
+        self.assertEqual(set(Track.objects.values_list('title', flat=True)), {'Song 0', 'Song 1'})
+        with open(checkpoint_path, encoding='utf-8') as f:
+            self.assertEqual(json.load(f)['rows_done'], 2)
+
+        lastfm.get_track_info_many.side_effect = available
+        stats = IngestionService.import_file(path, lastfm, chunk_size=2, checkpoint_path=checkpoint_path)
+
+        self.assertEqual(stats['rows_done'], 4)
+        self.assertEqual(stats['not_found'], 0)
+        self.assertEqual(Track.objects.count(), 4)
+
+    def test_error_answer_is_not_counted_as_not_found(self):
+        """Тест: пустой ответ из-за ошибки Last.fm останавливает импорт, а не теряет строки."""
+        path = os.path.join(self.temp_dir, 'tracks.csv')
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write('artist,track\nArtist 0,Song 0\nArtist 1,Broken\nArtist 2,Missing\n')
+        checkpoint_path = os.path.join(self.temp_dir, 'checkpoint.json')
+
+        with self.assertRaises(LastFMUnavailable):
+            IngestionService.import_file(path, fake_lastfm(missing={'Missing'}, errors={'Broken'}),
+                                         chunk_size=1, checkpoint_path=checkpoint_path)
+
+        with open(checkpoint_path, encoding='utf-8') as f:
+            self.assertEqual(json.load(f)['rows_done'], 1)
+
+        stats = IngestionService.import_file(path, fake_lastfm(missing={'Missing'}),
+                                             chunk_size=1, checkpoint_path=checkpoint_path)
+
+        self.assertEqual(stats['not_found'], 1)
+        self.assertEqual(set(Track.objects.values_list('title', flat=True)), {'Song 0', 'Broken'})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,193 @@
+"""
+Тесты для очереди задач обогащения.
+"""
+import os
+import sys
+import unittest
+from datetime import timedelta
+from unittest.mock import Mock
+import django
+from django.conf import settings
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+if not settings.configured:
+    settings.configure(
+        SECRET_KEY='test-secret-key',
+        INSTALLED_APPS=[
+            'django.contrib.contenttypes',
+            'django.contrib.auth',
+            'catalog',
+        ],
+        DATABASES={
+            'default': {
+                'ENGINE': 'django.db.backends.sqlite3',
+                'NAME': ':memory:',
+            }
+        },
+        LASTFM_API_KEY='test_api_key',
+        LASTFM_SHARED_SECRET='test_shared_secret',
+        USE_TZ=True,
+    )
+    django.setup()
+
+from django.core.management import call_command
+from django.test.utils import override_settings
+from django.utils import timezone
+
+from catalog.models import Artist, EnrichmentJob, Genre, Track
+from catalog.services.job_queue import JobQueueService
+from catalog.services.lastfm_service import LastFMUnavailable
+
+
+class TestJobQueue(unittest.TestCase):
+    """Тесты для JobQueueService."""
+
+    @classmethod
+    def setUpClass(cls):
+        call_command('migrate', verbosity=0)
+
+    def setUp(self):
+        """Настройка тестового окружения."""
+        EnrichmentJob.objects.all().delete()
+        Track.objects.all().delete()
+        Artist.objects.all().delete()
+        Genre.objects.all().delete()
+        self.artist = Artist.objects.create(name='Coldplay')
+        self.track = Track.objects.create(title='Yellow', artist=self.artist)
+
+    def test_enqueue_dedupes_and_raises_priority(self):
+        """Тест: повторная постановка не создаёт дубль и повышает приоритет."""
+        first, created = JobQueueService.enqueue_track(self.track.pk, priority=JobQueueService.PRIORITY_BACKGROUND)
+        second, created_again = JobQueueService.enqueue_track(
+            self.track.pk, priority=JobQueueService.PRIORITY_INTERACTIVE
+        )
+
+        self.assertTrue(created)
+        self.assertFalse(created_again)
+        self.assertEqual(first.pk, second.pk)
+        self.assertEqual(EnrichmentJob.objects.count(), 1)
+        self.assertEqual(EnrichmentJob.objects.get().priority, JobQueueService.PRIORITY_INTERACTIVE)
+
+    def test_enqueue_after_done_creates_new_job(self):
+        """Тест: после выполнения задачи по ключу можно поставить новую."""
+        job, _ = JobQueueService.enqueue_track(self.track.pk)
+        JobQueueService.complete(job)
+
+        _, created = JobQueueService.enqueue_track(self.track.pk)
+
+        self.assertTrue(created)
+        self.assertEqual(EnrichmentJob.objects.count(), 2)
+
+    def test_claim_respects_priority_and_run_after(self):
+        """Тест: захватываются готовые задачи в порядке приоритета, без повторов."""
+        other = Track.objects.create(title='Clocks', artist=self.artist)
+        low, _ = JobQueueService.enqueue_track(self.track.pk, priority=JobQueueService.PRIORITY_BACKGROUND)
+        high, _ = JobQueueService.enqueue_track(other.pk, priority=JobQueueService.PRIORITY_INTERACTIVE)
+        later, _ = JobQueueService.enqueue_artist(self.artist.pk, priority=100)
+        EnrichmentJob.objects.filter(pk=later.pk).update(run_after=timezone.now() + timedelta(hours=1))
+
+        claimed = JobQueueService.claim('worker-1', limit=5)
+
+        self.assertEqual([job.pk for job in claimed], [high.pk, low.pk])
+        self.assertTrue(all(job.status == EnrichmentJob.STATUS_RUNNING for job in claimed))
+        self.assertTrue(all(job.attempts == 1 for job in claimed))
+        self.assertEqual(JobQueueService.claim('worker-2', limit=5), [])
+
+    def test_run_enriches_track_and_enqueues_artist(self):
+        """Тест: задача трека сохраняет данные Last.fm и ставит задачу исполнителя."""
+        lastfm = Mock()
+        lastfm.get_track_info.return_value = {
+            'name': 'Yellow', 'artist': 'Coldplay', 'url': 'https://www.last.fm/music/Coldplay/_/Yellow',
+            'listeners': 100, 'playcount': 1000, 'duration': 266, 'album': 'Parachutes',
+            'tags': ['rock', 'britpop'], 'image': '',
+        }
+        JobQueueService.enqueue_track(self.track.pk)
+        job = JobQueueService.claim('worker-1')[0]
+
+        self.assertTrue(JobQueueService.run(job, lastfm))
+
+        self.track.refresh_from_db()
+        self.assertEqual(self.track.lastfm_playcount, 1000)
+        self.assertEqual(self.track.album, 'Parachutes')
+        self.assertEqual(set(self.artist.genres.values_list('name', flat=True)), {'Rock', 'Britpop'})
+        self.assertEqual(EnrichmentJob.objects.get(pk=job.pk).status, EnrichmentJob.STATUS_DONE)
+        self.assertTrue(JobQueueService.is_pending(JobQueueService.artist_key(self.artist.pk)))
+
+    def test_not_found_track_is_not_enqueued_again(self):
+        """Тест: трек, которого нет в Last.fm, помечается проверенным и не требует задач."""
+        lastfm = Mock()
+        lastfm.get_track_info.return_value = None
+        lastfm.is_track_not_found.return_value = True
+        self.assertTrue(self.track.needs_enrichment())
+        JobQueueService.enqueue_track(self.track.pk)
+        job = JobQueueService.claim('worker-1')[0]
+
+        self.assertTrue(JobQueueService.run(job, lastfm))
+
+        self.track.refresh_from_db()
+        self.assertIsNotNone(self.track.lastfm_synced_at)
+        self.assertFalse(self.track.needs_enrichment())
+        self.assertEqual(EnrichmentJob.objects.get(pk=job.pk).last_error, 'Не найден в Last.fm')
+
+    def test_empty_answer_without_not_found_is_retried(self):
+        """Тест: None из-за ошибки Last.fm (не код 6) не помечает трек проверенным, задача повторяется."""
+        lastfm = Mock()
+        lastfm.get_track_info.return_value = None
+        lastfm.is_track_not_found.return_value = False
+        JobQueueService.enqueue_track(self.track.pk)
+        job = JobQueueService.claim('worker-1')[0]
+
+        self.assertFalse(JobQueueService.run(job, lastfm))
+
+        job.refresh_from_db()
+        self.track.refresh_from_db()
+        self.assertEqual(job.status, EnrichmentJob.STATUS_PENDING)
+        self.assertIn('LastFMUnavailable', job.last_error)
+        self.assertIsNone(self.track.lastfm_synced_at)
+        self.assertTrue(self.track.needs_enrichment())
+
+    def test_failure_retries_with_backoff_then_fails(self):
+        """Тест: ошибка откладывает задачу, после последней попытки - статус failed."""
+        lastfm = Mock()
+        lastfm.get_track_info.side_effect = LastFMUnavailable('HTTP error 503')
+        job, _ = JobQueueService.enqueue_track(self.track.pk)
+        EnrichmentJob.objects.filter(pk=job.pk).update(max_attempts=2)
+
+        job = JobQueueService.claim('worker-1')[0]
+        self.assertFalse(JobQueueService.run(job, lastfm))
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, EnrichmentJob.STATUS_PENDING)
+        self.assertGreater(job.run_after, timezone.now())
+        self.assertIn('HTTP error 503', job.last_error)
+        self.assertEqual(JobQueueService.claim('worker-1'), [])
+
+        EnrichmentJob.objects.filter(pk=job.pk).update(run_after=timezone.now())
+        job = JobQueueService.claim('worker-1')[0]
+        JobQueueService.run(job, lastfm)
+
+        self.assertEqual(EnrichmentJob.objects.get(pk=job.pk).status, EnrichmentJob.STATUS_FAILED)
+
+    def test_retry_delay_grows_and_is_capped(self):
+        """Тест: задержка растёт экспоненциально и ограничена сверху."""
+        with override_settings(JOB_RETRY_BACKOFF=10, JOB_RETRY_BACKOFF_MAX=100):
+            self.assertTrue(5 <= JobQueueService.retry_delay(1) <= 10)
+            self.assertTrue(20 <= JobQueueService.retry_delay(3) <= 40)
+            self.assertTrue(50 <= JobQueueService.retry_delay(10) <= 100)
+
+    def test_reclaim_stale(self):
+        """Тест: задачи зависшего воркера возвращаются в очередь."""
+        job, _ = JobQueueService.enqueue_track(self.track.pk)
+        JobQueueService.claim('worker-1')
+        EnrichmentJob.objects.filter(pk=job.pk).update(locked_at=timezone.now() - timedelta(hours=1))
+
+        self.assertEqual(JobQueueService.reclaim_stale(lease_seconds=60), 1)
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, EnrichmentJob.STATUS_PENDING)
+        self.assertEqual(job.locked_by, '')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,243 @@
+"""
+Тесты для асинхронного клиента Last.fm.
+"""
+import asyncio
+import os
+import shutil
+import sys
+import tempfile
+import time
+import unittest
+import django
+from django.conf import settings
+
+import httpx
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+if not settings.configured:
+    settings.configure(
+        SECRET_KEY='test-secret-key',
+        INSTALLED_APPS=[
+            'django.contrib.contenttypes',
+            'django.contrib.auth',
+            'catalog',
+        ],
+        DATABASES={
+            'default': {
+                'ENGINE': 'django.db.backends.sqlite3',
+                'NAME': ':memory:',
+            }
+        },
+        LASTFM_API_KEY='test_api_key',
+        LASTFM_SHARED_SECRET='test_shared_secret',
+        USE_TZ=True,
+    )
+    django.setup()
+
+from asgiref.sync import async_to_sync
+
+from catalog.services.lastfm_async import (
+    AsyncLastFMService, aclose_async_lastfm_services, async_lastfm_service, get_async_lastfm_service
+)
+from catalog.services.lastfm_service import LastFMDeadlineExceeded, LastFMService
+from catalog.services.resilience import CircuitBreaker, deadline
+
+TRACK_INFO = {
+    'track': {
+        'name': 'Song',
+        'artist': {'name': 'Artist'},
+        'listeners': '100',
+        'playcount': '1000',
+        'url': 'https://www.last.fm/music/Artist/_/Song',
+        'toptags': {'tag': [{'name': 'rock'}]},
+    }
+}
+
+
+class TestAsyncLastFMService(unittest.TestCase):
+    """Тесты для AsyncLastFMService."""
+
+    def setUp(self):
+        """Настройка тестового окружения."""
+        self.temp_dir = tempfile.mkdtemp()
+        self.client = LastFMService(cache_dir=self.temp_dir)
+        self.client.circuit_breaker = CircuitBreaker()
+        self.requests = []
+
+    def tearDown(self):
+        """Очистка после тестов."""
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def _service(self, responses):
+        """Клиент, получающий ответы из списка вместо сети."""
+        service = AsyncLastFMService(self.client, max_concurrency=4)
+        service.backoff = 0
+
+        async def handler(request):
+            self.requests.append(request)
+            await asyncio.sleep(0.01)
+            status, payload = responses[min(len(self.requests), len(responses)) - 1]
+            return httpx.Response(status, json=payload)
+
+        service.http = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        return service
+
+    def test_get_track_info(self):
+        """Тест: разбор ответа и сохранение в кэш."""
+        service = self._service([(200, TRACK_INFO)])
+
+        async def scenario():
+            first = await service.get_track_info('Artist', 'Song')
+            second = await service.get_track_info('Artist', 'Song')
+            await service.aclose()
+            return first, second
+
+        first, second = asyncio.run(scenario())
+
+        self.assertEqual(first['name'], 'Song')
+        self.assertEqual(first['tags'], ['rock'])
+        self.assertEqual(first, second)
+        self.assertEqual(len(self.requests), 1)
+
+    def test_concurrent_requests_coalesced(self):
+        """Тест: одновременные одинаковые запросы выполняются один раз."""
+        service = self._service([(200, TRACK_INFO)])
+
+        async def scenario():
+            results = await asyncio.gather(*[
+                service.get_track_info('Artist', 'Song') for _ in range(5)
+            ])
+            await service.aclose()
+            return results
+
+        results = asyncio.run(scenario())
+
+        self.assertEqual(len(self.requests), 1)
+        self.assertTrue(all(result['name'] == 'Song' for result in results))
+
+    def test_coalesced_waiter_respects_caller_deadline(self):
+        """Тест: вызов, ждущий чужой запрос с тем же ключом, не ждет дольше своего бюджета."""
+        service = self._service([(200, TRACK_INFO)])
+        cache_key = self.client._get_cache_key('track.getInfo', {'artist': 'Artist', 'track': 'Song'})
+        params = {'artist': 'Artist', 'track': 'Song'}
+
+        async def scenario():
+            release = asyncio.Event()
+            original_fetch = service._fetch
+
+            async def slow_fetch(*args, **kwargs):
+                await release.wait()
+                return await original_fetch(*args, **kwargs)
+
+            service._fetch = slow_fetch
+            asyncio.get_running_loop().call_later(3, release.set)
+            leader = asyncio.ensure_future(service._fetch_coalesced(cache_key, 'track.getInfo', params))
+            await asyncio.sleep(0)
+
+            service._fetch = original_fetch
+            began = time.monotonic()
+            try:
+                with deadline(0.2), self.assertRaises(LastFMDeadlineExceeded):
+                    await service._fetch_coalesced(cache_key, 'track.getInfo', params)
+                elapsed = time.monotonic() - began
+            finally:
+                release.set()
+                await leader
+                await service.aclose()
+            return elapsed
+
+        self.assertLess(asyncio.run(scenario()), 2)
+        self.assertEqual(len(self.requests), 1)
+
+    def test_retry_after_server_error(self):
+        """Тест: повтор запроса после ответа 503."""
+        service = self._service([(503, {}), (200, TRACK_INFO)])
+
+        async def scenario():
+            result = await service.get_track_info('Artist', 'Song')
+            await service.aclose()
+            return result
+
+        result = asyncio.run(scenario())
+
+        self.assertEqual(result['name'], 'Song')
+        self.assertEqual(len(self.requests), 2)
+
+    def test_rate_limited_answer_not_retried(self):
+        """Тест: 429 не повторяется в обход ограничителя частоты."""
+        service = self._service([(429, {}), (200, TRACK_INFO)])
+
+        async def scenario():
+            result = await service.get_track_info('Artist', 'Song')
+            await service.aclose()
+            return result
+
+        self.assertIsNone(asyncio.run(scenario()))
+        self.assertEqual(len(self.requests), 1)
+
+    def test_unavailable_returns_none(self):
+        """Тест: недоступный Last.fm дает None, а не исключение."""
+        service = self._service([(503, {})])
+
+        async def scenario():
+            result = await service.get_track_info('Artist', 'Song')
+            await service.aclose()
+            return result
+
+        self.assertIsNone(asyncio.run(scenario()))
+        self.assertEqual(len(self.requests), service.retries + 1)
+
+    def test_registry_per_event_loop(self):
+        """Тест: один общий клиент на цикл событий, aclose_async_lastfm_services его закрывает."""
+        async def scenario():
+            first = get_async_lastfm_service(self.temp_dir)
+            second = get_async_lastfm_service(self.temp_dir)
+            await aclose_async_lastfm_services()
+            return first, second
+
+        first, second = asyncio.run(scenario())
+        self.assertIs(first, second)
+        self.assertTrue(first.http.is_closed)
+
+    def test_client_closed_after_call_without_lifespan(self):
+        """Тест: в цикле без lifespan (async_to_sync под WSGI) клиент закрывается после вызова."""
+        async def scenario():
+            async with async_lastfm_service(self.temp_dir) as client:
+                self.assertFalse(client.http.is_closed)
+            return client
+
+        first = async_to_sync(scenario)()
+        second = async_to_sync(scenario)()
+
+        self.assertIsNot(first, second)
+        self.assertTrue(first.http.is_closed)
+        self.assertTrue(second.http.is_closed)
+
+    def test_lifespan_shutdown_closes_shared_client(self):
+        """Тест: под ASGI клиент общий для запросов и закрывается при lifespan.shutdown."""
+        from genrefy_project.asgi import application
+
+        async def scenario():
+            inbox, outbox = asyncio.Queue(), asyncio.Queue()
+            server = asyncio.ensure_future(application({'type': 'lifespan'}, inbox.get, outbox.put))
+
+            await inbox.put({'type': 'lifespan.startup'})
+            self.assertEqual((await outbox.get())['type'], 'lifespan.startup.complete')
+
+            async with async_lastfm_service(self.temp_dir) as first:
+                pass
+            async with async_lastfm_service(self.temp_dir) as second:
+                pass
+            self.assertIs(first, second)
+            self.assertFalse(first.http.is_closed)
+
+            await inbox.put({'type': 'lifespan.shutdown'})
+            self.assertEqual((await outbox.get())['type'], 'lifespan.shutdown.complete')
+            await server
+            return first
+
+        self.assertTrue(asyncio.run(scenario()).http.is_closed)
+
+if __name__ == '__main__':
+    unittest.main()
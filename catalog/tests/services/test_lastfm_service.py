@@ -2,14 +2,22 @@
 Тесты для сервиса Last.fm.
 """
 import os
+import sqlite3
 import sys
 import tempfile
+import threading
+import time
 import unittest
 import django
 from django.conf import settings
 from unittest.mock import patch, Mock
 
-from catalog.services.lastfm_service import LastFMService
+import requests
+
+from catalog.services.lastfm_service import (
+    LastFMDeadlineExceeded, LastFMService, LastFMUnavailable, get_lastfm_service
+)
+from catalog.services.resilience import CircuitBreaker, deadline
 
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
 
@@ -41,6 +49,7 @@ class TestLastFMService(unittest.TestCase):
         """Настройка тестового окружения."""
         self.temp_dir = tempfile.mkdtemp()
         self.service = LastFMService(cache_dir=self.temp_dir)
+        self.service.circuit_breaker = CircuitBreaker()
 
     def tearDown(self):
         """Очистка после тестов."""
@@ -84,7 +93,7 @@ class TestLastFMService(unittest.TestCase):
         cached_data = {'cached': 'data'}
         mock_load_cache.return_value = cached_data
 
-        with patch('requests.get') as mock_get:
+        with patch('requests.Session.get') as mock_get:
             result = self.service._make_request('test.method', {})
 
             self.assertEqual(result, cached_data)
@@ -92,7 +101,7 @@ class TestLastFMService(unittest.TestCase):
 
     @patch('catalog.services.lastfm_service.BaseAPIService._load_from_cache')
     @patch('catalog.services.lastfm_service.BaseAPIService._save_to_cache')
-    @patch('catalog.services.lastfm_service.requests.get')
+    @patch('catalog.services.lastfm_service.requests.Session.get')
     def test_make_request_success(self, mock_get, mock_save_cache, mock_load_cache):
         """Тест: успешный HTTP запрос."""
         mock_load_cache.return_value = None
@@ -108,6 +117,333 @@ class TestLastFMService(unittest.TestCase):
         mock_get.assert_called_once()
         mock_save_cache.assert_called_once()
 
+    @patch('catalog.services.lastfm_service.LastFMService._schedule_refresh')
+    @patch('catalog.services.lastfm_service.LastFMService._fetch')
+    def test_make_request_stale_while_revalidate(self, mock_fetch, mock_schedule):
+        """Тест: недавно устаревший ответ отдаётся сразу с фоновым обновлением."""
+        with patch.object(self.service, '_load_from_cache', return_value=None), \
+                patch.object(self.service, '_load_stale_from_cache', return_value=({'stale': True}, 7.5 * 86400)):
+            result = self.service._make_request('test.method', {})
+
+        self.assertEqual(result, {'stale': True})
+        mock_schedule.assert_called_once()
+        mock_fetch.assert_not_called()
+
+    @patch('catalog.services.lastfm_service.LastFMService._fetch')
+    def test_make_request_serves_stale_on_error(self, mock_fetch):
+        """Тест: при недоступности Last.fm отдаётся устаревший ответ."""
+        mock_fetch.side_effect = LastFMUnavailable('HTTP error 503')
+
+        with patch.object(self.service, '_load_from_cache', return_value=None), \
+                patch.object(self.service, '_load_stale_from_cache', return_value=({'stale': True}, 20 * 86400)):
+            result = self.service._make_request('test.method', {})
+
+        self.assertEqual(result, {'stale': True})
+        mock_fetch.assert_called_once()
+
+    @patch('catalog.services.lastfm_service.LastFMService._fetch')
+    def test_make_request_error_without_stale(self, mock_fetch):
+        """Тест: без устаревшей записи ошибка Last.fm даёт None."""
+        mock_fetch.side_effect = LastFMUnavailable('timeout')
+
+        with patch.object(self.service, '_load_from_cache', return_value=None), \
+                patch.object(self.service, '_load_stale_from_cache', return_value=None):
+            self.assertIsNone(self.service._make_request('test.method', {}))
+
+    @patch('catalog.services.lastfm_service.requests.Session.get')
+    def test_fetch_server_error_is_unavailable(self, mock_get):
+        """Тест: ответ 5xx считается временной недоступностью."""
+        mock_get.return_value = Mock(status_code=503)
+
+        with self.assertRaises(LastFMUnavailable):
+            self.service._fetch('key', 'test.method', {})
+
+    @patch('catalog.services.lastfm_service.requests.Session.get')
+    def test_not_found_is_cached_negatively(self, mock_get):
+        """Тест: ответ "не найдено" кэшируется и не запрашивается повторно."""
+        mock_response = Mock(status_code=200)
+        mock_response.json.return_value = {'error': 6, 'message': 'Artist not found'}
+        mock_get.return_value = mock_response
+
+        params = {'artist': 'Нет такого артиста'}
+        self.assertIsNone(self.service._make_request('artist.getInfo', params))
+        self.assertIsNone(self.service._make_request('artist.getInfo', params))
+
+        mock_get.assert_called_once()
+
+    @patch('catalog.services.lastfm_service.requests.Session.get')
+    def test_expired_negative_entry_is_refetched(self, mock_get):
+        """Тест: истёкшая отрицательная запись не мешает новому запросу."""
+        mock_response = Mock(status_code=200)
+        mock_response.json.return_value = {'artist': {'name': 'Found'}}
+        mock_get.return_value = mock_response
+
+        cache_key = self.service._get_cache_key('artist.getInfo', {'artist': 'Found'})
+        self.service._save_negative(cache_key, {'error': 6}, ttl_seconds=-1)
+
+        result = self.service._make_request('artist.getInfo', {'artist': 'Found'})
+
+        self.assertEqual(result, {'artist': {'name': 'Found'}})
+        mock_get.assert_called_once()
+
+    def test_cache_ttl_per_method_with_jitter(self):
+        """Тест: TTL зависит от метода, разброс детерминирован и ограничен."""
+        keys = [self.service._get_cache_key('chart.getTopTags', {'limit': i}) for i in range(50)]
+        ttls = [self.service._cache_ttl('chart.getTopTags', key) for key in keys]
+        base = LastFMService.CACHE_TTL['chart.getTopTags']
+
+        self.assertTrue(all(base * 0.9 <= ttl <= base * 1.1 for ttl in ttls))
+        self.assertGreater(len(set(ttls)), 1)
+        self.assertEqual(ttls[0], self.service._cache_ttl('chart.getTopTags', keys[0]))
+        self.assertLess(max(ttls), self.service._cache_ttl('artist.getInfo', keys[0]))
+
+    @patch('catalog.services.lastfm_service.requests.Session.get')
+    def test_rate_limited_request_is_not_cached(self, mock_get):
+        """Тест: без токена лимита запрос не выполняется и не кэшируется как ошибка."""
+        with patch.object(self.service.rate_limiter, 'acquire', return_value=False):
+            self.assertIsNone(self.service._make_request('artist.getInfo', {'artist': 'Queen'}))
+
+        mock_get.assert_not_called()
+        cache_key = self.service._get_cache_key('artist.getInfo', {'artist': 'Queen'})
+        self.assertIsNone(self.service.storage.read(cache_key, max_age_seconds=60))
+
+    @patch('catalog.services.lastfm_service.requests.Session.get')
+    def test_get_artist_info_many_fetches_only_misses(self, mock_get):
+        """Тест: пакетный запрос берёт из кэша попадания и запрашивает только промахи."""
+        def response(url, params, timeout):
+            mock_response = Mock(status_code=200)
+            mock_response.json.return_value = {'artist': {'name': params['artist']}}
+            return mock_response
+
+        mock_get.side_effect = response
+
+        cached_key = self.service._get_cache_key('artist.getInfo', {'artist': 'Queen', 'autocorrect': 1})
+        self.service._save_to_cache(cached_key, {'artist': {'name': 'Queen'}})
+
+        results = dict(self.service.get_artist_info_many(['Queen', 'Madonna', 'Adele', 'Madonna']))
+
+        self.assertEqual(set(results), {'Queen', 'Madonna', 'Adele'})
+        self.assertEqual(results['Adele']['name'], 'Adele')
+        self.assertEqual(mock_get.call_count, 2)
+        requested = {call.kwargs['params']['artist'] for call in mock_get.call_args_list}
+        self.assertEqual(requested, {'Madonna', 'Adele'})
+
+    @patch.object(LastFMService, '_fetch')
+    def test_get_track_info_many_yields_cache_hits_first(self, mock_fetch):
+        """Тест: попадания в кэш отдаются до завершения сетевых запросов."""
+        mock_fetch.return_value = None
+
+        cached_key = self.service._get_cache_key(
+            'track.getInfo', {'artist': 'Queen', 'track': 'Bohemian Rhapsody', 'autocorrect': 1}
+        )
+        self.service._save_to_cache(cached_key, {'track': {'name': 'Bohemian Rhapsody', 'artist': {'name': 'Queen'}}})
+
+        results = list(self.service.get_track_info_many([
+            ('Nirvana', 'Creep'),
+            ('Queen', 'Bohemian Rhapsody'),
+        ]))
+
+        self.assertEqual(results[0][0], ('Queen', 'Bohemian Rhapsody'))
+        self.assertEqual(results[0][1]['name'], 'Bohemian Rhapsody')
+        self.assertEqual(results[1], (('Nirvana', 'Creep'), None))
+        self.assertEqual(mock_fetch.call_args.args[4], self.service.batch_rate_limit_wait)
+
+    @patch.object(LastFMService, '_fetch')
+    def test_get_track_info_many_max_age_refetches_and_raises(self, mock_fetch):
+        """Тест: с max_age старый ответ кэша запрашивается заново, ошибка пробрасывается."""
+        params = {'artist': 'Queen', 'track': 'Bohemian Rhapsody', 'autocorrect': 1}
+        self.service._save_to_cache(
+            self.service._get_cache_key('track.getInfo', params),
+            {'track': {'name': 'Bohemian Rhapsody', 'artist': {'name': 'Queen'}}}
+        )
+        mock_fetch.side_effect = LastFMUnavailable('HTTP error 503')
+        self.service.raise_unavailable = True
+
+        self.assertEqual(len(list(self.service.get_track_info_many([('Queen', 'Bohemian Rhapsody')]))), 1)
+        with self.assertRaises(LastFMUnavailable):
+            list(self.service.get_track_info_many([('Queen', 'Bohemian Rhapsody')], max_age=0))
+
+        self.assertEqual(mock_fetch.call_count, 1)
+
+    @patch('catalog.services.lastfm_service.requests.Session.get')
+    def test_circuit_opens_after_failures(self, mock_get):
+        """Тест: после серии ошибок Last.fm не вызывается, отказ не кэшируется."""
+        mock_get.return_value = Mock(status_code=503)
+        self.service.circuit_breaker = CircuitBreaker(min_calls=2, window=2)
+
+        for i in range(2):
+            self.assertIsNone(self.service._make_request('artist.getInfo', {'artist': f'A{i}'}))
+
+        self.assertIsNone(self.service._make_request('artist.getInfo', {'artist': 'Queen'}))
+
+        self.assertEqual(mock_get.call_count, 2)
+        cache_key = self.service._get_cache_key('artist.getInfo', {'artist': 'Queen'})
+        self.assertIsNone(self.service.storage.read(cache_key, max_age_seconds=60))
+
+    @patch('catalog.services.lastfm_service.requests.Session.get')
+    def test_deadline_exceeded_serves_stale(self, mock_get):
+        """Тест: при исчерпанном бюджете отдаются устаревшие данные без запроса."""
+        params = {'artist': 'Queen'}
+
+        with patch.object(self.service, '_load_fresh', return_value=(False, None)), \
+                patch.object(self.service, '_load_stale_from_cache',
+                             return_value=({'artist': {'name': 'Queen'}}, 10 ** 8)), \
+                deadline(-1):
+            result = self.service._make_request('artist.getInfo', params)
+
+        self.assertEqual(result, {'artist': {'name': 'Queen'}})
+        mock_get.assert_not_called()
+
+    @patch('catalog.services.lastfm_service.requests.Session.get')
+    def test_not_found_is_distinguished_from_errors(self, mock_get):
+        """Тест: только ошибка API 6 считается "не найдено", прочие None - нет."""
+        mock_get.side_effect = [
+            Mock(status_code=200, json=Mock(return_value={'error': 6, 'message': 'Track not found'})),
+            Mock(status_code=200, json=Mock(return_value={'error': 10, 'message': 'Invalid API key'})),
+            Mock(status_code=400, text='Bad request'),
+        ]
+
+        self.assertIsNone(self.service.get_track_info('Queen', 'Missing'))
+        self.assertTrue(self.service.is_track_not_found('Queen', 'Missing'))
+
+        self.assertIsNone(self.service.get_track_info('Queen', 'Error'))
+        self.assertFalse(self.service.is_track_not_found('Queen', 'Error'))
+
+        self.assertIsNone(self.service.get_artist_info('Queen'))
+        self.assertFalse(self.service.is_artist_not_found('Queen'))
+        self.assertFalse(self.service.is_track_not_found('Queen', 'Never requested'))
+
+    @patch('catalog.services.lastfm_service.requests.Session.get')
+    def test_budget_timeout_does_not_trip_breaker(self, mock_get):
+        """Тест: таймаут, урезанный бюджетом вызывающего кода, не считается ошибкой Last.fm."""
+        mock_get.side_effect = requests.exceptions.ReadTimeout('read timed out')
+        self.service.circuit_breaker = CircuitBreaker(min_calls=1, window=1)
+
+        with deadline(1), self.assertRaises(LastFMDeadlineExceeded):
+            self.service._fetch('key', 'artist.getInfo', {'artist': 'Queen'})
+
+        self.assertEqual(self.service.circuit_breaker.stats()['calls'], 0)
+        self.assertEqual(self.service.circuit_breaker.state, CircuitBreaker.CLOSED)
+
+        with self.assertRaises(LastFMUnavailable):
+            self.service._fetch('key', 'artist.getInfo', {'artist': 'Queen'})
+        self.assertEqual(self.service.circuit_breaker.state, CircuitBreaker.OPEN)
+
+    @patch('catalog.services.lastfm_service.requests.Session.get')
+    def test_local_error_releases_half_open_probe(self, mock_get):
+        """Тест: ошибка кэша во время пробного вызова не оставляет выключатель в half_open навсегда."""
+        mock_get.return_value = Mock(status_code=200, json=Mock(return_value={'artist': {'name': 'Queen'}}))
+        breaker = CircuitBreaker(min_calls=1, window=1, open_seconds=0)
+        breaker.record_failure()
+        self.service.circuit_breaker = breaker
+        cache_key = self.service._get_cache_key('artist.getInfo', {'artist': 'Queen'})
+
+        with patch.object(self.service, '_save_to_cache', side_effect=sqlite3.OperationalError('locked')), \
+                self.assertRaises(sqlite3.OperationalError):
+            self.service._fetch(cache_key, 'artist.getInfo', {'artist': 'Queen'})
+
+        self.assertEqual(self.service._fetch(cache_key, 'artist.getInfo', {'artist': 'Queen'}),
+                         {'artist': {'name': 'Queen'}})
+        self.assertEqual(breaker.state, CircuitBreaker.CLOSED)
+
+    @patch('catalog.services.lastfm_service.requests.Session.get')
+    def test_coalesced_waiter_respects_caller_deadline(self, mock_get):
+        """Тест: поток, ждущий чужой запрос с тем же ключом, не ждет дольше своего бюджета."""
+        started = threading.Event()
+        release = threading.Event()
+
+        def slow_get(*args, **kwargs):
+            started.set()
+            release.wait(5)
+            return Mock(status_code=200, json=Mock(return_value={'artist': {'name': 'Queen'}}))
+
+        mock_get.side_effect = slow_get
+        cache_key = self.service._get_cache_key('artist.getInfo', {'artist': 'Queen'})
+        leader = threading.Thread(
+            target=self.service._fetch_coalesced, args=(cache_key, 'artist.getInfo', {'artist': 'Queen'})
+        )
+        leader.start()
+        started.wait(5)
+
+        began = time.monotonic()
+        try:
+            with deadline(0.2), self.assertRaises(LastFMDeadlineExceeded):
+                self.service._fetch_coalesced(cache_key, 'artist.getInfo', {'artist': 'Queen'})
+            elapsed = time.monotonic() - began
+        finally:
+            release.set()
+            leader.join()
+
+        self.assertLess(elapsed, 2)
+        self.assertEqual(mock_get.call_count, 1)
+
+    @patch('catalog.services.lastfm_service.requests.Session.get')
+    def test_batch_requests_respect_caller_deadline(self, mock_get):
+        """Тест: потоки пакетного запроса соблюдают бюджет времени вызывающего кода."""
+        with deadline(-1):
+            results = dict(self.service.get_artist_info_many(['Queen', 'Adele']))
+
+        self.assertEqual(results, {'Queen': None, 'Adele': None})
+        mock_get.assert_not_called()
+
+    def test_iter_top_tags_walks_pages(self):
+        """Тест: итератор проходит все страницы и останавливается на последней."""
+        def response(method, params):
+            page = params.get('page', 1)
+            return {'tags': {
+                'tag': [{'name': f'tag{page}-{i}'} for i in range(2)],
+                '@attr': {'page': str(page), 'totalPages': '3'},
+            }}
+
+        with patch.object(self.service, '_make_request', side_effect=response) as mock_request:
+            names = [tag['name'] for tag in self.service.iter_top_tags(page_size=2)]
+
+        self.assertEqual(names, ['tag1-0', 'tag1-1', 'tag2-0', 'tag2-1', 'tag3-0', 'tag3-1'])
+        self.assertEqual(mock_request.call_count, 3)
+        self.assertNotIn('page', mock_request.call_args_list[0].args[1])
+
+    def test_iter_search_track_stops_early(self):
+        """Тест: при раннем выходе лишние страницы не запрашиваются."""
+        def response(method, params):
+            page = params.get('page', 1)
+            return {'results': {
+                'trackmatches': {'track': [
+                    {'name': f'Song {page}-{i}', 'artist': 'Artist'} for i in range(10)
+                ]},
+                'opensearch:totalResults': '1000',
+                'opensearch:itemsPerPage': '10',
+            }}
+
+        with patch.object(self.service, '_make_request', side_effect=response) as mock_request:
+            tracks = list(self.service.iter_search_track('Song', page_size=10, max_items=5))
+
+        self.assertEqual(len(tracks), 5)
+        self.assertLessEqual(mock_request.call_count, 2)
+
+    def test_total_pages(self):
+        """Тест: количество страниц из @attr и из opensearch-полей."""
+        self.assertEqual(LastFMService._total_pages({'tracks': {'@attr': {'totalPages': '7'}}}, 'tracks'), 7)
+        self.assertEqual(LastFMService._total_pages({'results': {
+            'opensearch:totalResults': '21', 'opensearch:itemsPerPage': '10'
+        }}, 'results'), 3)
+        self.assertEqual(LastFMService._total_pages(None, 'tags'), 0)
+
+    def test_get_lastfm_service_is_shared(self):
+        """Тест: реестр возвращает один клиент с общей сессией."""
+        client = get_lastfm_service(self.temp_dir)
+
+        self.assertIs(get_lastfm_service(self.temp_dir), client)
+        self.assertIs(client.session, self.service.session)
+
+    def test_session_retries_server_errors(self):
+        """Тест: сессия повторяет GET после 5xx, но не после 429."""
+        retry = self.service.session.get_adapter(self.service.base_url).max_retries
+
+        self.assertGreater(retry.total, 0)
+        self.assertNotIn(429, retry.status_forcelist)
+        self.assertIn(503, retry.status_forcelist)
+        self.assertGreater(retry.backoff_jitter, 0)
+
     def test_parse_track_search_result_valid(self):
         """Тест: парсинг валидного результата поиска трека."""
         track_data = {
@@ -191,6 +527,25 @@ class TestLastFMService(unittest.TestCase):
         result = self.service._get_image_url(images)
         self.assertEqual(result, 'http://valid.jpg')
 
+    def test_parse_recent_tracks_skips_now_playing(self):
+        """Тест: играющий сейчас трек пропускается, одиночный элемент-объект разбирается."""
+        now_playing = {'name': 'Live', 'artist': {'#text': 'Band'}, '@attr': {'nowplaying': 'true'}}
+        scrobble = {
+            'name': 'Song',
+            'artist': {'#text': 'Band'},
+            'album': {'#text': 'Album'},
+            'date': {'uts': '1600000000', '#text': '13 Sep 2020, 12:26'}
+        }
+
+        result = self.service._parse_recent_tracks_response(
+            {'recenttracks': {'track': [now_playing, scrobble]}}
+        )
+        single = self.service._parse_recent_tracks_response({'recenttracks': {'track': scrobble}})
+
+        expected = [{'name': 'Song', 'artist': 'Band', 'album': 'Album', 'timestamp': 1600000000}]
+        self.assertEqual(result, expected)
+        self.assertEqual(single, expected)
+
 
 if __name__ == '__main__':
     unittest.main()
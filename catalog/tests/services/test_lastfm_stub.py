@@ -0,0 +1,151 @@
+"""
+Тесты для локальной замены Last.fm API.
+"""
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+import django
+from django.conf import settings
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+if not settings.configured:
+    settings.configure(
+        SECRET_KEY='test-secret-key',
+        INSTALLED_APPS=[
+            'django.contrib.contenttypes',
+            'django.contrib.auth',
+            'catalog',
+        ],
+        DATABASES={
+            'default': {
+                'ENGINE': 'django.db.backends.sqlite3',
+                'NAME': ':memory:',
+            }
+        },
+        LASTFM_API_KEY='test_api_key',
+        LASTFM_SHARED_SECRET='test_shared_secret',
+        USE_TZ=True,
+    )
+    django.setup()
+
+from catalog.services.http import build_session
+from catalog.services.lastfm_service import LastFMService, LastFMUnavailable
+from catalog.services.lastfm_stub import LastFMStubServer, StubConfig, SyntheticLastFM, recording_key
+from catalog.services.resilience import CircuitBreaker
+
+
+class TestSyntheticLastFM(unittest.TestCase):
+    """Тесты для синтетических ответов."""
+
+    def test_responses_are_deterministic(self):
+        """Тест: одинаковые параметры дают одинаковый ответ."""
+        synthetic = SyntheticLastFM(StubConfig())
+        params = {'method': 'artist.getInfo', 'artist': 'Queen'}
+
+        self.assertEqual(synthetic.respond(params), synthetic.respond(dict(params)))
+
+    def test_pagination_and_payload_size(self):
+        """Тест: размер страницы, последняя страница и размер биографии."""
+        synthetic = SyntheticLastFM(StubConfig(total_items=25, bio_bytes=5000))
+
+        status, body = synthetic.respond({'method': 'tag.getTopTracks', 'tag': 'rock', 'limit': '10', 'page': '3'})
+        self.assertEqual(status, 200)
+        self.assertEqual(len(body['tracks']['track']), 5)
+        self.assertEqual(body['tracks']['@attr']['totalPages'], '3')
+
+        _, body = synthetic.respond({'method': 'artist.getInfo', 'artist': 'Queen'})
+        self.assertGreaterEqual(len(body['artist']['bio']['content'].encode()), 5000)
+
+    def test_recording_key_ignores_credentials(self):
+        """Тест: ключ API и подпись не влияют на ключ записи."""
+        self.assertEqual(
+            recording_key({'method': 'track.getInfo', 'track': 'Yellow', 'api_key': 'a'}),
+            recording_key({'method': 'track.getInfo', 'track': 'Yellow', 'api_key': 'b', 'format': 'json'})
+        )
+
+
+class TestLastFMStubServer(unittest.TestCase):
+    """Тесты для LastFMStubServer вместе с LastFMService."""
+
+    def setUp(self):
+        """Настройка тестового окружения."""
+        self.temp_dir = tempfile.mkdtemp()
+        self.servers = []
+
+    def tearDown(self):
+        """Очистка после тестов."""
+        for server in self.servers:
+            server.stop()
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def _server(self, **config) -> LastFMStubServer:
+        server = LastFMStubServer(config=StubConfig(seed=1, **config)).start()
+        self.servers.append(server)
+        return server
+
+    def _client(self, server: LastFMStubServer, name: str) -> LastFMService:
+        client = LastFMService(cache_dir=os.path.join(self.temp_dir, name), session=build_session(retries=0))
+        client.base_url = server.url
+        client.circuit_breaker = CircuitBreaker()
+        return client
+
+    def test_service_against_stub(self):
+        """Тест: LastFMService разбирает ответы сервера."""
+        server = self._server()
+        client = self._client(server, 'plain')
+
+        track = client.get_track_info('Queen', 'Bohemian Rhapsody')
+        tags = list(client.iter_top_tags(page_size=100, max_items=150))
+
+        self.assertEqual(track['name'], 'Bohemian Rhapsody')
+        self.assertEqual(track['artist'], 'Queen')
+        self.assertEqual(len(track['tags']), 5)
+        self.assertEqual(len(tags), 150)
+        self.assertEqual(server.stats['synthetic'], 3)
+
+    def test_injected_errors(self):
+        """Тест: внедрённые ошибки 5xx видны клиенту как недоступность."""
+        server = self._server(rate_5xx=1.0)
+        client = self._client(server, 'errors')
+
+        with self.assertRaises(LastFMUnavailable):
+            client._fetch('key', 'artist.getInfo', {'artist': 'Queen'})
+
+        self.assertEqual(server.stats['injected_errors'], 1)
+
+    def test_session_retries_5xx_but_not_429(self):
+        """Тест: сессия повторяет 5xx, а 429 отдает сразу, не обходя ограничитель частоты."""
+        for config, expected_requests in (({'rate_5xx': 1.0}, 3), ({'rate_429': 1.0}, 1)):
+            server = self._server(**config)
+            client = self._client(server, f"retry-{expected_requests}")
+            client.session = build_session(retries=2, backoff=0)
+
+            with self.assertRaises(LastFMUnavailable):
+                client._fetch('key', 'artist.getInfo', {'artist': 'Queen'})
+
+            self.assertEqual(server.stats['requests'], expected_requests)
+
+    def test_record_and_replay(self):
+        """Тест: ответы записываются с вышестоящего сервера и воспроизводятся."""
+        replay_dir = os.path.join(self.temp_dir, 'replay')
+        upstream = self._server()
+        recorder = self._server(replay_dir=replay_dir, record_upstream=upstream.url)
+
+        recorded = self._client(recorder, 'record').get_artist_info('Queen')
+
+        replayer = self._server(replay_dir=replay_dir, synthetic=False)
+        replayed = self._client(replayer, 'replay').get_artist_info('Queen')
+        missing = self._client(replayer, 'missing').get_artist_info('Nobody')
+
+        self.assertEqual(recorded, replayed)
+        self.assertIsNone(missing)
+        self.assertEqual(recorder.stats['recorded'], 1)
+        self.assertEqual(replayer.stats['replayed'], 1)
+        self.assertEqual(upstream.stats['requests'], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,164 @@
+"""
+Тесты для импорта истории прослушиваний.
+"""
+import os
+import sys
+import unittest
+import django
+from django.conf import settings
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+if not settings.configured:
+    settings.configure(
+        SECRET_KEY='test-secret-key',
+        INSTALLED_APPS=[
+            'django.contrib.contenttypes',
+            'django.contrib.auth',
+            'catalog',
+        ],
+        DATABASES={
+            'default': {
+                'ENGINE': 'django.db.backends.sqlite3',
+                'NAME': ':memory:',
+            }
+        },
+        LASTFM_API_KEY='test_api_key',
+        LASTFM_SHARED_SECRET='test_shared_secret',
+        USE_TZ=True,
+    )
+    django.setup()
+
+from unittest.mock import Mock
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+
+from catalog.models import Artist, EnrichmentJob, GenreStats, ListeningEvent, PendingScrobble, Track
+from catalog.services.job_queue import JobQueueService
+from catalog.services.lastfm_service import LastFMUnavailable
+from catalog.services.listening_service import ListeningHistoryService
+
+
+class FakeLastFM:
+    """История из scrobbles (от новых к старым) с постраничной выдачей."""
+
+    def __init__(self, scrobbles, page_size=2, fail_on_page=None):
+        self.scrobbles = scrobbles
+        self.page_size = page_size
+        self.fail_on_page = fail_on_page
+        self.calls = []
+
+    def get_recent_tracks(self, username, page=1, limit=200, since=None, until=None):
+        self.calls.append((page, since, until))
+        if page == self.fail_on_page:
+            return None
+        window = [s for s in self.scrobbles
+                  if (since is None or s['timestamp'] >= since) and s['timestamp'] <= until]
+        total_pages = -(-len(window) // self.page_size)
+        start = (page - 1) * self.page_size
+        return window[start:start + self.page_size], total_pages
+
+
+def scrobble(artist, name, timestamp):
+    return {'artist': artist, 'name': name, 'album': '', 'timestamp': timestamp}
+
+
+class TestListeningHistoryService(unittest.TestCase):
+    """Тесты для ListeningHistoryService."""
+
+    @classmethod
+    def setUpClass(cls):
+        call_command('migrate', verbosity=0)
+
+    def setUp(self):
+        """Настройка тестового окружения."""
+        ListeningEvent.objects.all().delete()
+        PendingScrobble.objects.all().delete()
+        EnrichmentJob.objects.all().delete()
+        Track.objects.all().delete()
+        Artist.objects.all().delete()
+        User.objects.filter(username='listener').delete()
+        self.user = User.objects.create(username='listener')
+        self.history = [
+            scrobble('Air', 'Sexy Boy', 1005),
+            scrobble('Air', 'La Femme d\'Argent', 1004),
+            scrobble('Moby', 'Porcelain', 1003),
+            scrobble('Air', 'Sexy Boy', 1002),
+            scrobble('Moby', 'Natural Blues', 1001),
+        ]
+
+    def test_sync_resolves_tracks_against_catalog(self):
+        """Тест: треки каталога переиспользуются, остальные ждут проверки и не попадают в каталог."""
+        air = Artist.objects.create(name='Air')
+        sexy_boy = Track.objects.create(title='Sexy Boy', artist=air)
+
+        stats = ListeningHistoryService.sync_user(self.user.id, 'listener', FakeLastFM(self.history))
+
+        self.assertEqual(stats, {'pages': 3, 'scrobbles': 2, 'pending': 3})
+        self.assertEqual(sexy_boy.listening_events.count(), 2)
+        self.assertEqual(PendingScrobble.objects.filter(user=self.user).count(), 3)
+        self.assertEqual(Track.objects.count(), 1)
+        self.assertEqual(Artist.objects.count(), 1)
+        self.assertEqual(
+            EnrichmentJob.objects.filter(kind=EnrichmentJob.KIND_SCROBBLE).count(), 3
+        )
+        self.assertEqual(int(ListeningHistoryService.last_listened_at(self.user.id).timestamp()), 1005)
+
+    def test_confirmed_track_is_promoted_by_job(self):
+        """Тест: задача добавляет подтверждённый Last.fm трек и переносит прослушивания."""
+        ListeningHistoryService.sync_user(self.user.id, 'listener', FakeLastFM(self.history))
+        lastfm = Mock()
+        lastfm.get_track_info.side_effect = lambda artist, track: None if track == 'Porcelain' else {
+            'name': track, 'artist': artist, 'url': f'https://www.last.fm/music/{artist}',
+            'listeners': 10, 'playcount': 100, 'duration': 200, 'album': '', 'tags': ['trip-hop'], 'image': '',
+        }
+        lastfm.is_track_not_found.return_value = True
+
+        while JobQueueService.claim('worker-1', limit=10):
+            for job in EnrichmentJob.objects.filter(status=EnrichmentJob.STATUS_RUNNING):
+                JobQueueService.run(job, lastfm)
+
+        self.assertFalse(PendingScrobble.objects.exists())
+        self.assertEqual(
+            set(Track.objects.values_list('title', flat=True)),
+            {'Sexy Boy', 'La Femme d\'Argent', 'Natural Blues'}
+        )
+        self.assertEqual(ListeningEvent.objects.filter(user=self.user).count(), 4)
+        self.assertTrue(GenreStats.objects.filter(genre__name='Trip-Hop').exists())
+
+    def test_pages_are_imported_oldest_first(self):
+        """Тест: страницы обходятся от последней (старой) к первой."""
+        lastfm = FakeLastFM(self.history)
+
+        ListeningHistoryService.sync_user(self.user.id, 'listener', lastfm)
+
+        self.assertEqual([page for page, _, _ in lastfm.calls], [1, 3, 2])
+
+    def test_incremental_sync_starts_from_last_event(self):
+        """Тест: повторная синхронизация запрашивает только новое и не дублирует границу."""
+        ListeningHistoryService.sync_user(self.user.id, 'listener', FakeLastFM(self.history))
+        lastfm = FakeLastFM([scrobble('Moby', 'Why Does My Heart Feel So Bad?', 1006)] + self.history)
+
+        ListeningHistoryService.sync_user(self.user.id, 'listener', lastfm)
+
+        self.assertEqual(lastfm.calls[0][1], 1005)
+        self.assertEqual(PendingScrobble.objects.filter(user=self.user).count(), 6)
+
+    def test_interrupted_sync_resumes(self):
+        """Тест: после сбоя на странице старые страницы сохранены, повторный запуск дозагружает остальное."""
+        with self.assertRaises(LastFMUnavailable):
+            ListeningHistoryService.sync_user(self.user.id, 'listener', FakeLastFM(self.history, fail_on_page=2))
+
+        self.assertEqual(
+            sorted(int(event.listened_at.timestamp()) for event in PendingScrobble.objects.all()),
+            [1001]
+        )
+
+        ListeningHistoryService.sync_user(self.user.id, 'listener', FakeLastFM(self.history))
+
+        self.assertEqual(PendingScrobble.objects.filter(user=self.user).count(), 5)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,107 @@
+"""
+Тесты для ограничения частоты запросов.
+"""
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+import django
+from django.conf import settings
+from unittest.mock import patch
+
+from catalog.services.rate_limit import SharedTokenBucket, TokenBucket
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+if not settings.configured:
+    settings.configure(
+        SECRET_KEY='test-secret-key',
+        INSTALLED_APPS=[
+            'django.contrib.contenttypes',
+            'django.contrib.auth',
+            'catalog',
+        ],
+        USE_TZ=True,
+    )
+    django.setup()
+
+
+class TestTokenBucket(unittest.TestCase):
+    """Тесты для TokenBucket."""
+
+    @patch('catalog.services.rate_limit.time.time', return_value=1000.0)
+    def test_burst_then_reject(self, mock_time):
+        """Тест: всплеск до capacity, затем отказ без ожидания."""
+        bucket = TokenBucket(rate=1, capacity=3)
+
+        self.assertEqual([bucket.try_acquire() for _ in range(4)], [True, True, True, False])
+        self.assertEqual(bucket.stats()['rejected'], 1)
+
+    def test_refill(self):
+        """Тест: токены пополняются со временем."""
+        with patch('catalog.services.rate_limit.time.time', return_value=1000.0):
+            bucket = TokenBucket(rate=2, capacity=1)
+            self.assertTrue(bucket.try_acquire())
+            self.assertFalse(bucket.try_acquire())
+
+        with patch('catalog.services.rate_limit.time.time', return_value=1000.5):
+            self.assertTrue(bucket.try_acquire())
+
+    @patch('catalog.services.rate_limit.time.sleep')
+    def test_acquire_waits_for_token(self, mock_sleep):
+        """Тест: блокирующее получение ждёт следующий токен."""
+        times = iter([1000.0, 1000.0, 1000.0, 1000.5])
+
+        with patch('catalog.services.rate_limit.time.time', side_effect=lambda: next(times)):
+            bucket = TokenBucket(rate=2, capacity=1)
+            bucket.try_acquire()
+            self.assertTrue(bucket.acquire(timeout=None))
+
+        mock_sleep.assert_called_once_with(0.5)
+
+    @patch('catalog.services.rate_limit.time.time', return_value=1000.0)
+    def test_acquire_gives_up_when_wait_exceeds_timeout(self, mock_time):
+        """Тест: ожидание дольше timeout не начинается."""
+        bucket = TokenBucket(rate=0.1, capacity=1)
+        bucket.try_acquire()
+
+        with patch('catalog.services.rate_limit.time.sleep') as mock_sleep:
+            self.assertFalse(bucket.acquire(timeout=1))
+
+        mock_sleep.assert_not_called()
+
+
+class TestSharedTokenBucket(unittest.TestCase):
+    """Тесты для SharedTokenBucket."""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.temp_dir, 'ratelimit.sqlite3')
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    @patch('catalog.services.rate_limit.time.time', return_value=1000.0)
+    def test_limit_shared_between_instances(self, mock_time):
+        """Тест: экземпляры с одним файлом (разные процессы) делят токены."""
+        first = SharedTokenBucket(self.path, 'lastfm', rate=1, capacity=2)
+        second = SharedTokenBucket(self.path, 'lastfm', rate=1, capacity=2)
+
+        self.assertTrue(first.try_acquire())
+        self.assertTrue(second.try_acquire())
+        self.assertFalse(first.try_acquire())
+        self.assertFalse(second.try_acquire())
+
+    @patch('catalog.services.rate_limit.time.time', return_value=1000.0)
+    def test_buckets_are_independent_by_name(self, mock_time):
+        """Тест: лимиты с разными именами не влияют друг на друга."""
+        first = SharedTokenBucket(self.path, 'lastfm', rate=1, capacity=1)
+        other = SharedTokenBucket(self.path, 'other', rate=1, capacity=1)
+
+        self.assertTrue(first.try_acquire())
+        self.assertTrue(other.try_acquire())
+
+
+if __name__ == '__main__':
+    unittest.main()
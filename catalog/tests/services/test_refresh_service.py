@@ -0,0 +1,162 @@
+"""
+Тесты для планового обновления данных Last.fm.
+"""
+import os
+import sys
+import unittest
+from datetime import timedelta
+from unittest.mock import Mock
+import django
+from django.conf import settings
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+if not settings.configured:
+    settings.configure(
+        SECRET_KEY='test-secret-key',
+        INSTALLED_APPS=[
+            'django.contrib.contenttypes',
+            'django.contrib.auth',
+            'catalog',
+        ],
+        DATABASES={
+            'default': {
+                'ENGINE': 'django.db.backends.sqlite3',
+                'NAME': ':memory:',
+            }
+        },
+        LASTFM_API_KEY='test_api_key',
+        LASTFM_SHARED_SECRET='test_shared_secret',
+        USE_TZ=True,
+    )
+    django.setup()
+
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from catalog.models import Artist, Track
+from catalog.services.lastfm_service import LastFMUnavailable
+from catalog.services.refresh_service import RefreshService
+
+DAY = 24 * 60 * 60
+
+
+class TestRefreshService(unittest.TestCase):
+    """Тесты для RefreshService."""
+
+    @classmethod
+    def setUpClass(cls):
+        call_command('migrate', verbosity=0)
+
+    def setUp(self):
+        """Настройка тестового окружения."""
+        Track.objects.all().delete()
+        Artist.objects.all().delete()
+        self.now = timezone.now()
+        self.artist = Artist.objects.create(name='Coldplay', lastfm_listeners=5_000_000,
+                                            lastfm_synced_at=self.now)
+
+    def _track(self, title, listeners, synced_days_ago):
+        return Track.objects.create(
+            title=title,
+            artist=self.artist,
+            lastfm_listeners=listeners,
+            lastfm_synced_at=self.now - timedelta(days=synced_days_ago)
+        )
+
+    def test_target_age_shrinks_with_popularity(self):
+        """Тест: популярные сущности обновляются чаще, но не чаще REFRESH_MIN_AGE."""
+        self.assertEqual(RefreshService.target_age(0), 30 * DAY)
+        self.assertLess(RefreshService.target_age(1_000_000), RefreshService.target_age(100))
+        self.assertGreaterEqual(RefreshService.target_age(10 ** 12), RefreshService.min_age())
+
+    def test_pick_stale_prefers_hot_entities(self):
+        """Тест: популярный трек обгоняет столь же старый непопулярный, свежие не выбираются."""
+        hot = self._track('Yellow', 2_000_000, synced_days_ago=5)
+        tail = self._track('B-side', 10, synced_days_ago=5)
+        old_tail = self._track('Demo', 10, synced_days_ago=60)
+        self._track('Fresh', 2_000_000, synced_days_ago=0)
+
+        picked = RefreshService.pick_stale(10, now=self.now)
+
+        self.assertEqual([pk for _, _, pk in picked], [old_tail.pk, hot.pk, tail.pk])
+        self.assertEqual([pk for _, _, pk in RefreshService.pick_stale(1, now=self.now)], [old_tail.pk])
+
+    def test_pick_stale_ranks_in_database(self):
+        """Тест: устарелость считается в SQL так же, как staleness(), и ограничена LIMIT."""
+        for i in range(5):
+            self._track(f'Song {i}', 10 ** i, synced_days_ago=3 + i)
+
+        with CaptureQueriesContext(connection) as queries:
+            picked = RefreshService.pick_stale(2, now=self.now)
+
+        self.assertEqual(len(picked), 2)
+        self.assertTrue(all('LIMIT 2' in query['sql'] for query in queries.captured_queries))
+        for staleness, _, pk in picked:
+            track = Track.objects.get(pk=pk)
+            age = (self.now - track.lastfm_synced_at).total_seconds()
+            self.assertAlmostEqual(staleness, RefreshService.staleness(age, track.lastfm_listeners), places=3)
+
+    def test_refresh_tracks_updates_and_marks_synced(self):
+        """Тест: статистика обновляется пакетом, ненайденные тоже помечаются синхронизированными."""
+        yellow = self._track('Yellow', 100, synced_days_ago=10)
+        missing = self._track('Missing', 100, synced_days_ago=10)
+        lastfm = Mock()
+        lastfm.get_track_info_many.return_value = iter([
+            (('Coldplay', 'Yellow'), {'listeners': 900, 'playcount': 9000, 'tags': ['rock']}),
+            (('Coldplay', 'Missing'), None),
+        ])
+
+        stats = RefreshService.refresh_tracks([yellow.pk, missing.pk], lastfm, max_age=DAY)
+
+        self.assertEqual(stats, {'refreshed': 1, 'not_found': 1})
+        self.assertEqual(lastfm.get_track_info_many.call_args.kwargs['max_age'], DAY)
+        yellow.refresh_from_db()
+        missing.refresh_from_db()
+        self.assertEqual(yellow.lastfm_playcount, 9000)
+        self.assertEqual(yellow.tags, ['rock'])
+        self.assertGreater(yellow.lastfm_synced_at, self.now)
+        self.assertGreater(missing.lastfm_synced_at, self.now)
+
+    def test_refresh_keeps_results_before_error(self):
+        """Тест: при ошибке Last.fm полученные результаты сохраняются, остальные не трогаются."""
+        yellow = self._track('Yellow', 100, synced_days_ago=10)
+        clocks = self._track('Clocks', 100, synced_days_ago=10)
+
+        def results(keys, max_age=None):
+            yield ('Coldplay', 'Yellow'), {'listeners': 900, 'playcount': 9000, 'tags': []}
+            raise LastFMUnavailable('HTTP error 503')
+
+        lastfm = Mock()
+        lastfm.get_track_info_many.side_effect = results
+
+        with self.assertRaises(LastFMUnavailable):
+            RefreshService.refresh_tracks([yellow.pk, clocks.pk], lastfm)
+
+        yellow.refresh_from_db()
+        clocks.refresh_from_db()
+        self.assertEqual(yellow.lastfm_playcount, 9000)
+        self.assertLess(clocks.lastfm_synced_at, self.now)
+
+    def test_refresh_batch_splits_by_kind(self):
+        """Тест: шаг обновляет и треки, и исполнителей в пределах лимита."""
+        self._track('Yellow', 100, synced_days_ago=40)
+        Artist.objects.filter(pk=self.artist.pk).update(lastfm_synced_at=self.now - timedelta(days=40))
+        lastfm = Mock()
+        lastfm.get_track_info_many.side_effect = lambda keys, max_age=None: iter(
+            [(key, {'listeners': 1, 'playcount': 2, 'tags': []}) for key in keys]
+        )
+        lastfm.get_artist_info_many.side_effect = lambda names, max_age=None: iter(
+            [(name, {'listeners': 3, 'playcount': 4}) for name in names]
+        )
+
+        stats = RefreshService.refresh_batch(2, lastfm)
+
+        self.assertEqual(stats, {'selected': 2, 'tracks': 1, 'artists': 1, 'not_found': 0})
+        self.assertEqual(RefreshService.pick_stale(10), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,151 @@
+"""
+Тесты для выключателя и бюджета времени запросов.
+"""
+import asyncio
+import os
+import sys
+import unittest
+import django
+from django.conf import settings
+from unittest.mock import patch
+
+from catalog.services.resilience import CircuitBreaker, cap_timeout, deadline, remaining_time, with_deadline
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+if not settings.configured:
+    settings.configure(
+        SECRET_KEY='test-secret-key',
+        INSTALLED_APPS=[
+            'django.contrib.contenttypes',
+            'django.contrib.auth',
+            'catalog',
+        ],
+        USE_TZ=True,
+    )
+    django.setup()
+
+
+class TestCircuitBreaker(unittest.TestCase):
+    """Тесты для CircuitBreaker."""
+
+    def _breaker(self):
+        return CircuitBreaker(failure_rate=0.5, window=4, min_calls=4, slow_call_seconds=1, open_seconds=10)
+
+    def test_opens_on_error_rate(self):
+        """Тест: доля ошибок выше порога размыкает выключатель."""
+        breaker = self._breaker()
+
+        breaker.record_success(0.1)
+        breaker.record_success(0.1)
+        breaker.record_failure()
+        self.assertEqual(breaker.state, CircuitBreaker.CLOSED)
+
+        breaker.record_failure()
+        self.assertEqual(breaker.state, CircuitBreaker.OPEN)
+        self.assertFalse(breaker.allow_request())
+        self.assertEqual(breaker.stats()['rejected'], 1)
+
+    def test_slow_calls_count_as_failures(self):
+        """Тест: медленные вызовы размыкают выключатель."""
+        breaker = self._breaker()
+
+        for _ in range(4):
+            breaker.record_success(2.0)
+
+        self.assertEqual(breaker.state, CircuitBreaker.OPEN)
+
+    @patch('catalog.services.resilience.time.monotonic')
+    def test_half_open_probe(self, mock_monotonic):
+        """Тест: после паузы пропускается пробный вызов, успех замыкает выключатель."""
+        mock_monotonic.return_value = 100.0
+        breaker = self._breaker()
+        for _ in range(4):
+            breaker.record_failure()
+
+        mock_monotonic.return_value = 111.0
+        self.assertEqual(breaker.state, CircuitBreaker.HALF_OPEN)
+        self.assertTrue(breaker.allow_request())
+        self.assertFalse(breaker.allow_request())
+
+        breaker.record_success(0.1)
+        self.assertEqual(breaker.state, CircuitBreaker.CLOSED)
+
+    @patch('catalog.services.resilience.time.monotonic')
+    def test_half_open_failure_reopens(self, mock_monotonic):
+        """Тест: ошибка пробного вызова снова размыкает выключатель."""
+        mock_monotonic.return_value = 100.0
+        breaker = self._breaker()
+        for _ in range(4):
+            breaker.record_failure()
+
+        mock_monotonic.return_value = 111.0
+        self.assertTrue(breaker.allow_request())
+        breaker.record_failure()
+
+        self.assertEqual(breaker.state, CircuitBreaker.OPEN)
+        self.assertEqual(breaker.stats()['opened'], 2)
+
+    @patch('catalog.services.resilience.time.monotonic')
+    def test_release_frees_half_open_probe(self, mock_monotonic):
+        """Тест: пробный вызов без результата не занимает место пробы навсегда."""
+        mock_monotonic.return_value = 100.0
+        breaker = self._breaker()
+        for _ in range(4):
+            breaker.record_failure()
+
+        mock_monotonic.return_value = 111.0
+        self.assertTrue(breaker.allow_request())
+        breaker.release()
+
+        self.assertEqual(breaker.state, CircuitBreaker.HALF_OPEN)
+        self.assertTrue(breaker.allow_request())
+        breaker.record_success(0.1)
+        self.assertEqual(breaker.state, CircuitBreaker.CLOSED)
+
+
+class TestDeadline(unittest.TestCase):
+    """Тесты для бюджета времени."""
+
+    def test_no_deadline(self):
+        """Тест: без дедлайна таймауты не меняются."""
+        self.assertIsNone(remaining_time())
+        self.assertEqual(cap_timeout(10), 10)
+
+    def test_deadline_caps_timeout(self):
+        """Тест: таймаут урезается до оставшегося бюджета."""
+        with deadline(2):
+            self.assertLessEqual(cap_timeout(10), 2)
+            self.assertEqual(cap_timeout(0.5), 0.5)
+
+        self.assertIsNone(remaining_time())
+
+    def test_nested_deadline_cannot_extend(self):
+        """Тест: вложенный дедлайн не продлевает внешний."""
+        with deadline(1):
+            with deadline(60):
+                self.assertLessEqual(remaining_time(), 1)
+
+    def test_expired_deadline(self):
+        """Тест: истекший бюджет дает нулевой таймаут."""
+        with deadline(-1):
+            self.assertLess(remaining_time(), 0)
+            self.assertEqual(cap_timeout(10), 0)
+
+    def test_with_deadline_sync_and_async_views(self):
+        """Тест: декоратор задает бюджет для обычных и async-представлений."""
+        @with_deadline(5)
+        def view(request):
+            return remaining_time()
+
+        @with_deadline(5)
+        async def async_view(request):
+            return await asyncio.to_thread(remaining_time)
+
+        self.assertLessEqual(view(None), 5)
+        self.assertLessEqual(asyncio.run(async_view(None)), 5)
+        self.assertIsNone(remaining_time())
+
+
+if __name__ == '__main__':
+    unittest.main()
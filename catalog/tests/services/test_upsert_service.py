@@ -0,0 +1,195 @@
+"""
+Тесты для пакетной записи сущностей каталога.
+"""
+import os
+import sys
+import unittest
+import django
+from django.conf import settings
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+if not settings.configured:
+    settings.configure(
+        SECRET_KEY='test-secret-key',
+        INSTALLED_APPS=[
+            'django.contrib.contenttypes',
+            'django.contrib.auth',
+            'catalog',
+        ],
+        DATABASES={
+            'default': {
+                'ENGINE': 'django.db.backends.sqlite3',
+                'NAME': ':memory:',
+            }
+        },
+        LASTFM_API_KEY='test_api_key',
+        LASTFM_SHARED_SECRET='test_shared_secret',
+        USE_TZ=True,
+    )
+    django.setup()
+
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from catalog.models import Artist, Genre, Track, canonical_key
+from catalog.services.upsert_service import UpsertService
+
+
+class TestUpsertService(unittest.TestCase):
+    """Тесты для UpsertService."""
+
+    @classmethod
+    def setUpClass(cls):
+        call_command('migrate', verbosity=0)
+
+    def setUp(self):
+        """Настройка тестового окружения."""
+        Track.objects.all().delete()
+        Artist.objects.all().delete()
+        Genre.objects.all().delete()
+
+    def test_upsert_artists_returns_ids_and_is_idempotent(self):
+        """Тест: повторная запись не создаёт дублей и возвращает те же id."""
+        existing = Artist.objects.create(name='Radiohead', lastfm_listeners=1)
+
+        first = UpsertService.upsert_artists(
+            [{'name': 'Radiohead', 'lastfm_listeners': 500}, {'name': 'Portishead', 'lastfm_listeners': 70}],
+            ['lastfm_listeners']
+        )
+        second = UpsertService.upsert_artists(
+            [{'name': 'Radiohead', 'lastfm_listeners': 600}, {'name': 'Portishead', 'lastfm_listeners': 70}],
+            ['lastfm_listeners']
+        )
+
+        self.assertEqual(first, second)
+        self.assertEqual(first['Radiohead'], existing.id)
+        self.assertEqual(Artist.objects.count(), 2)
+        self.assertEqual(Artist.objects.get(pk=existing.id).lastfm_listeners, 600)
+
+    def test_only_listed_columns_are_updated(self):
+        """Тест: колонки вне update_fields у существующей строки не меняются."""
+        artist = Artist.objects.create(name='Muse', lastfm_url='https://example.com/muse', lastfm_playcount=5)
+
+        UpsertService.upsert_artists(
+            [{'name': 'Muse', 'lastfm_url': '', 'lastfm_playcount': 50}],
+            ['lastfm_playcount']
+        )
+
+        artist.refresh_from_db()
+        self.assertEqual(artist.lastfm_playcount, 50)
+        self.assertEqual(artist.lastfm_url, 'https://example.com/muse')
+
+    def test_insert_only_mode_keeps_existing_rows(self):
+        """Тест: без update_fields существующий трек не перезаписывается."""
+        artist = Artist.objects.create(name='Björk')
+        track = Track.objects.create(title='Hyperballad', artist=artist, lastfm_playcount=42)
+
+        ids = UpsertService.upsert_tracks([
+            {'artist_id': artist.id, 'title': 'Hyperballad', 'lastfm_playcount': 0},
+            {'artist_id': artist.id, 'title': 'Jóga'},
+        ])
+
+        self.assertEqual(ids[(artist.id, 'Hyperballad')], track.id)
+        self.assertIn((artist.id, 'Jóga'), ids)
+        track.refresh_from_db()
+        self.assertEqual(track.lastfm_playcount, 42)
+
+    def test_upsert_tracks_writes_stats_in_one_statement(self):
+        """Тест: порция треков пишется одной командой, статистика обновляется."""
+        artist = Artist.objects.create(name='Massive Attack')
+        Track.objects.create(title='Teardrop', artist=artist)
+        info = {'url': 'https://example.com/teardrop', 'listeners': 10, 'playcount': 100, 'tags': ['trip-hop']}
+        rows = [
+            {'artist_id': artist.id, 'title': title, **UpsertService.track_stats(info)}
+            for title in ('Teardrop', 'Angel', 'Unfinished Sympathy')
+        ]
+
+        with CaptureQueriesContext(connection) as queries:
+            ids = UpsertService.upsert_tracks(rows, UpsertService.TRACK_STATS_FIELDS)
+
+        track_statements = [query for query in queries.captured_queries if '"catalog_track"' in query['sql']]
+        if connection.features.can_return_rows_from_bulk_insert:
+            self.assertEqual(len(track_statements), 1)
+        self.assertEqual(len(ids), 3)
+        teardrop = Track.objects.get(pk=ids[(artist.id, 'Teardrop')])
+        self.assertEqual(teardrop.lastfm_playcount, 100)
+        self.assertEqual(teardrop.tags, ['trip-hop'])
+        self.assertIsNotNone(teardrop.lastfm_synced_at)
+        self.assertEqual(teardrop.get_lastfm_data()['playcount'], 100)
+
+    def test_for_list_defers_heavy_columns(self):
+        """Тест: списочный режим не читает lastfm_data, tags_json и описание исполнителя."""
+        artist = Artist.objects.create(name='Portishead', description='Длинная биография')
+        UpsertService.upsert_tracks(
+            [{'artist_id': artist.id, 'title': 'Roads',
+              **UpsertService.track_stats({'playcount': 7, 'tags': ['trip-hop'], 'wiki': 'x' * 1000})}],
+            UpsertService.TRACK_STATS_FIELDS
+        )
+
+        with CaptureQueriesContext(connection) as queries:
+            track = Track.objects.for_list().get(title='Roads')
+            self.assertEqual(track.artist.name, 'Portishead')
+
+        self.assertEqual(len(queries.captured_queries), 1)
+        sql = queries.captured_queries[0]['sql']
+        for column in ('lastfm_data', 'tags_json', 'description'):
+            self.assertNotIn(column, sql)
+        self.assertEqual(track.get_deferred_fields(), {'lastfm_data', 'tags_json'})
+        self.assertEqual(track.get_lastfm_data()['wiki'], 'x' * 1000)
+
+    def test_canonical_key(self):
+        """Тест: ключ не зависит от регистра, пунктуации и формы Unicode."""
+        self.assertEqual(canonical_key('AC/DC'), 'ac dc')
+        self.assertEqual(canonical_key('ac-dc'), 'ac dc')
+        self.assertEqual(canonical_key('Guns N’ Roses'), canonical_key("guns n' roses"))
+        self.assertEqual(canonical_key('Ｂｊöｒｋ'), 'björk')
+        self.assertEqual(canonical_key('  Hey   Ya! '), 'hey ya')
+        self.assertEqual(canonical_key('!!!'), '!!!')
+
+    def test_spelling_variants_map_to_one_row(self):
+        """Тест: варианты написания пишутся в одну строку и находятся через by_name."""
+        artist = Artist.objects.create(name='AC/DC')
+
+        artist_ids = UpsertService.upsert_artists([{'name': 'ac-dc', 'lastfm_listeners': 10}], ['lastfm_listeners'])
+        track_ids = UpsertService.upsert_tracks([
+            {'artist_id': artist.id, 'title': 'Back In Black'},
+            {'artist_id': artist.id, 'title': 'back in black!'},
+        ])
+
+        self.assertEqual(artist_ids, {'ac-dc': artist.id})
+        self.assertEqual(Artist.objects.get().name, 'AC/DC')
+        self.assertEqual(Track.objects.count(), 1)
+        self.assertEqual(set(track_ids), {(artist.id, 'Back In Black'), (artist.id, 'back in black!')})
+        self.assertEqual(len(set(track_ids.values())), 1)
+        self.assertEqual(Artist.objects.by_name('Ac Dc').get(), artist)
+        self.assertEqual(Track.objects.by_name('BACK IN BLACK', 'acdc').count(), 0)
+        self.assertEqual(Track.objects.by_name('BACK IN BLACK', 'AC DC').get().pk, track_ids[(artist.id, 'Back In Black')])
+
+    def test_save_keeps_keys_in_sync(self):
+        """Тест: переименование через save(update_fields) обновляет ключ."""
+        artist = Artist.objects.create(name='Prince')
+        track = Track.objects.create(artist=artist, title='Purple Rain')
+
+        artist.name = 'The Artist (Formerly Known As Prince)'
+        artist.save(update_fields=['name'])
+        track.title = 'Purple  Rain (Live)'
+        track.save(update_fields=['title'])
+
+        self.assertEqual(Artist.objects.get(pk=artist.pk).name_key, 'the artist formerly known as prince')
+        self.assertEqual(Track.objects.get(pk=track.pk).title_key, 'purple rain live')
+
+    def test_upsert_genres_fills_lastfm_tag(self):
+        """Тест: жанры получают тег Last.fm, существующие переиспользуются."""
+        rock = Genre.objects.create(name='Rock')
+
+        ids = UpsertService.upsert_genres([{'name': 'Rock'}, {'name': 'Shoegaze', 'description': 'Стена звука'}])
+
+        self.assertEqual(ids['Rock'], rock.id)
+        self.assertEqual(Genre.objects.get(name='Shoegaze').lastfm_tag, 'shoegaze')
+        self.assertEqual(Genre.objects.count(), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -16,6 +16,7 @@ urlpatterns = [
     path('artist/<int:pk>/', views.artist_detail, name='artist_detail'),
     path('artist/', views.artist_detail, name='artist_detail_by_name'),
     path('analytics/', views.analytics_view, name='analytics'),
+    path('export/', views.export_catalog, name='export_catalog'),
     path('save-track/', views.save_track_from_lastfm, name='save_track'),
     path('toggle_favorite/', views.toggle_favorite, name='toggle_favorite'),
     path('add-to-favorites/', views.add_to_favorites, name='add_to_favorites'),
@@ -1,19 +1,24 @@
 import json
 
+from asgiref.sync import sync_to_async
 from django.contrib import messages
+from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib.auth import login as auth_login
 from django.contrib.auth import logout as auth_logout
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.views import LoginView
-from django.http import JsonResponse
-from django.shortcuts import render, get_object_or_404, redirect
-from django.urls import reverse_lazy
+from django.http import JsonResponse, StreamingHttpResponse
+from django.shortcuts import render, get_object_or_404, aget_object_or_404, redirect
+from django.urls import reverse, reverse_lazy
+from django.utils import timezone
+from django.utils.http import urlencode
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_POST
 
 from .forms import SearchForm, AddTrackFromLastFMForm, FavoriteForm, GenreAnalysisForm, RegistrationForm
 from .models import Genre, Artist, Track, Favorite
-from .services import CatalogService, AnalyticsService
+from .services import CatalogService, AnalyticsService, ExportService, JobQueueService, with_deadline
+from .services.lastfm_service import LastFMUnavailable
 
 
 class CustomLoginView(LoginView):
@@ -74,17 +79,19 @@ def toggle_favorite(request):
         if not item_id:
             return JsonResponse({'status': 'error', 'message': 'No item_id provided'})
 
-        if item_type == 'genre':
-            try:
-                genre = Genre.objects.get(id=item_id)
-                item_id = str(genre.id)
-            except (Genre.DoesNotExist, ValueError):
-                return JsonResponse({'status': 'error', 'message': 'Genre not found'})
+        item_model = Favorite.item_model(item_type)
+        if item_model is None:
+            return JsonResponse({'status': 'error', 'message': 'Unknown item_type'})
+
+        try:
+            item = item_model.objects.get(pk=item_id)
+        except (item_model.DoesNotExist, ValueError, TypeError):
+            return JsonResponse({'status': 'error', 'message': f'{item_model.__name__} not found'})
 
         favorite = Favorite.objects.filter(
             user=request.user,
             item_type=item_type,
-            item_id=item_id
+            **{item_type: item}
         ).first()
 
         if favorite:
@@ -95,7 +102,7 @@ def toggle_favorite(request):
             Favorite.objects.create(
                 user=request.user,
                 item_type=item_type,
-                item_id=item_id
+                **{item_type: item}
             )
             action = 'added'
             is_favorite = True
@@ -104,7 +111,7 @@ def toggle_favorite(request):
             'status': 'success',
             'action': action,
             'is_favorite': is_favorite,
-            'item_id': item_id,
+            'item_id': item.pk,
             'item_type': item_type
         })
 
@@ -120,15 +127,15 @@ def genre_list(request):
 
     genres = CatalogService.get_genre_statistics(limit=100)
 
-    favorite_genres_ids = []
+    favorite_genres_ids = set()
     if request.user.is_authenticated:
-        favorite_genres_ids = Favorite.objects.filter(
+        favorite_genres_ids = set(Favorite.objects.filter(
             user=request.user,
             item_type='genre'
-        ).values_list('item_id', flat=True)
+        ).values_list('genre_id', flat=True))
 
     if favorites_only and request.user.is_authenticated:
-        genres = [genre for genre in genres if str(genre.id) in favorite_genres_ids]
+        genres = [genre for genre in genres if genre.id in favorite_genres_ids]
 
     if search_query:
         genres = [genre for genre in genres
@@ -153,7 +160,7 @@ def genre_list(request):
         genre.display_track_count = getattr(genre, 'annotated_track_count', 0) or 0
         genre.display_artist_count = getattr(genre, 'annotated_artist_count', 0) or 0
         genre.total_playcount = getattr(genre, 'total_playcount', 0) or 0
-        genre.is_favorite = str(genre.id) in favorite_genres_ids
+        genre.is_favorite = genre.id in favorite_genres_ids
 
     total_favorites = len(favorite_genres_ids) if request.user.is_authenticated else 0
     showing_favorites = favorites_only and request.user.is_authenticated
@@ -171,11 +178,12 @@ def genre_list(request):
     })
 
 
-def genre_detail(request, pk):
+@with_deadline()
+async def genre_detail(request, pk):
     """Детальная страница жанра."""
-    genre, artists, tracks, top_tracks = CatalogService.get_genre_with_details(pk)
+    genre, artists, tracks, top_tracks = await CatalogService.aget_genre_with_details(pk)
 
-    return render(request, 'catalog/genre_detail.html', {
+    return await sync_to_async(render)(request, 'catalog/genre_detail.html', {
         'genre': genre,
         'artists': artists,
         'tracks': tracks,
@@ -184,7 +192,8 @@ def genre_detail(request, pk):
     })
 
 
-def search_view(request):
+@with_deadline()
+async def search_view(request):
     """Поиск в Last.fm."""
     form = SearchForm(request.GET or None)
     results = []
@@ -192,9 +201,9 @@ def search_view(request):
     if form.is_valid():
         query = form.cleaned_data['query']
         search_type = form.cleaned_data['search_type']
-        results = CatalogService.search_in_lastfm(query, search_type)
+        results = await CatalogService.asearch_in_lastfm(query, search_type)
 
-    return render(request, 'catalog/search_results.html', {
+    return await sync_to_async(render)(request, 'catalog/search_results.html', {
         'form': form,
         'results': results,
         'search_type': form.cleaned_data.get('search_type', 'track') if form.is_bound else 'track',
@@ -202,14 +211,18 @@ def search_view(request):
     })
 
 
-def track_detail(request, pk=None):
+@with_deadline()
+async def track_detail(request, pk=None):
     """Детальная страница трека."""
     if pk:
-        track = get_object_or_404(Track, pk=pk)
+        tracks = Track.objects.select_related('artist')
+        track = await aget_object_or_404(tracks, pk=pk)
 
-        if not track.get_lastfm_data():
-            CatalogService.update_track_from_lastfm(track)
-            track.refresh_from_db()
+        enrichment_pending = track.needs_enrichment()
+        if enrichment_pending:
+            await sync_to_async(JobQueueService.enqueue_track)(
+                track.pk, priority=JobQueueService.PRIORITY_INTERACTIVE
+            )
 
         favorite_form = FavoriteForm(initial={
             'track_id': track.id,
@@ -218,9 +231,11 @@ def track_detail(request, pk=None):
             'artist_name': track.artist.name
         })
 
-        return render(request, 'catalog/track_detail.html', {
+        return await sync_to_async(render)(request, 'catalog/track_detail.html', {
             'track': track,
             'favorite_form': favorite_form,
+            'enrichment_pending': enrichment_pending,
+            'lastfm_missing': not enrichment_pending and not track.get_lastfm_data(),
             'page_title': f'{track.title} - {track.artist.name}'
         })
 
@@ -228,26 +243,20 @@ def track_detail(request, pk=None):
         track_name = request.GET.get('track')
         artist_name = request.GET.get('artist')
 
-        track = Track.objects.filter(
-            title__iexact=track_name,
-            artist__name__iexact=artist_name
-        ).first()
-
+        track = await Track.objects.by_name(track_name, artist_name).afirst()
         if track:
             return redirect('catalog:track_detail', pk=track.pk)
-        else:
-            track, created = CatalogService.get_or_create_track_from_lastfm(track_name, artist_name)
 
-            if track:
-                return redirect('catalog:track_detail', pk=track.pk)
-            else:
-                messages.error(request, 'Трек не найден')
-                return redirect('catalog:search')
+        # GET ничего не записывает: трек создается только POST-формой сохранения
+        messages.info(request, f'Трека "{track_name}" нет в каталоге, его можно сохранить')
+        query = urlencode({'track_name': track_name, 'artist_name': artist_name})
+        return redirect(f"{reverse('catalog:save_track')}?{query}")
 
     messages.error(request, 'Не указаны параметры')
     return redirect('catalog:search')
 
 
+@with_deadline()
 def artist_detail(request, pk=None):
     """Детальная страница исполнителя."""
     if pk:
@@ -266,7 +275,7 @@ def artist_detail(request, pk=None):
     elif request.GET.get('artist'):
         artist_name = request.GET.get('artist')
 
-        artist = Artist.objects.filter(name__iexact=artist_name).first()
+        artist = Artist.objects.by_name(artist_name).first()
 
         if artist:
             return redirect('catalog:artist_detail', pk=artist.pk)
@@ -283,6 +292,7 @@ def artist_detail(request, pk=None):
     return redirect('catalog:search')
 
 
+@with_deadline()
 def analytics_view(request):
     """Аналитика жанров."""
     form = GenreAnalysisForm(request.GET or None)
@@ -303,6 +313,47 @@ def analytics_view(request):
     })
 
 
+@staff_member_required
+def export_catalog(request):
+    """
+    Потоковая выгрузка каталога для сотрудников.
+
+    GET-параметры: format (jsonl или csv), entity (можно несколько;
+    для csv - ровно одна), since (только изменённые с этого времени).
+    """
+    export_format = request.GET.get('format', 'jsonl')
+    entities = request.GET.getlist('entity') or list(ExportService.ENTITIES)
+
+    if export_format not in ExportService.FORMATS:
+        return JsonResponse({'status': 'error', 'message': f'Unknown format: {export_format}'}, status=400)
+    unknown = [entity for entity in entities if entity not in ExportService.ENTITIES]
+    if unknown:
+        return JsonResponse({'status': 'error', 'message': f'Unknown entity: {", ".join(unknown)}'}, status=400)
+    if export_format == 'csv' and len(entities) != 1:
+        return JsonResponse({'status': 'error', 'message': 'CSV export requires exactly one entity'}, status=400)
+
+    since = None
+    if request.GET.get('since'):
+        try:
+            since = ExportService.parse_since(request.GET['since'])
+        except ValueError as e:
+            return JsonResponse({'status': 'error', 'message': str(e)}, status=400)
+
+    started_at = timezone.now()
+    if export_format == 'csv':
+        content = ExportService.iter_csv(entities[0], since)
+        filename = f'{entities[0]}.csv'
+    else:
+        content = ExportService.iter_jsonl(entities, since)
+        filename = 'catalog.jsonl'
+
+    response = StreamingHttpResponse(content, content_type=ExportService.CONTENT_TYPES[export_format])
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    # Значение since для следующей инкрементальной выгрузки
+    response['X-Export-Started-At'] = started_at.isoformat()
+    return response
+
+
 @login_required
 def add_to_favorites(request):
     """Добавление в избранное (через форму на странице трека)."""
@@ -329,26 +380,14 @@ def add_to_favorites(request):
 @login_required
 def my_favorites(request):
     """Избранное пользователя."""
-    favorite_genres_ids = Favorite.objects.filter(
-        user=request.user,
-        item_type='genre'
-    ).values_list('item_id', flat=True)
-
-    genre_ids = []
-    for item_id in favorite_genres_ids:
-        try:
-            genre_ids.append(int(item_id))
-        except (ValueError, TypeError):
-            continue
-
-    if not genre_ids:
-        favorite_genres = Genre.objects.none()
-    else:
-        favorite_genres = Genre.objects.filter(id__in=genre_ids)
+    favorite_genres = Genre.objects.filter(
+        favorites__user=request.user,
+        favorites__item_type='genre'
+    )
 
     recommendations = {
-        'artists': Artist.objects.filter(genres__in=favorite_genres).distinct()[:4],
-        'tracks': Track.objects.filter(artist__genres__in=favorite_genres).distinct()[:5]
+        'artists': Artist.objects.for_list().filter(genres__in=favorite_genres).distinct()[:4],
+        'tracks': Track.objects.for_list().filter(artist__genres__in=favorite_genres).distinct()[:5]
     }
 
     return render(request, 'catalog/favorites.html', {
@@ -358,25 +397,29 @@ def my_favorites(request):
     })
 
 
+@with_deadline()
 def save_track_from_lastfm(request):
-    """Сохранение трека из Last.fm."""
+    """Сохранение трека, подтверждённого Last.fm."""
     if request.method == 'POST':
         form = AddTrackFromLastFMForm(request.POST)
         if form.is_valid():
             track_name = form.cleaned_data['track_name']
             artist_name = form.cleaned_data['artist_name']
 
-            track, created = CatalogService.get_or_create_track_from_lastfm(track_name, artist_name)
-
-            if track:
-                if created:
-                    messages.success(request, f'Трек "{track_name}" сохранен!')
+            try:
+                track, created = CatalogService.get_or_create_confirmed_track(track_name, artist_name)
+            except (LastFMUnavailable, ValueError):
+                messages.error(request, 'Last.fm сейчас недоступен, трек не проверен. Попробуйте позже.')
+            else:
+                if track is None:
+                    messages.error(request, f'Трек "{track_name}" исполнителя "{artist_name}" не найден в Last.fm')
                 else:
-                    messages.info(request, f'Трек "{track_name}" уже есть')
+                    if created:
+                        messages.success(request, f'Трек "{track.title}" сохранен!')
+                    else:
+                        messages.info(request, f'Трек "{track.title}" уже есть')
 
-                return redirect('catalog:track_detail', pk=track.pk)
-            else:
-                messages.error(request, 'Не удалось сохранить трек')
+                    return redirect('catalog:track_detail', pk=track.pk)
 
     else:
         initial_data = {}
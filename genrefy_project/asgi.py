@@ -13,4 +13,29 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "genrefy_project.settings")
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+from catalog.services.lastfm_async import aclose_async_lastfm_services, manage_event_loop  # noqa: E402
+
+
+async def application(scope, receive, send):
+    """
+    Django и протокол lifespan.
+
+    Django lifespan не поддерживает, поэтому старт и остановка воркера
+    обрабатываются здесь: общие клиенты Last.fm цикла событий
+    закрываются при остановке.
+    """
+    if scope["type"] != "lifespan":
+        await django_application(scope, receive, send)
+        return
+
+    while True:
+        message = await receive()
+        if message["type"] == "lifespan.startup":
+            manage_event_loop()
+            await send({"type": "lifespan.startup.complete"})
+        elif message["type"] == "lifespan.shutdown":
+            await aclose_async_lastfm_services()
+            await send({"type": "lifespan.shutdown.complete"})
+            return
@@ -40,6 +40,8 @@ else:
 
 LASTFM_API_KEY = os.environ.get('LASTFM_API_KEY', '')
 LASTFM_SHARED_SECRET = os.environ.get('LASTFM_SHARED_SECRET', '')
+# Адрес API; для бенчмарков - адрес локального сервера lastfm_stub
+LASTFM_API_URL = os.environ.get('LASTFM_API_URL', 'https://ws.audioscrobbler.com/2.0/')
 
 if not LASTFM_API_KEY or not LASTFM_SHARED_SECRET:
     print("=" * 60)
@@ -53,6 +55,67 @@ if not LASTFM_API_KEY or not LASTFM_SHARED_SECRET:
 CACHE_TTL_DAYS = int(os.environ.get('CACHE_TTL_DAYS', '7'))
 CACHE_DIR = os.environ.get('CACHE_DIR', os.path.join(BASE_DIR, '.cache'))
 
+# Сколько секунд после истечения TTL ответ Last.fm отдаётся сразу с фоновым обновлением
+LASTFM_STALE_WHILE_REVALIDATE = int(os.environ.get('LASTFM_STALE_WHILE_REVALIDATE', str(24 * 60 * 60)))
+# Максимальный возраст сверх TTL, при котором ответ используется, если Last.fm недоступен
+LASTFM_STALE_IF_ERROR = int(os.environ.get('LASTFM_STALE_IF_ERROR', str(30 * 24 * 60 * 60)))
+# Сколько секунд процесс ждёт, пока другой процесс запрашивает тот же ключ Last.fm
+LASTFM_LEASE_TIMEOUT = int(os.environ.get('LASTFM_LEASE_TIMEOUT', '5'))
+
+LASTFM_REQUEST_TIMEOUT = float(os.environ.get('LASTFM_REQUEST_TIMEOUT', '10'))
+LASTFM_HTTP_POOL_SIZE = int(os.environ.get('LASTFM_HTTP_POOL_SIZE', '20'))
+LASTFM_HTTP_RETRIES = int(os.environ.get('LASTFM_HTTP_RETRIES', '2'))
+LASTFM_HTTP_BACKOFF = float(os.environ.get('LASTFM_HTTP_BACKOFF', '0.3'))
+
+# Лимит запросов к Last.fm: запросов в секунду и допустимый всплеск (общий для всех воркеров)
+LASTFM_RATE_LIMIT = float(os.environ.get('LASTFM_RATE_LIMIT', '5'))
+LASTFM_RATE_BURST = int(os.environ.get('LASTFM_RATE_BURST', '10'))
+# Сколько секунд запрос ждёт токен, прежде чем отдать данные из кэша
+LASTFM_RATE_LIMIT_WAIT = float(os.environ.get('LASTFM_RATE_LIMIT_WAIT', '1'))
+# Одновременных запросов к Last.fm из async-представлений одного воркера
+LASTFM_ASYNC_MAX_CONCURRENCY = int(os.environ.get('LASTFM_ASYNC_MAX_CONCURRENCY', '10'))
+# Пакетное обогащение: число потоков и сколько поток ждёт токен лимита
+LASTFM_BATCH_WORKERS = int(os.environ.get('LASTFM_BATCH_WORKERS', '4'))
+LASTFM_BATCH_RATE_LIMIT_WAIT = float(os.environ.get('LASTFM_BATCH_RATE_LIMIT_WAIT', '30'))
+
+# Бюджет времени на обращения к внешним API за один запрос к представлению
+UPSTREAM_DEADLINE = float(os.environ.get('UPSTREAM_DEADLINE', '3'))
+# Выключатель: доля ошибок и медленных вызовов среди последних WINDOW,
+# после которой Last.fm не вызывается OPEN_SECONDS секунд
+CIRCUIT_BREAKER_FAILURE_RATE = float(os.environ.get('CIRCUIT_BREAKER_FAILURE_RATE', '0.5'))
+CIRCUIT_BREAKER_WINDOW = int(os.environ.get('CIRCUIT_BREAKER_WINDOW', '20'))
+CIRCUIT_BREAKER_MIN_CALLS = int(os.environ.get('CIRCUIT_BREAKER_MIN_CALLS', '10'))
+CIRCUIT_BREAKER_SLOW_CALL = float(os.environ.get('CIRCUIT_BREAKER_SLOW_CALL', '5'))
+CIRCUIT_BREAKER_OPEN_SECONDS = float(os.environ.get('CIRCUIT_BREAKER_OPEN_SECONDS', '30'))
+
+# Очередь задач обогащения (команда enrichment_worker): потоки воркера,
+# пауза при пустой очереди, повторы с экспоненциальной задержкой
+# и время, после которого задача зависшего воркера возвращается в очередь
+JOB_WORKER_THREADS = int(os.environ.get('JOB_WORKER_THREADS', '4'))
+JOB_POLL_INTERVAL = float(os.environ.get('JOB_POLL_INTERVAL', '2'))
+JOB_MAX_ATTEMPTS = int(os.environ.get('JOB_MAX_ATTEMPTS', '5'))
+JOB_RETRY_BACKOFF = float(os.environ.get('JOB_RETRY_BACKOFF', '30'))
+JOB_RETRY_BACKOFF_MAX = float(os.environ.get('JOB_RETRY_BACKOFF_MAX', str(60 * 60)))
+JOB_LEASE_SECONDS = float(os.environ.get('JOB_LEASE_SECONDS', '600'))
+
+# Плановое обновление (команда refresh_lastfm): запросов к Last.fm в час,
+# шаг планировщика и интервалы обновления - от MIN_AGE для самых
+# популярных сущностей до MAX_AGE для длинного хвоста
+LASTFM_REFRESH_BUDGET = int(os.environ.get('LASTFM_REFRESH_BUDGET', '600'))
+REFRESH_INTERVAL = float(os.environ.get('REFRESH_INTERVAL', '60'))
+REFRESH_MIN_AGE = float(os.environ.get('REFRESH_MIN_AGE', str(24 * 60 * 60)))
+REFRESH_MAX_AGE = float(os.environ.get('REFRESH_MAX_AGE', str(30 * 24 * 60 * 60)))
+
+# Источник статистики жанров для страниц жанров и аналитики: table -
+# таблица GenreStats, matview - материализованное представление (только
+# PostgreSQL, обновляется командой refresh_genre_leaderboard), live -
+# агрегирующий запрос при каждом обращении
+GENRE_STATS_BACKEND = os.environ.get('GENRE_STATS_BACKEND', 'table')
+
+API_CACHE_BACKEND = os.environ.get('API_CACHE_BACKEND', 'sqlite')
+API_MEMORY_CACHE_MAX_ENTRIES = int(os.environ.get('API_MEMORY_CACHE_MAX_ENTRIES', '1024'))
+API_MEMORY_CACHE_MAX_BYTES = int(os.environ.get('API_MEMORY_CACHE_MAX_BYTES', str(32 * 1024 * 1024)))
+
 INSTALLED_APPS = [
     "django.contrib.admin",
     "django.contrib.auth",